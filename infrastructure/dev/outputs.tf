@@ -1,4 +1,9 @@
 output "api_invoke_url" {
   description = "The base URL for the deployed 'dev' API."
   value       = module.api.api_invoke_url
-}
\ No newline at end of file
+}
+
+output "websocket_url" {
+  description = "The WebSocket URL for real-time delivery in the 'dev' environment."
+  value       = module.api.websocket_url
+}
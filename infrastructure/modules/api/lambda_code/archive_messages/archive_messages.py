@@ -0,0 +1,45 @@
+import os
+import time
+from datetime import datetime
+
+# boto3/botocore are loaded lazily by aws_clients on the first DynamoDB call.
+import message_archive
+import metrics
+import warmup
+
+# The schedule runs hourly; each run takes one segment of a parallel scan of
+# the conversations table, so every conversation is checked once a day
+SCAN_SEGMENTS = int(os.environ.get("ARCHIVE_SCAN_SEGMENTS", "24"))
+# Stop starting conversations this long before the Lambda timeout
+TIMEOUT_MARGIN_SECONDS = 60
+
+
+def scan_segment(event):
+    """The scan segment for this run: ``event["segment"]`` if given, else the hour of the scheduled time."""
+    if "segment" in event:
+        return int(event["segment"])
+    scheduled = event.get("time")
+    hour = datetime.fromisoformat(scheduled.replace("Z", "+00:00")).hour if scheduled else time.gmtime().tm_hour
+    return hour % SCAN_SEGMENTS
+
+
+@metrics.instrument
+@warmup.primes(clients=("s3",), resources=("dynamodb",), modules=("boto3.dynamodb.conditions",))
+def lambda_handler(event, context):
+    """Move conversations that have been quiet for ARCHIVE_AFTER_DAYS to the S3 message archive.
+
+    Invoked by an hourly EventBridge schedule, or by hand with
+    ``{"segment": n}``. A run that reaches its time limit stops; the
+    conversations it did not get to are picked up the next day.
+    """
+    segment = scan_segment(event)
+    deadline = None
+    if context is not None:
+        deadline = time.monotonic() + context.get_remaining_time_in_millis() / 1000 - TIMEOUT_MARGIN_SECONDS
+    totals = message_archive.compact(segment=segment, total_segments=SCAN_SEGMENTS, deadline=deadline)
+
+    metrics.add("ConversationsArchived", totals["archived"], namespace="ChatApp/Archive")
+    metrics.add("MessagesArchived", totals["messages"], namespace="ChatApp/Archive")
+    metrics.add("ArchiveBytesWritten", totals["bytes"], unit="Bytes", namespace="ChatApp/Archive")
+    print(f"Archive segment {segment}/{SCAN_SEGMENTS}: {totals}")
+    return dict(totals, segment=segment)
@@ -0,0 +1,49 @@
+import importlib
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import archive_messages
+import message_archive
+import message_store
+
+T0 = 1700000000
+
+
+@pytest.fixture(autouse=True)
+def tables(archive_bucket, monkeypatch):
+    monkeypatch.setenv("ARCHIVE_SCAN_SEGMENTS", "1")
+    importlib.reload(archive_messages)
+    return archive_bucket
+
+
+def test_archives_quiet_conversations_and_reports_metrics(capsys):
+    conversation = message_store.create_conversation("user-1", ["user-2"])
+    for i in range(3):
+        message_store.send_message(conversation, "user-1", f"hello {i}", now=T0 + i)
+
+    result = archive_messages.lambda_handler({"time": "2026-10-18T03:00:00Z"}, None)
+
+    assert result["segment"] == 0
+    assert result["archived"] == 1 and result["messages"] == 3 and result["complete"]
+    assert len(message_archive.history(conversation)[0]) == 3
+    record = json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+    assert record["MessagesArchived"] == 3
+    assert record["ArchiveBytesWritten"] == result["bytes"]
+
+
+def test_stops_when_the_time_limit_is_near():
+    message_store.create_conversation("user-1", ["user-2"])
+    context = SimpleNamespace(get_remaining_time_in_millis=lambda: 1000)
+
+    result = archive_messages.lambda_handler({"segment": 0}, context)
+
+    assert result["complete"] is False and result["scanned"] == 0
+
+
+def test_scheduled_hour_picks_the_scan_segment(monkeypatch):
+    monkeypatch.setattr(archive_messages, "SCAN_SEGMENTS", 24)
+
+    assert archive_messages.scan_segment({"time": "2026-10-18T07:00:00Z"}) == 7
+    assert archive_messages.scan_segment({"segment": 3}) == 3
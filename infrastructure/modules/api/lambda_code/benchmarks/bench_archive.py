@@ -0,0 +1,225 @@
+"""Message archive compression ratio and archived-page read latency.
+
+Seeds ``--conversations`` conversations of ``--messages`` messages each,
+written straight into the messages table as ``send_message`` stores them.
+Words are drawn Zipf-like from a ``--vocabulary``-word vocabulary of
+made-up words, and senders alternate at random between the members. The
+conversations are then archived with ``message_archive.compact``. Reports:
+
+1. compaction throughput, and the archive's size against the messages'
+   DynamoDB item size (attribute names plus values, as DynamoDB bills
+   storage) and against the uncompressed chunks;
+2. latency of a 50-message history page from the table before archiving
+   (newest page, and a page halfway back);
+3. latency of the same pages from the archive, with the segment's index
+   not yet cached in the container (two ranged GETs) and cached (one).
+
+    python bench_archive.py --conversations 20 --messages 5000
+
+Without endpoints it runs in-process on moto, so latencies leave out the
+network; for real round trips point it at DynamoDB Local and an
+S3-compatible store such as MinIO:
+
+    python bench_archive.py --endpoint-url http://localhost:8000 --s3-endpoint-url http://localhost:9000
+"""
+import argparse
+import itertools
+import os
+import random
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "shared", "python"))
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+os.environ.setdefault("AWS_REGION", "us-east-1")
+os.environ["CONVERSATIONS_TABLE_NAME"] = "bench-conversations"
+os.environ["MESSAGES_TABLE_NAME"] = "bench-messages"
+os.environ["MESSAGE_ARCHIVE_BUCKET_NAME"] = "bench-message-archive"
+
+import aws_clients  # noqa: E402
+import dynamo_batch  # noqa: E402
+import message_archive  # noqa: E402
+import message_store  # noqa: E402
+
+START = 1704067200.0  # 2024-01-01T00:00:00Z
+PAGE = 50
+TABLES = {
+    "bench-conversations": [("conversationID", "S")],
+    "bench-messages": [("pk", "S"), ("messageID", "S")],
+}
+SYLLABLES = ["ba", "ko", "ri", "ta", "men", "lo", "su", "vi", "nar", "pe", "do", "ki", "sha", "tor", "e", "an"]
+
+
+def create_stores(dynamodb, s3):
+    for name, key in TABLES.items():
+        dynamodb.create_table(
+            TableName=name,
+            KeySchema=[{"AttributeName": attr, "KeyType": kind} for (attr, _), kind in zip(key, ("HASH", "RANGE"))],
+            AttributeDefinitions=[{"AttributeName": attr, "AttributeType": kind} for attr, kind in key],
+            BillingMode="PAY_PER_REQUEST",
+        ).wait_until_exists()
+    s3.create_bucket(Bucket="bench-message-archive")
+
+
+def item_size(item):
+    """DynamoDB's billed size of an item: attribute name lengths plus value sizes."""
+    size = 0
+    for name, value in item.items():
+        size += len(name.encode())
+        size += len(value.encode()) if isinstance(value, str) else (len(str(value)) + 1) // 2 + 1
+    return size
+
+
+def seed(args, rng):
+    """Write the messages; return ``(conversations, total item bytes)``."""
+    vocabulary = sorted({"".join(rng.choices(SYLLABLES, k=rng.randint(1, 4))) for _ in range(args.vocabulary * 2)})
+    vocabulary = vocabulary[:args.vocabulary]
+    rng.shuffle(vocabulary)
+    cumulative = list(itertools.accumulate(1 / (rank + 1) ** 1.1 for rank in range(len(vocabulary))))
+
+    conversations, total = [], 0
+    for c in range(args.conversations):
+        members = [f"user-{c}-{m}" for m in range(rng.randint(2, 6))]
+        conversation = message_store.create_conversation(members[0], members[1:], now=START)
+        items = []
+        for i in range(args.messages):
+            now = START + i * 60 + rng.random()
+            words = rng.choices(vocabulary, cum_weights=cumulative, k=rng.randint(2, 24))
+            item = {"pk": message_store.partition_key(conversation["conversationID"], 0),
+                    "conversationID": conversation["conversationID"],
+                    "messageID": message_store.new_message_id(now), "senderID": rng.choice(members),
+                    "body": " ".join(words).capitalize(), "sentAt": int(now * 1000)}
+            total += item_size(item)
+            items.append(item)
+        dynamo_batch.batch_write("bench-messages", items)
+        conversations.append(conversation)
+    return conversations, total
+
+
+def cursors(conversation):
+    """The ``before`` of the newest page and of a page halfway back."""
+    messages, cursor = [], None
+    while True:
+        page, cursor = message_store.history(conversation, message_store.MAX_PAGE_SIZE, cursor)
+        messages += page
+        if cursor is None:
+            break
+    middle = len(messages) // 2
+    return {"newest": None, "halfway": messages[middle]["messageID"]}
+
+
+def timed(calls):
+    latencies = []
+    for call in calls:
+        start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return statistics.median(latencies), latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+
+def report(label, p50, p95, note=""):
+    print(f"{label:<36} p50 {p50 * 1e3:8.2f}ms  p95 {p95 * 1e3:8.2f}ms  {note}")
+
+
+def pages(conversations, positions, read, repeats, before_each=None):
+    """Return ``(p50, p95, calls)`` for reading each conversation's page ``repeats`` times."""
+    calls = []
+    for _ in range(repeats):
+        for conversation, position in zip(conversations, positions):
+            def call(conversation=conversation, position=position):
+                if before_each:
+                    before_each()
+                read(conversation, position)
+            calls.append(call)
+    return (*timed(calls), len(calls))
+
+
+def run(args):
+    import boto3
+
+    dynamodb = boto3.resource("dynamodb", region_name=os.environ["AWS_REGION"], endpoint_url=args.endpoint_url)
+    s3 = boto3.client("s3", region_name=os.environ["AWS_REGION"], endpoint_url=args.s3_endpoint_url)
+    aws_clients.set_resource("dynamodb", dynamodb)
+    aws_clients.set_client("s3", s3)
+    create_stores(dynamodb, s3)
+    try:
+        rng = random.Random(5)
+        conversations, item_bytes = seed(args, rng)
+        count = args.conversations * args.messages
+        print(f"seeded {args.conversations:,} conversations x {args.messages:,} messages "
+              f"({item_bytes / count:.0f} bytes per DynamoDB item)")
+
+        positions = {name: [] for name in ("newest", "halfway")}
+        for conversation in conversations:
+            for name, cursor in cursors(conversation).items():
+                positions[name].append(cursor)
+        for name, before in positions.items():
+            p50, p95, _ = pages(conversations, before, lambda c, b: message_store.history(c, PAGE, b), args.repeats)
+            report(f"table, {name} page of {PAGE}:", p50, p95, "(1 Query)")
+
+        start = time.perf_counter()
+        totals = message_archive.compact(now=START + args.messages * 60 + 100 * 86400)
+        elapsed = time.perf_counter() - start
+        print(f"archived {totals['messages']:,} messages in {totals['segments']} segments "
+              f"({totals['messages'] / elapsed:,.0f} msgs/s on this store)")
+        print(f"archive {totals['bytes'] / 1e6:.2f} MB: {item_bytes / totals['bytes']:.1f}x smaller than the "
+              f"DynamoDB items ({item_bytes / 1e6:.2f} MB), {totals['rawBytes'] / totals['bytes']:.1f}x "
+              f"smaller than uncompressed chunks")
+
+        # As containers see them once their conversation cache has refreshed
+        archived = []
+        for conversation in conversations:
+            last = message_archive.segments(conversation["conversationID"])[-1]["last"]
+            archived.append(dict(conversation, archivedThrough=last))
+        gets = []
+        s3.meta.events.register("before-call.s3.GetObject", lambda **_: gets.append(1))
+        read = lambda c, b: message_archive.history(c, PAGE, b)  # noqa: E731
+        for name, before in positions.items():
+            gets.clear()
+            p50, p95, calls = pages(archived, before, read, args.repeats, before_each=message_archive._indexes.clear)
+            report(f"archive, {name}, index not cached:", p50, p95, f"({len(gets) / calls:.1f} ranged GETs per page)")
+            for conversation, cursor in zip(archived, before):
+                read(conversation, cursor)
+            gets.clear()
+            p50, p95, calls = pages(archived, before, read, args.repeats)
+            report(f"archive, {name}, index cached:", p50, p95, f"({len(gets) / calls:.1f} ranged GETs per page)")
+    finally:
+        for name in TABLES:
+            dynamodb.Table(name).delete()
+        keys = [o["Key"] for page in s3.get_paginator("list_objects_v2").paginate(Bucket="bench-message-archive")
+                for o in page.get("Contents", [])]
+        for start in range(0, len(keys), 1000):
+            s3.delete_objects(Bucket="bench-message-archive",
+                              Delete={"Objects": [{"Key": key} for key in keys[start:start + 1000]]})
+        s3.delete_bucket(Bucket="bench-message-archive")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--endpoint-url", help="DynamoDB Local endpoint; defaults to in-process moto")
+    parser.add_argument("--s3-endpoint-url", help="S3-compatible endpoint (e.g. MinIO); defaults to in-process moto")
+    parser.add_argument("--conversations", type=int, default=20)
+    parser.add_argument("--messages", type=int, default=5000, help="messages per conversation")
+    parser.add_argument("--vocabulary", type=int, default=5000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    if args.endpoint_url or args.s3_endpoint_url:
+        if not (args.endpoint_url and args.s3_endpoint_url):
+            parser.error("--endpoint-url and --s3-endpoint-url go together")
+        run(args)
+        return
+
+    from moto import mock_aws
+
+    with mock_aws():
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Bulk signup throughput against a latency-simulating Cognito fake.
+
+Compares N single-user invocations with one bulk invocation, and
+extrapolates to 10k accounts. Either way, profiles come later from the
+post-confirmation trigger.
+Latencies are simulated with sleeps, so the result shows the effect of the
+thread pool rather than real AWS numbers.
+
+    python bench_bulk_signup.py --users 500 --cognito-ms 60
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "shared", "python"))
+sys.path.insert(0, os.path.join(HERE, "..", "signup"))
+
+os.environ.setdefault("COGNITO_CLIENT_ID", "bench-client")
+
+import aws_clients  # noqa: E402
+import signup  # noqa: E402
+
+
+class FakeCognito:
+    def __init__(self, latency):
+        self.latency = latency
+
+    def sign_up(self, **kwargs):
+        time.sleep(self.latency)
+        return {"UserSub": "sub-" + kwargs["Username"]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--cognito-ms", type=float, default=60.0)
+    args = parser.parse_args(argv)
+
+    aws_clients.set_client("cognito-idp", FakeCognito(args.cognito_ms / 1000))
+    users = [{"email": f"user{i}@example.com", "password": "Password123!"} for i in range(args.users)]
+
+    start = time.perf_counter()
+    for user in users:
+        signup.lambda_handler({"body": json.dumps(user)}, None)
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    response = signup.lambda_handler({
+        "resource": signup.BULK_RESOURCE,
+        "body": json.dumps({"users": users}),
+        "requestContext": {"identity": {"userArn": "arn:aws:iam::123456789012:role/bench"}},
+    }, None)
+    bulk = time.perf_counter() - start
+    assert json.loads(response["body"])["created"] == args.users
+
+    scale = 10_000 / args.users
+    print(f"{args.users} users, concurrency {signup.BULK_CONCURRENCY}")
+    print(f"single-user calls: {single:8.2f}s  (~{single * scale / 60:.1f} min for 10k)")
+    print(f"bulk call:         {bulk:8.2f}s  (~{bulk * scale / 60:.1f} min for 10k)")
+
+
+if __name__ == "__main__":
+    main()
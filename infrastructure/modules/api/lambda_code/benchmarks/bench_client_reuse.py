@@ -0,0 +1,65 @@
+"""Per-invocation AWS client overhead: build-per-call vs the shared cache.
+
+"before" mirrors what signup/login used to do on every request (a fresh
+DynamoDB resource plus a Cognito client); "after" goes through
+``aws_clients``. No AWS calls are made, so this runs offline.
+
+    python bench_client_reuse.py --iterations 200
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "shared", "python"))
+
+# Keep botocore away from the instance metadata endpoint.
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+os.environ.setdefault("AWS_REGION", "us-east-1")
+
+import boto3  # noqa: E402
+
+import aws_clients  # noqa: E402
+
+
+def before():
+    region = os.environ["AWS_REGION"]
+    boto3.resource("dynamodb", region_name=region)
+    boto3.client("cognito-idp", region_name=region)
+
+
+def after():
+    aws_clients.get_resource("dynamodb")
+    aws_clients.get_client("cognito-idp")
+
+
+def measure(fn, iterations):
+    fn()  # first call is the cold start for both variants
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed / iterations, peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    results = {name: measure(fn, args.iterations) for name, fn in (("before", before), ("after", after))}
+
+    print(f"{'variant':<8} {'per call':>12} {'peak alloc':>12}")
+    for name, (per_call, peak) in results.items():
+        print(f"{name:<8} {per_call * 1e3:>10.3f}ms {peak / 1024:>10.1f}KB")
+    print(f"speedup: {results['before'][0] / results['after'][0]:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Upload bytes and stored objects with and without content-hash dedupe.
+
+Replays a forwarding-heavy chat workload through get-upload-url on moto:
+``--uploads`` sends drawn from ``--distinct`` files with Zipf-like
+popularity (a few memes get forwarded constantly, most files are sent
+once) by 50 users. After each miss the upload is "completed" by marking
+the sender's row READY with ``uploadedBy``, as media-complete does. A hit
+is a user sending a file they already uploaded; other users upload the bytes again, but to the
+same key, so each file is still stored once. Reports the hit rate, the
+bytes uploaded and the objects stored, with and without dedupe.
+
+    python bench_dedupe.py --uploads 2000 --distinct 400 --skew 1.1
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import random
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "shared", "python"))
+sys.path.insert(0, os.path.join(HERE, "..", "upload_url"))
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+os.environ.setdefault("AWS_REGION", "us-east-1")
+os.environ["MEDIA_BUCKET_NAME"] = "bench-bucket"
+os.environ["MEDIA_METADATA_TABLE_NAME"] = "bench-media"
+
+import jwt_verifier  # noqa: E402
+import media_store  # noqa: E402
+import upload_url  # noqa: E402
+
+
+class AnyUser:
+    def verify(self, token, token_use=None):
+        return {"sub": token}
+
+
+def create_tables():
+    import boto3
+
+    dynamodb = boto3.client("dynamodb", region_name=os.environ["AWS_REGION"])
+    dynamodb.create_table(
+        TableName="bench-media",
+        KeySchema=[{"AttributeName": "mediaID", "KeyType": "HASH"}, {"AttributeName": "userID", "KeyType": "RANGE"}],
+        AttributeDefinitions=[{"AttributeName": "mediaID", "AttributeType": "S"},
+                              {"AttributeName": "userID", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    files = [
+        {"contentType": "image/jpeg", "size": rng.randint(50000, 3000000),
+         "sha256": hashlib.sha256(f"file-{i}".encode()).hexdigest()}
+        for i in range(args.distinct)
+    ]
+    weights = [1 / (rank + 1) ** args.skew for rank in range(args.distinct)]
+
+    create_tables()
+    jwt_verifier.set_verifier(AnyUser())
+    uploaded_bytes = total_bytes = hits = 0
+    stored = set()
+    for i in range(args.uploads):
+        item = rng.choices(files, weights)[0]
+        user_id = f"user-{i % 50}"
+        event = {"httpMethod": "POST", "headers": {"Authorization": f"Bearer {user_id}"},
+                 "body": json.dumps({"files": [item]})}
+        with contextlib.redirect_stdout(io.StringIO()):  # drop the per-request EMF lines
+            response = upload_url.lambda_handler(event, None)
+        upload = json.loads(response["body"])["uploads"][0]
+        total_bytes += item["size"]
+        if upload["duplicate"]:
+            hits += 1
+            continue
+        uploaded_bytes += item["size"]
+        stored.add(upload["key"])
+        media_store.finalize(upload["mediaID"], user_id, item["size"], {"uploadedBy": user_id},
+                             table_name="bench-media")
+
+    print(f"uploads:          {args.uploads:>12,}")
+    print(f"dedupe hit rate:  {hits / args.uploads:>12.1%}")
+    print(f"bytes uploaded:   {uploaded_bytes:>12,}  (without dedupe {total_bytes:,}, "
+          f"-{1 - uploaded_bytes / total_bytes:.1%})")
+    print(f"objects stored:   {len(stored):>12,}  (without dedupe {args.uploads:,})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--uploads", type=int, default=2000)
+    parser.add_argument("--distinct", type=int, default=400)
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of file popularity")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    from moto import mock_aws
+
+    with mock_aws():
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Download-URL signing cost and URL reuse, fully offline.
+
+Part one times one URL from each path: boto3's ``generate_presigned_url``
+(what a handler would call per view), ``s3_signing.GetUrlSigner``, a
+CloudFront canned-policy signature from ``cloudfront_signing``, and a
+``download_urls`` cache hit.
+
+Part two replays ``--views`` image views by ``--clients`` browsers over
+``--hours`` hours, with Zipf-like key popularity. It compares a fresh URL
+per view against the window-aligned cache, and counts signatures and the
+views a browser could serve from its cache because it had already loaded
+that exact URL. CloudFront URLs are the same from every container, so
+their hit rate is that of a single cache. S3 URLs carry each container's
+own credentials, so views are also spread over ``--containers`` caches with
+different keys, as warm Lambda containers would serve them.
+
+    python bench_download_urls.py --views 200000 --clients 500 --keys 5000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "shared", "python"))
+
+import cloudfront_signing  # noqa: E402
+import download_urls  # noqa: E402
+import s3_signing  # noqa: E402
+
+START = 1767225600.0  # 2026-01-01T00:00:00Z
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def time_per_call(call, count):
+    call(0)
+    start = time.perf_counter()
+    for i in range(count):
+        call(i)
+    return (time.perf_counter() - start) / count
+
+
+def cloudfront_signer():
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.TraditionalOpenSSL,
+                            serialization.NoEncryption()).decode()
+    return cloudfront_signing.CloudFrontSigner.from_pem("d111.cloudfront.net", "K2JCJMDEHXQW5F", pem)
+
+
+def signing_costs(count):
+    import boto3
+    from botocore.config import Config
+
+    client = boto3.client("s3", region_name="us-east-1", aws_access_key_id="AKIDEXAMPLE",
+                          aws_secret_access_key="secret", config=Config(signature_version="s3v4"))
+    s3 = s3_signing.GetUrlSigner("bench-media", "us-east-1", "AKIDEXAMPLE", "secret")
+    params = {"response-cache-control": download_urls.CACHE_CONTROL}
+    cdn = cloudfront_signer()
+    cache = download_urls.DownloadUrlCache(s3, params=params, clock=Clock(START))
+    cache.get("uploads/0.png")
+
+    return {
+        "boto3 generate_presigned_url": time_per_call(lambda i: client.generate_presigned_url(
+            "get_object", Params={"Bucket": "bench-media", "Key": f"uploads/{i}.png",
+                                  "ResponseCacheControl": download_urls.CACHE_CONTROL}), count),
+        "GetUrlSigner": time_per_call(lambda i: s3.signed_url(f"uploads/{i}.png", START, 7200, params), count),
+        "CloudFrontSigner (RSA)": time_per_call(lambda i: cdn.signed_url(f"uploads/{i}.png", START, 7200),
+                                                max(count // 10, 1)),
+        "cache hit": time_per_call(lambda i: cache.get("uploads/0.png"), count),
+    }
+
+
+def replay(args):
+    rng = random.Random(args.seed)
+    weights = [1 / (rank + 1) ** args.skew for rank in range(args.keys)]
+    views = sorted(rng.uniform(0, args.hours * 3600) for _ in range(args.views))
+    keys = rng.choices(range(args.keys), weights, k=args.views)
+    clients = [rng.randrange(args.clients) for _ in range(args.views)]
+
+    signer = s3_signing.GetUrlSigner("bench-media", "us-east-1", "AKIDEXAMPLE", "secret")
+    clock = Clock(START)
+    cache = download_urls.DownloadUrlCache(signer, window=args.window, clock=clock)
+    containers = [download_urls.DownloadUrlCache(
+        s3_signing.GetUrlSigner("bench-media", "us-east-1", f"ASIAEXAMPLE{n}", "secret", f"token-{n}"),
+        window=args.window, clock=clock) for n in range(args.containers)]
+    fresh_signed = browser_hits = container_hits = 0
+    seen, seen_per_container = set(), set()
+    for offset, key, client in zip(views, keys, clients):
+        clock.now = START + offset
+        # Without the cache every view is signed "now", so no two URLs match
+        signer.signed_url(f"uploads/{key}.png", clock.now, 2 * args.window)
+        fresh_signed += 1
+        url, _ = cache.get(f"uploads/{key}.png")
+        if (client, url) in seen:
+            browser_hits += 1
+        seen.add((client, url))
+        url, _ = rng.choice(containers).get(f"uploads/{key}.png")
+        if (client, url) in seen_per_container:
+            container_hits += 1
+        seen_per_container.add((client, url))
+    return fresh_signed, cache.signed, browser_hits, container_hits
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=20000, help="calls per timing")
+    parser.add_argument("--views", type=int, default=200000)
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--keys", type=int, default=5000)
+    parser.add_argument("--hours", type=float, default=8)
+    parser.add_argument("--window", type=int, default=download_urls.WINDOW_SECONDS)
+    parser.add_argument("--containers", type=int, default=10, help="warm containers serving S3 URLs")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of key popularity")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    print(f"{'one URL':<30} {'us':>9}")
+    for name, seconds in signing_costs(args.count).items():
+        print(f"{name:<30} {seconds * 1e6:>9.2f}")
+
+    fresh, signed, browser_hits, container_hits = replay(args)
+    print()
+    print(f"views:                  {args.views:>10,}  ({args.clients} browsers, {args.keys:,} keys, "
+          f"{args.hours:g} h, {args.window} s windows)")
+    print(f"signatures:             {signed:>10,}  (fresh URL per view: {fresh:,})")
+    print(f"browser cache hits:     {browser_hits / args.views:>10.1%}  (CloudFront, or S3 from one container; "
+          f"fresh URL per view: 0.0%)")
+    print(f"  S3, {args.containers:>3} containers:  {container_hits / args.views:>10.1%}  "
+          f"(each container signs with its own credentials)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""Inbox load time for a user in ``--conversations`` conversations.
+
+Seeds one user with ``--conversations`` 1:1 conversations and
+``--messages`` messages in each, sent through ``message_store.send_message``
+(which keeps every member's inbox summary up to date), then times:
+
+1. the app's conversation list without the inbox: one ``history`` Query
+   (limit 1) per conversation for the last message, sorted client-side.
+   This is a lower bound; it still has no unread counts.
+2. the first page of the inbox (``list_inbox``, 20 summaries) and the whole
+   inbox paged at 100, each a single Query per page on the recency index.
+3. ``mark_read`` and a send to a group of ``--group-size`` members, whose
+   inbox updates add one UpdateItem per member.
+
+For meaningful numbers run it against DynamoDB Local:
+
+    docker run -p 8000:8000 amazon/dynamodb-local
+    python bench_inbox.py --endpoint-url http://localhost:8000
+
+Without ``--endpoint-url`` it runs in-process on moto, whose Queries walk
+the whole table, so absolute latencies are pessimistic; the Query counts
+are what carry over.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "shared", "python"))
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+os.environ.setdefault("AWS_REGION", "us-east-1")
+os.environ["CONVERSATIONS_TABLE_NAME"] = "bench-conversations"
+os.environ["MESSAGES_TABLE_NAME"] = "bench-messages"
+os.environ["MESSAGE_DELIVERIES_TABLE_NAME"] = "bench-message-deliveries"
+os.environ["INBOX_TABLE_NAME"] = "bench-inbox"
+
+import aws_clients  # noqa: E402
+import inbox_store  # noqa: E402
+import message_store  # noqa: E402
+
+TABLES = {
+    "bench-conversations": [("conversationID", "S")],
+    "bench-messages": [("pk", "S"), ("messageID", "S")],
+    "bench-message-deliveries": [("userID", "S"), ("messageID", "S")],
+}
+
+
+def create_tables(dynamodb):
+    for name, key in TABLES.items():
+        dynamodb.create_table(
+            TableName=name,
+            KeySchema=[{"AttributeName": attr, "KeyType": kind} for (attr, _), kind in zip(key, ("HASH", "RANGE"))],
+            AttributeDefinitions=[{"AttributeName": attr, "AttributeType": kind} for attr, kind in key],
+            BillingMode="PAY_PER_REQUEST",
+        ).wait_until_exists()
+    dynamodb.create_table(
+        TableName="bench-inbox",
+        KeySchema=[{"AttributeName": "userID", "KeyType": "HASH"},
+                   {"AttributeName": "conversationID", "KeyType": "RANGE"}],
+        AttributeDefinitions=[{"AttributeName": "userID", "AttributeType": "S"},
+                              {"AttributeName": "conversationID", "AttributeType": "S"},
+                              {"AttributeName": "lastActivityAt", "AttributeType": "N"}],
+        LocalSecondaryIndexes=[{
+            "IndexName": inbox_store.RECENCY_INDEX_NAME,
+            "KeySchema": [{"AttributeName": "userID", "KeyType": "HASH"},
+                          {"AttributeName": "lastActivityAt", "KeyType": "RANGE"}],
+            "Projection": {"ProjectionType": "ALL"},
+        }],
+        BillingMode="PAY_PER_REQUEST",
+    ).wait_until_exists()
+
+
+def seed(args):
+    start_time = time.time() - args.conversations * args.messages
+    conversations = [message_store.create_conversation("user-0", [f"user-{i + 1}"], now=start_time + i)
+                     for i in range(args.conversations)]
+
+    def send(i):
+        conversation = conversations[i % len(conversations)]
+        sender = conversation["members"][i % 2]
+        message_store.send_message(conversation, sender, f"message {i}", now=start_time + i)
+
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        list(pool.map(send, range(args.conversations * args.messages)))
+    return conversations
+
+
+def timed(call, repeats):
+    """Return ``(p50, p95, result)`` in seconds over ``repeats`` calls."""
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = call()
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return statistics.median(latencies), latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], result
+
+
+def without_inbox(conversations, threads):
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        last = list(pool.map(lambda c: message_store.history(c, limit=1)[0], conversations))
+    return sorted((messages[0]["sentAt"] for messages in last if messages), reverse=True)
+
+
+def whole_inbox(user_id):
+    summaries, cursor, queries = [], None, 0
+    while True:
+        page, cursor = inbox_store.list_inbox(user_id, limit=inbox_store.MAX_PAGE_SIZE, cursor=cursor)
+        summaries += page
+        queries += 1
+        if cursor is None:
+            return summaries, queries
+
+
+def report(label, p50, p95, note=""):
+    print(f"{label:<34} p50 {p50 * 1e3:8.2f}ms  p95 {p95 * 1e3:8.2f}ms  {note}")
+
+
+def run(args):
+    import boto3
+
+    dynamodb = boto3.resource("dynamodb", region_name=os.environ["AWS_REGION"], endpoint_url=args.endpoint_url)
+    aws_clients.set_resource("dynamodb", dynamodb)
+    create_tables(dynamodb)
+    try:
+        start = time.perf_counter()
+        conversations = seed(args)
+        sends = args.conversations * args.messages
+        print(f"seeded {args.conversations:,} conversations, {sends:,} messages "
+              f"({sends / (time.perf_counter() - start):,.0f} sends/s with inbox updates)")
+
+        p50, p95, _ = timed(lambda: without_inbox(conversations, args.threads), args.repeats)
+        report(f"without inbox ({args.threads} threads):", p50, p95, f"({len(conversations):,} Queries)")
+        p50, p95, _ = timed(lambda: inbox_store.list_inbox("user-0"), args.repeats)
+        report("inbox, first page (20):", p50, p95, "(1 Query)")
+        p50, p95, (summaries, queries) = timed(lambda: whole_inbox("user-0"), args.repeats)
+        report(f"inbox, all {len(summaries):,} conversations:", p50, p95, f"({queries} pages of 100)")
+
+        conversation_id = conversations[0]["conversationID"]
+        p50, p95, _ = timed(lambda: inbox_store.mark_read("user-0", conversation_id), args.repeats)
+        report("mark read:", p50, p95, "(1 UpdateItem)")
+
+        group = message_store.create_conversation("user-0", [f"user-{i}" for i in range(1, args.group_size)])
+        p50, p95, _ = timed(lambda: message_store.send_message(group, "user-0", "hello"), args.repeats)
+        report(f"send to {args.group_size} members:", p50, p95, f"({args.group_size} inbox UpdateItems)")
+    finally:
+        for name in (*TABLES, "bench-inbox"):
+            dynamodb.Table(name).delete()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--endpoint-url", help="DynamoDB Local endpoint; defaults to in-process moto")
+    parser.add_argument("--conversations", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=2, help="messages per conversation")
+    parser.add_argument("--group-size", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    if args.endpoint_url:
+        run(args)
+        return
+
+    from moto import mock_aws
+
+    with mock_aws():
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Cognito token verifications per second on one core, fully offline.
+
+A throwaway RSA key from jwks_fixture stands in for the user pool's JWKS.
+"cold" verifies a distinct token each time (full signature check), "memoized"
+re-verifies the same token (claims cache hit), which is what a client sending
+the same access token on every request costs after the first call.
+
+    python bench_jwt_verify.py --tokens 2000
+"""
+import argparse
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "shared", "python"))
+
+import jwks_fixture  # noqa: E402
+from jwt_verifier import CognitoVerifier, JWKSCache  # noqa: E402
+
+
+def rate(fn, tokens):
+    start = time.perf_counter()
+    for token in tokens:
+        fn(token)
+    return len(tokens) / (time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=2000)
+    parser.add_argument("--bits", type=int, default=2048)
+    args = parser.parse_args(argv)
+
+    key = jwks_fixture.make_key("bench", bits=args.bits, seed=0)
+    jwks = JWKSCache("local://jwks", fetch=lambda url: jwks_fixture.jwks(key), cache_dir=None)
+    verifier = CognitoVerifier(jwks_fixture.REGION, jwks_fixture.USER_POOL_ID, jwks_fixture.CLIENT_ID, jwks=jwks)
+
+    tokens = [jwks_fixture.sign(jwks_fixture.claims(sub=f"user-{i}"), key) for i in range(args.tokens)]
+    cold = rate(verifier.verify, tokens)
+    memoized = rate(verifier.verify, [tokens[0]] * args.tokens)
+
+    print(f"RSA-{args.bits}, {args.tokens} tokens, JWKS fetches: {jwks.fetches}")
+    print(f"cold (signature check): {cold:>10,.0f} verifications/s")
+    print(f"memoized (same token):  {memoized:>10,.0f} verifications/s")
+
+
+if __name__ == "__main__":
+    main()
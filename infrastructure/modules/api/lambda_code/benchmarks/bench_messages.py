@@ -0,0 +1,152 @@
+"""Message write throughput and history-page latency as the messages table grows.
+
+1. Sends ``--send`` messages through ``message_store.send_message`` from
+   ``--threads`` threads (one put plus a BatchWriteItem fan-out to every
+   member's delivery feed) and reports messages/s.
+2. Bulk-loads the messages table up to ``--total`` messages spread over
+   ``--conversations`` conversations, then times ``history`` pages (the last
+   50 messages) for an ordinary and for a write-sharded group conversation.
+
+For meaningful numbers run it against DynamoDB Local:
+
+    docker run -p 8000:8000 amazon/dynamodb-local
+    python bench_messages.py --endpoint-url http://localhost:8000 --total 1000000
+
+Without ``--endpoint-url`` it runs in-process on moto with a smaller default
+``--total``, which only checks the script end to end (moto Queries walk the
+whole table, so its latencies grow with table size where DynamoDB's don't).
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "shared", "python"))
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+os.environ.setdefault("AWS_REGION", "us-east-1")
+os.environ["CONVERSATIONS_TABLE_NAME"] = "bench-conversations"
+os.environ["MESSAGES_TABLE_NAME"] = "bench-messages"
+os.environ["MESSAGE_DELIVERIES_TABLE_NAME"] = "bench-message-deliveries"
+
+import aws_clients  # noqa: E402
+import dynamo_batch  # noqa: E402
+import message_store  # noqa: E402
+
+TABLES = {
+    "bench-conversations": [("conversationID", "S")],
+    "bench-messages": [("pk", "S"), ("messageID", "S")],
+    "bench-message-deliveries": [("userID", "S"), ("messageID", "S")],
+}
+
+
+def create_tables(dynamodb):
+    for name, key in TABLES.items():
+        dynamodb.create_table(
+            TableName=name,
+            KeySchema=[{"AttributeName": attr, "KeyType": kind} for (attr, _), kind in zip(key, ("HASH", "RANGE"))],
+            AttributeDefinitions=[{"AttributeName": attr, "AttributeType": kind} for attr, kind in key],
+            BillingMode="PAY_PER_REQUEST",
+        ).wait_until_exists()
+
+
+def bench_send(conversations, count, threads):
+    def send(i):
+        conversation = conversations[i % len(conversations)]
+        message_store.send_message(conversation, conversation["members"][0], f"message {i}")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(send, range(count)))
+    return count / (time.perf_counter() - start)
+
+
+def bulk_load(conversations, total, threads, start_time):
+    """Write ``total`` messages straight into the messages table (no fan-out)."""
+    def load(offset):
+        items = []
+        for i in range(offset, min(offset + 1000, total)):
+            conversation = conversations[i % len(conversations)]
+            now = start_time + i / 1000
+            items.append({
+                "pk": message_store.partition_key(conversation["conversationID"], i % conversation["shardCount"]),
+                "conversationID": conversation["conversationID"],
+                "messageID": message_store.new_message_id(now),
+                "senderID": conversation["members"][0],
+                "body": f"message {i}",
+                "sentAt": int(now * 1000),
+            })
+        dynamo_batch.batch_write("bench-messages", items)
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(load, range(0, total, 1000)))
+
+
+def page_latency(conversation, pages):
+    latencies = []
+    for _ in range(pages):
+        start = time.perf_counter()
+        message_store.history(conversation, limit=50)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return statistics.median(latencies), latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+
+def run(args):
+    import boto3
+
+    dynamodb = boto3.resource("dynamodb", region_name=os.environ["AWS_REGION"], endpoint_url=args.endpoint_url)
+    aws_clients.set_resource("dynamodb", dynamodb)
+    create_tables(dynamodb)
+    try:
+        conversations = [message_store.create_conversation(f"user-{i}", [f"user-{i + 1}"])
+                         for i in range(args.conversations - 1)]
+        group = message_store.create_conversation("user-0", [f"user-{i}" for i in range(1, args.group_size)])
+        conversations.append(group)
+
+        rate = bench_send(conversations, args.send, args.threads)
+        print(f"send (put + fan-out):     {rate:>9,.0f} messages/s  ({args.threads} threads)")
+
+        start = time.perf_counter()
+        bulk_load(conversations, args.total, args.threads, time.time() - args.total / 1000)
+        print(f"bulk load:                {args.total / (time.perf_counter() - start):>9,.0f} messages/s  "
+              f"({args.total:,} messages)")
+
+        for label, conversation in (("1:1 conversation", conversations[0]),
+                                    (f"group ({group['shardCount']} shards)", group)):
+            p50, p95 = page_latency(conversation, args.pages)
+            print(f"history page, {label + ':':<22} p50 {p50 * 1e3:6.2f}ms  p95 {p95 * 1e3:6.2f}ms")
+    finally:
+        for name in TABLES:
+            dynamodb.Table(name).delete()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--endpoint-url", help="DynamoDB Local endpoint; defaults to in-process moto")
+    parser.add_argument("--total", type=int, help="messages in the table (default 1,000,000; 20,000 on moto)")
+    parser.add_argument("--send", type=int, default=2000, help="messages sent through the full send path")
+    parser.add_argument("--conversations", type=int, default=1000)
+    parser.add_argument("--group-size", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--pages", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    if args.endpoint_url:
+        args.total = args.total or 1000000
+        run(args)
+        return
+
+    from moto import mock_aws
+
+    args.total = args.total or 20000
+    with mock_aws():
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Presence write cost and read latency for ``--clients`` connected clients.
+
+Simulates ``--minutes`` minutes in which every client sends a WebSocket
+heartbeat every ``--interval`` seconds (each at its own phase). API Gateway
+routes each heartbeat to one of ``--containers`` warm Lambda containers at
+random; each container has its own ``presence.WriteCache``, all on one
+simulated clock, so the coalescing runs exactly as deployed. The DynamoDB
+calls that reach the table are counted from botocore's events and reported
+per simulated minute after the first (when every client writes its first
+heartbeat) as write units (UpdateItem, 1 WCU per item under 1 KB) and read
+units (eventually consistent GetItem, 0.5 RCU). Without coalescing every
+heartbeat is one UpdateItem, the baseline shown.
+
+Then it times the reads: ``conversation_presence`` for a conversation of
+``--members`` members and ``presence_of`` for as many user IDs, each one
+BatchGetItem per 100 users.
+
+    python bench_presence.py --clients 10000 --containers 1,20,100
+
+On moto each container setting takes several minutes at 10,000 clients.
+
+Without ``--endpoint-url`` it runs in-process on moto; the request counts
+are exact either way, the latencies only with DynamoDB Local or a real table.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "shared", "python"))
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+os.environ.setdefault("AWS_REGION", "us-east-1")
+os.environ["CONNECTIONS_TABLE_NAME"] = "bench-connections"
+
+import aws_clients  # noqa: E402
+import presence  # noqa: E402
+
+START = 1700000000.0
+
+
+class Clock:
+    def __init__(self):
+        self.now = START
+
+    def __call__(self):
+        return self.now
+
+
+def create_table(dynamodb):
+    dynamodb.create_table(
+        TableName="bench-connections",
+        KeySchema=[{"AttributeName": "pk", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "pk", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    ).wait_until_exists()
+
+
+def heartbeats(args):
+    """Return every ``(time, user)`` heartbeat of the simulation in time order."""
+    rng = random.Random(7)
+    events = []
+    for i in range(args.clients):
+        t = START + rng.uniform(0, args.interval)
+        while t < START + args.minutes * 60:
+            events.append((t, f"user-{i}"))
+            t += args.interval * rng.uniform(0.9, 1.1)
+    events.sort()
+    return events
+
+
+def simulate(args, containers, events, calls):
+    """Run the heartbeats through ``containers`` caches; return per-minute op counts after minute 1."""
+    rng = random.Random(11)
+    clock = Clock()
+    caches = [presence.WriteCache(clock=clock) for _ in range(containers)]
+    per_minute = Counter()
+    for t, user_id in events:
+        clock.now = t
+        presence.set_cache(rng.choice(caches))
+        before = calls.copy()
+        presence.heartbeat(user_id, now=t)
+        minute = int((t - START) // 60)
+        for operation in ("GetItem", "UpdateItem"):
+            per_minute[minute, operation] += calls[operation] - before[operation]
+    presence.set_cache(None)
+    steady = range(1, args.minutes)
+    return {operation: statistics.mean(per_minute[minute, operation] for minute in steady)
+            for operation in ("GetItem", "UpdateItem")}
+
+
+def timed(call, repeats):
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return statistics.median(latencies), latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+
+def run(args):
+    import boto3
+
+    dynamodb = boto3.resource("dynamodb", region_name=os.environ["AWS_REGION"], endpoint_url=args.endpoint_url)
+    aws_clients.set_resource("dynamodb", dynamodb)
+    calls = Counter()
+    dynamodb.meta.client.meta.events.register(
+        "before-call.dynamodb.*", lambda model, **_: calls.update((model.name,)))
+
+    events = heartbeats(args)
+    per_minute = len(events) / args.minutes
+    print(f"{args.clients:,} clients, heartbeat every ~{args.interval:g}s: {per_minute:,.0f} heartbeats/min; "
+          f"write window {presence.WRITE_WINDOW_SECONDS}s, online for {presence.ONLINE_SECONDS}s")
+    print(f"{'no coalescing:':<22} {per_minute:>9,.0f} WCU/min  {0:>8,.0f} RCU/min")
+    try:
+        for containers in (int(c) for c in args.containers.split(",")):
+            create_table(dynamodb)
+            ops = simulate(args, containers, events, calls)
+            writes, reads = ops["UpdateItem"], ops["GetItem"] * 0.5
+            print(f"{f'{containers} containers:':<22} {writes:>9,.0f} WCU/min  {reads:>8,.0f} RCU/min  "
+                  f"({per_minute / writes:.1f}x fewer writes, {(writes + reads / 5) / per_minute:.0%} of the cost)")
+            dynamodb.Table("bench-connections").delete()
+
+        create_table(dynamodb)
+        members = [f"user-{i}" for i in range(args.members)]
+        now = time.time()
+        for user_id in members[::2]:
+            presence.heartbeat(user_id, now=now)
+        presence.start_typing(members[0], "conv-bench", now=now)
+        conversation = {"conversationID": "conv-bench", "members": members}
+        p50, p95 = timed(lambda: presence.conversation_presence(conversation), args.repeats)
+        print(f"{f'conversation of {args.members}:':<22} p50 {p50 * 1e3:7.2f}ms  p95 {p95 * 1e3:7.2f}ms")
+        p50, p95 = timed(lambda: presence.presence_of(members), args.repeats)
+        print(f"{f'{args.members} user IDs:':<22} p50 {p50 * 1e3:7.2f}ms  p95 {p95 * 1e3:7.2f}ms")
+    finally:
+        dynamodb.Table("bench-connections").delete()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--endpoint-url", help="DynamoDB Local endpoint; defaults to in-process moto")
+    parser.add_argument("--clients", type=int, default=10000)
+    parser.add_argument("--interval", type=float, default=20, help="seconds between a client's heartbeats")
+    parser.add_argument("--minutes", type=int, default=4)
+    parser.add_argument("--containers", default="1,20,100", help="comma-separated warm container counts")
+    parser.add_argument("--members", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    if args.endpoint_url:
+        run(args)
+        return
+
+    from moto import mock_aws
+
+    with mock_aws():
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Presigned POST signatures per second: boto3 vs the local PostPolicySigner.
+
+Also times a full get-upload-url invocation for an N-file manifest. Uses
+dummy credentials; nothing is sent to AWS.
+
+    python bench_presign.py --count 2000 --files 20
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "shared", "python"))
+sys.path.insert(0, os.path.join(HERE, "..", "upload_url"))
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+os.environ.setdefault("AWS_REGION", "us-east-1")
+os.environ.setdefault("MEDIA_BUCKET_NAME", "bench-bucket")
+
+import aws_clients  # noqa: E402
+import upload_url  # noqa: E402
+from s3_signing import PostPolicySigner  # noqa: E402
+
+
+def per_second(fn, count):
+    fn(0)
+    start = time.perf_counter()
+    for i in range(count):
+        fn(i)
+    return count / (time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--files", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    s3 = aws_clients.get_client("s3")
+    signer = PostPolicySigner.from_session("bench-bucket")
+    conditions = [["content-length-range", 100, 5000000]]
+
+    boto = per_second(lambda i: s3.generate_presigned_post(
+        Bucket="bench-bucket", Key=f"uploads/{i}.jpg", Fields={"Content-Type": "image/jpeg"},
+        Conditions=[{"Content-Type": "image/jpeg"}] + conditions, ExpiresIn=3600), args.count)
+    local = per_second(lambda i: signer.presign_post(
+        f"uploads/{i}.jpg", fields={"Content-Type": "image/jpeg"}, conditions=conditions), args.count)
+
+    event = {"httpMethod": "POST", "body": json.dumps(
+        {"files": [{"contentType": "image/jpeg", "size": 2000000}] * args.files})}
+    upload_url.lambda_handler(event, None)
+    start = time.perf_counter()
+    for _ in range(100):
+        upload_url.lambda_handler(event, None)
+    invocation = (time.perf_counter() - start) / 100
+
+    print(f"boto3 generate_presigned_post: {boto:>10,.0f} signatures/s")
+    print(f"PostPolicySigner:              {local:>10,.0f} signatures/s")
+    print(f"{args.files}-file manifest invocation: {invocation * 1e3:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Profile reads with and without the per-container cache, for group chats.
+
+Replays ``--opens`` conversation opens through the profiles endpoint on
+moto. Each conversation has ``--members`` members drawn from ``--users``
+users, and conversations are opened with Zipf-like popularity (a few busy
+groups are opened constantly). Every open asks for all of its members'
+profiles. A few members of each group have deleted their accounts, which
+exercises the negative cache. Reports the hit ratio, the BatchGetItem calls
+and read units actually consumed, the read units the cache saved, and the
+time per open against the same workload with the cache disabled.
+
+    python bench_profiles.py --opens 2000 --members 50 --conversations 200
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import time
+from unittest.mock import patch
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "shared", "python"))
+sys.path.insert(0, os.path.join(HERE, "..", "get_profiles"))
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+os.environ.setdefault("AWS_REGION", "us-east-1")
+os.environ["USER_PROFILE_TABLE_NAME"] = "bench-profiles"
+
+import dynamo_batch  # noqa: E402
+import get_profiles  # noqa: E402
+import jwt_verifier  # noqa: E402
+import profile_store  # noqa: E402
+
+DELETED_PER_GROUP = 2
+
+
+class AnyUser:
+    def verify(self, token, token_use=None):
+        return {"sub": token}
+
+
+def create_table(users):
+    import boto3
+
+    boto3.client("dynamodb", region_name=os.environ["AWS_REGION"]).create_table(
+        TableName="bench-profiles",
+        KeySchema=[{"AttributeName": "userId", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "userId", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    dynamo_batch.batch_write("bench-profiles", [
+        {"userId": f"user-{i}", "email": f"user{i}@example.com", "createdAt": "2024-01-01T00:00:00"}
+        for i in range(users)
+    ])
+
+
+def replay(opens, cached):
+    """Open each conversation in ``opens``; return ``(seconds, calls, units, hits, saved)``."""
+    profile_store.clear_cache()
+    calls = units = hits = saved = 0
+    real_batch_get = dynamo_batch.batch_get
+
+    def counting_batch_get(*args, **kwargs):
+        nonlocal calls, units
+        items, unprocessed, consumed = real_batch_get(*args, **kwargs)
+        calls += 1
+        units += consumed
+        return items, unprocessed, consumed
+
+    start = time.perf_counter()
+    with patch("dynamo_batch.batch_get", counting_batch_get):
+        for members in opens:
+            if not cached:
+                profile_store.clear_cache()
+            event = {"httpMethod": "POST", "headers": {"Authorization": f"Bearer {members[0]}"},
+                     "body": json.dumps({"userIds": members})}
+            with contextlib.redirect_stdout(io.StringIO()) as out:  # keep the EMF line
+                get_profiles.lambda_handler(event, None)
+            record = json.loads(out.getvalue().strip().splitlines()[-1])
+            hits += record["ProfileCacheHits"]
+            saved += record["ProfileReadUnitsSaved"]
+    return time.perf_counter() - start, calls, units, hits, saved
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    create_table(args.users)
+    jwt_verifier.set_verifier(AnyUser())
+
+    conversations = []
+    for _ in range(args.conversations):
+        members = [f"user-{i}" for i in rng.sample(range(args.users), args.members - DELETED_PER_GROUP)]
+        members += [f"deleted-{rng.randrange(args.users)}" for _ in range(DELETED_PER_GROUP)]
+        conversations.append(members)
+    weights = [1 / (rank + 1) ** args.skew for rank in range(args.conversations)]
+    opens = rng.choices(conversations, weights, k=args.opens)
+    lookups = sum(len(set(members)) for members in opens)
+
+    cold_seconds, cold_calls, cold_units, _, _ = replay(opens, cached=False)
+    warm_seconds, warm_calls, warm_units, hits, saved = replay(opens, cached=True)
+
+    print(f"conversation opens: {args.opens:>10,}  ({args.members} members, {lookups:,} profile lookups)")
+    print(f"cache hit ratio:    {hits / lookups:>10.1%}")
+    print(f"BatchGetItem calls: {warm_calls:>10,}  (without cache {cold_calls:,})")
+    print(f"read units used:    {warm_units:>10,.1f}  (without cache {cold_units:,.1f})")
+    print(f"read units saved:   {saved:>10,.1f}  (reported by ProfileReadUnitsSaved)")
+    print(f"ms per open:        {warm_seconds / args.opens * 1000:>10.2f}  "
+          f"(without cache {cold_seconds / args.opens * 1000:.2f}, moto latency)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--opens", type=int, default=2000)
+    parser.add_argument("--members", type=int, default=50)
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of conversation popularity")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    from moto import mock_aws
+
+    with mock_aws():
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
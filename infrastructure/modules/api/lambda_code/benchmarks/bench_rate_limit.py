@@ -0,0 +1,99 @@
+"""Per-request cost of the auth rate limiter on the allowed and rejected paths.
+
+Runs ``rate_limit.check`` against a moto rate-limit table for a few traffic
+shapes and reports the time per check and the UpdateItem calls per check.
+moto answers in-process, so the "at N ms" column adds ``--dynamo-ms`` per
+table call to estimate the cost against real DynamoDB; the local-lease and
+rejected paths make no calls at all.
+
+    python bench_rate_limit.py --requests 3000 --dynamo-ms 5
+"""
+import argparse
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "shared", "python"))
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+os.environ.setdefault("AWS_REGION", "us-east-1")
+os.environ["RATE_LIMIT_TABLE_NAME"] = "bench-rate-limits"
+
+import rate_limit  # noqa: E402
+
+SCENARIOS = {
+    # refresh-token logins from one office NAT: IP bucket only, served from leases
+    "same IP, no username": lambda i: {"ip": "198.51.100.1"},
+    # password logins from one NAT: a lease for the IP, a write per new username
+    "same IP, new usernames": lambda i: {"ip": "198.51.100.1", "username": f"user{i}@example.com"},
+    # the worst allowed case: nothing is known locally
+    "new IPs and usernames": lambda i: {"ip": f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}",
+                                        "username": f"user{i}@example.com"},
+    # a credential-stuffing burst against one account, after its bucket ran dry
+    "rejected (empty bucket)": lambda i: {"username": "victim@example.com"},
+}
+
+
+def run(args):
+    import boto3
+
+    boto3.client("dynamodb", region_name=os.environ["AWS_REGION"]).create_table(
+        TableName="bench-rate-limits",
+        KeySchema=[{"AttributeName": "pk", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "pk", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    # An IP bucket that refills faster than the run spends it, with 30-token leases
+    rate_limit.LIMITS["ip"] = (300, 600_000.0)
+
+    writes = []
+    table = rate_limit._table()
+
+    class CountingTable:
+        def update_item(self, **kwargs):
+            writes.append(1)
+            return table.update_item(**kwargs)
+
+    rate_limit._table = CountingTable
+
+    print(f"{'scenario':<26} {'us/check':>9} {'writes/check':>13} {f'at {args.dynamo_ms:g} ms':>10}")
+    for number, (name, request) in enumerate(SCENARIOS.items()):
+        # Fresh usernames and IPs per scenario, as if unseen by every container
+        offset = number * args.requests
+        rate_limit.reset()
+        if name.startswith("rejected"):
+            for _ in range(rate_limit.LIMITS["user"][0] + 1):
+                try:
+                    rate_limit.check("bench", **request(offset))
+                except rate_limit.Limited:
+                    pass
+        writes.clear()
+        rejected = 0
+        start = time.perf_counter()
+        for i in range(args.requests):
+            try:
+                rate_limit.check("bench", **request(offset + i))
+            except rate_limit.Limited:
+                rejected += 1
+        elapsed = time.perf_counter() - start
+        per_check = len(writes) / args.requests
+        print(f"{name:<26} {elapsed / args.requests * 1e6:>9.1f} {per_check:>13.2f} "
+              f"{per_check * args.dynamo_ms:>7.2f} ms" + (f"  ({rejected:,} rejected)" if rejected else ""))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--dynamo-ms", type=float, default=5.0, help="assumed UpdateItem round trip")
+    args = parser.parse_args(argv)
+
+    from moto import mock_aws
+
+    with mock_aws():
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Per-response time and allocation: rebuilt vs precomputed envelopes, json vs orjson.
+
+"before" builds each response the way the handlers used to (a fresh CORS
+headers dict, a fresh envelope, ``json.dumps`` of the body); "after" is the
+``api_responses`` path. Static responses become a constant; dynamic bodies
+(a 20-file upload manifest of presigned posts) are serialized by the
+backend ``api_responses`` picks. Allocation is the traced memory retained
+per response while ``--count`` of them are alive.
+
+    python bench_responses.py --count 20000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "shared", "python"))
+
+import api_responses  # noqa: E402
+
+HEADERS = api_responses.cors_headers("GET,POST,OPTIONS", "Content-Type,Authorization,Idempotency-Key")
+PREFLIGHT = api_responses.preflight(HEADERS)
+INVALID_JSON = api_responses.static(400, HEADERS, {"message": "Invalid JSON format in request body."})
+
+MANIFEST = {"uploads": [{
+    "mediaID": f"3f1c2a9e-8b7d-4c6e-9f0a-{index:012d}",
+    "key": f"uploads/3f1c2a9e-8b7d-4c6e-9f0a-{index:012d}",
+    "contentType": "image/jpeg",
+    "size": 1_048_576,
+    "duplicate": False,
+    "upload": {
+        "url": "https://bench-bucket.s3.amazonaws.com/",
+        "fields": {
+            "Content-Type": "image/jpeg",
+            "key": f"uploads/3f1c2a9e-8b7d-4c6e-9f0a-{index:012d}",
+            "x-amz-algorithm": "AWS4-HMAC-SHA256",
+            "x-amz-credential": "AKIAEXAMPLE/20240101/us-east-1/s3/aws4_request",
+            "x-amz-date": "20240101T000000Z",
+            "policy": "eyJleHBpcmF0aW9uIjogIjIwMjQtMDEtMDFUMDE6MDA6MDBaIiwgImNvbmRpdGlvbnMiOiBbXX0=" * 4,
+            "x-amz-signature": "0" * 64,
+        },
+    },
+} for index in range(20)]}
+
+
+def rebuilt(status_code, body):
+    headers = {
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Headers": "Content-Type,Authorization,Idempotency-Key",
+        "Access-Control-Allow-Methods": "GET,POST,OPTIONS"
+    }
+    return {"statusCode": status_code, "headers": headers, "body": json.dumps(body)}
+
+
+CASES = {
+    "preflight": (lambda: rebuilt(200, {"message": "CORS preflight OK"}), lambda: PREFLIGHT),
+    "validation error": (lambda: rebuilt(400, {"message": "Invalid JSON format in request body."}),
+                         lambda: INVALID_JSON),
+    "20-file manifest": (lambda: rebuilt(200, MANIFEST), lambda: api_responses.response(200, HEADERS, MANIFEST)),
+}
+
+
+def time_per_call(build, count):
+    build()
+    start = time.perf_counter()
+    for _ in range(count):
+        build()
+    return (time.perf_counter() - start) / count
+
+
+def bytes_per_response(build, count):
+    keep = [None] * count
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(count):
+        keep[i] = build()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return retained / count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    print(f"dynamic bodies use: {api_responses.backend()}")
+    print(f"{'response':<18} {'before us':>10} {'after us':>9} {'before B':>9} {'after B':>8}")
+    for name, (before, after) in CASES.items():
+        count = args.count if name != "20-file manifest" else args.count // 10
+        print(f"{name:<18} {time_per_call(before, count) * 1e6:>10.2f} {time_per_call(after, count) * 1e6:>9.2f} "
+              f"{bytes_per_response(before, count):>9.0f} {bytes_per_response(after, count):>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Search indexing throughput and query latency over a large message history.
+
+Generates ``--messages`` messages (default 1,000,000) over ``--days`` days
+in ``--conversations`` conversations, words drawn Zipf-like from a
+``--vocabulary``-word vocabulary, and indexes them in stream-sized batches
+of 100 through ``search_index.index_messages``. Reports messages/s and
+postings written, then times ``search`` for one-, two- and three-term
+queries (common and rare terms) in the busiest conversation, against a
+scan of that conversation's messages, which is what answering the same
+query from the messages table would take.
+
+By default the index is ``search_index.MemoryIndex``, so the numbers are
+the indexer's and the query planner's own cost (message generation is
+included in the indexing time). To include DynamoDB, point
+it at DynamoDB Local (with fewer messages):
+
+    docker run -p 8000:8000 amazon/dynamodb-local
+    python bench_search.py --endpoint-url http://localhost:8000 --messages 100000
+"""
+import argparse
+import itertools
+import os
+import random
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "shared", "python"))
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+os.environ.setdefault("AWS_REGION", "us-east-1")
+os.environ["SEARCH_INDEX_TABLE_NAME"] = "bench-search-index"
+
+import aws_clients  # noqa: E402
+import message_store  # noqa: E402
+import search_index  # noqa: E402
+
+START = 1735689600.0  # 2025-01-01T00:00:00Z
+BATCH = 100
+
+
+def generate(args, rng):
+    """Yield ``(conversation_id, message)`` in send order."""
+    vocabulary = [f"w{rank}" for rank in range(args.vocabulary)]
+    cumulative = list(itertools.accumulate(1 / (rank + 1) ** args.skew for rank in range(args.vocabulary)))
+    # Conversation 0 is the busiest; the rest share the remaining traffic
+    conversation_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(args.conversations)))
+    span = args.days * 86400
+    for i in range(args.messages):
+        conversation = f"c{rng.choices(range(args.conversations), cum_weights=conversation_weights)[0]}"
+        words = rng.choices(vocabulary, cum_weights=cumulative, k=rng.randint(4, 20))
+        now = START + span * i / args.messages
+        yield {"conversationID": conversation, "messageID": message_store.new_message_id(now),
+               "body": " ".join(words)}
+
+
+def index_batch(batch, backend):
+    """``search_index.index_messages``, also returning the number of postings."""
+    postings, _ = search_index.postings_for(batch)
+    backend.add(postings)
+    return sum(len(new) for new in postings.values())
+
+
+def index_all(args, backend, rng):
+    busiest, postings = [], 0
+    batch = []
+    start = time.perf_counter()
+    for message in generate(args, rng):
+        if message["conversationID"] == "c0":
+            busiest.append(message)
+        batch.append(message)
+        if len(batch) == BATCH:
+            postings += index_batch(batch, backend)
+            batch = []
+    if batch:
+        postings += index_batch(batch, backend)
+    return time.perf_counter() - start, postings, busiest
+
+
+def timed(call, repeats):
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return statistics.median(latencies), latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+
+def scan(messages, query):
+    terms = query.split()
+    return [m["messageID"] for m in reversed(messages) if all(term in m["body"].split() for term in terms)][:20]
+
+
+def run(args, backend):
+    rng = random.Random(args.seed)
+    seconds, postings, busiest = index_all(args, backend, rng)
+    print(f"indexed {args.messages:,} messages in {seconds:.1f}s: {args.messages / seconds:,.0f} messages/s "
+          f"({postings:,} postings, {postings * 17 / 1e6:,.0f} MB of posting data)")
+    print(f"busiest conversation: {len(busiest):,} messages")
+    print()
+
+    queries = {
+        "1 common term": "w3",
+        "1 rare term": f"w{args.vocabulary // 2}",
+        "2 common terms": "w3 w7",
+        "common + rare": f"w3 w{args.vocabulary // 50}",
+        "3 terms": "w5 w11 w40",
+    }
+    print(f"{'query (limit 20)':<18} {'index p50':>10} {'p95':>9} {'scan p50':>10} {'results':>8}")
+    for label, query in queries.items():
+        results, _ = search_index.search("c0", query, limit=20, backend=backend)
+        assert sorted((r["messageID"] for r in results), reverse=True) == scan(busiest, query)
+        p50, p95 = timed(lambda: search_index.search("c0", query, limit=20, backend=backend), args.repeats)
+        scan_p50, _ = timed(lambda: scan(busiest, query), max(1, args.repeats // 10))
+        print(f"{label:<18} {p50 * 1e3:>8.2f}ms {p95 * 1e3:>7.2f}ms {scan_p50 * 1e3:>8.1f}ms {len(results):>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--endpoint-url", help="DynamoDB Local endpoint; defaults to the in-process index")
+    parser.add_argument("--messages", type=int, default=1000000)
+    parser.add_argument("--conversations", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--vocabulary", type=int, default=50000)
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent of word frequency")
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    if not args.endpoint_url:
+        run(args, search_index.MemoryIndex())
+        return
+
+    import boto3
+
+    dynamodb = boto3.resource("dynamodb", region_name=os.environ["AWS_REGION"], endpoint_url=args.endpoint_url)
+    aws_clients.set_resource("dynamodb", dynamodb)
+    dynamodb.create_table(
+        TableName="bench-search-index",
+        KeySchema=[{"AttributeName": "pk", "KeyType": "HASH"}, {"AttributeName": "block", "KeyType": "RANGE"}],
+        AttributeDefinitions=[{"AttributeName": "pk", "AttributeType": "S"},
+                              {"AttributeName": "block", "AttributeType": "N"}],
+        BillingMode="PAY_PER_REQUEST",
+    ).wait_until_exists()
+    try:
+        run(args, search_index.DynamoIndex())
+    finally:
+        dynamodb.Table("bench-search-index").delete()
+
+
+if __name__ == "__main__":
+    main()
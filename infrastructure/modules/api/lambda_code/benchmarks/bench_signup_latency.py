@@ -0,0 +1,118 @@
+"""/signup latency with the profile write inline vs in the post-confirmation trigger.
+
+"inline" is the old flow (sign_up, then put_item before responding),
+reproduced by running the post_confirmation write right after the handler;
+"trigger" is the current handler, which responds once Cognito accepts the
+user. Latencies are simulated with sleeps drawn from a lognormal around
+``--cognito-ms`` / ``--dynamo-ms``, so the result shows the shape of the
+change rather than real AWS numbers. ``--dynamo-errors`` is the fraction
+of profile writes that fail: a 500 for an already-created user inline, a
+retried trigger (and no client-visible error) otherwise.
+
+    python bench_signup_latency.py --requests 2000 --cognito-ms 60 --dynamo-ms 8
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "shared", "python"))
+sys.path.insert(0, os.path.join(HERE, "..", "signup"))
+sys.path.insert(0, os.path.join(HERE, "..", "post_confirmation"))
+
+os.environ.setdefault("COGNITO_CLIENT_ID", "bench-client")
+os.environ.setdefault("USER_PROFILE_TABLE_NAME", "bench-profiles")
+
+import aws_clients  # noqa: E402
+import post_confirmation  # noqa: E402
+import signup  # noqa: E402
+
+
+def _sleep(median):
+    time.sleep(random.lognormvariate(0, 0.35) * median)
+
+
+class FakeCognito:
+    def __init__(self, latency):
+        self.latency = latency
+
+    def sign_up(self, **kwargs):
+        _sleep(self.latency)
+        return {"UserSub": "sub-" + kwargs["Username"]}
+
+
+class FakeTable:
+    def __init__(self, latency, error_rate):
+        self.latency = latency
+        self.error_rate = error_rate
+
+    def put_item(self, **kwargs):
+        _sleep(self.latency)
+        if random.random() < self.error_rate:
+            raise aws_clients.ClientError(
+                {"Error": {"Code": "ProvisionedThroughputExceededException", "Message": "Rate exceeded"}}, "PutItem"
+            )
+
+
+class FakeDynamo:
+    def __init__(self, latency, error_rate):
+        self.table = FakeTable(latency, error_rate)
+
+    def Table(self, name):
+        return self.table
+
+
+def inline(event):
+    response = signup.lambda_handler(event, None)
+    try:
+        post_confirmation.create_profile(os.environ["USER_PROFILE_TABLE_NAME"], json.loads(response["body"])["id"],
+                                         json.loads(event["body"])["email"])
+    except aws_clients.ClientError:
+        return 500
+    return response["statusCode"]
+
+
+def trigger(event):
+    return signup.lambda_handler(event, None)["statusCode"]
+
+
+def measure(flow, requests):
+    samples, errors = [], 0
+    for i in range(requests):
+        event = {"body": json.dumps({"email": f"user{i}@example.com", "password": "Password123!"})}
+        start = time.perf_counter()
+        status = flow(event)
+        samples.append(time.perf_counter() - start)
+        errors += status != 201
+    samples.sort()
+    return samples, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--cognito-ms", type=float, default=60.0)
+    parser.add_argument("--dynamo-ms", type=float, default=8.0)
+    parser.add_argument("--dynamo-errors", type=float, default=0.001)
+    args = parser.parse_args(argv)
+
+    aws_clients.set_client("cognito-idp", FakeCognito(args.cognito_ms / 1000))
+    aws_clients.set_resource("dynamodb", FakeDynamo(args.dynamo_ms / 1000, args.dynamo_errors))
+
+    print(f"{args.requests} signups, Cognito ~{args.cognito_ms:g} ms, DynamoDB ~{args.dynamo_ms:g} ms")
+    print(f"{'profile write':<14} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'5xx':>5}")
+    for name, flow in (("inline", inline), ("trigger", trigger)):
+        # Keep the per-invocation metrics records out of the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            samples, errors = measure(flow, args.requests)
+        p50, p95, p99 = (samples[min(len(samples) - 1, int(len(samples) * q))] * 1e3 for q in (0.5, 0.95, 0.99))
+        print(f"{name:<14} {p50:>8.1f} {p95:>8.1f} {p99:>8.1f} {errors:>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Thumbnail pipeline throughput and peak RSS over a directory of images.
+
+Runs ``thumbnails.render_renditions`` (one decode, renditions cascaded from
+it) over every JPEG/PNG in a directory and, for comparison, the naive
+approach of decoding the original once per rendition. Each mode runs in its
+own process so its peak RSS is measured on its own.
+
+    python bench_thumbnails.py ~/Pictures/samples
+    python bench_thumbnails.py --generate 20 --out /tmp/renditions
+
+``--generate N`` writes N synthetic 12 MP JPEGs to a temporary directory
+when there are no sample files to hand. ``--out`` also writes every rendition
+to disk, so the script doubles as a local driver for eyeballing the output.
+"""
+import argparse
+import glob
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "shared", "python"))
+sys.path.insert(0, os.path.join(HERE, "..", "thumbnails"))
+
+import thumbnails  # noqa: E402
+from media_types import RENDITION_EXTENSIONS  # noqa: E402
+
+
+def render_naive(data):
+    """One full decode per rendition (what a straightforward pipeline does)."""
+    from PIL import Image
+
+    renditions = []
+    for name, box, quality in thumbnails.RENDITIONS:
+        image = Image.open(io.BytesIO(data)).convert("RGB")
+        image.thumbnail((box, box), Image.Resampling.LANCZOS)
+        content_type, body = thumbnails._encode(image, quality, webp=True)
+        renditions.append((name, content_type, body, image.width, image.height))
+    return renditions
+
+
+MODES = {"single-decode": thumbnails.render_renditions, "naive": render_naive}
+
+
+def sample_files(directory):
+    return sorted(
+        path for pattern in ("*.jpg", "*.jpeg", "*.png", "*.JPG", "*.JPEG", "*.PNG")
+        for path in glob.glob(os.path.join(directory, pattern))
+    )
+
+
+def generate_samples(directory, count, size=(4000, 3000)):
+    from PIL import Image, ImageDraw
+
+    for i in range(count):
+        image = Image.linear_gradient("L").resize(size).convert("RGB")
+        draw = ImageDraw.Draw(image)
+        for j in range(40):
+            x, y = (i * 97 + j * 211) % size[0], (i * 53 + j * 149) % size[1]
+            draw.ellipse((x, y, x + 300, y + 200), fill=((j * 40) % 256, (i * 30) % 256, 120))
+        image.save(os.path.join(directory, f"sample-{i:03d}.jpg"), quality=90)
+
+
+def peak_rss_mb():
+    # ru_maxrss survives execve on Linux (it would report the parent's peak);
+    # VmHWM belongs to this process's address space only
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def worker(mode, directory, out):
+    render = MODES[mode]
+    files = sample_files(directory)
+    start = time.perf_counter()
+    for path in files:
+        with open(path, "rb") as f:
+            renditions = render(f.read())
+        if out:
+            stem = os.path.splitext(os.path.basename(path))[0]
+            for name, content_type, body, _, _ in renditions:
+                with open(os.path.join(out, f"{stem}.{name}{RENDITION_EXTENSIONS[content_type]}"), "wb") as f:
+                    f.write(body)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"images": len(files), "seconds": elapsed, "peak_rss_mb": peak_rss_mb()}))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory", nargs="?", help="directory of sample JPEG/PNG files")
+    parser.add_argument("--generate", type=int, default=0, help="generate N synthetic samples instead")
+    parser.add_argument("--out", help="write renditions to this directory (single-decode mode only)")
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--worker", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        worker(args.worker, args.directory, args.out)
+        return
+
+    with tempfile.TemporaryDirectory() as scratch:
+        directory = args.directory
+        if args.generate:
+            directory = scratch
+            generate_samples(directory, args.generate)
+        if not directory or not sample_files(directory):
+            parser.error("no sample images: pass a directory of JPEG/PNG files or --generate N")
+        if args.out:
+            os.makedirs(args.out, exist_ok=True)
+
+        for mode in args.modes.split(","):
+            command = [sys.executable, os.path.abspath(__file__), directory, "--worker", mode]
+            if args.out and mode == "single-decode":
+                command += ["--out", args.out]
+            result = json.loads(subprocess.run(command, check=True, capture_output=True, text=True).stdout)
+            print(f"{mode:>14}: {result['images'] / result['seconds']:6.2f} images/s  "
+                  f"peak RSS {result['peak_rss_mb']:6.1f} MB  ({result['images']} images)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""WebSocket fan-out throughput: registry lookup plus post_to_connection.
+
+Registers ``--connections`` connections (one per user, a ``--gone`` fraction
+of them already closed) in a moto connections table, then pushes one
+message to all of them through ``ws_connections`` and the in-process
+management API stand-in, which sleeps ``--latency`` seconds per post to
+model the HTTPS round trip. Each ``--workers`` setting is a separate run;
+1 worker is the sequential baseline.
+
+    python bench_ws_fanout.py --connections 10000 --latency 0.005 --workers 1,8,32,64
+"""
+import argparse
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "shared", "python"))
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+os.environ.setdefault("AWS_REGION", "us-east-1")
+os.environ["CONNECTIONS_TABLE_NAME"] = "bench-connections"
+
+import aws_clients  # noqa: E402
+import dynamo_batch  # noqa: E402
+import ws_connections  # noqa: E402
+from local_management_api import LocalManagementApi  # noqa: E402
+
+
+def load_registry(count, gone):
+    """Write ``count`` connections straight into the table; return the stand-in API."""
+    import boto3
+
+    boto3.client("dynamodb", region_name=os.environ["AWS_REGION"]).create_table(
+        TableName="bench-connections",
+        KeySchema=[{"AttributeName": "pk", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "pk", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    items = []
+    for i in range(count):
+        items.append({"pk": f"connection#conn-{i}", "userID": f"user-{i}", "connectedAt": 0})
+        items.append({"pk": f"user#user-{i}", "connectionIDs": {f"conn-{i}"}})
+    dynamo_batch.batch_write("bench-connections", items)
+    closed = int(count * gone)
+    return LocalManagementApi(f"conn-{i}" for i in range(closed, count))
+
+
+def run(args):
+    users = [f"user-{i}" for i in range(args.connections)]
+    for workers in (int(w) for w in args.workers.split(",")):
+        api = load_registry(args.connections, args.gone)
+        api.latency = args.latency
+        aws_clients.set_client("apigatewaymanagementapi", api)
+        ws_connections.BROADCAST_WORKERS = workers
+
+        start = time.perf_counter()
+        connections = ws_connections.connections_for(users)
+        lookup = time.perf_counter() - start
+        start = time.perf_counter()
+        delivered, pruned = ws_connections.broadcast("https://local", connections, {"type": "message", "body": "x"})
+        elapsed = time.perf_counter() - start
+
+        print(f"{workers:>3} workers: {api.calls / elapsed:>9,.0f} posts/s  fan-out {elapsed:6.2f}s  "
+              f"(lookup {lookup:5.2f}s, {delivered:,} delivered, {pruned:,} pruned)")
+        aws_clients.get_resource("dynamodb").Table("bench-connections").delete()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--connections", type=int, default=10000)
+    parser.add_argument("--gone", type=float, default=0.05, help="fraction of registered connections already closed")
+    parser.add_argument("--latency", type=float, default=0.005, help="seconds per post_to_connection call")
+    parser.add_argument("--workers", default="1,8,32,64")
+    args = parser.parse_args(argv)
+
+    from moto import mock_aws
+
+    with mock_aws():
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
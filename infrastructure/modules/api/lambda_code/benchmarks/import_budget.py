@@ -0,0 +1,129 @@
+"""Cold-start import cost per Lambda handler, checked against a budget.
+
+Each handler module is imported in a fresh interpreter under
+``python -X importtime`` with the same sys.path Lambda gives it (its own
+directory plus the shared layer). The cumulative import time of the handler
+module is compared with ``import_budget.json``; the script exits non-zero if
+any handler goes over.
+
+    python import_budget.py            # every handler in lambda_code/
+    python import_budget.py login      # just one
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+LAMBDA_CODE_DIR = os.path.dirname(HERE)
+SHARED_DIR = os.path.join(LAMBDA_CODE_DIR, "shared", "python")
+BUDGET_FILE = os.path.join(HERE, "import_budget.json")
+
+# Modules that must never be imported at handler load time.
+HEAVY_MODULES = ("boto3", "botocore")
+
+
+def discover_handlers():
+    """Return every ``<name>/<name>.py`` handler module under lambda_code/."""
+    return sorted(
+        name for name in os.listdir(LAMBDA_CODE_DIR)
+        if os.path.isfile(os.path.join(LAMBDA_CODE_DIR, name, f"{name}.py"))
+    )
+
+
+def load_budgets(path=BUDGET_FILE):
+    with open(path) as f:
+        return json.load(f)
+
+
+def parse_importtime(stderr):
+    """Parse ``-X importtime`` output into ``(name, depth, self_us, cumulative_us)`` rows."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # column header
+        self_us, cumulative_us, name = fields
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return rows
+
+
+def handler_imports(rows, handler):
+    """Return ``{module: (self_us, cumulative_us)}`` for ``handler`` and everything it pulled in.
+
+    importtime prints children before their parent, so the handler's subtree
+    is the run of nested rows immediately above its own top-level row.
+    """
+    end = next(i for i, row in enumerate(rows) if row[0] == handler and row[1] == 0)
+    start = end
+    while start > 0 and rows[start - 1][1] > 0:
+        start -= 1
+    return {name: (self_us, cumulative_us) for name, _, self_us, cumulative_us in rows[start:end + 1]}
+
+
+def measure(handler, runs=5):
+    """Import ``handler`` ``runs`` times in fresh interpreters.
+
+    Returns the median cumulative import time in milliseconds and the modules
+    the handler imported on the last run.
+    """
+    env = {k: v for k, v in os.environ.items() if not k.startswith("PYTHON")}
+    env["PYTHONPATH"] = os.pathsep.join([os.path.join(LAMBDA_CODE_DIR, handler), SHARED_DIR])
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+
+    timings = []
+    modules = {}
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {handler}"],
+            env=env, capture_output=True, text=True, check=True,
+        )
+        modules = handler_imports(parse_importtime(proc.stderr), handler)
+        timings.append(modules[handler][1] / 1000)
+    return statistics.median(timings), modules
+
+
+def check(handlers, budgets, runs=5, timing=True):
+    """Measure every handler and return ``(report_rows, failures)``.
+
+    With ``timing=False`` only the modules imported are checked, not the
+    time taken, which depends on how busy the machine is.
+    """
+    rows, failures = [], []
+    for handler in handlers:
+        budget = budgets.get(handler, budgets["default"])
+        elapsed, modules = measure(handler, runs)
+        heavy = sorted(name for name in modules if name.split(".")[0] in HEAVY_MODULES)
+        slowest = sorted(modules.items(), key=lambda item: item[1][0], reverse=True)[:3]
+        rows.append((handler, elapsed, budget, [name for name, _ in slowest]))
+        if timing and elapsed > budget:
+            failures.append(f"{handler}: {elapsed:.1f}ms exceeds budget of {budget}ms")
+        if heavy:
+            failures.append(f"{handler}: imports {', '.join(heavy[:3])} at load time")
+    return rows, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("handlers", nargs="*", help="handler names (default: all)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-file", default=BUDGET_FILE)
+    args = parser.parse_args(argv)
+
+    rows, failures = check(args.handlers or discover_handlers(), load_budgets(args.budget_file), args.runs)
+
+    print(f"{'handler':<20} {'import':>9} {'budget':>8}  slowest self-time")
+    for handler, elapsed, budget, slowest in rows:
+        print(f"{handler:<20} {elapsed:>7.1f}ms {budget:>6}ms  {', '.join(slowest)}")
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""Local stand-in for a Cognito user pool's signing keys.
+
+Generates throwaway RSA keys in pure Python (no crypto dependency), publishes
+them as a JWKS document and signs RS256 tokens with Cognito-shaped claims.
+Used by the jwt_verifier tests and benchmark; never use these keys for
+anything real.
+"""
+import base64
+import hashlib
+import json
+import random
+import time
+
+_SHA256_DIGEST_INFO = bytes.fromhex("3031300d060960864801650304020105000420")
+_SMALL_PRIMES = [p for p in range(3, 2000, 2) if all(p % d for d in range(3, int(p ** 0.5) + 1, 2))]
+
+REGION = "us-east-1"
+USER_POOL_ID = "us-east-1_fixture"
+CLIENT_ID = "fixture-client"
+ISSUER = f"https://cognito-idp.{REGION}.amazonaws.com/{USER_POOL_ID}"
+
+
+def _is_probable_prime(n, rng, rounds=24):
+    if any(n % p == 0 for p in _SMALL_PRIMES):
+        return n in _SMALL_PRIMES
+    d, r = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        r += 1
+    for _ in range(rounds):
+        x = pow(rng.randrange(2, n - 1), d, n)
+        if x in (1, n - 1):
+            continue
+        for _ in range(r - 1):
+            x = pow(x, 2, n)
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def _random_prime(bits, rng):
+    while True:
+        candidate = rng.getrandbits(bits) | (1 << (bits - 1)) | (1 << (bits - 2)) | 1
+        if _is_probable_prime(candidate, rng):
+            return candidate
+
+
+def make_key(kid, bits=2048, seed=None):
+    """Return an RSA key dict ``{kid, n, e, d}``."""
+    rng = random.Random(seed)
+    e = 65537
+    while True:
+        p, q = _random_prime(bits // 2, rng), _random_prime(bits // 2, rng)
+        phi = (p - 1) * (q - 1)
+        if p != q and phi % e:
+            return {"kid": kid, "n": p * q, "e": e, "d": pow(e, -1, phi)}
+
+
+def _b64url(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _int_b64url(value):
+    return _b64url(value.to_bytes((value.bit_length() + 7) // 8, "big"))
+
+
+def jwks(*keys):
+    """Return the public JWKS document for ``keys``."""
+    return {
+        "keys": [
+            {"kid": key["kid"], "kty": "RSA", "alg": "RS256", "use": "sig",
+             "n": _int_b64url(key["n"]), "e": _int_b64url(key["e"])}
+            for key in keys
+        ]
+    }
+
+
+def sign(claims, key):
+    """Return an RS256 JWT for ``claims`` signed with ``key``."""
+    header = _b64url(json.dumps({"kid": key["kid"], "alg": "RS256"}).encode())
+    payload = _b64url(json.dumps(claims).encode())
+    signing_input = f"{header}.{payload}".encode()
+
+    k = (key["n"].bit_length() + 7) // 8
+    digest_info = _SHA256_DIGEST_INFO + hashlib.sha256(signing_input).digest()
+    encoded = b"\x00\x01" + b"\xff" * (k - len(digest_info) - 3) + b"\x00" + digest_info
+    signature = pow(int.from_bytes(encoded, "big"), key["d"], key["n"]).to_bytes(k, "big")
+    return f"{header}.{payload}.{_b64url(signature)}"
+
+
+def claims(sub="user-123", token_use="access", ttl=3600, **extra):
+    """Return Cognito-shaped claims for an id or access token."""
+    now = int(time.time())
+    body = {"sub": sub, "iss": ISSUER, "token_use": token_use, "iat": now, "exp": now + ttl}
+    if token_use == "id":
+        body.update({"aud": CLIENT_ID, "email": f"{sub}@example.com"})
+    else:
+        body.update({"client_id": CLIENT_ID, "username": sub})
+    body.update(extra)
+    return body
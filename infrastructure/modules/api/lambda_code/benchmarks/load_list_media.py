@@ -0,0 +1,138 @@
+"""Per-page latency of the media listing as the media table grows.
+
+Seeds the table in steps (``--sizes``), keeping the listed user's own media
+fixed, and after each step pages through that user's media with
+``media_store.list_user_media`` (a Query on the sparse user index). For
+contrast it also times the Scan + filter that listing needed before the
+index existed. Query latency should stay flat while the Scan grows with the
+table.
+
+Run against DynamoDB Local for meaningful numbers:
+
+    docker run -p 8000:8000 amazon/dynamodb-local
+    python load_list_media.py --endpoint-url http://localhost:8000 --sizes 10000,50000,200000
+
+Without ``--endpoint-url`` it runs in-process on moto, which is only good as
+a smoke test: moto evaluates a Query by walking the whole table.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "shared", "python"))
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+os.environ.setdefault("AWS_REGION", "us-east-1")
+
+import aws_clients  # noqa: E402
+import media_store  # noqa: E402
+
+TABLE = "bench-media-metadata"
+USER = "bench-user"
+
+
+def create_table(dynamodb):
+    table = dynamodb.create_table(
+        TableName=TABLE,
+        KeySchema=[{"AttributeName": "mediaID", "KeyType": "HASH"},
+                   {"AttributeName": "userID", "KeyType": "RANGE"}],
+        AttributeDefinitions=[{"AttributeName": "mediaID", "AttributeType": "S"},
+                              {"AttributeName": "userID", "AttributeType": "S"},
+                              {"AttributeName": "uploadedAt", "AttributeType": "N"}],
+        GlobalSecondaryIndexes=[{
+            "IndexName": media_store.USER_INDEX_NAME,
+            "KeySchema": [{"AttributeName": "userID", "KeyType": "HASH"},
+                          {"AttributeName": "uploadedAt", "KeyType": "RANGE"}],
+            "Projection": {"ProjectionType": "ALL"},
+        }],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    table.wait_until_exists()
+    return table
+
+
+def seed(table, count, user_id=None, users=1000):
+    now = int(time.time() * 1000)
+    with table.batch_writer() as batch:
+        for i in range(count):
+            media_id = str(uuid.uuid4())
+            item = media_store.pending_item(media_id, user_id or f"user-{i % users}", f"uploads/{media_id}.jpg",
+                                            "image/jpeg", 2000)
+            item.update(status=media_store.READY, uploadedAt=now - i)
+            del item["expiresAt"]
+            batch.put_item(Item=item)
+
+
+def page_latencies(page_size, rounds):
+    latencies = []
+    for _ in range(rounds):
+        cursor = None
+        while True:
+            start = time.perf_counter()
+            items, cursor = media_store.list_user_media(USER, page_size, cursor, TABLE)
+            latencies.append(time.perf_counter() - start)
+            if not cursor:
+                break
+    return latencies
+
+
+def scan_listing(table):
+    from boto3.dynamodb.conditions import Attr
+
+    start = time.perf_counter()
+    kwargs = {"FilterExpression": Attr("userID").eq(USER)}
+    while True:
+        page = table.scan(**kwargs)
+        if "LastEvaluatedKey" not in page:
+            break
+        kwargs["ExclusiveStartKey"] = page["LastEvaluatedKey"]
+    return time.perf_counter() - start
+
+
+def run(args):
+    import boto3
+
+    dynamodb = boto3.resource("dynamodb", region_name=os.environ["AWS_REGION"], endpoint_url=args.endpoint_url)
+    aws_clients.set_resource("dynamodb", dynamodb)
+    table = create_table(dynamodb)
+    try:
+        seed(table, args.user_media, user_id=USER)
+        rows = args.user_media
+        print(f"{'rows':>10}  {'query p50':>10}  {'query p95':>10}  {'scan listing':>12}")
+        for size in args.sizes:
+            seed(table, size - rows)
+            rows = size
+            latencies = sorted(page_latencies(args.page_size, args.rounds))
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            print(f"{rows:>10,}  {statistics.median(latencies) * 1e3:>8.2f}ms  {p95 * 1e3:>8.2f}ms  "
+                  f"{scan_listing(table) * 1e3:>10.1f}ms")
+    finally:
+        table.delete()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--endpoint-url", help="DynamoDB Local endpoint; defaults to in-process moto")
+    parser.add_argument("--sizes", type=lambda s: [int(n) for n in s.split(",")], default=[1000, 5000, 20000])
+    parser.add_argument("--user-media", type=int, default=200, help="media rows owned by the listed user")
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    if args.endpoint_url:
+        run(args)
+        return
+
+    from moto import mock_aws
+
+    with mock_aws():
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
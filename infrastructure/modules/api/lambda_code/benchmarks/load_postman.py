@@ -0,0 +1,340 @@
+"""Replay the Postman collection under load and report RPS and tail latency per route.
+
+Each of ``--concurrency`` virtual users runs the whole collection in order
+(one "iteration") over its own keep-alive connection, with its own copy of
+the variables, until ``--iterations`` iterations in total have run or
+``--duration`` seconds have passed. Every response is checked against the
+status code its test script asserts (``pm.response.to.have.status(...)``).
+
+    # against the local emulator, started in-process
+    python load_postman.py --local --concurrency 8 --iterations 200
+
+    # against a deployed stage (the emulator can also run on its own:
+    # python local_api.py --port 3000, then --base-url http://127.0.0.1:3000)
+    python load_postman.py --environment ../../../../../postman/Sandbox.postman_environment.json \\
+        --var login_email=me@example.com --var login_password=... --concurrency 16 --duration 60
+
+Postman scripts are JavaScript and are not run; the replay understands the
+subset the collection uses to pass values between requests:
+``pm.collectionVariables.set(name, expr)`` (also ``pm.environment`` /
+``pm.variables``), ``var``/``let``/``const`` assignments, and expressions
+concatenating string literals, ``Date.now()`` (unique per iteration here,
+so generated emails never collide across virtual users), earlier local
+variables and ``pm.response.json().field``. ``{{$timestamp}}``,
+``{{$guid}}`` and ``{{$randomInt}}`` are substituted as in Postman.
+"""
+import argparse
+import contextlib
+import http.client
+import itertools
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.abspath(os.path.join(HERE, "..", "..", "..", "..", ".."))
+DEFAULT_COLLECTION = os.path.join(REPO_ROOT, "postman", "ChatApp.postman_collection.json")
+
+LOAD_TEST_EMAIL = "loadtest@example.com"
+LOAD_TEST_PASSWORD = "LoadTest123"
+
+_VARIABLE = re.compile(r"\{\{\s*([^{}]+?)\s*\}\}")
+_SET = re.compile(r"pm\.(?:collectionVariables|environment|variables)\.set\(\s*[\"'](\w+)[\"']\s*,\s*(.+)\)\s*;?\s*$")
+_ASSIGN = re.compile(r"(?:var|let|const)\s+(\w+)\s*=\s*(.+?)\s*;?\s*$")
+_TERM = re.compile(r"\s*(\"[^\"]*\"|'[^']*'|Date\.now\(\)|pm\.response\.json\(\)((?:\.\w+)+)|-?\d+|\w+)\s*(\+|$)")
+_STATUS = re.compile(r"to\.have\.status\((\d{3})\)")
+
+_unique = itertools.count()
+
+
+# --- Collection parsing ---
+
+def _script(item, listen):
+    for event in item.get("event", []):
+        if event.get("listen") == listen:
+            return event.get("script", {}).get("exec", [])
+    return []
+
+
+def load_requests(path):
+    """Flatten the collection into ``[{name, method, url, headers, body, prerequest, tests, expected}]``."""
+    with open(path) as f:
+        collection = json.load(f)
+
+    requests = []
+
+    def walk(items):
+        for item in items:
+            if "item" in item:
+                walk(item["item"])
+                continue
+            request = item["request"]
+            url = request["url"]["raw"] if isinstance(request["url"], dict) else request["url"]
+            tests = _script(item, "test")
+            expected = next((int(m.group(1)) for line in tests for m in [_STATUS.search(line)] if m), None)
+            requests.append({
+                "name": item["name"],
+                "method": request["method"],
+                "url": url,
+                "headers": {h["key"]: h["value"] for h in request.get("header", []) if not h.get("disabled")},
+                "body": (request.get("body") or {}).get("raw"),
+                "prerequest": _script(item, "prerequest"),
+                "tests": tests,
+                "expected": expected,
+            })
+
+    walk(collection["item"])
+    variables = {v["key"]: v.get("value", "") for v in collection.get("variable", [])}
+    return requests, variables
+
+
+def load_environment(path):
+    with open(path) as f:
+        return {v["key"]: v.get("value", "") for v in json.load(f).get("values", []) if v.get("enabled", True)}
+
+
+# --- Script subset ---
+
+def _evaluate(expression, scope, response_json):
+    value = ""
+    position = 0
+    while position < len(expression):
+        match = _TERM.match(expression, position)
+        if match is None:
+            raise ValueError(f"unsupported script expression: {expression}")
+        term, path = match.group(1), match.group(2)
+        if term[0] in "\"'":
+            value += term[1:-1]
+        elif term == "Date.now()":
+            value += str(int(time.time() * 1000) * 1000 + next(_unique) % 1000)
+        elif path:
+            node = response_json()
+            for key in path.strip(".").split("."):
+                node = node[key]
+            value += str(node)
+        elif term in scope:
+            value += str(scope[term])
+        else:
+            value += term
+        position = match.end()
+    return value
+
+
+def run_script(lines, variables, response_json=None):
+    """Apply the variable assignments in a Postman script to ``variables``."""
+    scope = {}
+    for line in lines:
+        line = line.strip()
+        match = _SET.match(line)
+        if match:
+            variables[match.group(1)] = _evaluate(match.group(2), scope, response_json)
+            continue
+        match = _ASSIGN.match(line)
+        if match:
+            try:
+                scope[match.group(1)] = _evaluate(match.group(2), scope, response_json)
+            except (ValueError, KeyError, TypeError):
+                pass  # e.g. `const responseData = pm.response.json();`, only used by assertions
+
+
+def substitute(text, variables):
+    def replace(match):
+        name = match.group(1)
+        if name == "$timestamp":
+            return str(int(time.time()))
+        if name == "$guid":
+            return str(uuid.uuid4())
+        if name == "$randomInt":
+            return str(random.randint(0, 1000))
+        return str(variables.get(name, match.group(0)))
+
+    return _VARIABLE.sub(replace, text) if text else text
+
+
+# --- Virtual users ---
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def add(self, route, seconds, ok):
+        with self._lock:
+            self.samples.setdefault(route, []).append(seconds)
+            if not ok:
+                self.errors[route] = self.errors.get(route, 0) + 1
+
+
+class VirtualUser:
+    def __init__(self, requests, variables):
+        self.requests = requests
+        self.base_variables = variables
+        self.connections = {}
+
+    def _connection(self, scheme, netloc):
+        key = (scheme, netloc)
+        if key not in self.connections:
+            cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            self.connections[key] = cls(netloc, timeout=30)
+        return self.connections[key]
+
+    def _send(self, method, url, headers, body):
+        parts = urlsplit(url)
+        target = parts.path + (f"?{parts.query}" if parts.query else "")
+        for attempt in range(2):
+            connection = self._connection(parts.scheme, parts.netloc)
+            try:
+                connection.request(method, target, body=body.encode() if body else None, headers=headers)
+                response = connection.getresponse()
+                return response.status, response.read()
+            except (http.client.HTTPException, OSError):
+                connection.close()
+                del self.connections[(parts.scheme, parts.netloc)]
+                if attempt:
+                    raise
+
+    def iteration(self, recorder=None):
+        variables = dict(self.base_variables)
+        for request in self.requests:
+            run_script(request["prerequest"], variables)
+            url = substitute(request["url"], variables)
+            headers = {name: substitute(value, variables) for name, value in request["headers"].items()}
+            body = substitute(request["body"], variables)
+
+            start = time.perf_counter()
+            try:
+                status, payload = self._send(request["method"], url, headers, body)
+            except (http.client.HTTPException, OSError):
+                status, payload = None, b""
+            elapsed = time.perf_counter() - start
+
+            if recorder is not None:
+                ok = status is not None and request["expected"] in (None, status)
+                recorder.add(f"{request['method']} {urlsplit(url).path}", elapsed, ok)
+            if status is not None:
+                run_script(request["tests"], variables, lambda: json.loads(payload))
+
+    def close(self):
+        for connection in self.connections.values():
+            connection.close()
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def run(requests, variables, concurrency, iterations=None, duration=None, warmup=0):
+    """Run the load and return ``(recorder, elapsed_seconds)``."""
+    users = [VirtualUser(requests, variables) for _ in range(concurrency)]
+    for _ in range(warmup):
+        for user in users:
+            user.iteration()
+
+    recorder = Recorder()
+    remaining = itertools.count()
+    deadline = time.perf_counter() + duration if duration else None
+
+    def loop(user):
+        while True:
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            if iterations is not None and next(remaining) >= iterations:
+                return
+            user.iteration(recorder)
+
+    threads = [threading.Thread(target=loop, args=(user,)) for user in users]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    for user in users:
+        user.close()
+    return recorder, elapsed
+
+
+def report(recorder, elapsed):
+    rows = []
+    for route, samples in sorted(recorder.samples.items()):
+        samples.sort()
+        rows.append({
+            "route": route,
+            "requests": len(samples),
+            "rps": len(samples) / elapsed,
+            "p50_ms": percentile(samples, 0.50) * 1e3,
+            "p95_ms": percentile(samples, 0.95) * 1e3,
+            "p99_ms": percentile(samples, 0.99) * 1e3,
+            "errors": recorder.errors.get(route, 0),
+        })
+    return rows
+
+
+def print_report(rows, elapsed):
+    print(f"{'route':<28} {'requests':>9} {'rps':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for row in rows:
+        print(f"{row['route']:<28} {row['requests']:>9,} {row['rps']:>9.1f} {row['p50_ms']:>8.2f} "
+              f"{row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f} {row['errors']:>7,}")
+    total = sum(row["requests"] for row in rows)
+    print(f"{'total':<28} {total:>9,} {total / elapsed:>9.1f}  in {elapsed:.1f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--collection", default=DEFAULT_COLLECTION)
+    parser.add_argument("--environment", help="Postman environment file (e.g. Sandbox.postman_environment.json)")
+    parser.add_argument("--var", action="append", default=[], metavar="NAME=VALUE", help="override a variable")
+    parser.add_argument("--base-url", help="shorthand for --var baseUrl=...")
+    parser.add_argument("--local", action="store_true", help="start the local API emulator in-process")
+    parser.add_argument("--handler-log", default=os.devnull,
+                        help="with --local, where the handlers' output (EMF metric lines) goes")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--iterations", type=int, help="collection runs in total (default 100 without --duration)")
+    parser.add_argument("--duration", type=float, help="seconds to run for")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed iterations per virtual user first")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    requests, variables = load_requests(args.collection)
+    if args.environment:
+        variables.update(load_environment(args.environment))
+    for assignment in args.var:
+        name, _, value = assignment.partition("=")
+        variables[name] = value
+    if args.base_url:
+        variables["baseUrl"] = args.base_url
+    if args.iterations is None and args.duration is None:
+        args.iterations = 100
+
+    api = None
+    with contextlib.ExitStack() as stack:
+        if args.local:
+            from local_api import LocalApi
+
+            # In-process handlers print an EMF line per request; keep them out of the report
+            stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(args.handler_log, "w"))))
+            api = stack.enter_context(LocalApi())
+            variables["baseUrl"] = api.base_url
+            # The collection's login requests need an existing, confirmed user
+            variables["login_email"] = variables.get("login_email") or LOAD_TEST_EMAIL
+            variables["login_password"] = variables.get("login_password") or LOAD_TEST_PASSWORD
+            api.create_user(variables["login_email"], variables["login_password"])
+        recorder, elapsed = run(requests, variables, args.concurrency, args.iterations, args.duration, args.warmup)
+
+    rows = report(recorder, elapsed)
+    if args.json:
+        print(json.dumps({"elapsed_s": elapsed, "routes": rows}, indent=2))
+    else:
+        print_report(rows, elapsed)
+    return 1 if any(row["errors"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
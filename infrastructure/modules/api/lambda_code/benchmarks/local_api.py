@@ -0,0 +1,353 @@
+"""Local stand-in for the REST API: API Gateway routes -> the real lambda_handlers.
+
+Starts an HTTP server whose routes match the api module's API Gateway
+resources and turns each request into an API Gateway proxy event for the
+handler behind it. DynamoDB and S3 are moto, running in-process, with the
+tables and bucket the handlers expect; Cognito is ``local_cognito``, with
+the post-confirmation trigger that creates user profiles. Bearer
+tokens are checked by the real ``jwt_verifier`` against the local pool's
+signing key, so signup -> login -> get-upload-url works end to end.
+
+    python local_api.py --port 3000
+    curl -X POST localhost:3000/signup -d '{"email": "a@example.com", "password": "secret1"}'
+
+Cognito normally keeps new users UNCONFIRMED until they enter the emailed
+code; the emulator confirms users created through /signup right away
+(``--no-auto-confirm`` keeps them unconfirmed). Requests are served from a
+thread per connection against one copy of each handler, i.e. like a set of
+warm containers that share module-level caches. Handler invocations run one
+at a time, as in a Lambda container: the handlers share one copy of the
+shared layer, including the invocation ``metrics`` is recording.
+"""
+import argparse
+import base64
+import importlib
+import json
+import os
+import sys
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+LAMBDA_CODE_DIR = os.path.dirname(HERE)
+sys.path.insert(0, os.path.join(LAMBDA_CODE_DIR, "shared", "python"))
+
+from local_cognito import LocalCognito  # noqa: E402
+
+REGION = "us-east-1"
+
+# (method, path) -> handler module, as wired in modules/api/main.tf
+ROUTES = {
+    ("POST", "/signup"): "signup",
+    # AWS_IAM-authorized in API Gateway; unsigned here, so always a 403
+    ("POST", "/signup/bulk"): "signup",
+    ("POST", "/login"): "login",
+    ("GET", "/get-upload-url"): "upload_url",
+    ("POST", "/get-upload-url"): "upload_url",
+    ("POST", "/get-download-url"): "download_url",
+    ("POST", "/multipart-upload"): "multipart_upload",
+    ("GET", "/media"): "list_media",
+    ("POST", "/profiles"): "get_profiles",
+    ("POST", "/conversations"): "create_conversation",
+    ("POST", "/messages"): "send_message",
+    ("GET", "/messages"): "message_history",
+    ("GET", "/messages/since"): "messages_since",
+    ("GET", "/inbox"): "inbox",
+    ("POST", "/inbox/read"): "inbox",
+    ("GET", "/search"): "search_messages",
+    ("POST", "/presence"): "get_presence",
+}
+# Cognito triggers, as wired on the identity module's user pool
+TRIGGERS = ("post_confirmation",)
+
+# Shared-layer modules that read their configuration at import time
+CONFIGURED_MODULES = ("download_urls", "idempotency", "inbox_store", "media_store", "message_archive", "message_store",
+                      "presence", "profile_store", "rate_limit", "search_index", "ws_connections")
+
+TABLES = {
+    "USER_PROFILE_TABLE_NAME": ("local-user-profiles", [("userId", "S")]),
+    "UPLOAD_SESSIONS_TABLE_NAME": ("local-upload-sessions", [("uploadId", "S")]),
+    "CONVERSATIONS_TABLE_NAME": ("local-conversations", [("conversationID", "S")]),
+    "MESSAGES_TABLE_NAME": ("local-messages", [("pk", "S"), ("messageID", "S")]),
+    "MESSAGE_DELIVERIES_TABLE_NAME": ("local-message-deliveries", [("userID", "S"), ("messageID", "S")]),
+    "CONNECTIONS_TABLE_NAME": ("local-connections", [("pk", "S")]),
+    "IDEMPOTENCY_TABLE_NAME": ("local-idempotency", [("pk", "S")]),
+    "SEARCH_INDEX_TABLE_NAME": ("local-search-index", [("pk", "S"), ("block", "N")]),
+}
+# Only with rate_limits=True: load tests log in from one IP as one user
+RATE_LIMIT_TABLE_NAME = "local-rate-limits"
+MEDIA_METADATA_TABLE_NAME = "local-media"
+INBOX_TABLE_NAME = "local-inbox"
+MEDIA_BUCKET_NAME = "local-media-bucket"
+MESSAGE_ARCHIVE_BUCKET_NAME = "local-message-archive"
+
+
+def _key_schema(key):
+    return {
+        "KeySchema": [{"AttributeName": name, "KeyType": kind} for (name, _), kind in zip(key, ("HASH", "RANGE"))],
+        "AttributeDefinitions": [{"AttributeName": name, "AttributeType": kind} for name, kind in key],
+    }
+
+
+class LocalApi:
+    """In-process API emulator; use as a context manager or ``start()``/``stop()``."""
+
+    def __init__(self, host="127.0.0.1", port=0, auto_confirm=True, rate_limits=False):
+        self.host = host
+        self.port = port
+        self.auto_confirm = auto_confirm
+        self.rate_limits = rate_limits
+        self.cognito = LocalCognito()
+        self.handlers = {}
+        self.environment = {}
+        self._saved_environment = {}
+        self._mock = None
+        self._server = None
+        self._thread = None
+        # Re-entrant: signup runs the post-confirmation trigger inside its invocation
+        self._invocations = threading.RLock()
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self._server.server_address[1]}"
+
+    # --- Backing services ---
+
+    def _provision(self):
+        import boto3
+
+        dynamodb = boto3.client("dynamodb", region_name=REGION)
+        for table_name, key in TABLES.values():
+            dynamodb.create_table(TableName=table_name, BillingMode="PAY_PER_REQUEST", **_key_schema(key))
+        dynamodb.create_table(
+            TableName=MEDIA_METADATA_TABLE_NAME,
+            BillingMode="PAY_PER_REQUEST",
+            KeySchema=[{"AttributeName": "mediaID", "KeyType": "HASH"},
+                       {"AttributeName": "userID", "KeyType": "RANGE"}],
+            AttributeDefinitions=[{"AttributeName": "mediaID", "AttributeType": "S"},
+                                  {"AttributeName": "userID", "AttributeType": "S"},
+                                  {"AttributeName": "uploadedAt", "AttributeType": "N"}],
+            GlobalSecondaryIndexes=[{
+                "IndexName": "userID-uploadedAt-index",
+                "KeySchema": [{"AttributeName": "userID", "KeyType": "HASH"},
+                              {"AttributeName": "uploadedAt", "KeyType": "RANGE"}],
+                "Projection": {"ProjectionType": "ALL"},
+            }],
+        )
+        dynamodb.create_table(
+            TableName=INBOX_TABLE_NAME,
+            BillingMode="PAY_PER_REQUEST",
+            KeySchema=[{"AttributeName": "userID", "KeyType": "HASH"},
+                       {"AttributeName": "conversationID", "KeyType": "RANGE"}],
+            AttributeDefinitions=[{"AttributeName": "userID", "AttributeType": "S"},
+                                  {"AttributeName": "conversationID", "AttributeType": "S"},
+                                  {"AttributeName": "lastActivityAt", "AttributeType": "N"}],
+            LocalSecondaryIndexes=[{
+                "IndexName": "userID-lastActivityAt-index",
+                "KeySchema": [{"AttributeName": "userID", "KeyType": "HASH"},
+                              {"AttributeName": "lastActivityAt", "KeyType": "RANGE"}],
+                "Projection": {"ProjectionType": "ALL"},
+            }],
+        )
+        s3 = boto3.client("s3", region_name=REGION)
+        s3.create_bucket(Bucket=MEDIA_BUCKET_NAME)
+        s3.create_bucket(Bucket=MESSAGE_ARCHIVE_BUCKET_NAME)
+        if self.rate_limits:
+            dynamodb.create_table(TableName=RATE_LIMIT_TABLE_NAME, BillingMode="PAY_PER_REQUEST",
+                                  **_key_schema([("pk", "S")]))
+            self.environment["RATE_LIMIT_TABLE_NAME"] = RATE_LIMIT_TABLE_NAME
+
+        self.environment.update({name: table_name for name, (table_name, _) in TABLES.items()})
+        self.environment.update({
+            "MEDIA_METADATA_TABLE_NAME": MEDIA_METADATA_TABLE_NAME,
+            "INBOX_TABLE_NAME": INBOX_TABLE_NAME,
+            "MEDIA_BUCKET_NAME": MEDIA_BUCKET_NAME,
+            "MESSAGE_ARCHIVE_BUCKET_NAME": MESSAGE_ARCHIVE_BUCKET_NAME,
+            "COGNITO_USER_POOL_ID": self.cognito.user_pool_id,
+            "COGNITO_CLIENT_ID": self.cognito.client_id,
+        })
+        self._apply_environment(self.environment)
+
+    def _apply_environment(self, values):
+        for name, value in values.items():
+            self._saved_environment.setdefault(name, os.environ.get(name))
+            os.environ[name] = value
+
+    def _load_handlers(self):
+        import aws_clients
+        import jwt_verifier
+
+        aws_clients.reset()
+        for name in CONFIGURED_MODULES:
+            importlib.reload(importlib.import_module(name))
+        for module_name in sorted(set(ROUTES.values()) | set(TRIGGERS)):
+            directory = os.path.join(LAMBDA_CODE_DIR, module_name)
+            if directory not in sys.path:
+                sys.path.insert(0, directory)
+            self.handlers[module_name] = importlib.reload(importlib.import_module(module_name)).lambda_handler
+
+        self.cognito.post_confirmation = self.handlers["post_confirmation"]
+        aws_clients.set_client("cognito-idp", self.cognito)
+        jwt_verifier.set_verifier(self.cognito.verifier())
+
+    def start(self):
+        from moto import mock_aws
+
+        self._apply_environment({
+            "AWS_REGION": REGION,
+            "AWS_DEFAULT_REGION": REGION,
+            "AWS_ACCESS_KEY_ID": "local",
+            "AWS_SECRET_ACCESS_KEY": "local",
+        })
+        self._mock = mock_aws()
+        self._mock.start()
+        self._provision()
+        self._load_handlers()
+
+        self._server = ThreadingHTTPServer((self.host, self.port), _handler_class(self))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        import aws_clients
+        import jwt_verifier
+
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+        if self._mock:
+            self._mock.stop()
+        for name, value in self._saved_environment.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        self._saved_environment.clear()
+        # Leave the shared modules configured from the restored environment
+        jwt_verifier.set_verifier(None)
+        aws_clients.reset()
+        for name in CONFIGURED_MODULES:
+            importlib.reload(importlib.import_module(name))
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    # --- Request dispatch ---
+
+    def create_user(self, email, password):
+        """Sign up and confirm a user directly in the local user pool; returns the user's sub."""
+        sub = self.cognito.sign_up(ClientId=self.cognito.client_id, Username=email, Password=password,
+                                   UserAttributes=[{"Name": "email", "Value": email}])["UserSub"]
+        self.confirm(email)
+        return sub
+
+    def confirm(self, email):
+        with self._invocations:
+            self.cognito.admin_confirm_sign_up(UserPoolId=self.cognito.user_pool_id, Username=email)
+
+    def invoke(self, method, path, headers=None, body=None, query=None):
+        """Run the handler for ``method path`` and return its proxy response (or a 403/404 like API Gateway)."""
+        options = method == "OPTIONS"
+        module_name = next((name for (route_method, route_path), name in ROUTES.items()
+                            if route_path == path and (options or route_method == method)), None)
+        if module_name is None:
+            known_path = any(route_path == path for _, route_path in ROUTES)
+            return {"statusCode": 403 if known_path else 404,
+                    "body": json.dumps({"message": "Missing Authentication Token"})}
+
+        event = {
+            "resource": path,
+            "path": path,
+            "httpMethod": method,
+            "headers": headers or {},
+            "multiValueHeaders": {name: [value] for name, value in (headers or {}).items()},
+            "queryStringParameters": query or None,
+            "multiValueQueryStringParameters": {name: [value] for name, value in query.items()} if query else None,
+            "pathParameters": None,
+            "stageVariables": None,
+            "requestContext": {
+                "requestId": str(uuid.uuid4()),
+                "stage": "local",
+                "resourcePath": path,
+                "httpMethod": method,
+                "path": f"/local{path}",
+                "identity": {"sourceIp": "127.0.0.1"},
+            },
+            "body": body,
+            "isBase64Encoded": False,
+        }
+        with self._invocations:
+            response = self.handlers[module_name](event, None)
+
+            if self.auto_confirm and module_name == "signup" and response.get("statusCode") == 201:
+                self.confirm(json.loads(body)["email"])
+            if module_name == "send_message" and response.get("statusCode") == 201:
+                # Stands in for the messages table's stream -> search-indexer
+                import search_index
+
+                search_index.index_messages([json.loads(response["body"])])
+        return response
+
+
+def _handler_class(api):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body go out in separate writes; with Nagle on, the
+        # body waits for the client's delayed ACK (~40 ms per request)
+        disable_nagle_algorithm = True
+
+        def _dispatch(self):
+            url = urlsplit(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length).decode() if length else None
+            try:
+                response = api.invoke(self.command, url.path.rstrip("/") or "/", dict(self.headers.items()),
+                                      body, dict(parse_qsl(url.query)))
+            except Exception as e:  # an unhandled handler error is a 502 from API Gateway
+                print(f"{self.command} {url.path}: {e!r}")
+                response = {"statusCode": 502, "body": json.dumps({"message": "Internal server error"})}
+
+            payload = response.get("body") or ""
+            payload = base64.b64decode(payload) if response.get("isBase64Encoded") else payload.encode()
+            self.send_response(response.get("statusCode", 200))
+            for name, value in (response.get("headers") or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        do_GET = do_POST = do_PUT = do_DELETE = do_OPTIONS = _dispatch
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3000)
+    parser.add_argument("--no-auto-confirm", dest="auto_confirm", action="store_false",
+                        help="leave users created through /signup UNCONFIRMED, as Cognito does")
+    parser.add_argument("--rate-limits", action="store_true", help="rate-limit /login and /signup as deployed")
+    args = parser.parse_args(argv)
+
+    with LocalApi(args.host, args.port, auto_confirm=args.auto_confirm, rate_limits=args.rate_limits) as api:
+        print(f"Serving {len(ROUTES)} routes on {api.base_url} (Ctrl-C to stop)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
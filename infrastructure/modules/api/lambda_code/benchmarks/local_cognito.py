@@ -0,0 +1,139 @@
+"""In-process stand-in for the Cognito user pool the handlers talk to.
+
+Implements the ``cognito-idp`` calls the Lambdas make (``sign_up``,
+``initiate_auth`` with USER_PASSWORD_AUTH / REFRESH_TOKEN_AUTH) plus
+``admin_confirm_sign_up``, raising the same ClientError codes Cognito does.
+A ``post_confirmation`` callable is run like the user pool's Lambda
+trigger: after the user is confirmed, so a trigger that raises fails the
+call but leaves the user confirmed, as Cognito does.
+Tokens are RS256 JWTs signed with a jwks_fixture key, so ``verifier()``
+checks them with the real ``jwt_verifier.CognitoVerifier``. Install it with
+``aws_clients.set_client("cognito-idp", cognito)``.
+"""
+import hashlib
+import os
+import threading
+import uuid
+
+import jwks_fixture
+
+MIN_PASSWORD_LENGTH = 6
+
+
+def _error(code, message, operation):
+    from botocore.exceptions import ClientError
+
+    return ClientError({"Error": {"Code": code, "Message": message},
+                        "ResponseMetadata": {"HTTPStatusCode": 400}}, operation)
+
+
+class LocalCognito:
+    user_pool_id = jwks_fixture.USER_POOL_ID
+    client_id = jwks_fixture.CLIENT_ID
+
+    def __init__(self, key=None, token_ttl=3600, post_confirmation=None):
+        self.key = key or jwks_fixture.make_key("local-key-1", seed=1)
+        self.token_ttl = token_ttl
+        self.post_confirmation = post_confirmation
+        self.users = {}
+        self.refresh_tokens = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _hash(password, salt):
+        return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, 1000)
+
+    def _check_client(self, client_id, operation):
+        if client_id != self.client_id:
+            raise _error("ResourceNotFoundException", "User pool client does not exist.", operation)
+
+    # --- cognito-idp API ---
+
+    def sign_up(self, ClientId, Username, Password, UserAttributes=()):
+        self._check_client(ClientId, "SignUp")
+        if len(Password) < MIN_PASSWORD_LENGTH:
+            raise _error("InvalidPasswordException", "Password did not conform with policy", "SignUp")
+        salt = os.urandom(16)
+        with self._lock:
+            if Username in self.users:
+                raise _error("UsernameExistsException", "An account with the given email already exists.", "SignUp")
+            self.users[Username] = {
+                "sub": str(uuid.uuid4()),
+                "salt": salt,
+                "password": self._hash(Password, salt),
+                "attributes": {a["Name"]: a["Value"] for a in UserAttributes},
+                "confirmed": False,
+            }
+            return {"UserConfirmed": False, "UserSub": self.users[Username]["sub"]}
+
+    def admin_confirm_sign_up(self, UserPoolId, Username):
+        user = self.users.get(Username)
+        if user is None:
+            raise _error("UserNotFoundException", "User does not exist.", "AdminConfirmSignUp")
+        if user["confirmed"]:
+            return {}
+        user["confirmed"] = True
+        if self.post_confirmation:
+            event = {
+                "version": "1",
+                "triggerSource": "PostConfirmation_ConfirmSignUp",
+                "region": jwks_fixture.REGION,
+                "userPoolId": self.user_pool_id,
+                "userName": user["sub"],
+                "request": {"userAttributes": {"sub": user["sub"], **user["attributes"]}},
+                "response": {},
+            }
+            try:
+                self.post_confirmation(event, None)
+            except Exception as e:
+                raise _error("UnexpectedLambdaException", f"PostConfirmation failed: {e!r}", "AdminConfirmSignUp")
+        return {}
+
+    def initiate_auth(self, ClientId, AuthFlow, AuthParameters):
+        self._check_client(ClientId, "InitiateAuth")
+        if AuthFlow == "REFRESH_TOKEN_AUTH":
+            username = self.refresh_tokens.get(AuthParameters.get("REFRESH_TOKEN"))
+            if username is None:
+                raise _error("NotAuthorizedException", "Invalid Refresh Token", "InitiateAuth")
+            return {"AuthenticationResult": self._tokens(username, refresh=False)}
+        if AuthFlow != "USER_PASSWORD_AUTH":
+            raise _error("InvalidParameterException", f"Unsupported auth flow {AuthFlow}", "InitiateAuth")
+
+        username, password = AuthParameters.get("USERNAME"), AuthParameters.get("PASSWORD", "")
+        user = self.users.get(username)
+        if user is None:
+            raise _error("UserNotFoundException", "User does not exist.", "InitiateAuth")
+        if self._hash(password, user["salt"]) != user["password"]:
+            raise _error("NotAuthorizedException", "Incorrect username or password.", "InitiateAuth")
+        if not user["confirmed"]:
+            raise _error("UserNotConfirmedException", "User is not confirmed.", "InitiateAuth")
+        return {"AuthenticationResult": self._tokens(username, refresh=True)}
+
+    def _tokens(self, username, refresh):
+        user = self.users[username]
+        result = {
+            "IdToken": jwks_fixture.sign(jwks_fixture.claims(
+                user["sub"], "id", self.token_ttl, email=username, **{"cognito:username": user["sub"]}
+            ), self.key),
+            "AccessToken": jwks_fixture.sign(jwks_fixture.claims(user["sub"], "access", self.token_ttl), self.key),
+            "ExpiresIn": self.token_ttl,
+            "TokenType": "Bearer",
+        }
+        if refresh:
+            token = uuid.uuid4().hex
+            with self._lock:
+                self.refresh_tokens[token] = username
+            result["RefreshToken"] = token
+        return result
+
+    # --- Token verification ---
+
+    def jwks(self):
+        return jwks_fixture.jwks(self.key)
+
+    def verifier(self):
+        """Return a ``CognitoVerifier`` for this pool's tokens."""
+        import jwt_verifier
+
+        jwks = jwt_verifier.JWKSCache("local", fetch=lambda url: self.jwks(), cache_dir=None)
+        return jwt_verifier.CognitoVerifier(jwks_fixture.REGION, self.user_pool_id, self.client_id, jwks=jwks)
@@ -0,0 +1,44 @@
+"""In-process stand-in for the API Gateway management API of a WebSocket stage.
+
+Implements ``post_to_connection`` the way ws_connections uses it: posts to
+open connections are recorded, posts to closed or unknown connections raise
+the same ``GoneException`` ClientError boto3 does. ``latency`` (seconds) is
+slept on every call, with the GIL released, to stand in for the HTTPS round
+trip so concurrency behaves as it would against the real endpoint. Install
+it with ``aws_clients.set_client("apigatewaymanagementapi", api)``.
+"""
+import threading
+import time
+
+
+class LocalManagementApi:
+    def __init__(self, connections=(), latency=0.0):
+        self.latency = latency
+        self.open = set(connections)
+        self.received = {}
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def connect(self, connection_id):
+        with self._lock:
+            self.open.add(connection_id)
+
+    def close(self, connection_id):
+        with self._lock:
+            self.open.discard(connection_id)
+
+    def post_to_connection(self, ConnectionId, Data):
+        from botocore.exceptions import ClientError
+
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+            if ConnectionId not in self.open:
+                raise ClientError(
+                    {"Error": {"Code": "GoneException", "Message": ""},
+                     "ResponseMetadata": {"HTTPStatusCode": 410}},
+                    "PostToConnection"
+                )
+            self.received.setdefault(ConnectionId, []).append(bytes(Data))
+        return {"ResponseMetadata": {"HTTPStatusCode": 200}}
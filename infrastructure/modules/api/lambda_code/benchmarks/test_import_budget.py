@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+import import_budget
+
+# Wall-clock budgets depend on how busy the machine is, so they are only
+# asserted on request (IMPORT_BUDGET_TIMING=1 pytest ...); the module check runs always
+TIMING = os.environ.get("IMPORT_BUDGET_TIMING") == "1"
+
+SAMPLE = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 | site
+import time:       300 |        300 |     json.scanner
+import time:       400 |        700 |   json
+import time:       900 |        900 |   aws_clients
+import time:      1000 |       2600 | login
+"""
+
+
+def test_parse_importtime_keeps_depth_and_timings():
+    rows = import_budget.parse_importtime(SAMPLE)
+
+    assert rows[0] == ("site", 0, 120, 120)
+    assert rows[1] == ("json.scanner", 2, 300, 300)
+    assert rows[-1] == ("login", 0, 1000, 2600)
+
+
+def test_handler_imports_is_limited_to_the_handler_subtree():
+    modules = import_budget.handler_imports(import_budget.parse_importtime(SAMPLE), "login")
+
+    assert set(modules) == {"json.scanner", "json", "aws_clients", "login"}
+    assert modules["login"] == (1000, 2600)
+
+
+@pytest.mark.parametrize("handler", import_budget.discover_handlers())
+def test_handler_does_not_import_heavy_modules_at_load_time(handler):
+    _, failures = import_budget.check([handler], import_budget.load_budgets(), runs=1, timing=False)
+
+    assert failures == []
+
+
+@pytest.mark.skipif(not TIMING, reason="set IMPORT_BUDGET_TIMING=1 to check import times")
+@pytest.mark.parametrize("handler", import_budget.discover_handlers())
+def test_handler_cold_start_import_within_budget(handler):
+    _, failures = import_budget.check([handler], import_budget.load_budgets(), runs=3)
+
+    assert failures == []
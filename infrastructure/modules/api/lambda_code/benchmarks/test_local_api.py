@@ -0,0 +1,115 @@
+import json
+import urllib.error
+import urllib.parse
+import urllib.request
+
+import pytest
+
+import load_postman
+from local_api import LocalApi
+
+
+@pytest.fixture
+def api():
+    with LocalApi() as local_api:
+        yield local_api
+
+
+def call(api, method, path, body=None, token=None):
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    request = urllib.request.Request(api.base_url + path, method=method, headers=headers,
+                                     data=json.dumps(body).encode() if body is not None else None)
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_signup_login_and_upload_url_end_to_end(api):
+    status, user = call(api, "POST", "/signup", {"email": "a@example.com", "password": "secret1"})
+    assert status == 201
+
+    # The profile comes from the post-confirmation trigger
+    import aws_clients
+
+    profiles = aws_clients.get_resource("dynamodb").Table(api.environment["USER_PROFILE_TABLE_NAME"])
+    assert profiles.get_item(Key={"userId": user["id"]})["Item"]["email"] == "a@example.com"
+
+    status, login = call(api, "POST", "/login", {"username": "a@example.com", "password": "secret1"})
+    assert status == 200
+
+    status, body = call(api, "POST", "/get-upload-url", {"files": [{"contentType": "image/jpeg", "size": 204800}]},
+                        token=login["id_token"])
+    assert status == 200
+    assert len(body["uploads"]) == 1
+    assert call(api, "POST", "/get-upload-url", {"files": []}, token="forged")[0] == 401
+
+
+def test_sent_messages_are_searchable(api):
+    tokens = []
+    for email in ("a@example.com", "b@example.com"):
+        api.create_user(email, "secret1")
+        tokens.append(call(api, "POST", "/login", {"username": email, "password": "secret1"})[1]["id_token"])
+    b_id = api.cognito.verifier().verify(tokens[1])["sub"]
+
+    _, conversation = call(api, "POST", "/conversations", {"members": [b_id]}, token=tokens[0])
+    _, message = call(api, "POST", "/messages", {"conversationId": conversation["conversationID"],
+                                                 "body": "Quarterly roadmap draft"}, token=tokens[0])
+    query = urllib.parse.urlencode({"conversationId": conversation["conversationID"], "q": "roadmap"})
+    status, body = call(api, "GET", f"/search?{query}", token=tokens[1])
+
+    assert status == 200
+    assert [r["messageID"] for r in body["results"]] == [message["messageID"]]
+
+
+def test_unknown_routes_look_like_api_gateway(api):
+    assert call(api, "POST", "/nope", {})[0] == 404
+    assert call(api, "DELETE", "/signup")[0] == 403
+
+
+def test_replays_the_postman_collection_without_errors(api):
+    requests, variables = load_postman.load_requests(load_postman.DEFAULT_COLLECTION)
+    api.create_user("load@example.com", "LoadTest123")
+    variables.update(baseUrl=api.base_url, login_email="load@example.com", login_password="LoadTest123")
+
+    recorder, elapsed = load_postman.run(requests, variables, concurrency=2, iterations=4, warmup=0)
+    rows = {row["route"]: row for row in load_postman.report(recorder, elapsed)}
+
+    assert set(rows) == {"POST /signup", "POST /login", "POST /get-upload-url"}
+    assert rows["POST /signup"]["requests"] == 4 * 7
+    assert all(row["errors"] == 0 for row in rows.values())
+
+
+def test_script_subset_passes_values_between_requests():
+    variables = {}
+    load_postman.run_script(['var email = "u_" + Date.now() + "@example.com";',
+                             'pm.collectionVariables.set("user_email", email);'], variables)
+    first = variables["user_email"]
+    load_postman.run_script(['pm.collectionVariables.set("user_email", "u_" + Date.now() + "@example.com");'],
+                            variables)
+    load_postman.run_script(['pm.collectionVariables.set("id_token", pm.response.json().id_token);'],
+                            variables, lambda: {"id_token": "abc"})
+
+    assert first.startswith("u_") and first.endswith("@example.com")
+    assert variables["user_email"] != first
+    assert variables["id_token"] == "abc"
+
+
+def test_rate_limits_can_be_switched_on():
+    with LocalApi(rate_limits=True) as api:
+        credentials = {"username": "nobody@example.com", "password": "wrong-password"}
+        statuses = [api.invoke("POST", "/login", body=json.dumps(credentials))["statusCode"] for _ in range(8)]
+
+    assert statuses[0] == 404
+    assert statuses[-1] == 429
+
+
+def test_idempotency_keys_are_honoured(api):
+    headers = {"Idempotency-Key": "signup-1"}
+    first = api.invoke("POST", "/signup", headers, json.dumps({"email": "b@example.com", "password": "secret1"}))
+    retry = api.invoke("POST", "/signup", headers, json.dumps({"email": "b@example.com", "password": "secret1"}))
+
+    assert (first["statusCode"], retry["statusCode"]) == (201, 201)
+    assert retry["body"] == first["body"]
+    assert retry["headers"]["Idempotent-Replayed"] == "true"
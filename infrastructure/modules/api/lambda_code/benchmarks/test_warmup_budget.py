@@ -0,0 +1,29 @@
+import pytest
+
+import import_budget
+import warmup_budget
+
+
+def result(**overrides):
+    base = {
+        "first_ms": 100.0, "repeat_ms": 0.1,
+        "first": {"warmup": True, "primed": ["client:s3", "resource:dynamodb", "jwks"]},
+        "second": {"warmup": True, "primed": ["client:s3", "resource:dynamodb", "jwks"]},
+        "clients": ["s3"], "resources": ["dynamodb"],
+    }
+    return {**base, **overrides}
+
+
+def test_problems_flags_a_handler_that_ran_or_did_not_prime():
+    assert warmup_budget.problems("h", result(), 1000) == []
+    assert warmup_budget.problems("h", result(first={"statusCode": 401}), 1000)
+    assert warmup_budget.problems("h", result(clients=[]), 1000) == ["h: reported client:s3 but did not create it"]
+    assert warmup_budget.problems("h", result(first_ms=1500.0), 1000)
+    assert warmup_budget.problems("h", result(repeat_ms=50.0), 1000)
+
+
+@pytest.mark.parametrize("handler", import_budget.discover_handlers())
+def test_handler_warmup_primes_within_budget(handler):
+    _, failures = warmup_budget.check([handler], warmup_budget.load_budgets())
+
+    assert failures == []
@@ -0,0 +1,135 @@
+"""Time each handler's warm-up invocation in a fresh interpreter, against a budget.
+
+For every handler a new interpreter imports the module (with the same
+sys.path Lambda gives it) and sends it ``{"warmup": true}`` twice. The
+first call is what a warm-up schedule or provisioned-concurrency init pays;
+the second must find everything already primed. The script checks that the
+first call built the clients it reports, that the handler itself was never
+run (no AWS call is made: the credentials are fake and the JWKS comes from
+the on-disk cache jwt_verifier reads), and that it fits ``warmup_budget.json``.
+
+    python warmup_budget.py            # every handler in lambda_code/
+    python warmup_budget.py login      # just one
+"""
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import import_budget
+import jwks_fixture
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BUDGET_FILE = os.path.join(HERE, "warmup_budget.json")
+# A warm-up that finds everything primed should be close to free
+REPEAT_BUDGET_MS = 5
+
+PROBE = """\
+import json, sys, time
+start = time.perf_counter()
+import {handler} as handler
+imported = time.perf_counter()
+first = handler.lambda_handler({{"warmup": True}}, None)
+primed = time.perf_counter()
+second = handler.lambda_handler({{"warmup": True}}, None)
+repeat = time.perf_counter()
+import aws_clients
+print(json.dumps({{
+    "import_ms": (imported - start) * 1000,
+    "first_ms": (primed - imported) * 1000,
+    "repeat_ms": (repeat - primed) * 1000,
+    "first": first,
+    "second": second,
+    "clients": sorted(key[0] for key in aws_clients._clients),
+    "resources": sorted(key[0] for key in aws_clients._resources),
+}}))
+"""
+
+
+def load_budgets(path=BUDGET_FILE):
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_jwks_cache(cache_dir, user_pool_id, region="us-east-1"):
+    """Put a JWKS where jwt_verifier's disk cache looks for this user pool's keys."""
+    url = f"https://cognito-idp.{region}.amazonaws.com/{user_pool_id}/.well-known/jwks.json"
+    path = os.path.join(cache_dir, f"jwks-{hashlib.sha256(url.encode()).hexdigest()[:16]}.json")
+    import time
+
+    with open(path, "w") as f:
+        json.dump({"fetched_at": time.time(), "jwks": jwks_fixture.jwks(jwks_fixture.make_key("warmup", 512, 1))}, f)
+
+
+def measure(handler, cache_dir):
+    env = {k: v for k, v in os.environ.items() if not k.startswith(("PYTHON", "AWS_"))}
+    env.update({
+        "PYTHONPATH": os.pathsep.join([os.path.join(import_budget.LAMBDA_CODE_DIR, handler),
+                                       import_budget.SHARED_DIR]),
+        "PYTHONDONTWRITEBYTECODE": "1",
+        "AWS_ACCESS_KEY_ID": "warmup",
+        "AWS_SECRET_ACCESS_KEY": "warmup",
+        "AWS_REGION": "us-east-1",
+        "COGNITO_USER_POOL_ID": jwks_fixture.USER_POOL_ID,
+        "JWKS_CACHE_DIR": cache_dir,
+        # The EMF record would otherwise be mixed into the probe's output
+        "METRICS_SAMPLE_RATE": "0",
+    })
+    proc = subprocess.run([sys.executable, "-c", PROBE.format(handler=handler)],
+                          env=env, capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def problems(handler, result, budget):
+    """Return what is wrong with one handler's warm-up ``result``."""
+    found = []
+    first, second = result["first"], result["second"]
+    if not isinstance(first, dict) or first.get("warmup") is not True:
+        return [f"{handler}: warm-up event reached the handler ({first!r})"]
+    for name in first["primed"]:
+        kind, _, service = name.partition(":")
+        if kind in ("client", "resource") and service not in result[f"{kind}s"]:
+            found.append(f"{handler}: reported {name} but did not create it")
+    if result["first_ms"] > budget:
+        found.append(f"{handler}: warm-up took {result['first_ms']:.0f}ms, budget {budget}ms")
+    if second["primed"] != first["primed"] or result["repeat_ms"] > REPEAT_BUDGET_MS:
+        found.append(f"{handler}: repeat warm-up took {result['repeat_ms']:.1f}ms")
+    return found
+
+
+def check(handlers, budgets):
+    """Measure every handler and return ``(report_rows, failures)``."""
+    rows, failures = [], []
+    with tempfile.TemporaryDirectory() as cache_dir:
+        write_jwks_cache(cache_dir, jwks_fixture.USER_POOL_ID)
+        for handler in handlers:
+            budget = budgets.get(handler, budgets["default"])
+            result = measure(handler, cache_dir)
+            rows.append((handler, result, budget))
+            failures.extend(problems(handler, result, budget))
+    return rows, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("handlers", nargs="*", help="handler names (default: all)")
+    parser.add_argument("--budget-file", default=BUDGET_FILE)
+    args = parser.parse_args(argv)
+
+    rows, failures = check(args.handlers or import_budget.discover_handlers(), load_budgets(args.budget_file))
+
+    print(f"{'handler':<20} {'import':>8} {'warm-up':>9} {'repeat':>8} {'budget':>8}  primed")
+    for handler, result, budget in rows:
+        primed = result["first"].get("primed", []) if isinstance(result["first"], dict) else []
+        print(f"{handler:<20} {result['import_ms']:>6.1f}ms {result['first_ms']:>7.1f}ms "
+              f"{result['repeat_ms']:>6.2f}ms {budget:>6}ms  {', '.join(primed)}")
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
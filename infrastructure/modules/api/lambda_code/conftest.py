@@ -0,0 +1,223 @@
+import os
+import sys
+
+import pytest
+
+# The shared Lambda layer is mounted at /opt/python in AWS; put the same
+# modules on the path for local test runs.
+LAMBDA_CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(LAMBDA_CODE_DIR, "shared", "python"))
+# Local stand-ins (e.g. jwks_fixture) live next to the benchmarks.
+sys.path.insert(0, os.path.join(LAMBDA_CODE_DIR, "benchmarks"))
+
+import aws_clients  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def reset_aws_clients():
+    """Make sure no cached client or injected fake leaks between tests."""
+    aws_clients.reset()
+    yield
+    aws_clients.reset()
+
+
+class StubVerifier:
+    """Accepts ``Bearer user-<id>`` and returns it as the ``sub`` claim."""
+
+    def verify(self, token, token_use=None):
+        import jwt_verifier
+
+        if not token.startswith("user-"):
+            raise jwt_verifier.TokenError("Invalid token signature")
+        return {"sub": token, "token_use": token_use or "id"}
+
+
+@pytest.fixture
+def stub_verifier():
+    """Authenticate handlers without Cognito: any ``Bearer user-...`` token is valid."""
+    import jwt_verifier
+
+    jwt_verifier.set_verifier(StubVerifier())
+    yield
+    jwt_verifier.set_verifier(None)
+
+
+MESSAGING_TABLES = {
+    "CONVERSATIONS_TABLE_NAME": ("test-conversations", [("conversationID", "S")]),
+    "MESSAGES_TABLE_NAME": ("test-messages", [("pk", "S"), ("messageID", "S")]),
+    "MESSAGE_DELIVERIES_TABLE_NAME": ("test-message-deliveries", [("userID", "S"), ("messageID", "S")]),
+    "CONNECTIONS_TABLE_NAME": ("test-connections", [("pk", "S")]),
+}
+INBOX_TABLE = "test-inbox"
+
+
+def create_inbox_table(dynamodb, table_name):
+    """Create an inbox table (with its recency index) through a boto3 DynamoDB client."""
+    import inbox_store
+
+    dynamodb.create_table(
+        TableName=table_name,
+        KeySchema=[{"AttributeName": "userID", "KeyType": "HASH"},
+                   {"AttributeName": "conversationID", "KeyType": "RANGE"}],
+        AttributeDefinitions=[{"AttributeName": "userID", "AttributeType": "S"},
+                              {"AttributeName": "conversationID", "AttributeType": "S"},
+                              {"AttributeName": "lastActivityAt", "AttributeType": "N"}],
+        LocalSecondaryIndexes=[{
+            "IndexName": inbox_store.RECENCY_INDEX_NAME,
+            "KeySchema": [{"AttributeName": "userID", "KeyType": "HASH"},
+                          {"AttributeName": "lastActivityAt", "KeyType": "RANGE"}],
+            "Projection": {"ProjectionType": "ALL"},
+        }],
+        BillingMode="PAY_PER_REQUEST",
+    )
+
+
+@pytest.fixture
+def messaging_tables(monkeypatch):
+    """Create the messaging tables in moto and point message_store, inbox_store, presence and ws_connections at them."""
+    import importlib
+
+    import boto3
+    from moto import mock_aws
+
+    monkeypatch.setenv("AWS_REGION", "us-east-1")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    for variable, (table_name, _) in MESSAGING_TABLES.items():
+        monkeypatch.setenv(variable, table_name)
+    monkeypatch.setenv("INBOX_TABLE_NAME", INBOX_TABLE)
+
+    import inbox_store
+    import message_store
+    import presence
+    import ws_connections
+
+    importlib.reload(inbox_store)
+    importlib.reload(message_store)
+    importlib.reload(presence)
+    importlib.reload(ws_connections)
+    with mock_aws():
+        dynamodb = boto3.client("dynamodb", region_name="us-east-1")
+        for table_name, key in MESSAGING_TABLES.values():
+            dynamodb.create_table(
+                TableName=table_name,
+                KeySchema=[{"AttributeName": name, "KeyType": kind} for (name, _), kind in zip(key, ("HASH", "RANGE"))],
+                AttributeDefinitions=[{"AttributeName": name, "AttributeType": kind} for name, kind in key],
+                BillingMode="PAY_PER_REQUEST",
+            )
+        create_inbox_table(dynamodb, INBOX_TABLE)
+        yield message_store
+
+
+@pytest.fixture
+def search_tables(messaging_tables, monkeypatch):
+    """The messaging tables plus a search index table in moto, with search_index pointed at it."""
+    import importlib
+
+    import boto3
+
+    import search_index
+
+    monkeypatch.setenv("SEARCH_INDEX_TABLE_NAME", "test-search-index")
+    importlib.reload(search_index)
+    boto3.client("dynamodb", region_name="us-east-1").create_table(
+        TableName="test-search-index",
+        KeySchema=[{"AttributeName": "pk", "KeyType": "HASH"}, {"AttributeName": "block", "KeyType": "RANGE"}],
+        AttributeDefinitions=[{"AttributeName": "pk", "AttributeType": "S"},
+                              {"AttributeName": "block", "AttributeType": "N"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    yield messaging_tables
+    search_index.set_backend(None)
+
+
+@pytest.fixture
+def archive_bucket(messaging_tables, monkeypatch):
+    """The messaging tables plus a message archive bucket in moto, with message_archive pointed at it."""
+    import importlib
+
+    import boto3
+
+    import message_archive
+
+    monkeypatch.setenv("MESSAGE_ARCHIVE_BUCKET_NAME", "test-message-archive")
+    importlib.reload(message_archive)
+    boto3.client("s3", region_name="us-east-1").create_bucket(Bucket="test-message-archive")
+    return messaging_tables
+
+
+@pytest.fixture
+def media_table(messaging_tables, monkeypatch):
+    """The messaging tables plus a media metadata table in moto, with media_store pointed at it."""
+    import importlib
+
+    import boto3
+
+    import media_store
+
+    monkeypatch.setenv("MEDIA_METADATA_TABLE_NAME", "test-media-metadata")
+    importlib.reload(media_store)
+    boto3.client("dynamodb", region_name="us-east-1").create_table(
+        TableName="test-media-metadata",
+        KeySchema=[{"AttributeName": "mediaID", "KeyType": "HASH"}, {"AttributeName": "userID", "KeyType": "RANGE"}],
+        AttributeDefinitions=[{"AttributeName": "mediaID", "AttributeType": "S"},
+                              {"AttributeName": "userID", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    return boto3.resource("dynamodb", region_name="us-east-1").Table("test-media-metadata")
+
+
+@pytest.fixture
+def management_api():
+    """Route WebSocket posts to an in-process management API stand-in."""
+    from local_management_api import LocalManagementApi
+
+    api = LocalManagementApi()
+    aws_clients.set_client("apigatewaymanagementapi", api)
+    return api
+
+
+@pytest.fixture
+def rate_limit_table(monkeypatch):
+    """Create the rate-limit table in moto and switch the limiter on."""
+    import boto3
+    from moto import mock_aws
+
+    import rate_limit
+
+    monkeypatch.setenv("AWS_REGION", "us-east-1")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_TABLE_NAME", "test-rate-limits")
+    rate_limit.reset()
+    with mock_aws():
+        boto3.client("dynamodb", region_name="us-east-1").create_table(
+            TableName="test-rate-limits",
+            KeySchema=[{"AttributeName": "pk", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "pk", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        yield boto3.resource("dynamodb", region_name="us-east-1").Table("test-rate-limits")
+    rate_limit.reset()
+
+
+@pytest.fixture
+def idempotency_table(monkeypatch):
+    """Create the idempotency table in moto and honour Idempotency-Key headers."""
+    import boto3
+    from moto import mock_aws
+
+    import idempotency
+
+    monkeypatch.setenv("AWS_REGION", "us-east-1")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setattr(idempotency, "IDEMPOTENCY_TABLE_NAME", "test-idempotency")
+    with mock_aws():
+        boto3.client("dynamodb", region_name="us-east-1").create_table(
+            TableName="test-idempotency",
+            KeySchema=[{"AttributeName": "pk", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "pk", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        yield boto3.resource("dynamodb", region_name="us-east-1").Table("test-idempotency")
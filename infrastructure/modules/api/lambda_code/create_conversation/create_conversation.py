@@ -0,0 +1,60 @@
+import json
+import os
+
+# boto3/botocore are loaded lazily by aws_clients on the first DynamoDB call.
+import api_responses
+import aws_clients
+import message_store
+import metrics
+import warmup
+from jwt_verifier import TokenError, authenticate
+
+CONVERSATIONS_TABLE_NAME = os.environ.get("CONVERSATIONS_TABLE_NAME")
+MAX_NAME_LENGTH = 100
+
+# --- Precomputed responses ---
+HEADERS = api_responses.cors_headers("POST,OPTIONS", "Content-Type,Authorization")
+PREFLIGHT = api_responses.preflight(HEADERS)
+MISSING_TABLE_BODY = json.dumps({"message": "CONVERSATIONS_TABLE_NAME environment variable is not set."})
+UNAUTHORIZED_BODY = json.dumps({"message": "Unauthorized"})
+INVALID_JSON_BODY = json.dumps({"message": "Invalid JSON format in request body."})
+INVALID_MEMBERS_BODY = json.dumps({
+    "message": f"members must be a non-empty list of at most {message_store.MAX_MEMBERS - 1} user IDs."
+})
+INVALID_NAME_BODY = json.dumps({"message": f"name must be a string of at most {MAX_NAME_LENGTH} characters."})
+CREATE_FAILED_BODY = json.dumps({"message": "Could not create the conversation."})
+
+
+@metrics.instrument
+@warmup.primes(resources=("dynamodb",), jwks=True, modules=("uuid",))
+def lambda_handler(event, context):
+    if event.get("httpMethod") == "OPTIONS":
+        return PREFLIGHT
+    if not CONVERSATIONS_TABLE_NAME:
+        return api_responses.response(500, HEADERS, MISSING_TABLE_BODY)
+
+    try:
+        user_id = authenticate(event)["sub"]
+    except TokenError:
+        return api_responses.response(401, HEADERS, UNAUTHORIZED_BODY)
+
+    try:
+        body = json.loads(event.get("body") or "{}")
+        members = body.get("members")
+        name = body.get("name")
+    except (json.JSONDecodeError, AttributeError):
+        return api_responses.response(400, HEADERS, INVALID_JSON_BODY)
+
+    if (not isinstance(members, list) or not members or len(members) >= message_store.MAX_MEMBERS
+            or not all(isinstance(member, str) and member for member in members)):
+        return api_responses.response(400, HEADERS, INVALID_MEMBERS_BODY)
+    if name is not None and (not isinstance(name, str) or len(name) > MAX_NAME_LENGTH):
+        return api_responses.response(400, HEADERS, INVALID_NAME_BODY)
+
+    try:
+        conversation = message_store.create_conversation(user_id, members, name)
+    except aws_clients.ClientError as e:
+        print(f"Error creating conversation: {e}")
+        return api_responses.response(500, HEADERS, CREATE_FAILED_BODY)
+
+    return api_responses.response(201, HEADERS, conversation)
@@ -0,0 +1,37 @@
+import importlib
+import json
+
+import pytest
+
+import create_conversation
+
+pytestmark = pytest.mark.usefixtures("stub_verifier")
+
+
+@pytest.fixture(autouse=True)
+def tables(messaging_tables):
+    importlib.reload(create_conversation)
+    return messaging_tables
+
+
+def call(body, token="user-1"):
+    event = {"httpMethod": "POST", "headers": {"Authorization": f"Bearer {token}"}, "body": json.dumps(body)}
+    response = create_conversation.lambda_handler(event, None)
+    return response["statusCode"], json.loads(response["body"])
+
+
+def test_creates_conversation_including_the_caller(tables):
+    status, body = call({"members": ["user-2", "user-1"], "name": "Lunch"})
+
+    assert status == 201
+    assert body["members"] == ["user-1", "user-2"]
+    assert tables.get_conversation(body["conversationID"])["name"] == "Lunch"
+
+
+@pytest.mark.parametrize("body", [{}, {"members": []}, {"members": [1]}, {"members": ["user-2"], "name": "x" * 101}])
+def test_validation(body):
+    assert call(body)[0] == 400
+
+
+def test_requires_a_valid_token():
+    assert call({"members": ["user-2"]}, token="forged")[0] == 401
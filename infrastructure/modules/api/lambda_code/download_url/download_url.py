@@ -0,0 +1,90 @@
+import json
+import os
+
+# boto3/botocore are loaded lazily by aws_clients on the first signer build.
+import api_responses
+import aws_clients
+import download_urls
+import media_store
+import message_store
+import metrics
+import warmup
+from jwt_verifier import TokenError, authenticate
+
+MAX_KEYS = int(os.environ.get("MAX_DOWNLOAD_KEYS", "100"))
+METRICS_NAMESPACE = "ChatApp/Media"
+
+# --- Precomputed responses ---
+HEADERS = api_responses.cors_headers("POST,OPTIONS", "Content-Type,Authorization")
+PREFLIGHT = api_responses.preflight(HEADERS)
+MISSING_CONFIG = api_responses.static(
+    500, HEADERS, {"message": "MEDIA_BUCKET_NAME or CDN_DOMAIN_NAME environment variable is not set."}
+)
+UNAUTHORIZED = api_responses.static(401, HEADERS, {"message": "Unauthorized"})
+INVALID_JSON = api_responses.static(400, HEADERS, {"message": "Invalid JSON format in request body."})
+INVALID_KEYS = api_responses.static(
+    400, HEADERS, {"message": f"keys must be a non-empty list of at most {MAX_KEYS} media keys."}
+)
+LOOKUP_FAILED = api_responses.static(500, HEADERS, {"message": "Could not check access to the media."})
+SIGNING_FAILED = api_responses.static(500, HEADERS, {"message": "Could not generate download URLs."})
+
+
+@metrics.instrument
+@warmup.primes(clients=("ssm",) if download_urls.CDN_DOMAIN_NAME else (), resources=("dynamodb",), jwks=True,
+               modules=("boto3",))
+def lambda_handler(event, context):
+    """Sign download URLs for a batch of media keys (originals or renditions).
+
+    Only keys the caller may read are signed: media they uploaded, or media
+    attached to a message in one of their conversations (see
+    ``media_store.readable``). The rest come back in ``denied``.
+    """
+    if event.get("httpMethod") == "OPTIONS":
+        return PREFLIGHT
+    if not (download_urls.MEDIA_BUCKET_NAME or download_urls.CDN_DOMAIN_NAME):
+        return MISSING_CONFIG
+
+    try:
+        user_id = authenticate(event)["sub"]
+    except TokenError:
+        return UNAUTHORIZED
+
+    try:
+        keys = json.loads(event.get("body") or "{}").get("keys")
+    except (json.JSONDecodeError, AttributeError):
+        return INVALID_JSON
+
+    if (not isinstance(keys, list) or not keys or len(keys) > MAX_KEYS
+            or not all(download_urls.is_downloadable(key) for key in keys)):
+        return INVALID_KEYS
+
+    keys = list(dict.fromkeys(keys))
+    media_ids = {key: media_store.media_id_of(key) for key in keys}
+    try:
+        allowed = media_store.readable(user_id, set(filter(None, media_ids.values())),
+                                       message_store.member_of(user_id))
+    except aws_clients.ClientError as e:
+        print(f"Error checking media access: {e}")
+        return LOOKUP_FAILED
+    denied = [key for key in keys if media_ids[key] not in allowed]
+
+    try:
+        cache = download_urls.get_cache()
+    except (aws_clients.ClientError, ValueError) as e:
+        print(f"Error building the download URL signer: {e}")
+        return SIGNING_FAILED
+
+    signed_before = cache.signed
+    downloads = []
+    for key in keys:
+        if media_ids[key] not in allowed:
+            continue
+        url, expires_at = cache.get(key)
+        downloads.append({"key": key, "url": url, "expiresAt": expires_at})
+    signed = cache.signed - signed_before
+    metrics.add("DownloadUrlCacheHits", len(downloads) - signed, namespace=METRICS_NAMESPACE)
+    metrics.add("DownloadUrlsSigned", signed, namespace=METRICS_NAMESPACE)
+
+    if denied:
+        metrics.add("DownloadUrlsDenied", len(denied), namespace=METRICS_NAMESPACE)
+    return api_responses.response(200, HEADERS, {"downloads": downloads, "denied": denied})
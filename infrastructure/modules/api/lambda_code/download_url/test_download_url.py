@@ -0,0 +1,152 @@
+import importlib
+import json
+from unittest.mock import MagicMock
+from urllib.parse import parse_qs, urlsplit
+
+import boto3
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+import download_url
+import download_urls
+import media_store
+
+AUTH = {"Authorization": "Bearer user-1"}
+
+pytestmark = pytest.mark.usefixtures("stub_verifier")
+
+
+@pytest.fixture(autouse=True)
+def environment(media_table, monkeypatch):
+    monkeypatch.setenv("MEDIA_BUCKET_NAME", "test-media")
+    importlib.reload(download_urls)
+    importlib.reload(download_url)
+    # user-1 uploaded "a"
+    uploaded(media_table, "a", "user-1", "uploads/a.png")
+    yield monkeypatch
+    download_urls.set_cache(None)
+
+
+def uploaded(media_table, media_id, user_id, key, extra=None):
+    media_table.put_item(Item=media_store.pending_item(media_id, user_id, key, "image/png"))
+    media_store.finalize(media_id, user_id, 9, extra)
+
+
+def call(body, headers=AUTH):
+    event = {"httpMethod": "POST", "headers": headers, "body": json.dumps(body)}
+    response = download_url.lambda_handler(event, None)
+    return response["statusCode"], json.loads(response["body"])
+
+
+def test_signs_a_batch_of_keys_with_browser_cacheable_urls():
+    status, body = call({"keys": ["uploads/a.png", "derived/a/thumb_320.webp", "uploads/a.png"]})
+
+    assert status == 200
+    assert [d["key"] for d in body["downloads"]] == ["uploads/a.png", "derived/a/thumb_320.webp"]
+    url = body["downloads"][0]["url"]
+    assert url.startswith("https://test-media.s3.us-east-1.amazonaws.com/uploads/a.png?")
+    query = parse_qs(urlsplit(url).query)
+    assert query["response-cache-control"] == [download_urls.CACHE_CONTROL]
+    assert query["X-Amz-Expires"] == [str(2 * download_urls.WINDOW_SECONDS)]
+
+
+def test_signed_url_downloads_the_object():
+    s3 = boto3.client("s3", region_name="us-east-1")
+    s3.create_bucket(Bucket="test-media")
+    s3.put_object(Bucket="test-media", Key="uploads/a.png", Body=b"png bytes")
+
+    _, body = call({"keys": ["uploads/a.png"]})
+
+    import requests
+
+    assert requests.get(body["downloads"][0]["url"]).content == b"png bytes"
+
+
+def test_only_signs_media_the_caller_uploaded_or_was_sent(media_table):
+    uploaded(media_table, "b", "user-2", "uploads/b.png")
+    media_table.put_item(Item=media_store.pending_item("c", "user-1", "uploads/c.png", "image/png"))
+    keys = ["uploads/a.png", "uploads/b.png", "derived/b/thumb_320.webp", "uploads/c.png", "uploads/unknown.png"]
+
+    status, body = call({"keys": keys})
+
+    assert status == 200
+    assert [d["key"] for d in body["downloads"]] == ["uploads/a.png"]
+    assert body["denied"] == keys[1:]
+
+
+def test_a_claimed_hash_is_not_readable_on_someone_elses_upload(media_table):
+    media_id = media_store.content_media_id("ab" * 32)
+    key = f"uploads/{media_id}.png"
+    # user-1 only claimed the hash; user-2's signed POST wrote the object.
+    for user_id in ("user-1", "user-2"):
+        uploaded(media_table, media_id, user_id, key, {"uploadedBy": "user-2"})
+
+    _, body = call({"keys": [key]})
+    assert body["denied"] == [key]
+    _, body = call({"keys": [key]}, headers={"Authorization": "Bearer user-2"})
+    assert [d["key"] for d in body["downloads"]] == [key]
+
+
+def test_media_attached_in_a_conversation_is_readable_by_its_members(messaging_tables, media_table):
+    uploaded(media_table, "b", "user-2", "uploads/b.png")
+    conversations = messaging_tables._table(messaging_tables.CONVERSATIONS_TABLE_NAME)
+    conversations.put_item(Item={"conversationID": "c1", "members": ["user-1", "user-2"], "shardCount": 1})
+    conversations.put_item(Item={"conversationID": "c2", "members": ["user-2", "user-3"], "shardCount": 1})
+    message, _ = messaging_tables.send_message(
+        messaging_tables.get_conversation("c1"), "user-2", "look", attachments=["uploads/b.png"])
+
+    assert message["attachments"] == ["uploads/b.png"]
+    _, body = call({"keys": ["uploads/b.png", "derived/b/thumb_320.webp"]})
+    assert [d["key"] for d in body["downloads"]] == ["uploads/b.png", "derived/b/thumb_320.webp"]
+    _, body = call({"keys": ["uploads/b.png"]}, headers={"Authorization": "Bearer user-3"})
+    assert body["denied"] == ["uploads/b.png"]
+
+
+def test_repeat_requests_get_identical_urls_from_the_cache(capsys):
+    _, first = call({"keys": ["uploads/a.png"]})
+    capsys.readouterr()
+    _, second = call({"keys": ["uploads/a.png"]})
+
+    assert second == first
+    metrics = json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+    assert (metrics["DownloadUrlCacheHits"], metrics["DownloadUrlsSigned"]) == (1, 0)
+
+
+def test_signs_for_the_cdn_when_one_is_configured(environment):
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                            serialization.NoEncryption()).decode()
+    environment.setenv("CDN_DOMAIN_NAME", "d111.cloudfront.net")
+    environment.setenv("CDN_KEY_PAIR_ID", "K2JCJMDEHXQW5F")
+    environment.setenv("CDN_PRIVATE_KEY_PARAMETER", "/chatapp/cdn-key")
+    importlib.reload(download_urls)
+    boto3.client("ssm", region_name="us-east-1").put_parameter(
+        Name="/chatapp/cdn-key", Value=pem, Type="SecureString")
+
+    _, body = call({"keys": ["uploads/a.png"]})
+
+    url = body["downloads"][0]["url"]
+    assert url.startswith("https://d111.cloudfront.net/uploads/a.png?Expires=")
+    assert url.endswith("&Key-Pair-Id=K2JCJMDEHXQW5F")
+
+
+def test_signer_failures_are_a_500(monkeypatch):
+    monkeypatch.setattr(download_urls, "get_cache", MagicMock(side_effect=ValueError("bad key")))
+
+    assert call({"keys": ["uploads/a.png"]})[0] == 500
+
+
+@pytest.mark.parametrize("body", [
+    {},
+    {"keys": []},
+    {"keys": "uploads/a.png"},
+    {"keys": ["private/secrets.txt"]},
+    {"keys": [f"uploads/{i}.png" for i in range(101)]},
+])
+def test_invalid_key_lists_are_rejected(body):
+    assert call(body)[0] == 400
+
+
+def test_requires_a_valid_token():
+    assert call({"keys": ["uploads/a.png"]}, headers={})[0] == 401
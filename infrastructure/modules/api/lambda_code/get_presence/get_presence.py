@@ -0,0 +1,69 @@
+import json
+
+# boto3/botocore are loaded lazily by aws_clients on the first DynamoDB call.
+import api_responses
+import aws_clients
+import message_store
+import metrics
+import presence
+import warmup
+from jwt_verifier import TokenError, authenticate
+
+MAX_USER_IDS = 100
+
+# --- Precomputed responses ---
+HEADERS = api_responses.cors_headers("POST,OPTIONS", "Content-Type,Authorization")
+PREFLIGHT = api_responses.preflight(HEADERS)
+MISSING_TABLE_BODY = json.dumps({"message": "CONNECTIONS_TABLE_NAME environment variable is not set."})
+UNAUTHORIZED_BODY = json.dumps({"message": "Unauthorized"})
+INVALID_JSON_BODY = json.dumps({"message": "Invalid JSON format in request body."})
+INVALID_REQUEST_BODY = json.dumps({
+    "message": f"Send a conversationId, or userIds: a non-empty list of at most {MAX_USER_IDS} user IDs."
+})
+UNKNOWN_CONVERSATION_BODY = json.dumps({"message": "Conversation not found."})
+LOOKUP_FAILED_BODY = json.dumps({"message": "Could not load presence."})
+
+
+@metrics.instrument
+@warmup.primes(resources=("dynamodb",), jwks=True)
+def lambda_handler(event, context):
+    """POST /presence: who is online, for a conversation or a list of users.
+
+    ``{"conversationId": ...}`` returns every member's status and who is
+    typing there; ``{"userIds": [...]}`` returns those users' statuses.
+    Either way the statuses are one BatchGetItem per 100 users.
+    """
+    if event.get("httpMethod") == "OPTIONS":
+        return PREFLIGHT
+    if not presence.CONNECTIONS_TABLE_NAME:
+        return api_responses.response(500, HEADERS, MISSING_TABLE_BODY)
+
+    try:
+        user_id = authenticate(event)["sub"]
+    except TokenError:
+        return api_responses.response(401, HEADERS, UNAUTHORIZED_BODY)
+
+    try:
+        body = json.loads(event.get("body") or "{}")
+        conversation_id = body.get("conversationId")
+        user_ids = body.get("userIds")
+    except (json.JSONDecodeError, AttributeError):
+        return api_responses.response(400, HEADERS, INVALID_JSON_BODY)
+
+    if conversation_id is None and (
+            not isinstance(user_ids, list) or not user_ids or len(user_ids) > MAX_USER_IDS
+            or not all(isinstance(member, str) and member for member in user_ids)):
+        return api_responses.response(400, HEADERS, INVALID_REQUEST_BODY)
+
+    try:
+        if conversation_id is not None:
+            conversation = message_store.member_conversation(conversation_id, user_id)
+            return api_responses.response(200, HEADERS, presence.conversation_presence(conversation))
+        statuses, unprocessed = presence.presence_of(user_ids)
+    except message_store.NotAMember:
+        return api_responses.response(404, HEADERS, UNKNOWN_CONVERSATION_BODY)
+    except aws_clients.ClientError as e:
+        print(f"Error loading presence: {e}")
+        return api_responses.response(500, HEADERS, LOOKUP_FAILED_BODY)
+
+    return api_responses.response(200, HEADERS, {"users": statuses, "unprocessed": unprocessed})
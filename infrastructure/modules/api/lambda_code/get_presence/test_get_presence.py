@@ -0,0 +1,59 @@
+import importlib
+import json
+
+import pytest
+
+import get_presence
+import presence
+
+pytestmark = pytest.mark.usefixtures("stub_verifier")
+
+
+@pytest.fixture(autouse=True)
+def tables(messaging_tables):
+    importlib.reload(get_presence)
+    return messaging_tables
+
+
+def call(body, token="user-1"):
+    event = {"httpMethod": "POST", "headers": {"Authorization": f"Bearer {token}"}, "body": json.dumps(body)}
+    response = get_presence.lambda_handler(event, None)
+    return response["statusCode"], json.loads(response["body"])
+
+
+def test_returns_statuses_for_a_list_of_users():
+    presence.heartbeat("user-2")
+
+    status, body = call({"userIds": ["user-2", "user-3"]})
+
+    assert status == 200
+    assert body["users"]["user-2"]["online"] is True
+    assert body["users"]["user-3"] == {"online": False, "lastSeenAt": None}
+    assert body["unprocessed"] == []
+
+
+def test_returns_members_and_typing_for_a_conversation(tables):
+    conversation = tables.create_conversation("user-1", ["user-2", "user-3"])
+    presence.start_typing("user-2", conversation["conversationID"])
+
+    status, body = call({"conversationId": conversation["conversationID"]})
+
+    assert status == 200
+    assert sorted(body["members"]) == ["user-1", "user-2", "user-3"]
+    assert body["typing"] == ["user-2"]
+
+
+def test_non_members_get_not_found(tables):
+    conversation = tables.create_conversation("user-2", ["user-3"])
+
+    assert call({"conversationId": conversation["conversationID"]})[0] == 404
+
+
+@pytest.mark.parametrize("body", [{}, {"userIds": []}, {"userIds": "user-2"}, {"userIds": [""]},
+                                  {"userIds": [f"user-{i}" for i in range(get_presence.MAX_USER_IDS + 1)]}])
+def test_rejects_invalid_requests(body):
+    assert call(body)[0] == 400
+
+
+def test_requires_a_valid_token():
+    assert call({"userIds": ["user-2"]}, token="nope")[0] == 401
@@ -0,0 +1,66 @@
+import json
+import os
+
+# boto3/botocore are loaded lazily by aws_clients on the first DynamoDB call.
+import api_responses
+import aws_clients
+import metrics
+import profile_store
+import warmup
+from jwt_verifier import TokenError, authenticate
+
+MAX_USER_IDS = int(os.environ.get("MAX_PROFILE_IDS", "100"))
+METRICS_NAMESPACE = "ChatApp/Profiles"
+
+# --- Precomputed responses ---
+HEADERS = api_responses.cors_headers("POST,OPTIONS", "Content-Type,Authorization")
+PREFLIGHT = api_responses.preflight(HEADERS)
+MISSING_TABLE_BODY = json.dumps({"message": "USER_PROFILE_TABLE_NAME environment variable is not set."})
+UNAUTHORIZED_BODY = json.dumps({"message": "Unauthorized"})
+INVALID_JSON_BODY = json.dumps({"message": "Invalid JSON format in request body."})
+INVALID_IDS_BODY = json.dumps({"message": f"userIds must be a non-empty list of at most {MAX_USER_IDS} user IDs."})
+LOOKUP_FAILED_BODY = json.dumps({"message": "Could not load profiles."})
+
+
+def emit_cache_metrics(lookup):
+    """Log how much of this request the profile cache answered and the reads it saved."""
+    metrics.add("ProfileCacheHits", lookup.hits, namespace=METRICS_NAMESPACE)
+    metrics.add("ProfileCacheMisses", lookup.misses, namespace=METRICS_NAMESPACE)
+    metrics.add("ProfileCacheHitRatio", round(profile_store.hit_ratio() * 100, 1), "Percent", METRICS_NAMESPACE)
+    metrics.add("ProfileReadUnitsSaved", lookup.units_saved, "None", METRICS_NAMESPACE)
+
+
+@metrics.instrument
+@warmup.primes(resources=("dynamodb",), jwks=True)
+def lambda_handler(event, context):
+    if event.get("httpMethod") == "OPTIONS":
+        return PREFLIGHT
+    if not profile_store.USER_PROFILE_TABLE_NAME:
+        return api_responses.response(500, HEADERS, MISSING_TABLE_BODY)
+
+    try:
+        authenticate(event)
+    except TokenError:
+        return api_responses.response(401, HEADERS, UNAUTHORIZED_BODY)
+
+    try:
+        user_ids = json.loads(event.get("body") or "{}").get("userIds")
+    except (json.JSONDecodeError, AttributeError):
+        return api_responses.response(400, HEADERS, INVALID_JSON_BODY)
+
+    if (not isinstance(user_ids, list) or not user_ids or len(user_ids) > MAX_USER_IDS
+            or not all(isinstance(user_id, str) and user_id for user_id in user_ids)):
+        return api_responses.response(400, HEADERS, INVALID_IDS_BODY)
+
+    try:
+        lookup = profile_store.get_profiles(list(dict.fromkeys(user_ids)))
+    except aws_clients.ClientError as e:
+        print(f"Error loading {len(user_ids)} profiles: {e}")
+        return api_responses.response(500, HEADERS, LOOKUP_FAILED_BODY)
+
+    emit_cache_metrics(lookup)
+    return api_responses.response(200, HEADERS, {
+        "profiles": lookup.profiles,
+        "notFound": lookup.not_found,
+        "unprocessed": lookup.unprocessed
+    })
@@ -0,0 +1,108 @@
+import importlib
+import json
+from unittest.mock import patch
+
+import boto3
+import pytest
+from moto import mock_aws
+
+import get_profiles
+import profile_store
+
+TABLE = "test-profiles"
+AUTH = {"Authorization": "Bearer user-1"}
+
+pytestmark = pytest.mark.usefixtures("stub_verifier")
+
+
+@pytest.fixture(autouse=True)
+def table(monkeypatch):
+    monkeypatch.setenv("AWS_REGION", "us-east-1")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("USER_PROFILE_TABLE_NAME", TABLE)
+    importlib.reload(profile_store)
+    importlib.reload(get_profiles)
+
+    with mock_aws():
+        boto3.client("dynamodb", region_name="us-east-1").create_table(
+            TableName=TABLE,
+            KeySchema=[{"AttributeName": "userId", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "userId", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        table = boto3.resource("dynamodb", region_name="us-east-1").Table(TABLE)
+        for i in range(120):
+            table.put_item(Item={"userId": f"user-{i}", "email": f"user{i}@example.com",
+                                 "createdAt": "2024-01-01T00:00:00", "internalNote": "not for clients"})
+        yield table
+
+
+def call(body, headers=AUTH):
+    event = {"httpMethod": "POST", "headers": headers, "body": json.dumps(body)}
+    response = get_profiles.lambda_handler(event, None)
+    return response["statusCode"], json.loads(response["body"])
+
+
+def test_resolves_a_group_of_members_in_request_order():
+    ids = [f"user-{i}" for i in range(110, -1, -1)][:100]
+
+    status, body = call({"userIds": ids})
+
+    assert status == 200
+    assert [p["userId"] for p in body["profiles"]] == ids
+    assert body["profiles"][0] == {"userId": "user-110", "createdAt": "2024-01-01T00:00:00"}
+    assert body["notFound"] == [] and body["unprocessed"] == []
+
+
+def test_repeat_lookups_are_served_from_the_cache(capsys):
+    call({"userIds": ["user-1", "user-2"]})
+    capsys.readouterr()
+
+    with patch("dynamo_batch.batch_get") as batch_get:
+        status, body = call({"userIds": ["user-2", "user-1", "user-2"]})
+
+    batch_get.assert_not_called()
+    assert status == 200
+    assert [p["userId"] for p in body["profiles"]] == ["user-2", "user-1"]
+    metrics = json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+    assert (metrics["ProfileCacheHits"], metrics["ProfileCacheMisses"]) == (2, 0)
+    assert metrics["ProfileCacheHitRatio"] == 50.0
+    assert metrics["ProfileReadUnitsSaved"] > 0
+
+
+def test_unknown_users_are_reported_and_negatively_cached(table):
+    _, body = call({"userIds": ["user-1", "ghost"]})
+    assert body["notFound"] == ["ghost"]
+
+    table.put_item(Item={"userId": "ghost", "email": "ghost@example.com"})
+    _, body = call({"userIds": ["ghost"]})
+    assert body["notFound"] == ["ghost"]
+
+    profile_store.clear_cache()
+    _, body = call({"userIds": ["ghost"]})
+    assert [p["userId"] for p in body["profiles"]] == ["ghost"]
+
+
+def test_unprocessed_keys_are_returned_and_not_cached():
+    with patch("dynamo_batch.batch_get", return_value=([], [{"userId": "user-1"}], 0.0)):
+        _, body = call({"userIds": ["user-1"]})
+    assert body == {"profiles": [], "notFound": [], "unprocessed": ["user-1"]}
+
+    _, body = call({"userIds": ["user-1"]})
+    assert [p["userId"] for p in body["profiles"]] == ["user-1"]
+
+
+@pytest.mark.parametrize("body", [
+    {},
+    {"userIds": []},
+    {"userIds": "user-1"},
+    {"userIds": ["user-1", ""]},
+    {"userIds": [f"user-{i}" for i in range(101)]},
+])
+def test_invalid_user_id_lists_are_rejected(body):
+    assert call(body)[0] == 400
+
+
+def test_requires_a_valid_token():
+    assert call({"userIds": ["user-1"]}, headers={})[0] == 401
@@ -0,0 +1,104 @@
+import json
+
+# boto3/botocore are loaded lazily by aws_clients on the first DynamoDB call.
+import api_responses
+import aws_clients
+import inbox_store
+import message_store
+import metrics
+import warmup
+from jwt_verifier import TokenError, authenticate
+
+DEFAULT_PAGE_SIZE = 20
+
+# --- Precomputed responses ---
+HEADERS = api_responses.cors_headers("GET,POST,OPTIONS", "Content-Type,Authorization")
+PREFLIGHT = api_responses.preflight(HEADERS)
+MISSING_TABLE_BODY = json.dumps({"message": "INBOX_TABLE_NAME environment variable is not set."})
+UNAUTHORIZED_BODY = json.dumps({"message": "Unauthorized"})
+INVALID_JSON_BODY = json.dumps({"message": "Invalid JSON format in request body."})
+INVALID_LIMIT_BODY = json.dumps({"message": f"limit must be an integer between 1 and {inbox_store.MAX_PAGE_SIZE}."})
+INVALID_CURSOR_BODY = json.dumps({"message": "Invalid cursor."})
+INVALID_MESSAGE_ID_BODY = json.dumps({"message": "messageId must be a message ID."})
+UNKNOWN_CONVERSATION_BODY = json.dumps({"message": "Conversation not found."})
+INBOX_FAILED_BODY = json.dumps({"message": "Could not load the inbox."})
+MARK_READ_FAILED_BODY = json.dumps({"message": "Could not mark the conversation as read."})
+
+
+def parse_limit(params):
+    """Return the requested page size, or None if it is not valid."""
+    raw = params.get("limit")
+    if raw is None:
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(raw)
+    except ValueError:
+        return None
+    return limit if 1 <= limit <= inbox_store.MAX_PAGE_SIZE else None
+
+
+def list_conversations(event, user_id):
+    """GET /inbox?limit=20&cursor=...: the user's conversations, most recent activity first."""
+    params = event.get("queryStringParameters") or {}
+    limit = parse_limit(params)
+    if limit is None:
+        return api_responses.response(400, HEADERS, INVALID_LIMIT_BODY)
+
+    try:
+        conversations, cursor = inbox_store.list_inbox(user_id, limit, params.get("cursor"))
+    except ValueError:
+        return api_responses.response(400, HEADERS, INVALID_CURSOR_BODY)
+    except aws_clients.ClientError as e:
+        print(f"Error loading inbox: {e}")
+        return api_responses.response(500, HEADERS, INBOX_FAILED_BODY)
+
+    return api_responses.response(200, HEADERS, {"conversations": conversations, "cursor": cursor})
+
+
+def mark_read(event, user_id):
+    """POST /inbox/read {"conversationId", "messageId"?}: reset the unread count.
+
+    With ``messageId`` (the newest message the client has shown) the count is
+    only reset if nothing newer has arrived; ``reset`` says whether it was.
+    """
+    try:
+        body = json.loads(event.get("body") or "{}")
+        conversation_id = body.get("conversationId")
+        up_to = body.get("messageId")
+    except (json.JSONDecodeError, AttributeError):
+        return api_responses.response(400, HEADERS, INVALID_JSON_BODY)
+
+    if up_to is not None and not message_store.is_message_id(up_to):
+        return api_responses.response(400, HEADERS, INVALID_MESSAGE_ID_BODY)
+
+    try:
+        conversation = message_store.member_conversation(conversation_id, user_id)
+        summary, reset = inbox_store.mark_read(user_id, conversation["conversationID"], up_to)
+    except message_store.NotAMember:
+        return api_responses.response(404, HEADERS, UNKNOWN_CONVERSATION_BODY)
+    except aws_clients.ClientError as e:
+        print(f"Error marking conversation read: {e}")
+        return api_responses.response(500, HEADERS, MARK_READ_FAILED_BODY)
+
+    if summary is None:
+        # A member whose summary was never written (the conversation predates the inbox)
+        return api_responses.response(404, HEADERS, UNKNOWN_CONVERSATION_BODY)
+    return api_responses.response(200, HEADERS, {"conversation": summary, "reset": reset})
+
+
+@metrics.instrument
+@warmup.primes(resources=("dynamodb",), jwks=True, modules=("boto3.dynamodb.conditions",))
+def lambda_handler(event, context):
+    if event.get("httpMethod") == "OPTIONS":
+        return PREFLIGHT
+    if not inbox_store.INBOX_TABLE_NAME:
+        return api_responses.response(500, HEADERS, MISSING_TABLE_BODY)
+
+    try:
+        user_id = authenticate(event)["sub"]
+    except TokenError:
+        return api_responses.response(401, HEADERS, UNAUTHORIZED_BODY)
+
+    if event.get("httpMethod") == "POST":
+        return mark_read(event, user_id)
+    return list_conversations(event, user_id)
@@ -0,0 +1,68 @@
+import importlib
+import json
+
+import pytest
+
+import inbox
+
+pytestmark = pytest.mark.usefixtures("stub_verifier")
+
+
+@pytest.fixture(autouse=True)
+def tables(messaging_tables):
+    importlib.reload(inbox)
+    return messaging_tables
+
+
+def call(method, token="user-1", params=None, body=None):
+    event = {"httpMethod": method, "headers": {"Authorization": f"Bearer {token}"},
+             "queryStringParameters": params, "body": json.dumps(body) if body is not None else None}
+    response = inbox.lambda_handler(event, None)
+    return response["statusCode"], json.loads(response["body"])
+
+
+def test_lists_conversations_by_recent_activity_with_unread_counts(tables):
+    quiet = tables.create_conversation("user-1", ["user-2"], now=1700000000)
+    busy = tables.create_conversation("user-1", ["user-3"], name="Busy", now=1700000001)
+    tables.send_message(busy, "user-3", "one", now=1700000002)
+    tables.send_message(busy, "user-3", "two", now=1700000003)
+
+    status, first = call("GET", params={"limit": "1"})
+    _, second = call("GET", params={"limit": "1", "cursor": first["cursor"]})
+
+    assert status == 200
+    assert [(c["conversationID"], c["unreadCount"]) for c in first["conversations"]] == [(busy["conversationID"], 2)]
+    assert first["conversations"][0]["lastMessagePreview"] == "two"
+    assert [c["conversationID"] for c in second["conversations"]] == [quiet["conversationID"]]
+
+
+def test_mark_read_resets_the_unread_count(tables):
+    conversation = tables.create_conversation("user-1", ["user-2"])
+    first, _ = tables.send_message(conversation, "user-2", "one", now=1700000001)
+    tables.send_message(conversation, "user-2", "two", now=1700000002)
+
+    status, stale = call("POST", body={"conversationId": conversation["conversationID"], "messageId": first["messageID"]})
+    _, read = call("POST", body={"conversationId": conversation["conversationID"]})
+
+    assert status == 200
+    assert (stale["reset"], stale["conversation"]["unreadCount"]) == (False, 2)
+    assert (read["reset"], read["conversation"]["unreadCount"]) == (True, 0)
+
+
+def test_only_members_can_mark_read(tables):
+    conversation = tables.create_conversation("user-1", ["user-2"])
+
+    assert call("POST", token="user-3", body={"conversationId": conversation["conversationID"]})[0] == 404
+
+
+@pytest.mark.parametrize("method, params, body", [
+    ("GET", {"limit": "0"}, None),
+    ("GET", {"cursor": "bogus"}, None),
+    ("POST", None, {"conversationId": "c", "messageId": "bogus"}),
+])
+def test_rejects_bad_parameters(method, params, body):
+    assert call(method, params=params, body=body)[0] == 400
+
+
+def test_requires_a_token():
+    assert call("GET", token="nope")[0] == 401
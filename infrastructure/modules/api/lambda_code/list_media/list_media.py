@@ -0,0 +1,70 @@
+import json
+import os
+
+# boto3/botocore are loaded lazily by aws_clients on the first DynamoDB call.
+import api_responses
+import aws_clients
+import media_store
+import metrics
+import warmup
+from jwt_verifier import TokenError, authenticate
+
+MEDIA_METADATA_TABLE_NAME = os.environ.get("MEDIA_METADATA_TABLE_NAME")
+
+DEFAULT_PAGE_SIZE = 20
+
+# --- Precomputed responses ---
+HEADERS = api_responses.cors_headers("GET,OPTIONS", "Content-Type,Authorization")
+PREFLIGHT = api_responses.preflight(HEADERS)
+MISSING_TABLE_BODY = json.dumps({"message": "MEDIA_METADATA_TABLE_NAME environment variable is not set."})
+UNAUTHORIZED_BODY = json.dumps({"message": "Unauthorized"})
+INVALID_LIMIT_BODY = json.dumps({"message": f"limit must be an integer between 1 and {media_store.MAX_PAGE_SIZE}."})
+INVALID_CURSOR_BODY = json.dumps({"message": "Invalid cursor."})
+LIST_FAILED_BODY = json.dumps({"message": "Could not list media."})
+
+# Row fields returned to clients
+MEDIA_FIELDS = ("mediaID", "key", "contentType", "size", "uploadedAt", "renditions")
+
+
+def parse_limit(params):
+    """Return the requested page size, or None if it is not valid."""
+    raw = params.get("limit")
+    if raw is None:
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(raw)
+    except ValueError:
+        return None
+    return limit if 1 <= limit <= media_store.MAX_PAGE_SIZE else None
+
+
+@metrics.instrument
+@warmup.primes(resources=("dynamodb",), jwks=True, modules=("boto3.dynamodb.conditions",))
+def lambda_handler(event, context):
+    if event.get("httpMethod") == "OPTIONS":
+        return PREFLIGHT
+    if not MEDIA_METADATA_TABLE_NAME:
+        return api_responses.response(500, HEADERS, MISSING_TABLE_BODY)
+
+    try:
+        user_id = authenticate(event)["sub"]
+    except TokenError:
+        return api_responses.response(401, HEADERS, UNAUTHORIZED_BODY)
+
+    params = event.get("queryStringParameters") or {}
+    limit = parse_limit(params)
+    if limit is None:
+        return api_responses.response(400, HEADERS, INVALID_LIMIT_BODY)
+
+    try:
+        items, cursor = media_store.list_user_media(user_id, limit, params.get("cursor"), MEDIA_METADATA_TABLE_NAME)
+    except ValueError:
+        return api_responses.response(400, HEADERS, INVALID_CURSOR_BODY)
+    except aws_clients.ClientError as e:
+        print(f"Error listing media for {user_id}: {e}")
+        return api_responses.response(500, HEADERS, LIST_FAILED_BODY)
+
+    return api_responses.response(200, HEADERS, {
+        "media": [{field: item[field] for field in MEDIA_FIELDS if field in item} for item in items],
+        "cursor": cursor
+    })
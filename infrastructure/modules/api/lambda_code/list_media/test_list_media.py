@@ -0,0 +1,101 @@
+import importlib
+import json
+
+import boto3
+import pytest
+from moto import mock_aws
+
+import list_media
+import media_store
+
+TABLE = "test-media"
+AUTH = {"Authorization": "Bearer user-1"}
+
+pytestmark = pytest.mark.usefixtures("stub_verifier")
+
+
+@pytest.fixture(autouse=True)
+def table(monkeypatch):
+    monkeypatch.setenv("AWS_REGION", "us-east-1")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("MEDIA_METADATA_TABLE_NAME", TABLE)
+    importlib.reload(list_media)
+
+    with mock_aws():
+        boto3.client("dynamodb", region_name="us-east-1").create_table(
+            TableName=TABLE,
+            KeySchema=[{"AttributeName": "mediaID", "KeyType": "HASH"},
+                       {"AttributeName": "userID", "KeyType": "RANGE"}],
+            AttributeDefinitions=[{"AttributeName": "mediaID", "AttributeType": "S"},
+                                  {"AttributeName": "userID", "AttributeType": "S"},
+                                  {"AttributeName": "uploadedAt", "AttributeType": "N"}],
+            GlobalSecondaryIndexes=[{
+                "IndexName": media_store.USER_INDEX_NAME,
+                "KeySchema": [{"AttributeName": "userID", "KeyType": "HASH"},
+                              {"AttributeName": "uploadedAt", "KeyType": "RANGE"}],
+                "Projection": {"ProjectionType": "ALL"},
+            }],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        yield boto3.resource("dynamodb", region_name="us-east-1").Table(TABLE)
+
+
+def add_media(table, user_id, count, start=0):
+    for i in range(start, start + count):
+        media_id = f"{user_id}-{i:03d}"
+        table.put_item(Item=media_store.pending_item(media_id, user_id, f"uploads/{media_id}.jpg", "image/jpeg"))
+        media_store.finalize(media_id, user_id, 100 + i, table_name=TABLE, now=1700000000 + i)
+
+
+def call(params=None, headers=AUTH):
+    event = {"httpMethod": "GET", "headers": headers, "queryStringParameters": params}
+    response = list_media.lambda_handler(event, None)
+    return response["statusCode"], json.loads(response["body"])
+
+
+def test_pages_through_a_users_media_newest_first(table):
+    add_media(table, "user-1", 5)
+    add_media(table, "user-2", 3)
+
+    status, first = call({"limit": "2"})
+    assert status == 200
+    assert [m["mediaID"] for m in first["media"]] == ["user-1-004", "user-1-003"]
+
+    seen = [m["mediaID"] for m in first["media"]]
+    cursor = first["cursor"]
+    while cursor:
+        _, page = call({"limit": "2", "cursor": cursor})
+        seen += [m["mediaID"] for m in page["media"]]
+        cursor = page["cursor"]
+
+    assert seen == [f"user-1-{i:03d}" for i in range(4, -1, -1)]
+
+
+def test_pending_media_is_not_listed(table):
+    add_media(table, "user-1", 1)
+    table.put_item(Item=media_store.pending_item("pending", "user-1", "uploads/pending.jpg", "image/jpeg"))
+
+    _, body = call()
+
+    assert [m["mediaID"] for m in body["media"]] == ["user-1-000"]
+    assert body["cursor"] is None
+
+
+def test_cursor_cannot_be_used_for_another_user(table):
+    add_media(table, "user-2", 3)
+    _, page = call({"limit": "1"}, headers={"Authorization": "Bearer user-2"})
+
+    status, body = call({"cursor": page["cursor"]})
+
+    assert status == 400
+    assert body["message"] == "Invalid cursor."
+
+
+@pytest.mark.parametrize("params", [{"limit": "0"}, {"limit": "101"}, {"limit": "ten"}, {"cursor": "not-base64!"}])
+def test_rejects_bad_parameters(params):
+    assert call(params)[0] == 400
+
+
+def test_requires_a_valid_token():
+    assert call(headers={})[0] == 401
@@ -1,89 +1,148 @@
+import hashlib
+import hmac
 import json
 import os
-import boto3
-from botocore.exceptions import ClientError
+import time
+
+# boto3/botocore are loaded lazily by aws_clients on the first Cognito call.
+import api_responses
+import aws_clients
+import metrics
+import rate_limit
+import warmup
+from ttl_cache import TTLCache
 
 USER_POOL_ID = os.environ.get("COGNITO_USER_POOL_ID")
 CLIENT_ID = os.environ.get("COGNITO_CLIENT_ID")
 
+# --- Session cache ---
+# A repeat password login (same username and password) within a short
+# window gets the tokens issued moments ago instead of re-running the
+# Cognito auth flow. There is one entry per username: a successful login
+# with another password replaces it and a login Cognito rejects removes it.
+# A password change, disable or global sign-out made elsewhere is not seen
+# by this container, so it can keep handing out the old tokens for up to
+# SESSION_CACHE_TTL_SECONDS (default 10) afterwards. Entries never outlive
+# half the token lifetime. Refresh-token logins are never cached: Cognito
+# has to check that the refresh token has not been revoked.
+SESSION_CACHE_TTL = int(os.environ.get("SESSION_CACHE_TTL_SECONDS", "10"))
+SESSION_CACHE = TTLCache(
+    maxsize=int(os.environ.get("SESSION_CACHE_MAX_ENTRIES", "1024")),
+    ttl=SESSION_CACHE_TTL
+)
+# Keys and password checks are HMACs under a per-container secret, so
+# neither usernames nor passwords are kept in memory.
+_CACHE_KEY_SECRET = os.urandom(32)
 
-def lambda_handler(event, context):
-    cognito_client = boto3.client("cognito-idp", region_name=os.environ.get("AWS_REGION", "us-east-1"))
+# --- Precomputed responses ---
+HEADERS = api_responses.cors_headers("POST,OPTIONS")
+PREFLIGHT = api_responses.preflight(HEADERS)
+RATE_LIMITED_BODY = json.dumps({"error": "Too many login attempts. Try again later."})
+INVALID_REFRESH_TOKEN = api_responses.static(401, HEADERS, {"error": "Invalid or expired refresh token"})
+INVALID_CREDENTIALS = api_responses.static(401, HEADERS, {"error": "Invalid username or password"})
+USER_NOT_FOUND = api_responses.static(404, HEADERS, {"error": "User not found"})
+
+
+def _cache_key(*parts):
+    return hmac.new(_CACHE_KEY_SECRET, "\0".join(parts).encode(), hashlib.sha256).digest()
+
+
+def authenticate(auth_flow, auth_parameters, cache_key=None, credential=None):
+    """Run a Cognito InitiateAuth flow.
+
+    With a ``cache_key`` (the username's) repeats whose ``credential`` (the
+    password's HMAC) matches are answered from SESSION_CACHE. Returns
+    ``(authentication_result, expires_in)`` where ``expires_in`` is the
+    remaining token lifetime in seconds.
+    """
+    now = time.monotonic()
+    if cache_key is not None:
+        cached = SESSION_CACHE.get(cache_key)
+        if cached is not None and hmac.compare_digest(cached[0], credential):
+            _, issued_at, auth_result = cached
+            return auth_result, auth_result.get("ExpiresIn", 3600) - int(now - issued_at)
 
-    headers = {
-        "Access-Control-Allow-Origin": "*",
-        "Access-Control-Allow-Headers": "Content-Type",
-        "Access-Control-Allow-Methods": "POST,OPTIONS"
-    }
+    cognito_client = aws_clients.get_client("cognito-idp")
+    try:
+        response = cognito_client.initiate_auth(
+            ClientId=CLIENT_ID,
+            AuthFlow=auth_flow,
+            AuthParameters=auth_parameters
+        )
+    except aws_clients.ClientError:
+        if cache_key is not None:
+            # Wrong password, disabled or deleted user, reset required:
+            # whatever was cached for the username is no longer served
+            SESSION_CACHE.pop(cache_key)
+        raise
 
+    auth_result = response.get("AuthenticationResult", {})
+    expires_in = auth_result.get("ExpiresIn", 3600)
+    if auth_result and cache_key is not None:
+        SESSION_CACHE.set(cache_key, (credential, now, auth_result), ttl=min(SESSION_CACHE_TTL, expires_in // 2))
+    return auth_result, expires_in
+
+
+@metrics.instrument
+@warmup.primes(clients=("cognito-idp",), resources=("dynamodb",))
+def lambda_handler(event, context):
     if event.get("httpMethod") == "OPTIONS":
-        return {
-            "statusCode": 200,
-            "headers": headers,
-            "body": json.dumps({"message": "CORS preflight OK"})
-        }
+        return PREFLIGHT
 
     try:
         try:
             body = json.loads(event.get("body", "{}"))
+            refresh_token = body.get("refresh_token")
             username = body.get("username")
             password = body.get("password")
 
-            if not username or not password:
+            if not refresh_token and (not username or not password):
                 raise ValueError("Username and password are required.")
         except (json.JSONDecodeError, ValueError) as e:
+            return api_responses.response(400, HEADERS, {"error": f"Invalid input: {str(e)}"})
+
+        # Checked before the session cache too, so guessing passwords costs
+        # tokens even while a real session for the username is cached
+        try:
+            rate_limit.check("login", ip=rate_limit.source_ip(event), username=None if refresh_token else username)
+        except rate_limit.Limited as limited:
             return {
-                "statusCode": 400,
-                "headers": headers,
-                "body": json.dumps({"error": f"Invalid input: {str(e)}"})
+                "statusCode": 429,
+                "headers": {**HEADERS, "Retry-After": rate_limit.retry_after_header(limited)},
+                "body": RATE_LIMITED_BODY
             }
 
-        response = cognito_client.initiate_auth(
-            ClientId=CLIENT_ID,
-            AuthFlow="USER_PASSWORD_AUTH",
-            AuthParameters={
-                "USERNAME": username,
-                "PASSWORD": password
-            }
-        )
+        if refresh_token:
+            # Refresh-token fast path: no password check, no new refresh token
+            auth_result, expires_in = authenticate("REFRESH_TOKEN_AUTH", {"REFRESH_TOKEN": refresh_token})
+        else:
+            auth_result, expires_in = authenticate(
+                "USER_PASSWORD_AUTH",
+                {
+                    "USERNAME": username,
+                    "PASSWORD": password
+                },
+                _cache_key("user", username),
+                _cache_key("password", username, password)
+            )
 
-        auth_result = response.get("AuthenticationResult", {})
-        id_token = auth_result.get("IdToken")
-        access_token = auth_result.get("AccessToken")
-
-        return {
-            "statusCode": 200,
-            "headers": headers,
-            "body": json.dumps({
-                "message": "Login successful",
-                "id_token": id_token,
-                "access_token": access_token
-            })
-        }
-
-    except ClientError as e:
+        return api_responses.response(200, HEADERS, {
+            "message": "Login successful",
+            "id_token": auth_result.get("IdToken"),
+            "access_token": auth_result.get("AccessToken"),
+            "refresh_token": auth_result.get("RefreshToken", refresh_token),
+            "expires_in": expires_in
+        })
+
+    except aws_clients.ClientError as e:
         error_code = e.response.get("Error", {}).get("Code")
-        if error_code == "NotAuthorizedException":
-            return {
-                "statusCode": 401,
-                "headers": headers,
-                "body": json.dumps({"error": "Invalid username or password"})
-            }
+        if error_code == "NotAuthorizedException" and refresh_token:
+            return INVALID_REFRESH_TOKEN
+        elif error_code == "NotAuthorizedException":
+            return INVALID_CREDENTIALS
         elif error_code == "UserNotFoundException":
-            return {
-                "statusCode": 404,
-                "headers": headers,
-                "body": json.dumps({"error": "User not found"})
-            }
+            return USER_NOT_FOUND
         else:
-            return {
-                "statusCode": 400,
-                "headers": headers,
-                "body": json.dumps({"error": f"Cognito error: {e.response['Error']['Message']}"})
-            }
+            return api_responses.response(400, HEADERS, {"error": f"Cognito error: {e.response['Error']['Message']}"})
     except Exception as e:
-        return {
-            "statusCode": 500,
-            "headers": headers,
-            "body": json.dumps({"error": f"An unexpected error occurred: {str(e)}"})
-        }
+        return api_responses.response(500, HEADERS, {"error": f"An unexpected error occurred: {str(e)}"})
@@ -1,8 +1,9 @@
 import json
 import pytest
-from unittest.mock import patch
+from unittest.mock import MagicMock
 from botocore.exceptions import ClientError
 
+import aws_clients
 import login
 
 
@@ -13,6 +14,19 @@ def mock_env(monkeypatch):
     monkeypatch.setenv("COGNITO_CLIENT_ID", "fake_client_id")
 
 
+@pytest.fixture(autouse=True)
+def clear_session_cache():
+    login.SESSION_CACHE.clear()
+
+
+@pytest.fixture
+def mock_cognito():
+    """Inject a fake Cognito client into the shared client cache."""
+    client = MagicMock()
+    aws_clients.set_client("cognito-idp", client)
+    return client
+
+
 @pytest.fixture
 def sample_event():
     """Base event for most POST tests."""
@@ -43,10 +57,8 @@ def test_invalid_json():
     assert "Invalid input" in json.loads(result["body"])["error"]
 
 
-@patch("login.boto3.client")
-def test_successful_login(mock_boto_client, sample_event):
-    mock_client = mock_boto_client.return_value
-    mock_client.initiate_auth.return_value = {
+def test_successful_login(mock_cognito, sample_event):
+    mock_cognito.initiate_auth.return_value = {
         "AuthenticationResult": {
             "IdToken": "fake_id_token",
             "AccessToken": "fake_access_token"
@@ -62,45 +74,165 @@ def test_successful_login(mock_boto_client, sample_event):
     assert body["access_token"] == "fake_access_token"
 
 
-@patch("login.boto3.client")
-def test_not_authorized(mock_boto_client, sample_event):
-    mock_client = mock_boto_client.return_value
+def test_not_authorized(mock_cognito, sample_event):
     error_response = {"Error": {"Code": "NotAuthorizedException", "Message": "Bad credentials"}}
-    mock_client.initiate_auth.side_effect = ClientError(error_response, "InitiateAuth")
+    mock_cognito.initiate_auth.side_effect = ClientError(error_response, "InitiateAuth")
 
     result = login.lambda_handler(sample_event, None)
     assert result["statusCode"] == 401
     assert "Invalid username or password" in json.loads(result["body"])["error"]
 
 
-@patch("login.boto3.client")
-def test_user_not_found(mock_boto_client, sample_event):
-    mock_client = mock_boto_client.return_value
+def test_user_not_found(mock_cognito, sample_event):
     error_response = {"Error": {"Code": "UserNotFoundException", "Message": "No such user"}}
-    mock_client.initiate_auth.side_effect = ClientError(error_response, "InitiateAuth")
+    mock_cognito.initiate_auth.side_effect = ClientError(error_response, "InitiateAuth")
 
     result = login.lambda_handler(sample_event, None)
     assert result["statusCode"] == 404
     assert "User not found" in json.loads(result["body"])["error"]
 
 
-@patch("login.boto3.client")
-def test_generic_cognito_error(mock_boto_client, sample_event):
-    mock_client = mock_boto_client.return_value
+def test_generic_cognito_error(mock_cognito, sample_event):
     error_response = {"Error": {"Code": "ServiceError", "Message": "Something went wrong"}}
-    mock_client.initiate_auth.side_effect = ClientError(error_response, "InitiateAuth")
+    mock_cognito.initiate_auth.side_effect = ClientError(error_response, "InitiateAuth")
 
     result = login.lambda_handler(sample_event, None)
     assert result["statusCode"] == 400
     assert "Cognito error" in json.loads(result["body"])["error"]
 
 
-@patch("login.boto3.client")
-def test_unexpected_exception(mock_boto_client, sample_event):
-    mock_client = mock_boto_client.return_value
-    mock_client.initiate_auth.side_effect = RuntimeError("Boom!")
+def test_unexpected_exception(mock_cognito, sample_event):
+    mock_cognito.initiate_auth.side_effect = RuntimeError("Boom!")
 
     result = login.lambda_handler(sample_event, None)
     assert result["statusCode"] == 500
     assert "unexpected error" in json.loads(result["body"])["error"].lower()
 
+
+def test_login_returns_refresh_token(mock_cognito, sample_event):
+    mock_cognito.initiate_auth.return_value = {
+        "AuthenticationResult": {
+            "IdToken": "fake_id_token",
+            "AccessToken": "fake_access_token",
+            "RefreshToken": "fake_refresh_token",
+            "ExpiresIn": 3600
+        }
+    }
+
+    body = json.loads(login.lambda_handler(sample_event, None)["body"])
+
+    assert body["refresh_token"] == "fake_refresh_token"
+    assert body["expires_in"] == 3600
+
+
+def test_refresh_token_flow(mock_cognito):
+    mock_cognito.initiate_auth.return_value = {
+        "AuthenticationResult": {"IdToken": "new_id", "AccessToken": "new_access", "ExpiresIn": 3600}
+    }
+    event = {"httpMethod": "POST", "body": json.dumps({"refresh_token": "fake_refresh_token"})}
+
+    result = login.lambda_handler(event, None)
+    body = json.loads(result["body"])
+
+    assert result["statusCode"] == 200
+    assert body["access_token"] == "new_access"
+    assert body["refresh_token"] == "fake_refresh_token"
+    mock_cognito.initiate_auth.assert_called_once_with(
+        ClientId=login.CLIENT_ID,
+        AuthFlow="REFRESH_TOKEN_AUTH",
+        AuthParameters={"REFRESH_TOKEN": "fake_refresh_token"}
+    )
+
+
+def test_invalid_refresh_token(mock_cognito):
+    error_response = {"Error": {"Code": "NotAuthorizedException", "Message": "Refresh Token has expired"}}
+    mock_cognito.initiate_auth.side_effect = ClientError(error_response, "InitiateAuth")
+    event = {"httpMethod": "POST", "body": json.dumps({"refresh_token": "stale"})}
+
+    result = login.lambda_handler(event, None)
+
+    assert result["statusCode"] == 401
+    assert "refresh token" in json.loads(result["body"])["error"]
+
+
+def test_repeat_login_is_served_from_cache(mock_cognito, sample_event):
+    mock_cognito.initiate_auth.return_value = {
+        "AuthenticationResult": {"IdToken": "id", "AccessToken": "access", "ExpiresIn": 3600}
+    }
+
+    first = login.lambda_handler(sample_event, None)
+    second = login.lambda_handler(sample_event, None)
+
+    assert json.loads(first["body"])["access_token"] == json.loads(second["body"])["access_token"]
+    assert mock_cognito.initiate_auth.call_count == 1
+
+
+def test_cache_is_keyed_on_password(mock_cognito, sample_event):
+    mock_cognito.initiate_auth.return_value = {
+        "AuthenticationResult": {"IdToken": "id", "AccessToken": "access", "ExpiresIn": 3600}
+    }
+    login.lambda_handler(sample_event, None)
+
+    error_response = {"Error": {"Code": "NotAuthorizedException", "Message": "Bad credentials"}}
+    mock_cognito.initiate_auth.side_effect = ClientError(error_response, "InitiateAuth")
+    wrong_password = {"httpMethod": "POST", "body": json.dumps({"username": "testuser", "password": "wrong"})}
+
+    assert login.lambda_handler(wrong_password, None)["statusCode"] == 401
+
+
+def test_rejected_login_drops_the_cached_session(mock_cognito, sample_event):
+    mock_cognito.initiate_auth.return_value = {
+        "AuthenticationResult": {"IdToken": "id", "AccessToken": "access", "ExpiresIn": 3600}
+    }
+    login.lambda_handler(sample_event, None)
+    mock_cognito.initiate_auth.side_effect = ClientError(
+        {"Error": {"Code": "NotAuthorizedException", "Message": "User is disabled."}}, "InitiateAuth")
+    wrong_password = {"httpMethod": "POST", "body": json.dumps({"username": "testuser", "password": "wrong"})}
+    login.lambda_handler(wrong_password, None)
+
+    assert login.lambda_handler(sample_event, None)["statusCode"] == 401
+    assert mock_cognito.initiate_auth.call_count == 3
+
+
+def test_refresh_token_logins_always_go_to_cognito(mock_cognito):
+    mock_cognito.initiate_auth.return_value = {
+        "AuthenticationResult": {"IdToken": "id", "AccessToken": "access", "ExpiresIn": 3600}
+    }
+    event = {"httpMethod": "POST", "body": json.dumps({"refresh_token": "fake_refresh_token"})}
+
+    login.lambda_handler(event, None)
+    login.lambda_handler(event, None)
+
+    assert mock_cognito.initiate_auth.call_count == 2
+
+
+def test_cached_session_expires(mock_cognito, sample_event, monkeypatch):
+    mock_cognito.initiate_auth.return_value = {
+        "AuthenticationResult": {"IdToken": "id", "AccessToken": "access", "ExpiresIn": 3600}
+    }
+    login.lambda_handler(sample_event, None)
+
+    now = login.SESSION_CACHE.clock()
+    monkeypatch.setattr(login.SESSION_CACHE, "clock", lambda: now + login.SESSION_CACHE_TTL + 1)
+    login.lambda_handler(sample_event, None)
+
+    assert mock_cognito.initiate_auth.call_count == 2
+
+
+def test_login_attempts_are_rate_limited(mock_cognito, rate_limit_table):
+    mock_cognito.initiate_auth.side_effect = ClientError(
+        {"Error": {"Code": "NotAuthorizedException", "Message": "Incorrect username or password."}}, "InitiateAuth"
+    )
+    event = {
+        "httpMethod": "POST",
+        "body": json.dumps({"username": "victim@example.com", "password": "guess"}),
+        "requestContext": {"identity": {"sourceIp": "203.0.113.7"}},
+    }
+
+    statuses = [login.lambda_handler(event, None)["statusCode"] for _ in range(10)]
+
+    burst = login.rate_limit.LIMITS["user"][0]
+    assert statuses == [401] * burst + [429] * (10 - burst)
+    assert mock_cognito.initiate_auth.call_count == burst
+    result = login.lambda_handler(event, None)
+    assert int(result["headers"]["Retry-After"]) >= 1
@@ -0,0 +1,53 @@
+# boto3/botocore are loaded lazily by aws_clients on the first AWS call.
+import aws_clients
+import media_store
+import metrics
+import s3_events
+import warmup
+
+
+def uploader_of(bucket, key, version_id=None):
+    """The user named in the uploader metadata of this version of ``key``, or None."""
+    request = {"Bucket": bucket, "Key": key}
+    if version_id:
+        request["VersionId"] = version_id
+    try:
+        head = aws_clients.get_client("s3").head_object(**request)
+    except aws_clients.ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NoSuchVersion"):
+            return None
+        raise
+    return head.get("Metadata", {}).get(media_store.UPLOADER_METADATA)
+
+
+@metrics.instrument
+@warmup.primes(clients=("s3",), resources=("dynamodb",))
+def lambda_handler(event, context):
+    """Mark media READY once its object lands under ``uploads/``.
+
+    Invoked by the EventBridge rule on the media bucket's Object Created
+    events. Several users can hold PENDING rows for one content-addressed
+    object, since knowing the hash is enough to ask for an upload URL, so
+    only the row of the user named in that object version's uploader
+    metadata is finalized. Redelivered events are no-ops; AWS errors
+    propagate so the event is retried.
+    """
+    finalized = 0
+    for bucket, key, size, version_id in s3_events.created_versions(event):
+        media_id = media_store.media_id_from_key(key)
+        if media_id is None:
+            continue
+
+        rows = media_store.find_all(media_id)
+        if not rows:
+            print(f"No media row for {key} in {bucket}")
+        extra = None
+        if media_store.content_hash_of(media_id) and rows:
+            uploader = uploader_of(bucket, key, version_id)
+            rows = [row for row in rows if row["userID"] == uploader]
+            extra = {"uploadedBy": uploader}
+        for row in rows:
+            if media_store.finalize(media_id, row["userID"], size, extra):
+                finalized += 1
+
+    return {"finalized": finalized}
@@ -0,0 +1,105 @@
+import importlib
+
+import boto3
+import pytest
+from moto import mock_aws
+
+import media_complete
+import media_store
+
+TABLE = "test-media"
+
+
+@pytest.fixture(autouse=True)
+def table(monkeypatch):
+    monkeypatch.setenv("AWS_REGION", "us-east-1")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("MEDIA_METADATA_TABLE_NAME", TABLE)
+    importlib.reload(media_store)
+
+    with mock_aws():
+        boto3.client("dynamodb", region_name="us-east-1").create_table(
+            TableName=TABLE,
+            KeySchema=[{"AttributeName": "mediaID", "KeyType": "HASH"},
+                       {"AttributeName": "userID", "KeyType": "RANGE"}],
+            AttributeDefinitions=[{"AttributeName": "mediaID", "AttributeType": "S"},
+                                  {"AttributeName": "userID", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        yield boto3.resource("dynamodb", region_name="us-east-1").Table(TABLE)
+
+
+def object_created(key, size=1234):
+    return {
+        "source": "aws.s3",
+        "detail-type": "Object Created",
+        "detail": {"bucket": {"name": "media"}, "object": {"key": key, "size": size}},
+    }
+
+
+def test_finalizes_pending_row(table):
+    table.put_item(Item=media_store.pending_item("abc", "user-1", "uploads/abc.jpg", "image/jpeg"))
+
+    assert media_complete.lambda_handler(object_created("uploads/abc.jpg"), None) == {"finalized": 1}
+
+    row = table.get_item(Key={"mediaID": "abc", "userID": "user-1"})["Item"]
+    assert row["status"] == "READY"
+    assert row["size"] == 1234
+    assert "uploadedAt" in row
+    assert "expiresAt" not in row
+
+
+def test_redelivered_event_is_ignored(table):
+    table.put_item(Item=media_store.pending_item("abc", "user-1", "uploads/abc.jpg", "image/jpeg"))
+    media_complete.lambda_handler(object_created("uploads/abc.jpg"), None)
+    uploaded_at = table.get_item(Key={"mediaID": "abc", "userID": "user-1"})["Item"]["uploadedAt"]
+
+    assert media_complete.lambda_handler(object_created("uploads/abc.jpg"), None) == {"finalized": 0}
+    assert table.get_item(Key={"mediaID": "abc", "userID": "user-1"})["Item"]["uploadedAt"] == uploaded_at
+
+
+def test_unknown_and_foreign_objects_are_skipped():
+    assert media_complete.lambda_handler(object_created("uploads/missing.jpg"), None) == {"finalized": 0}
+    assert media_complete.lambda_handler(object_created("thumbnails/abc.jpg"), None) == {"finalized": 0}
+
+
+def test_accepts_s3_notification_records(table):
+    table.put_item(Item=media_store.pending_item("a b", "user-1", "uploads/a b.png", "image/png"))
+    event = {"Records": [{"s3": {"bucket": {"name": "media"}, "object": {"key": "uploads/a+b.png", "size": 10}}}]}
+
+    assert media_complete.lambda_handler(event, None) == {"finalized": 1}
+
+
+def upload(key, uploader=None, body=b"x" * 2000):
+    s3 = boto3.client("s3", region_name="us-east-1")
+    s3.create_bucket(Bucket="media")
+    metadata = {media_store.UPLOADER_METADATA: uploader} if uploader else {}
+    s3.put_object(Bucket="media", Key=key, Body=body, Metadata=metadata)
+
+
+def test_content_addressed_upload_finalizes_only_the_uploader(table):
+    media_id = media_store.content_media_id("ab" * 32)
+    key = f"uploads/{media_id}.png"
+    # user-1 only claimed the hash; user-2's signed POST wrote the bytes.
+    for user_id in ("user-1", "user-2"):
+        table.put_item(Item=media_store.pending_item(media_id, user_id, key, "image/png"))
+    upload(key, uploader="user-2")
+
+    assert media_complete.lambda_handler(object_created(key, size=2000), None) == {"finalized": 1}
+
+    claimed = table.get_item(Key={"mediaID": media_id, "userID": "user-1"})["Item"]
+    uploaded = table.get_item(Key={"mediaID": media_id, "userID": "user-2"})["Item"]
+    assert claimed["status"] == "PENDING"
+    assert uploaded["status"] == "READY"
+    assert uploaded["uploadedBy"] == "user-2"
+
+
+def test_content_addressed_object_without_uploader_finalizes_nothing(table):
+    media_id = media_store.content_media_id("cd" * 32)
+    key = f"uploads/{media_id}.png"
+    table.put_item(Item=media_store.pending_item(media_id, "user-1", key, "image/png"))
+    upload(key)
+
+    assert media_complete.lambda_handler(object_created(key, size=2000), None) == {"finalized": 0}
+    assert table.get_item(Key={"mediaID": media_id, "userID": "user-1"})["Item"]["status"] == "PENDING"
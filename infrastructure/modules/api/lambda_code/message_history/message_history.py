@@ -0,0 +1,73 @@
+import json
+import os
+
+# boto3/botocore are loaded lazily by aws_clients on the first DynamoDB call.
+import api_responses
+import aws_clients
+import message_archive
+import message_store
+import metrics
+import warmup
+from jwt_verifier import TokenError, authenticate
+
+MESSAGES_TABLE_NAME = os.environ.get("MESSAGES_TABLE_NAME")
+DEFAULT_PAGE_SIZE = 50
+
+# --- Precomputed responses ---
+HEADERS = api_responses.cors_headers("GET,OPTIONS", "Content-Type,Authorization")
+PREFLIGHT = api_responses.preflight(HEADERS)
+MISSING_TABLE_BODY = json.dumps({"message": "MESSAGES_TABLE_NAME environment variable is not set."})
+UNAUTHORIZED_BODY = json.dumps({"message": "Unauthorized"})
+INVALID_LIMIT_BODY = json.dumps({"message": f"limit must be an integer between 1 and {message_store.MAX_PAGE_SIZE}."})
+INVALID_CURSOR_BODY = json.dumps({"message": "Invalid cursor."})
+UNKNOWN_CONVERSATION_BODY = json.dumps({"message": "Conversation not found."})
+HISTORY_FAILED_BODY = json.dumps({"message": "Could not load messages."})
+
+
+def parse_limit(params):
+    """Return the requested page size, or None if it is not valid."""
+    raw = params.get("limit")
+    if raw is None:
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(raw)
+    except ValueError:
+        return None
+    return limit if 1 <= limit <= message_store.MAX_PAGE_SIZE else None
+
+
+@metrics.instrument
+@warmup.primes(clients=("s3",), resources=("dynamodb",), jwks=True, modules=("boto3.dynamodb.conditions",))
+def lambda_handler(event, context):
+    """GET /messages?conversationId=...&limit=50&before=<cursor>: newest first.
+
+    Pages past the messages still in the table come from the S3 archive.
+    """
+    if event.get("httpMethod") == "OPTIONS":
+        return PREFLIGHT
+    if not MESSAGES_TABLE_NAME:
+        return api_responses.response(500, HEADERS, MISSING_TABLE_BODY)
+
+    try:
+        user_id = authenticate(event)["sub"]
+    except TokenError:
+        return api_responses.response(401, HEADERS, UNAUTHORIZED_BODY)
+
+    params = event.get("queryStringParameters") or {}
+    limit = parse_limit(params)
+    if limit is None:
+        return api_responses.response(400, HEADERS, INVALID_LIMIT_BODY)
+    before = params.get("before")
+    if before is not None and not message_store.is_message_id(before):
+        return api_responses.response(400, HEADERS, INVALID_CURSOR_BODY)
+
+    try:
+        conversation = message_store.member_conversation(params.get("conversationId"), user_id)
+        messages, cursor = message_archive.history(conversation, limit, before)
+    except message_store.NotAMember:
+        return api_responses.response(404, HEADERS, UNKNOWN_CONVERSATION_BODY)
+    except aws_clients.ClientError as e:
+        print(f"Error loading message history: {e}")
+        return api_responses.response(500, HEADERS, HISTORY_FAILED_BODY)
+
+    return api_responses.response(200, HEADERS, {"messages": messages, "cursor": cursor})
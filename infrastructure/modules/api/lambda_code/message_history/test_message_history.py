@@ -0,0 +1,65 @@
+import importlib
+import json
+
+import pytest
+
+import message_history
+
+pytestmark = pytest.mark.usefixtures("stub_verifier")
+
+
+@pytest.fixture(autouse=True)
+def tables(messaging_tables):
+    importlib.reload(message_history)
+    return messaging_tables
+
+
+def call(params, token="user-1"):
+    event = {"httpMethod": "GET", "headers": {"Authorization": f"Bearer {token}"}, "queryStringParameters": params}
+    response = message_history.lambda_handler(event, None)
+    return response["statusCode"], json.loads(response["body"])
+
+
+def test_pages_back_through_history(tables):
+    conversation = tables.create_conversation("user-1", ["user-2"])
+    for i in range(5):
+        tables.send_message(conversation, "user-2", f"m{i}", now=1700000000 + i)
+
+    status, first = call({"conversationId": conversation["conversationID"], "limit": "3"})
+    _, second = call({"conversationId": conversation["conversationID"], "limit": "3", "before": first["cursor"]})
+
+    assert status == 200
+    assert [m["body"] for m in first["messages"]] == ["m4", "m3", "m2"]
+    assert [m["body"] for m in second["messages"]] == ["m1", "m0"]
+    assert second["cursor"] is None
+
+
+def test_only_members_can_read(tables):
+    conversation = tables.create_conversation("user-1", ["user-2"])
+
+    assert call({"conversationId": conversation["conversationID"]}, token="user-3")[0] == 404
+
+
+@pytest.mark.parametrize("params", [{"limit": "0"}, {"limit": "abc"}, {"before": "bogus"}])
+def test_rejects_bad_parameters(tables, params):
+    conversation = tables.create_conversation("user-1", ["user-2"])
+
+    assert call(dict(params, conversationId=conversation["conversationID"]))[0] == 400
+
+
+def test_continues_into_archived_history(archive_bucket):
+    import message_archive
+
+    importlib.reload(message_history)
+    conversation = archive_bucket.create_conversation("user-1", ["user-2"])
+    for i in range(4):
+        archive_bucket.send_message(conversation, "user-2", f"old{i}", now=1700000000 + i)
+    message_archive.compact(now=1700000000 + 100 * 24 * 3600)
+    archive_bucket.send_message(conversation, "user-1", "new")
+
+    _, first = call({"conversationId": conversation["conversationID"], "limit": "3"})
+    _, second = call({"conversationId": conversation["conversationID"], "limit": "3", "before": first["cursor"]})
+
+    assert [m["body"] for m in first["messages"]] == ["new", "old3", "old2"]
+    assert [m["body"] for m in second["messages"]] == ["old1", "old0"]
+    assert second["cursor"] is None
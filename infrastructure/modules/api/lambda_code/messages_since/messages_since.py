@@ -0,0 +1,58 @@
+import json
+import os
+
+# boto3/botocore are loaded lazily by aws_clients on the first DynamoDB call.
+import api_responses
+import aws_clients
+import message_store
+import metrics
+import warmup
+from jwt_verifier import TokenError, authenticate
+
+MESSAGE_DELIVERIES_TABLE_NAME = os.environ.get("MESSAGE_DELIVERIES_TABLE_NAME")
+
+# --- Precomputed responses ---
+HEADERS = api_responses.cors_headers("GET,OPTIONS", "Content-Type,Authorization")
+PREFLIGHT = api_responses.preflight(HEADERS)
+MISSING_TABLE_BODY = json.dumps({"message": "MESSAGE_DELIVERIES_TABLE_NAME environment variable is not set."})
+UNAUTHORIZED_BODY = json.dumps({"message": "Unauthorized"})
+INVALID_LIMIT_BODY = json.dumps({"message": f"limit must be an integer between 1 and {message_store.MAX_PAGE_SIZE}."})
+INVALID_CURSOR_BODY = json.dumps({"message": "Invalid cursor."})
+SYNC_FAILED_BODY = json.dumps({"message": "Could not load messages."})
+
+
+@metrics.instrument
+@warmup.primes(resources=("dynamodb",), jwks=True, modules=("boto3.dynamodb.conditions",))
+def lambda_handler(event, context):
+    """GET /messages/since?cursor=<last seen messageID>: every conversation, oldest first.
+
+    Without a cursor the feed starts from the oldest delivery still retained.
+    """
+    if event.get("httpMethod") == "OPTIONS":
+        return PREFLIGHT
+    if not MESSAGE_DELIVERIES_TABLE_NAME:
+        return api_responses.response(500, HEADERS, MISSING_TABLE_BODY)
+
+    try:
+        user_id = authenticate(event)["sub"]
+    except TokenError:
+        return api_responses.response(401, HEADERS, UNAUTHORIZED_BODY)
+
+    params = event.get("queryStringParameters") or {}
+    try:
+        limit = int(params.get("limit", message_store.MAX_PAGE_SIZE))
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= message_store.MAX_PAGE_SIZE:
+        return api_responses.response(400, HEADERS, INVALID_LIMIT_BODY)
+    cursor = params.get("cursor")
+    if cursor is not None and not message_store.is_message_id(cursor):
+        return api_responses.response(400, HEADERS, INVALID_CURSOR_BODY)
+
+    try:
+        messages, cursor, has_more = message_store.since(user_id, cursor, limit)
+    except aws_clients.ClientError as e:
+        print(f"Error loading messages since cursor: {e}")
+        return api_responses.response(500, HEADERS, SYNC_FAILED_BODY)
+
+    return api_responses.response(200, HEADERS, {"messages": messages, "cursor": cursor, "hasMore": has_more})
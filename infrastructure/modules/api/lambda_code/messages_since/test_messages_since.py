@@ -0,0 +1,45 @@
+import importlib
+import json
+
+import pytest
+
+import messages_since
+
+pytestmark = pytest.mark.usefixtures("stub_verifier")
+
+
+@pytest.fixture(autouse=True)
+def tables(messaging_tables):
+    importlib.reload(messages_since)
+    return messaging_tables
+
+
+def call(params=None, token="user-1"):
+    event = {"httpMethod": "GET", "headers": {"Authorization": f"Bearer {token}"}, "queryStringParameters": params}
+    response = messages_since.lambda_handler(event, None)
+    return response["statusCode"], json.loads(response["body"])
+
+
+def test_catches_up_across_conversations(tables):
+    first = tables.create_conversation("user-1", ["user-2"])
+    second = tables.create_conversation("user-3", ["user-1"])
+    for i in range(3):
+        tables.send_message(first if i % 2 else second, "user-2" if i % 2 else "user-3", f"m{i}", now=1700000000 + i)
+
+    status, page = call({"limit": "2"})
+    _, rest = call({"limit": "2", "cursor": page["cursor"]})
+
+    assert status == 200
+    assert [m["body"] for m in page["messages"]] == ["m0", "m1"]
+    assert page["hasMore"] is True
+    assert [m["body"] for m in rest["messages"]] == ["m2"]
+    assert call({"cursor": rest["cursor"]})[1]["messages"] == []
+
+
+@pytest.mark.parametrize("params", [{"limit": "0"}, {"limit": "1000"}, {"cursor": "nope"}])
+def test_rejects_bad_parameters(params):
+    assert call(params)[0] == 400
+
+
+def test_requires_a_valid_token():
+    assert call(token="forged")[0] == 401
@@ -0,0 +1,302 @@
+import json
+import os
+import time
+
+# boto3/botocore are loaded lazily by aws_clients on the first AWS call.
+import api_responses
+import aws_clients
+import media_store
+import metrics
+import warmup
+from jwt_verifier import TokenError, authenticate
+from media_types import MAX_MULTIPART_SIZE, MAX_PART_SIZE, MAX_PARTS, MEDIA_TYPES, MIN_PART_SIZE, object_key
+
+MEDIA_BUCKET_NAME = os.environ.get("MEDIA_BUCKET_NAME")
+UPLOAD_SESSIONS_TABLE_NAME = os.environ.get("UPLOAD_SESSIONS_TABLE_NAME")
+MEDIA_METADATA_TABLE_NAME = os.environ.get("MEDIA_METADATA_TABLE_NAME")
+
+PART_URL_EXPIRES_IN = 3600
+MAX_PARTS_PER_PRESIGN = 100
+# Sessions outlive the bucket's abort-incomplete-multipart-upload rule (7 days)
+SESSION_TTL_SECONDS = 8 * 24 * 3600
+
+IN_PROGRESS = "IN_PROGRESS"
+COMPLETED = "COMPLETED"
+ABORTED = "ABORTED"
+
+# --- Precomputed responses ---
+HEADERS = api_responses.cors_headers("POST,OPTIONS", "Content-Type,Authorization")
+PREFLIGHT = api_responses.preflight(HEADERS)
+MISSING_CONFIG_BODY = json.dumps(
+    {"message": "MEDIA_BUCKET_NAME and UPLOAD_SESSIONS_TABLE_NAME environment variables must be set."}
+)
+INVALID_JSON_BODY = json.dumps({"message": "Invalid JSON format in request body."})
+UNAUTHORIZED_BODY = json.dumps({"message": "Unauthorized"})
+UNKNOWN_UPLOAD_BODY = json.dumps({"message": "Upload not found."})
+UPLOAD_FAILED_BODY = json.dumps({"message": "Could not process the multipart upload request."})
+
+
+def _part_signer_client():
+    """An S3 client that presigns with SigV4, so part URLs can sign Content-Length.
+
+    The shared client may presign with SigV2, whose query signature does not
+    cover headers; a part URL signed that way accepts up to 5 GiB.
+    """
+    return aws_clients.get_client("s3", signature_version="s3v4")
+
+
+def part_size(session, number):
+    """Bytes part ``number`` must hold: ``partSize``, or the remainder for the last part."""
+    if number < session["partCount"]:
+        return session["partSize"]
+    return session["size"] - session["partSize"] * (session["partCount"] - 1)
+
+
+def _sessions_table():
+    return aws_clients.get_resource("dynamodb").Table(UPLOAD_SESSIONS_TABLE_NAME)
+
+
+def _load_session(upload_id):
+    item = _sessions_table().get_item(Key={"uploadId": upload_id}, ConsistentRead=True).get("Item")
+    if item:
+        for field in ("size", "partSize", "partCount"):
+            item[field] = int(item[field])
+    return item
+
+
+def _set_status(upload_id, status):
+    _sessions_table().update_item(
+        Key={"uploadId": upload_id},
+        UpdateExpression="SET #status = :status, updatedAt = :now",
+        ConditionExpression="#status = :in_progress",
+        ExpressionAttributeNames={"#status": "status"},
+        ExpressionAttributeValues={":status": status, ":now": int(time.time()), ":in_progress": IN_PROGRESS}
+    )
+
+
+def list_uploaded_parts(session):
+    """Return the parts S3 already holds for ``session`` (the source of truth for resume)."""
+    paginator = aws_clients.get_client("s3").get_paginator("list_parts")
+    parts = []
+    for page in paginator.paginate(Bucket=MEDIA_BUCKET_NAME, Key=session["key"], UploadId=session["uploadId"]):
+        parts.extend(page.get("Parts", []))
+    return parts
+
+
+def validate_initiate(body):
+    """Return an error message for an invalid initiate request, or None."""
+    content_type = body.get("contentType")
+    size = body.get("size")
+    part_size = body.get("partSize")
+    if content_type not in MEDIA_TYPES:
+        return f"Unsupported content type. Allowed: {', '.join(MEDIA_TYPES)}."
+    for name, value in (("size", size), ("partSize", part_size)):
+        if not isinstance(value, int) or isinstance(value, bool) or value <= 0:
+            return f"{name} must be a positive integer."
+    if size > MAX_MULTIPART_SIZE:
+        return f"Uploads are limited to {MAX_MULTIPART_SIZE} bytes."
+    if size > MEDIA_TYPES[content_type]["max_size"]:
+        return f"{content_type} uploads are limited to {MEDIA_TYPES[content_type]['max_size']} bytes."
+    if not MIN_PART_SIZE <= part_size <= MAX_PART_SIZE:
+        return f"partSize must be between {MIN_PART_SIZE} and {MAX_PART_SIZE} bytes."
+    if -(-size // part_size) > MAX_PARTS:
+        return f"partSize is too small: at most {MAX_PARTS} parts are allowed."
+    return None
+
+
+def initiate(body, user_id):
+    error = validate_initiate(body)
+    if error:
+        return api_responses.response(400, HEADERS, {"message": error})
+
+    import uuid
+
+    media_id = str(uuid.uuid4())
+    key = object_key(body["contentType"], media_id)
+    upload = aws_clients.get_client("s3").create_multipart_upload(
+        Bucket=MEDIA_BUCKET_NAME,
+        Key=key,
+        ContentType=body["contentType"]
+    )
+    now = int(time.time())
+    session = {
+        "uploadId": upload["UploadId"],
+        "userID": user_id,
+        "mediaID": media_id,
+        "key": key,
+        "contentType": body["contentType"],
+        "size": body["size"],
+        "partSize": body["partSize"],
+        "partCount": -(-body["size"] // body["partSize"]),
+        "status": IN_PROGRESS,
+        "createdAt": now,
+        "expiresAt": now + SESSION_TTL_SECONDS
+    }
+    _sessions_table().put_item(Item=session)
+    if MEDIA_METADATA_TABLE_NAME:
+        media_store.record_pending(
+            [media_store.pending_item(media_id, user_id, key, body["contentType"], body["size"])],
+            MEDIA_METADATA_TABLE_NAME
+        )
+
+    return api_responses.response(201, HEADERS, {
+        "uploadId": session["uploadId"],
+        "mediaID": media_id,
+        "key": key,
+        "partSize": session["partSize"],
+        "partCount": session["partCount"]
+    })
+
+
+def presign_parts(body, session):
+    part_numbers = body.get("partNumbers")
+    if not isinstance(part_numbers, list) or not part_numbers or len(part_numbers) > MAX_PARTS_PER_PRESIGN:
+        return api_responses.response(400, HEADERS, {
+            "message": f"partNumbers must be a list of 1 to {MAX_PARTS_PER_PRESIGN} part numbers."
+        })
+    if any(not isinstance(n, int) or isinstance(n, bool) or not 1 <= n <= session["partCount"] for n in part_numbers):
+        return api_responses.response(400, HEADERS, {"message": f"Part numbers must be between 1 and {session['partCount']}."})
+
+    # Content-Length is signed into each URL, so a part cannot be larger (or
+    # smaller) than the session declared
+    s3_client = _part_signer_client()
+    parts = [
+        {
+            "partNumber": number,
+            "url": s3_client.generate_presigned_url(
+                "upload_part",
+                Params={
+                    "Bucket": MEDIA_BUCKET_NAME,
+                    "Key": session["key"],
+                    "UploadId": session["uploadId"],
+                    "PartNumber": number,
+                    "ContentLength": part_size(session, number)
+                },
+                ExpiresIn=PART_URL_EXPIRES_IN
+            )
+        }
+        for number in part_numbers
+    ]
+    return api_responses.response(200, HEADERS, {"uploadId": session["uploadId"], "parts": parts})
+
+
+def status(session):
+    uploaded, missing = [], []
+    if session["status"] == IN_PROGRESS:
+        uploaded = list_uploaded_parts(session)
+        done = {part["PartNumber"] for part in uploaded}
+        missing = [n for n in range(1, session["partCount"] + 1) if n not in done]
+
+    return api_responses.response(200, HEADERS, {
+        "uploadId": session["uploadId"],
+        "key": session["key"],
+        "status": session["status"],
+        "partSize": session["partSize"],
+        "partCount": session["partCount"],
+        "uploadedParts": [
+            {"partNumber": part["PartNumber"], "etag": part["ETag"], "size": part["Size"]} for part in uploaded
+        ],
+        "missingParts": missing
+    })
+
+
+def complete(body, session):
+    """Complete the upload from the parts S3 holds.
+
+    The part list always comes from S3, never from the client (a ``parts``
+    list in the body is ignored): the upload only completes if S3 holds
+    exactly parts 1..partCount, each of the size the session declared, so
+    the object is exactly ``size`` bytes.
+    """
+    uploaded = sorted(list_uploaded_parts(session), key=lambda part: part["PartNumber"])
+    numbers = {part["PartNumber"] for part in uploaded}
+    missing = sorted(set(range(1, session["partCount"] + 1)) - numbers)
+    if missing:
+        return api_responses.response(409, HEADERS, {"message": "Upload is missing parts.", "missingParts": missing})
+    wrong = [part["PartNumber"] for part in uploaded
+             if part["PartNumber"] > session["partCount"] or part["Size"] != part_size(session, part["PartNumber"])]
+    if wrong:
+        return api_responses.response(400, HEADERS, {
+            "message": f"Parts must be numbered 1 to {session['partCount']} and add up to {session['size']} bytes.",
+            "invalidParts": wrong
+        })
+
+    parts = [{"PartNumber": part["PartNumber"], "ETag": part["ETag"]} for part in uploaded]
+
+    aws_clients.get_client("s3").complete_multipart_upload(
+        Bucket=MEDIA_BUCKET_NAME,
+        Key=session["key"],
+        UploadId=session["uploadId"],
+        MultipartUpload={"Parts": parts}
+    )
+    _set_status(session["uploadId"], COMPLETED)
+    return api_responses.response(200, HEADERS, {"uploadId": session["uploadId"], "key": session["key"], "status": COMPLETED})
+
+
+def abort(session):
+    aws_clients.get_client("s3").abort_multipart_upload(
+        Bucket=MEDIA_BUCKET_NAME,
+        Key=session["key"],
+        UploadId=session["uploadId"]
+    )
+    _set_status(session["uploadId"], ABORTED)
+    return api_responses.response(200, HEADERS, {"uploadId": session["uploadId"], "status": ABORTED})
+
+
+SESSION_ACTIONS = {
+    "presign_parts": presign_parts,
+    "status": lambda body, session: status(session),
+    "complete": complete,
+    "abort": lambda body, session: abort(session),
+}
+
+
+@metrics.instrument
+@warmup.primes(clients=("s3",), resources=("dynamodb",), jwks=True, modules=("uuid",))
+def lambda_handler(event, context):
+    if event.get("httpMethod") == "OPTIONS":
+        return PREFLIGHT
+    if not MEDIA_BUCKET_NAME or not UPLOAD_SESSIONS_TABLE_NAME:
+        return api_responses.response(500, HEADERS, MISSING_CONFIG_BODY)
+
+    try:
+        user_id = authenticate(event)["sub"]
+    except TokenError:
+        return api_responses.response(401, HEADERS, UNAUTHORIZED_BODY)
+
+    try:
+        body = json.loads(event.get("body") or "{}")
+        action = body.get("action")
+    except (json.JSONDecodeError, AttributeError):
+        return api_responses.response(400, HEADERS, INVALID_JSON_BODY)
+
+    if action != "initiate" and action not in SESSION_ACTIONS:
+        return api_responses.response(400, HEADERS, {
+            "message": f"action must be one of: initiate, {', '.join(SESSION_ACTIONS)}."
+        })
+
+    try:
+        if action == "initiate":
+            return initiate(body, user_id)
+
+        session = _load_session(body.get("uploadId")) if isinstance(body.get("uploadId"), str) else None
+        if session is None or session.get("userID") != user_id:
+            return api_responses.response(404, HEADERS, UNKNOWN_UPLOAD_BODY)
+        if session["status"] == COMPLETED and action == "complete":
+            # A retried complete after a dropped response
+            return api_responses.response(200, HEADERS, {"uploadId": session["uploadId"], "key": session["key"], "status": COMPLETED})
+        if session["status"] != IN_PROGRESS and action != "status":
+            return api_responses.response(409, HEADERS, {"message": f"Upload is {session['status']}."})
+
+        return SESSION_ACTIONS[action](body, session)
+
+    except aws_clients.ClientError as e:
+        code = e.response.get("Error", {}).get("Code")
+        if code == "NoSuchUpload":
+            return api_responses.response(404, HEADERS, UNKNOWN_UPLOAD_BODY)
+        if code in ("InvalidPart", "InvalidPartOrder", "EntityTooSmall"):
+            return api_responses.response(400, HEADERS, {"message": "S3 rejected the uploaded parts.", "code": code})
+        if code == "ConditionalCheckFailedException":
+            return api_responses.response(409, HEADERS, {"message": "Upload was completed or aborted concurrently."})
+        print(f"Error handling multipart upload request: {e}")
+        return api_responses.response(500, HEADERS, UPLOAD_FAILED_BODY)
@@ -0,0 +1,189 @@
+import importlib
+import json
+
+import boto3
+import pytest
+import requests
+from moto import mock_aws
+
+import multipart_upload
+
+BUCKET = "test-bucket"
+TABLE = "test-upload-sessions"
+PART_SIZE = 5 * 1024 * 1024
+AUTH = {"Authorization": "Bearer user-123"}
+
+pytestmark = pytest.mark.usefixtures("stub_verifier")
+
+
+@pytest.fixture(autouse=True)
+def aws(monkeypatch):
+    monkeypatch.setenv("AWS_REGION", "us-east-1")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("MEDIA_BUCKET_NAME", BUCKET)
+    monkeypatch.setenv("UPLOAD_SESSIONS_TABLE_NAME", TABLE)
+    monkeypatch.delenv("MEDIA_METADATA_TABLE_NAME", raising=False)
+    importlib.reload(multipart_upload)
+
+    with mock_aws():
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket=BUCKET)
+        boto3.client("dynamodb", region_name="us-east-1").create_table(
+            TableName=TABLE,
+            KeySchema=[{"AttributeName": "uploadId", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "uploadId", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        yield
+
+
+def call(headers=AUTH, **body):
+    response = multipart_upload.lambda_handler({"httpMethod": "POST", "headers": headers, "body": json.dumps(body)}, None)
+    return response["statusCode"], json.loads(response["body"])
+
+
+def initiate(size=PART_SIZE * 2 + 1000):
+    status, body = call(action="initiate", contentType="video/mp4", size=size, partSize=PART_SIZE)
+    assert status == 201
+    return body
+
+
+def upload(upload_id, part_numbers):
+    _, body = call(action="presign_parts", uploadId=upload_id, partNumbers=part_numbers)
+    for part in body["parts"]:
+        data = b"x" * (PART_SIZE if part["partNumber"] < 3 else 1000)
+        assert requests.put(part["url"], data=data).status_code == 200
+
+
+def test_upload_end_to_end_through_presigned_part_urls():
+    session = initiate()
+    assert session["partCount"] == 3
+    assert session["key"].startswith("uploads/") and session["key"].endswith(".mp4")
+
+    upload(session["uploadId"], [1, 2, 3])
+    status, body = call(action="complete", uploadId=session["uploadId"])
+
+    assert status == 200
+    assert body["status"] == "COMPLETED"
+    head = boto3.client("s3", region_name="us-east-1").head_object(Bucket=BUCKET, Key=session["key"])
+    assert head["ContentLength"] == PART_SIZE * 2 + 1000
+
+
+def test_interrupted_upload_resumes_from_server_state():
+    session = initiate()
+    upload(session["uploadId"], [1])  # connection drops after the first part
+
+    status, body = call(action="status", uploadId=session["uploadId"])
+    assert status == 200
+    assert [p["partNumber"] for p in body["uploadedParts"]] == [1]
+    assert body["missingParts"] == [2, 3]
+
+    status, body = call(action="complete", uploadId=session["uploadId"])
+    assert status == 409
+    assert body["missingParts"] == [2, 3]
+
+    upload(session["uploadId"], body["missingParts"])
+    status, body = call(action="complete", uploadId=session["uploadId"])
+    assert status == 200
+
+    # A retried complete is answered idempotently
+    assert call(action="complete", uploadId=session["uploadId"])[0] == 200
+
+
+def test_complete_with_client_supplied_etags():
+    session = initiate(size=PART_SIZE)
+    _, body = call(action="presign_parts", uploadId=session["uploadId"], partNumbers=[1])
+    etag = requests.put(body["parts"][0]["url"], data=b"x" * PART_SIZE).headers["ETag"]
+
+    status, _ = call(action="complete", uploadId=session["uploadId"], parts=[{"partNumber": 1, "etag": etag}])
+
+    assert status == 200
+
+
+def test_abort_stops_further_actions():
+    session = initiate()
+
+    assert call(action="abort", uploadId=session["uploadId"])[0] == 200
+    status, body = call(action="presign_parts", uploadId=session["uploadId"], partNumbers=[1])
+    assert status == 409
+    assert "ABORTED" in body["message"]
+
+
+@pytest.mark.parametrize("overrides, message", [
+    ({"contentType": "image/gif"}, "Unsupported content type"),
+    ({"partSize": 1024}, "partSize must be between"),
+    ({"size": 0}, "size must be a positive integer"),
+    ({"size": 6 * 1024 ** 3}, "Uploads are limited"),
+    ({"size": 200 * 1024 ** 2}, "video/mp4 uploads are limited to 100000000 bytes"),
+    ({"contentType": "image/jpeg"}, "image/jpeg uploads are limited to 5000000 bytes"),
+])
+def test_initiate_validation(overrides, message):
+    body = {"action": "initiate", "contentType": "video/mp4", "size": PART_SIZE * 3, "partSize": PART_SIZE}
+    body.update(overrides)
+
+    status, response = call(**body)
+
+    assert status == 400
+    assert message in response["message"]
+
+
+def test_presign_rejects_out_of_range_parts():
+    session = initiate()
+
+    status, _ = call(action="presign_parts", uploadId=session["uploadId"], partNumbers=[4])
+
+    assert status == 400
+
+
+def test_unknown_upload_and_action():
+    assert call(action="status", uploadId="nope")[0] == 404
+    assert call(action="explode")[0] == 400
+
+
+def test_sessions_belong_to_the_initiating_user():
+    session = initiate()
+
+    assert call(action="status", uploadId=session["uploadId"], headers={})[0] == 401
+    other = {"Authorization": "Bearer user-456"}
+    assert call(action="abort", uploadId=session["uploadId"], headers=other)[0] == 404
+
+
+def test_part_urls_sign_each_parts_content_length():
+    session = initiate()
+
+    _, body = call(action="presign_parts", uploadId=session["uploadId"], partNumbers=[1, 3])
+
+    for part in body["parts"]:
+        assert "X-Amz-SignedHeaders=content-length%3Bhost" in part["url"]
+
+
+@pytest.mark.parametrize("number, size", [(2, PART_SIZE + 1), (3, 999), (4, 1000)])
+def test_complete_rejects_parts_of_the_wrong_size_or_number(number, size):
+    session = initiate()
+    upload(session["uploadId"], [1, 2, 3])
+    # Bypassing the signed URLs, straight to S3
+    boto3.client("s3", region_name="us-east-1").upload_part(
+        Bucket=BUCKET, Key=session["key"], UploadId=session["uploadId"], PartNumber=number, Body=b"y" * size
+    )
+
+    status, body = call(action="complete", uploadId=session["uploadId"])
+
+    assert status == 400
+    assert body["invalidParts"] == [number]
+    assert call(action="status", uploadId=session["uploadId"])[1]["status"] == "IN_PROGRESS"
+
+
+def test_s3_part_errors_are_client_errors(monkeypatch):
+    session = initiate(size=PART_SIZE)
+    upload(session["uploadId"], [1])
+    s3 = multipart_upload.aws_clients.get_client("s3")
+
+    def reject(**_):
+        raise multipart_upload.aws_clients.ClientError({"Error": {"Code": "InvalidPart"}}, "CompleteMultipartUpload")
+
+    monkeypatch.setattr(s3, "complete_multipart_upload", reject)
+
+    status, body = call(action="complete", uploadId=session["uploadId"])
+
+    assert status == 400
+    assert body["code"] == "InvalidPart"
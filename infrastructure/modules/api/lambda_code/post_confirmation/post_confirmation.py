@@ -0,0 +1,109 @@
+import datetime
+import json
+import os
+
+# boto3/botocore are loaded lazily by aws_clients on the first DynamoDB call.
+import aws_clients
+import metrics
+import warmup
+
+USER_PROFILE_TABLE_NAME = os.environ.get('USER_PROFILE_TABLE_NAME')
+# Profile writes that failed in the trigger are retried from this queue
+PROFILE_RETRY_QUEUE_URL = os.environ.get('PROFILE_RETRY_QUEUE_URL')
+RETRY_DELAY_SECONDS = 10
+
+# Also fired after a forgotten-password reset, when the profile already exists
+CONFIRM_SIGN_UP = 'PostConfirmation_ConfirmSignUp'
+
+
+def profile_item(user_sub, email, created_at=None):
+    return {
+        'userId': user_sub,
+        'email': email,
+        'createdAt': created_at or datetime.datetime.utcnow().isoformat()
+    }
+
+
+def create_profile(table_name, user_sub, email):
+    """Write the user's profile unless it already exists; returns True if it was created.
+
+    The write is conditional, so a retried trigger (or a queued retry of a
+    write that did succeed) keeps the original ``createdAt``.
+    """
+    table = aws_clients.get_resource('dynamodb').Table(table_name)
+    try:
+        table.put_item(
+            Item=profile_item(user_sub, email),
+            ConditionExpression='attribute_not_exists(userId)'
+        )
+    except aws_clients.ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False
+        raise
+    return True
+
+
+def queue_retry(user_sub, email):
+    """Queue a profile write for the retry consumer (``retry_profiles``)."""
+    aws_clients.get_client('sqs').send_message(
+        QueueUrl=PROFILE_RETRY_QUEUE_URL,
+        MessageBody=json.dumps({'sub': user_sub, 'email': email}),
+        DelaySeconds=RETRY_DELAY_SECONDS
+    )
+
+
+def retry_profiles(event):
+    """SQS consumer: write the queued profiles, reporting the failed ones for redelivery.
+
+    A message that keeps failing goes to the dead-letter queue after the
+    queue's maxReceiveCount receives.
+    """
+    failures = []
+    for record in event['Records']:
+        try:
+            profile = json.loads(record['body'])
+            if create_profile(USER_PROFILE_TABLE_NAME, profile['sub'], profile.get('email')):
+                metrics.add('ProfilesCreated', 1)
+        except aws_clients.ClientError as e:
+            print(f"Profile retry failed: {e}")
+            failures.append({'itemIdentifier': record['messageId']})
+    return {'batchItemFailures': failures}
+
+
+@metrics.instrument
+@warmup.primes(clients=("sqs",), resources=("dynamodb",))
+def lambda_handler(event, context):
+    """Cognito post-confirmation trigger: create the user's profile row.
+
+    The trigger runs once the user is already confirmed: if it fails, the
+    client sees an error but the user stays confirmed, and ConfirmSignUp
+    cannot be repeated. So a failed write is not raised but queued on
+    PROFILE_RETRY_QUEUE_URL, whose messages this function also consumes
+    (``Records`` events), retrying the same conditional put. Only if the
+    queue cannot be reached either is the error raised. Returns the event,
+    as Cognito expects.
+    """
+    if 'Records' in event:
+        return retry_profiles(event)
+    if event.get('triggerSource') != CONFIRM_SIGN_UP:
+        return event
+    if not USER_PROFILE_TABLE_NAME:
+        raise RuntimeError('USER_PROFILE_TABLE_NAME environment variable is not set.')
+
+    attributes = event['request']['userAttributes']
+    try:
+        created = create_profile(USER_PROFILE_TABLE_NAME, attributes['sub'], attributes.get('email'))
+    except aws_clients.ClientError as e:
+        print(f"DynamoDB Error: {e}")
+        if not PROFILE_RETRY_QUEUE_URL:
+            raise
+        try:
+            queue_retry(attributes['sub'], attributes.get('email'))
+        except aws_clients.ClientError as queue_error:
+            print(f"Profile for {attributes['sub']} was neither written nor queued: {queue_error}")
+            raise e
+        metrics.add('ProfileWritesQueued', 1)
+        return event
+    if created:
+        metrics.add('ProfilesCreated', 1)
+    return event
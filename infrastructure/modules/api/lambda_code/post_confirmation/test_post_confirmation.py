@@ -0,0 +1,119 @@
+from unittest.mock import MagicMock
+
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+from moto import mock_aws
+
+import aws_clients
+import post_confirmation
+
+TABLE = "test-user-profiles"
+
+
+@pytest.fixture
+def table(monkeypatch):
+    monkeypatch.setenv("AWS_REGION", "us-east-1")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setattr(post_confirmation, "USER_PROFILE_TABLE_NAME", TABLE)
+
+    with mock_aws():
+        boto3.client("dynamodb", region_name="us-east-1").create_table(
+            TableName=TABLE,
+            KeySchema=[{"AttributeName": "userId", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "userId", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        yield boto3.resource("dynamodb", region_name="us-east-1").Table(TABLE)
+
+
+def confirmation(sub="sub-1", email="a@example.com", source="PostConfirmation_ConfirmSignUp"):
+    return {
+        "version": "1",
+        "triggerSource": source,
+        "userName": sub,
+        "request": {"userAttributes": {"sub": sub, "email": email, "email_verified": "true"}},
+        "response": {},
+    }
+
+
+def test_creates_the_profile_and_returns_the_event(table):
+    event = confirmation()
+
+    assert post_confirmation.lambda_handler(event, None) is event
+
+    item = table.get_item(Key={"userId": "sub-1"})["Item"]
+    assert item["email"] == "a@example.com"
+    assert "createdAt" in item
+
+
+def test_retried_trigger_keeps_the_original_profile(table):
+    table.put_item(Item={"userId": "sub-1", "email": "a@example.com", "createdAt": "2024-01-01T00:00:00"})
+
+    post_confirmation.lambda_handler(confirmation(), None)
+
+    assert table.get_item(Key={"userId": "sub-1"})["Item"]["createdAt"] == "2024-01-01T00:00:00"
+
+
+def test_password_reset_confirmation_is_ignored(table):
+    post_confirmation.lambda_handler(confirmation(source="PostConfirmation_ConfirmForgotPassword"), None)
+
+    assert "Item" not in table.get_item(Key={"userId": "sub-1"})
+
+
+def failing_table(monkeypatch):
+    """Make the profile write fail the way a throttled table does."""
+    resource = MagicMock()
+    resource.Table.return_value.put_item.side_effect = ClientError(
+        {"Error": {"Code": "ProvisionedThroughputExceededException", "Message": "Rate limit exceeded"}}, "PutItem"
+    )
+    aws_clients.set_resource("dynamodb", resource)
+
+
+def test_failed_write_without_a_retry_queue_is_raised(monkeypatch):
+    monkeypatch.setattr(post_confirmation, "USER_PROFILE_TABLE_NAME", TABLE)
+    monkeypatch.setattr(post_confirmation, "PROFILE_RETRY_QUEUE_URL", None)
+    failing_table(monkeypatch)
+
+    with pytest.raises(ClientError):
+        post_confirmation.lambda_handler(confirmation(), None)
+
+
+@pytest.fixture
+def queue(table, monkeypatch):
+    sqs = boto3.client("sqs", region_name="us-east-1")
+    url = sqs.create_queue(QueueName="profile-retries")["QueueUrl"]
+    monkeypatch.setattr(post_confirmation, "PROFILE_RETRY_QUEUE_URL", url)
+    monkeypatch.setattr(post_confirmation, "RETRY_DELAY_SECONDS", 0)
+    return sqs, url
+
+
+def received(queue):
+    sqs, url = queue
+    messages = sqs.receive_message(QueueUrl=url, MaxNumberOfMessages=10).get("Messages", [])
+    return {"Records": [{"messageId": m["MessageId"], "body": m["Body"]} for m in messages]}
+
+
+def test_failed_write_is_queued_and_retried(queue, table, monkeypatch):
+    dynamodb = aws_clients.get_resource("dynamodb")
+    failing_table(monkeypatch)
+    event = confirmation()
+
+    # The user is already confirmed: the trigger succeeds and the write is retried later
+    assert post_confirmation.lambda_handler(event, None) is event
+    assert "Item" not in table.get_item(Key={"userId": "sub-1"})
+
+    aws_clients.set_resource("dynamodb", dynamodb)
+    assert post_confirmation.lambda_handler(received(queue), None) == {"batchItemFailures": []}
+    assert table.get_item(Key={"userId": "sub-1"})["Item"]["email"] == "a@example.com"
+
+
+def test_retries_that_fail_again_are_reported_for_redelivery(queue, monkeypatch):
+    failing_table(monkeypatch)
+    post_confirmation.lambda_handler(confirmation(), None)
+    records = received(queue)
+
+    result = post_confirmation.lambda_handler(records, None)
+
+    assert result == {"batchItemFailures": [{"itemIdentifier": records["Records"][0]["messageId"]}]}
@@ -0,0 +1,36 @@
+# boto3/botocore are loaded lazily by aws_clients on the first DynamoDB call.
+import metrics
+import search_index
+import warmup
+
+
+def new_messages(event):
+    """Yield ``(sequence_number, message)`` for every message inserted in a stream batch."""
+    from boto3.dynamodb.types import TypeDeserializer
+
+    deserializer = TypeDeserializer()
+    for record in event.get("Records", []):
+        if record.get("eventName") != "INSERT":
+            continue
+        image = record["dynamodb"].get("NewImage") or {}
+        message = {name: deserializer.deserialize(value) for name, value in image.items()}
+        if {"conversationID", "messageID", "body"} <= message.keys():
+            yield record["dynamodb"]["SequenceNumber"], message
+
+
+@metrics.instrument
+@warmup.primes(resources=("dynamodb",), modules=("boto3.dynamodb.types",))
+def lambda_handler(event, context):
+    """Add new messages to the search index.
+
+    Invoked by the messages table's stream. Postings are added with set
+    semantics, so a retried batch is harmless; records whose postings could
+    not all be written are reported as batch item failures and retried.
+    """
+    records = list(new_messages(event))
+    failed = set(search_index.index_messages([message for _, message in records]))
+    metrics.add("MessagesIndexed", len(records) - len(failed), namespace="ChatApp/Search")
+    return {"batchItemFailures": [
+        {"itemIdentifier": sequence_number}
+        for sequence_number, message in records if message["messageID"] in failed
+    ]}
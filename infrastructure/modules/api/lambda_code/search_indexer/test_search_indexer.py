@@ -0,0 +1,55 @@
+import importlib
+import json
+from unittest.mock import patch
+
+import pytest
+from boto3.dynamodb.types import TypeSerializer
+
+import search_index
+import search_indexer
+
+
+@pytest.fixture(autouse=True)
+def index():
+    importlib.reload(search_indexer)
+    index = search_index.MemoryIndex()
+    search_index.set_backend(index)
+    yield index
+    search_index.set_backend(None)
+
+
+def stream_record(message, sequence_number, event_name="INSERT"):
+    serializer = TypeSerializer()
+    return {"eventName": event_name, "dynamodb": {
+        "SequenceNumber": sequence_number,
+        "NewImage": {name: serializer.serialize(value) for name, value in message.items()},
+    }}
+
+
+def message(message_id, body):
+    return {"pk": "c1#0", "conversationID": "c1", "messageID": message_id, "senderID": "user-1", "body": body,
+            "sentAt": 1700000000000}
+
+
+def test_indexes_inserted_messages(index, capsys):
+    first, second = "01HF7YAT3VFB8Q6KT68TWEFJJX", "01HF7YAT3WFB8Q6KT68TWEFJJX"
+    event = {"Records": [
+        stream_record(message(first, "release candidate ready"), "1"),
+        stream_record(message(second, "release notes"), "2"),
+        stream_record(message(second, "edited"), "3", event_name="MODIFY"),
+    ]}
+
+    assert search_indexer.lambda_handler(event, None) == {"batchItemFailures": []}
+    assert {r["messageID"] for r in search_index.search("c1", "release", backend=index)[0]} == {first, second}
+    record = json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+    assert record["MessagesIndexed"] == 2
+
+
+def test_reports_the_records_whose_postings_were_not_written(index):
+    first, second = "01HF7YAT3VFB8Q6KT68TWEFJJX", "01HF7YAT3WFB8Q6KT68TWEFJJX"
+    event = {"Records": [stream_record(message(first, "alpha"), "1"), stream_record(message(second, "beta"), "2")]}
+
+    with patch.object(index, "add", lambda postings: [key for key in postings if key[1] == "beta"]):
+        response = search_indexer.lambda_handler(event, None)
+
+    assert response == {"batchItemFailures": [{"itemIdentifier": "2"}]}
@@ -0,0 +1,77 @@
+import json
+
+# boto3/botocore are loaded lazily by aws_clients on the first DynamoDB call.
+import api_responses
+import aws_clients
+import message_store
+import metrics
+import search_index
+import warmup
+from jwt_verifier import TokenError, authenticate
+
+DEFAULT_PAGE_SIZE = 20
+MAX_QUERY_LENGTH = 200
+
+# --- Precomputed responses ---
+HEADERS = api_responses.cors_headers("GET,OPTIONS", "Content-Type,Authorization")
+PREFLIGHT = api_responses.preflight(HEADERS)
+MISSING_TABLE_BODY = json.dumps({"message": "SEARCH_INDEX_TABLE_NAME environment variable is not set."})
+UNAUTHORIZED_BODY = json.dumps({"message": "Unauthorized"})
+INVALID_LIMIT_BODY = json.dumps({"message": f"limit must be an integer between 1 and {search_index.MAX_PAGE_SIZE}."})
+INVALID_QUERY_BODY = json.dumps({
+    "message": f"q must contain a searchable word and be at most {MAX_QUERY_LENGTH} characters."
+})
+INVALID_CURSOR_BODY = json.dumps({"message": "Invalid cursor."})
+UNKNOWN_CONVERSATION_BODY = json.dumps({"message": "Conversation not found."})
+SEARCH_FAILED_BODY = json.dumps({"message": "Could not search messages."})
+
+
+def parse_limit(params):
+    """Return the requested page size, or None if it is not valid."""
+    raw = params.get("limit")
+    if raw is None:
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(raw)
+    except ValueError:
+        return None
+    return limit if 1 <= limit <= search_index.MAX_PAGE_SIZE else None
+
+
+@metrics.instrument
+@warmup.primes(resources=("dynamodb",), jwks=True, modules=("boto3.dynamodb.conditions",))
+def lambda_handler(event, context):
+    """GET /search?conversationId=...&q=...&limit=20&before=<cursor>: matching message IDs, ranked."""
+    if event.get("httpMethod") == "OPTIONS":
+        return PREFLIGHT
+    if not search_index.SEARCH_INDEX_TABLE_NAME:
+        return api_responses.response(500, HEADERS, MISSING_TABLE_BODY)
+
+    try:
+        user_id = authenticate(event)["sub"]
+    except TokenError:
+        return api_responses.response(401, HEADERS, UNAUTHORIZED_BODY)
+
+    params = event.get("queryStringParameters") or {}
+    limit = parse_limit(params)
+    if limit is None:
+        return api_responses.response(400, HEADERS, INVALID_LIMIT_BODY)
+    query = params.get("q") or ""
+    if len(query) > MAX_QUERY_LENGTH or not search_index.tokenize(query):
+        return api_responses.response(400, HEADERS, INVALID_QUERY_BODY)
+    before = params.get("before")
+    if before is not None and not message_store.is_message_id(before):
+        return api_responses.response(400, HEADERS, INVALID_CURSOR_BODY)
+
+    try:
+        conversation = message_store.member_conversation(params.get("conversationId"), user_id)
+        results, cursor = search_index.search(conversation["conversationID"], query, limit, before)
+    except message_store.NotAMember:
+        return api_responses.response(404, HEADERS, UNKNOWN_CONVERSATION_BODY)
+    except ValueError:
+        return api_responses.response(400, HEADERS, INVALID_CURSOR_BODY)
+    except aws_clients.ClientError as e:
+        print(f"Error searching messages: {e}")
+        return api_responses.response(500, HEADERS, SEARCH_FAILED_BODY)
+
+    return api_responses.response(200, HEADERS, {"results": results, "cursor": cursor})
@@ -0,0 +1,48 @@
+import importlib
+import json
+
+import pytest
+
+import search_index
+import search_messages
+
+pytestmark = pytest.mark.usefixtures("stub_verifier")
+
+
+@pytest.fixture(autouse=True)
+def tables(search_tables):
+    importlib.reload(search_messages)
+    return search_tables
+
+
+def call(params, token="user-1"):
+    event = {"httpMethod": "GET", "headers": {"Authorization": f"Bearer {token}"}, "queryStringParameters": params}
+    response = search_messages.lambda_handler(event, None)
+    return response["statusCode"], json.loads(response["body"])
+
+
+def test_searches_a_conversation(tables):
+    conversation = tables.create_conversation("user-1", ["user-2"])
+    messages = [tables.send_message(conversation, "user-2", body, now=1700000000 + i)[0]
+                for i, body in enumerate(["budget review friday", "review the budget budget", "lunch friday"])]
+    search_index.index_messages(messages)
+
+    status, body = call({"conversationId": conversation["conversationID"], "q": "Budget review"})
+
+    assert status == 200
+    assert [r["messageID"] for r in body["results"]] == [messages[1]["messageID"], messages[0]["messageID"]]
+    assert body["cursor"] is None
+
+
+def test_only_members_can_search(tables):
+    conversation = tables.create_conversation("user-1", ["user-2"])
+
+    assert call({"conversationId": conversation["conversationID"], "q": "budget"}, token="user-3")[0] == 404
+
+
+@pytest.mark.parametrize("params", [{"q": "the"}, {"q": "x" * 201}, {"q": "budget", "limit": "0"},
+                                    {"q": "budget", "before": "bogus"}])
+def test_rejects_bad_parameters(tables, params):
+    conversation = tables.create_conversation("user-1", ["user-2"])
+
+    assert call(dict(params, conversationId=conversation["conversationID"]))[0] == 400
@@ -0,0 +1,78 @@
+import json
+import os
+
+# boto3/botocore are loaded lazily by aws_clients on the first DynamoDB call.
+import api_responses
+import aws_clients
+import message_store
+import metrics
+import warmup
+import ws_connections
+from jwt_verifier import TokenError, authenticate
+
+MESSAGES_TABLE_NAME = os.environ.get("MESSAGES_TABLE_NAME")
+
+# --- Precomputed responses ---
+HEADERS = api_responses.cors_headers("POST,OPTIONS", "Content-Type,Authorization")
+PREFLIGHT = api_responses.preflight(HEADERS)
+MISSING_TABLE_BODY = json.dumps({"message": "MESSAGES_TABLE_NAME environment variable is not set."})
+UNAUTHORIZED_BODY = json.dumps({"message": "Unauthorized"})
+INVALID_JSON_BODY = json.dumps({"message": "Invalid JSON format in request body."})
+INVALID_BODY_BODY = json.dumps({
+    "message": f"body must be a non-empty string of at most {message_store.MAX_BODY_LENGTH} characters."
+})
+INVALID_ATTACHMENTS_BODY = json.dumps({
+    "message": f"attachments must be a list of at most {message_store.MAX_ATTACHMENTS} media keys."
+})
+UNREADABLE_ATTACHMENT_BODY = json.dumps({"message": "You can only attach media you uploaded or were sent."})
+UNKNOWN_CONVERSATION_BODY = json.dumps({"message": "Conversation not found."})
+SEND_FAILED_BODY = json.dumps({"message": "Could not send the message."})
+
+
+@metrics.instrument
+@warmup.primes(resources=("dynamodb",), jwks=True)
+def lambda_handler(event, context):
+    if event.get("httpMethod") == "OPTIONS":
+        return PREFLIGHT
+    if not MESSAGES_TABLE_NAME:
+        return api_responses.response(500, HEADERS, MISSING_TABLE_BODY)
+
+    try:
+        user_id = authenticate(event)["sub"]
+    except TokenError:
+        return api_responses.response(401, HEADERS, UNAUTHORIZED_BODY)
+
+    try:
+        body = json.loads(event.get("body") or "{}")
+        conversation_id = body.get("conversationId")
+        text = body.get("body")
+        attachments = body.get("attachments")
+    except (json.JSONDecodeError, AttributeError):
+        return api_responses.response(400, HEADERS, INVALID_JSON_BODY)
+
+    if not isinstance(text, str) or not text.strip() or len(text) > message_store.MAX_BODY_LENGTH:
+        return api_responses.response(400, HEADERS, INVALID_BODY_BODY)
+    if not message_store.valid_attachments(attachments):
+        return api_responses.response(400, HEADERS, INVALID_ATTACHMENTS_BODY)
+
+    try:
+        conversation = message_store.member_conversation(conversation_id, user_id)
+        message, undelivered = message_store.send_message(conversation, user_id, text, attachments=attachments)
+    except message_store.NotAMember:
+        return api_responses.response(404, HEADERS, UNKNOWN_CONVERSATION_BODY)
+    except message_store.AttachmentNotReadable:
+        return api_responses.response(403, HEADERS, UNREADABLE_ATTACHMENT_BODY)
+    except aws_clients.ClientError as e:
+        print(f"Error sending message: {e}")
+        return api_responses.response(500, HEADERS, SEND_FAILED_BODY)
+
+    if undelivered:
+        # The message is stored (history has it); only these feeds miss it
+        print(f"{len(undelivered)} deliveries of {message['messageID']} were not written")
+    if ws_connections.CONNECTIONS_TABLE_NAME and ws_connections.WEBSOCKET_ENDPOINT:
+        # Also push to members connected over WebSocket
+        try:
+            ws_connections.notify_members(ws_connections.WEBSOCKET_ENDPOINT, conversation, message)
+        except aws_clients.ClientError as e:
+            print(f"Error pushing {message['messageID']}: {e}")
+    return api_responses.response(201, HEADERS, message)
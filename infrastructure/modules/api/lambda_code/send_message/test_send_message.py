@@ -0,0 +1,74 @@
+import importlib
+import json
+
+import pytest
+
+import send_message
+
+pytestmark = pytest.mark.usefixtures("stub_verifier")
+
+
+@pytest.fixture(autouse=True)
+def tables(messaging_tables):
+    importlib.reload(send_message)
+    return messaging_tables
+
+
+def call(body, token="user-1"):
+    event = {"httpMethod": "POST", "headers": {"Authorization": f"Bearer {token}"}, "body": json.dumps(body)}
+    response = send_message.lambda_handler(event, None)
+    return response["statusCode"], json.loads(response["body"])
+
+
+def test_member_can_send(tables):
+    conversation = tables.create_conversation("user-1", ["user-2"])
+
+    status, body = call({"conversationId": conversation["conversationID"], "body": "hello"})
+
+    assert status == 201
+    assert body["senderID"] == "user-1"
+    assert [m["messageID"] for m in tables.since("user-2")[0]] == [body["messageID"]]
+
+
+def test_non_member_gets_not_found(tables):
+    conversation = tables.create_conversation("user-1", ["user-2"])
+
+    assert call({"conversationId": conversation["conversationID"], "body": "hi"}, token="user-3")[0] == 404
+    assert call({"conversationId": "missing", "body": "hi"})[0] == 404
+
+
+@pytest.mark.parametrize("text", [None, "", "   ", "x" * 4001])
+def test_rejects_empty_or_oversized_bodies(tables, text):
+    conversation = tables.create_conversation("user-1", ["user-2"])
+
+    assert call({"conversationId": conversation["conversationID"], "body": text})[0] == 400
+
+
+def test_attachments_must_be_media_the_sender_can_read(tables, media_table):
+    import media_store
+
+    for media_id, user_id in (("mine", "user-1"), ("theirs", "user-3")):
+        media_table.put_item(Item=media_store.pending_item(media_id, user_id, f"uploads/{media_id}.png", "image/png"))
+        media_store.finalize(media_id, user_id, 9)
+    conversation = tables.create_conversation("user-1", ["user-2"])
+    send = {"conversationId": conversation["conversationID"], "body": "look"}
+
+    assert call(dict(send, attachments=["uploads/theirs.png"]))[0] == 403
+    assert call(dict(send, attachments=["private/x"]))[0] == 400
+    status, body = call(dict(send, attachments=["uploads/mine.png"]))
+    assert (status, body["attachments"]) == (201, ["uploads/mine.png"])
+    assert media_store.readable("user-2", ["mine"], tables.member_of("user-2")) == {"mine"}
+
+
+def test_pushes_to_websocket_connections_when_configured(tables, management_api, monkeypatch):
+    import ws_connections
+
+    monkeypatch.setattr(ws_connections, "WEBSOCKET_ENDPOINT", "https://abc.example/dev")
+    ws_connections.register("c2", "user-2")
+    management_api.connect("c2")
+    conversation = tables.create_conversation("user-1", ["user-2"])
+
+    status, body = call({"conversationId": conversation["conversationID"], "body": "hello"})
+
+    assert status == 201
+    assert json.loads(management_api.received["c2"][0])["message"]["messageID"] == body["messageID"]
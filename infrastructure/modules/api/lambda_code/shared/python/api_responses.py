@@ -0,0 +1,95 @@
+"""API Gateway proxy responses shared by the REST handlers.
+
+Static responses (the CORS preflight, validation errors, ...) are built
+once per container with ``static()``: the whole envelope, body already
+serialized, in a read-only dict that every invocation returns as is. The
+CORS header sets from ``cors_headers()`` are read-only the same way, so a
+handler can't change them for the next request by accident; derive a new
+dict (``{**headers, "Retry-After": ...}``) instead.
+
+Dynamic bodies go through ``dumps()``, which uses orjson when the layer
+ships it and the stdlib otherwise. Both write compact JSON without ASCII
+escaping, so the body is the same string whichever backend is loaded.
+"""
+import json
+import os
+
+PREFLIGHT_MESSAGE = "CORS preflight OK"
+
+# Set to "json" to keep the stdlib serializer even when orjson is installed
+_BACKEND_SETTING = os.environ.get("JSON_BACKEND", "auto")
+_backend = None
+
+
+class FrozenDict(dict):
+    """A dict that refuses in-place changes; still serialized like any dict."""
+
+    __slots__ = ()
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("precomputed responses are read-only; copy before changing")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+
+def _stdlib_dumps(obj):
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+
+def _load_backend():
+    # Importing orjson costs a few ms, so it waits for the first dynamic body
+    # instead of landing on every cold start
+    global _backend
+    if _BACKEND_SETTING != "json":
+        try:
+            import orjson
+        except ImportError:
+            pass
+        else:
+            _backend = ("orjson", lambda obj: orjson.dumps(obj).decode())
+            return _backend
+    _backend = ("json", _stdlib_dumps)
+    return _backend
+
+
+def backend():
+    """Name of the serializer ``dumps`` uses: ``"orjson"`` or ``"json"``."""
+    return (_backend or _load_backend())[0]
+
+
+def dumps(obj):
+    """Serialize a response body to a compact JSON string."""
+    return (_backend or _load_backend())[1](obj)
+
+
+def cors_headers(methods, allow_headers="Content-Type"):
+    """Read-only CORS headers for a resource answering ``methods`` (e.g. ``"POST,OPTIONS"``)."""
+    return FrozenDict({
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Headers": allow_headers,
+        "Access-Control-Allow-Methods": methods,
+    })
+
+
+def static(status_code, headers, body):
+    """Precompute a read-only response; ``body`` is serialized now unless it is a str."""
+    return FrozenDict({
+        "statusCode": status_code,
+        "headers": headers,
+        "body": body if isinstance(body, str) else _stdlib_dumps(body),
+    })
+
+
+def preflight(headers):
+    """The OPTIONS response for a resource with these CORS headers."""
+    return static(200, headers, {"message": PREFLIGHT_MESSAGE})
+
+
+def response(status_code, headers, body):
+    """Build a response for a dynamic ``body`` (a str is used as is)."""
+    return {
+        "statusCode": status_code,
+        "headers": headers,
+        "body": body if isinstance(body, str) else dumps(body),
+    }
@@ -0,0 +1,147 @@
+"""Shared boto3 session and client cache for the ChatApp Lambda functions.
+
+Clients are created on first use and kept for the life of the execution
+environment, so warm invocations skip session setup, endpoint resolution and
+connection establishment. Tests can swap in fakes with ``set_client`` /
+``set_resource`` and clear everything with ``reset``.
+
+boto3/botocore are imported on first use rather than at module load, so
+handlers can import this module without paying ~200ms of cold-start import
+time on code paths (CORS preflight, input validation) that never reach AWS.
+``aws_clients.ClientError`` and ``aws_clients.BotoCoreError`` resolve the
+``botocore.exceptions`` classes lazily for the same reason; in an ``except``
+clause they are only evaluated once an exception is actually raised.
+
+Every session gets the ``metrics`` call timers, so all clients and resources
+created from it report their API call latency per invocation.
+"""
+import os
+import threading
+
+import metrics
+
+DEFAULT_REGION = "us-east-1"
+
+_lock = threading.RLock()
+_config = None
+_sessions = {}
+_clients = {}
+_resources = {}
+_client_overrides = {}
+_resource_overrides = {}
+
+
+def __getattr__(name):
+    if name in ("ClientError", "BotoCoreError"):
+        from botocore import exceptions
+
+        error = globals()[name] = getattr(exceptions, name)
+        return error
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _region(region_name):
+    return region_name or os.environ.get("AWS_REGION") or DEFAULT_REGION
+
+
+def client_config():
+    """Return the shared botocore ``Config`` used for every client and resource.
+
+    A larger pool lets fan-out code (thread pools, batch writers) reuse
+    connections instead of opening new ones; keep-alive stops idle sockets
+    being dropped between warm invocations.
+    """
+    global _config
+    if _config is None:
+        from botocore.config import Config
+
+        _config = Config(
+            max_pool_connections=int(os.environ.get("AWS_MAX_POOL_CONNECTIONS", "50")),
+            tcp_keepalive=True,
+            connect_timeout=3,
+            read_timeout=10,
+            retries={"mode": "standard", "max_attempts": 3},
+        )
+    return _config
+
+
+def get_session(region_name=None):
+    """Return the cached boto3 session for a region, creating it on first use."""
+    region = _region(region_name)
+    session = _sessions.get(region)
+    if session is None:
+        with _lock:
+            session = _sessions.get(region)
+            if session is None:
+                import boto3.session
+
+                session = boto3.session.Session(region_name=region)
+                # Clients copy the session's event hooks when they are created
+                metrics.track(session.events)
+                _sessions[region] = session
+    return session
+
+
+def get_client(service_name, region_name=None, endpoint_url=None, signature_version=None):
+    """Return a cached low-level client for ``service_name``.
+
+    ``endpoint_url`` is for services addressed per deployment, such as the
+    API Gateway management API of a WebSocket stage; each endpoint gets its
+    own cached client. ``signature_version`` (e.g. ``"s3v4"``) gets a
+    separate client for presigning with a specific signer.
+    """
+    if service_name in _client_overrides:
+        return _client_overrides[service_name]
+
+    key = (service_name, _region(region_name), endpoint_url, signature_version)
+    client = _clients.get(key)
+    if client is None:
+        session = get_session(key[1])
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                config = client_config()
+                if signature_version:
+                    from botocore.config import Config
+
+                    config = config.merge(Config(signature_version=signature_version))
+                client = session.client(service_name, endpoint_url=endpoint_url, config=config)
+                _clients[key] = client
+    return client
+
+
+def get_resource(service_name, region_name=None):
+    """Return a cached resource (e.g. ``dynamodb``) for ``service_name``."""
+    if service_name in _resource_overrides:
+        return _resource_overrides[service_name]
+
+    key = (service_name, _region(region_name))
+    resource = _resources.get(key)
+    if resource is None:
+        session = get_session(key[1])
+        with _lock:
+            resource = _resources.get(key)
+            if resource is None:
+                resource = session.resource(service_name, config=client_config())
+                _resources[key] = resource
+    return resource
+
+
+def set_client(service_name, client):
+    """Inject a client (usually a fake) returned for every region."""
+    _client_overrides[service_name] = client
+
+
+def set_resource(service_name, resource):
+    """Inject a resource (usually a fake) returned for every region."""
+    _resource_overrides[service_name] = resource
+
+
+def reset():
+    """Drop every cached session, client, resource and override."""
+    with _lock:
+        _sessions.clear()
+        _clients.clear()
+        _resources.clear()
+        _client_overrides.clear()
+        _resource_overrides.clear()
@@ -0,0 +1,106 @@
+"""CloudFront signed URLs (canned policy) without a crypto dependency.
+
+A canned-policy URL carries ``Expires``, ``Key-Pair-Id`` and an RSA-SHA1
+(PKCS#1 v1.5) signature over the policy JSON CloudFront rebuilds from the
+URL. Signing is one modular exponentiation, done here in pure Python (with
+the CRT parameters when the key provides them), so the layer does not need
+``cryptography`` or ``rsa``. The private key is read from a PEM document,
+either PKCS#1 (``BEGIN RSA PRIVATE KEY``) or unencrypted PKCS#8
+(``BEGIN PRIVATE KEY``).
+"""
+import base64
+import hashlib
+import json
+from urllib.parse import quote
+
+import aws_clients
+
+# DER-encoded DigestInfo prefix for SHA-1 (RFC 8017, section 9.2)
+_SHA1_DIGEST_INFO = bytes.fromhex("3021300906052b0e03021a05000414")
+# CloudFront's URL-safe variant of base64
+_URL_SAFE = str.maketrans("+=/", "-_~")
+
+
+def _der_elements(data):
+    """Split DER ``data`` into its top-level ``(tag, value)`` elements."""
+    elements, pos = [], 0
+    while pos < len(data):
+        tag, length = data[pos], data[pos + 1]
+        pos += 2
+        if length & 0x80:
+            size = length & 0x7F
+            length = int.from_bytes(data[pos:pos + size], "big")
+            pos += size
+        elements.append((tag, data[pos:pos + length]))
+        pos += length
+    return elements
+
+
+def parse_private_key(pem):
+    """Return ``{n, e, d, p, q, dp, dq, qinv}`` from a PKCS#1 or PKCS#8 RSA PEM."""
+    body = "".join(line for line in pem.strip().splitlines() if not line.startswith("-----"))
+    try:
+        (tag, sequence), = _der_elements(base64.b64decode(body))
+        fields = _der_elements(sequence)
+        if len(fields) == 3 and fields[2][0] == 0x04:
+            # PKCS#8 PrivateKeyInfo: version, algorithm, OCTET STRING(PKCS#1 key)
+            (tag, sequence), = _der_elements(fields[2][1])
+            fields = _der_elements(sequence)
+        numbers = [int.from_bytes(value, "big") for tag, value in fields[1:9] if tag == 0x02]
+    except (ValueError, IndexError):
+        raise ValueError("Not a PEM-encoded RSA private key")
+    if len(numbers) != 8:
+        raise ValueError("Not a PEM-encoded RSA private key")
+    return dict(zip(("n", "e", "d", "p", "q", "dp", "dq", "qinv"), numbers))
+
+
+class CloudFrontSigner:
+    """Builds canned-policy signed URLs for one distribution and one key pair."""
+
+    def __init__(self, domain, key_pair_id, key):
+        self.domain = domain
+        self.key_pair_id = key_pair_id
+        self.key = key
+        self.size = (key["n"].bit_length() + 7) // 8
+
+    @classmethod
+    def from_pem(cls, domain, key_pair_id, pem):
+        return cls(domain, key_pair_id, parse_private_key(pem))
+
+    @classmethod
+    def from_parameter(cls, domain, key_pair_id, parameter_name):
+        """Build a signer whose private key is the SSM SecureString ``parameter_name``."""
+        response = aws_clients.get_client("ssm").get_parameter(Name=parameter_name, WithDecryption=True)
+        return cls.from_pem(domain, key_pair_id, response["Parameter"]["Value"])
+
+    def _sign(self, message):
+        digest_info = _SHA1_DIGEST_INFO + hashlib.sha1(message).digest()
+        encoded = b"\x00\x01" + b"\xff" * (self.size - len(digest_info) - 3) + b"\x00" + digest_info
+        m = int.from_bytes(encoded, "big")
+        key = self.key
+        if key.get("p"):
+            m1 = pow(m, key["dp"], key["p"])
+            m2 = pow(m, key["dq"], key["q"])
+            s = m2 + key["q"] * ((key["qinv"] * (m1 - m2)) % key["p"])
+        else:
+            s = pow(m, key["d"], key["n"])
+        return s.to_bytes(self.size, "big")
+
+    def signed_url(self, key, signed_at, expires_in, params=None):
+        """Return a URL for ``key`` that CloudFront accepts until ``signed_at + expires_in``.
+
+        Takes the same arguments as ``s3_signing.GetUrlSigner.signed_url``;
+        ``params`` are added to the URL (and to the signed resource).
+        """
+        expires = int(signed_at + expires_in)
+        url = f"https://{self.domain}/{quote(key, safe='/~')}"
+        if params:
+            url += "?" + "&".join(f"{quote(name, safe='-_.~')}={quote(value, safe='-_.~')}"
+                                  for name, value in sorted(params.items()))
+        policy = json.dumps(
+            {"Statement": [{"Resource": url, "Condition": {"DateLessThan": {"AWS:EpochTime": expires}}}]},
+            separators=(",", ":"),
+        )
+        signature = base64.b64encode(self._sign(policy.encode("utf-8"))).decode("ascii").translate(_URL_SAFE)
+        separator = "&" if params else "?"
+        return f"{url}{separator}Expires={expires}&Signature={signature}&Key-Pair-Id={self.key_pair_id}"
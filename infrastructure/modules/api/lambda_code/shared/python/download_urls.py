@@ -0,0 +1,104 @@
+"""Signed download URLs for media, reused for a whole expiry window.
+
+Time is cut into windows of ``DOWNLOAD_URL_WINDOW_SECONDS``. Every URL
+handed out during a window is signed as of the window's start and expires
+two windows later, so it stays valid for at least one full window after it
+is returned. The signing time and lifetime only change at window
+boundaries, so the browser's cache (keyed by URL) can serve repeat views
+of a URL it has already loaded. Within a container the signed URLs are
+also kept in a ``TTLCache`` until their window ends, so a repeat costs a
+dictionary lookup rather than a signature.
+
+URLs point at the CloudFront distribution when ``CDN_DOMAIN_NAME`` and
+``CDN_KEY_PAIR_ID`` are set (the private key is read from the SSM
+parameter ``CDN_PRIVATE_KEY_PARAMETER``), otherwise at the bucket.
+CloudFront URLs depend only on the key, the window and the key pair, so
+every container hands out the same URL for a key within a window. S3 URLs
+are signed with the function's temporary credentials, whose access key
+and session token are part of the URL. They repeat only within one
+container (and one credential rotation), so a browser that reaches
+another container gets a new URL and downloads again. Those credentials
+also limit the URLs' lifetime, so keep the window well below the role
+session's duration.
+"""
+import os
+import time
+
+from ttl_cache import TTLCache
+
+MEDIA_BUCKET_NAME = os.environ.get("MEDIA_BUCKET_NAME")
+CDN_DOMAIN_NAME = os.environ.get("CDN_DOMAIN_NAME")
+CDN_KEY_PAIR_ID = os.environ.get("CDN_KEY_PAIR_ID")
+CDN_PRIVATE_KEY_PARAMETER = os.environ.get("CDN_PRIVATE_KEY_PARAMETER")
+
+WINDOW_SECONDS = int(os.environ.get("DOWNLOAD_URL_WINDOW_SECONDS", "3600"))
+CACHE_SIZE = int(os.environ.get("DOWNLOAD_URL_CACHE_SIZE", "10000"))
+
+# Media objects never change once written, so a browser may keep one for as
+# long as its URL can be used
+CACHE_CONTROL = f"private, max-age={2 * WINDOW_SECONDS}, immutable"
+
+# Keys a download URL may be issued for: originals and their renditions
+DOWNLOAD_PREFIXES = ("uploads/", "derived/")
+
+
+def is_downloadable(key):
+    """True for a media object key (not a path outside the media prefixes)."""
+    return (isinstance(key, str) and key.startswith(DOWNLOAD_PREFIXES)
+            and ".." not in key.split("/") and len(key) <= 1024)
+
+
+class DownloadUrlCache:
+    """Signs URLs with ``signer`` once per window and hands out the same URL until the window ends.
+
+    ``signer`` has ``signed_url(key, signed_at, expires_in, params)``, like
+    ``s3_signing.GetUrlSigner`` and ``cloudfront_signing.CloudFrontSigner``.
+    """
+
+    def __init__(self, signer, window=WINDOW_SECONDS, params=None, maxsize=CACHE_SIZE, clock=time.time):
+        self.signer = signer
+        self.window = window
+        self.params = params
+        self.clock = clock
+        self.signed = 0
+        self.cache = TTLCache(maxsize=maxsize, ttl=window, clock=clock)
+
+    def get(self, key):
+        """Return ``(url, expires_at)`` for ``key``."""
+        now = self.clock()
+        start = int(now // self.window) * self.window
+        entry = self.cache.get(key)
+        if entry is None or entry[0] != start:
+            expires_in = 2 * self.window
+            entry = (start, self.signer.signed_url(key, start, expires_in, self.params), start + expires_in)
+            self.signed += 1
+            self.cache.set(key, entry, ttl=start + self.window - now)
+        return entry[1], entry[2]
+
+
+_default_cache = None
+
+
+def get_cache():
+    """Return the container's cache, signing for the CDN if one is configured, else for the bucket."""
+    global _default_cache
+    if _default_cache is None:
+        if CDN_DOMAIN_NAME and CDN_KEY_PAIR_ID:
+            import cloudfront_signing
+
+            signer = cloudfront_signing.CloudFrontSigner.from_parameter(
+                CDN_DOMAIN_NAME, CDN_KEY_PAIR_ID, CDN_PRIVATE_KEY_PARAMETER)
+            # The distribution's response headers policy sets Cache-Control
+            _default_cache = DownloadUrlCache(signer)
+        else:
+            import s3_signing
+
+            signer = s3_signing.GetUrlSigner.from_session(MEDIA_BUCKET_NAME)
+            _default_cache = DownloadUrlCache(signer, params={"response-cache-control": CACHE_CONTROL})
+    return _default_cache
+
+
+def set_cache(cache):
+    """Replace the container's cache (tests, benchmarks); ``None`` resets it."""
+    global _default_cache
+    _default_cache = cache
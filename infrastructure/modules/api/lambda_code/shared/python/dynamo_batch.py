@@ -0,0 +1,101 @@
+"""DynamoDB batch helpers shared by the ChatApp Lambda functions.
+
+``batch_write`` splits items into 25-item ``BatchWriteItem`` calls and keeps
+re-sending whatever DynamoDB hands back as ``UnprocessedItems`` (throttling,
+partition limits) with exponential backoff and jitter; ``batch_delete`` does
+the same with delete requests. ``batch_get`` does the
+same for reads: 100-key ``BatchGetItem`` calls, ``UnprocessedKeys`` retried.
+"""
+import random
+import time
+
+import aws_clients
+
+BATCH_WRITE_LIMIT = 25
+BATCH_GET_LIMIT = 100
+MAX_ATTEMPTS = 6
+BASE_DELAY = 0.05
+MAX_DELAY = 2.0
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _backoff(attempt, base_delay):
+    # "Full jitter": sleep a random amount up to the exponential cap
+    time.sleep(random.uniform(0, min(MAX_DELAY, base_delay * (2 ** attempt))))
+
+
+def _write_requests(table_name, requests, dynamodb, max_attempts, base_delay):
+    """Send ``requests`` with ``BatchWriteItem``; return those still unprocessed."""
+    dynamodb = dynamodb or aws_clients.get_resource("dynamodb")
+    failed = []
+
+    for chunk in _chunks(list(requests), BATCH_WRITE_LIMIT):
+        pending = {table_name: chunk}
+        for attempt in range(max_attempts):
+            response = dynamodb.batch_write_item(RequestItems=pending)
+            pending = response.get("UnprocessedItems") or {}
+            if not pending:
+                break
+            if attempt < max_attempts - 1:
+                _backoff(attempt, base_delay)
+        failed.extend(pending.get(table_name, []))
+
+    return failed
+
+
+def batch_write(table_name, items, dynamodb=None, max_attempts=MAX_ATTEMPTS, base_delay=BASE_DELAY):
+    """Put ``items`` into ``table_name`` using ``BatchWriteItem``.
+
+    Uses the ``dynamodb`` resource (plain Python values, no type descriptors).
+    Returns the items that were still unprocessed after ``max_attempts``
+    rounds; an empty list means everything was written.
+    """
+    requests = ({"PutRequest": {"Item": item}} for item in items)
+    failed = _write_requests(table_name, requests, dynamodb, max_attempts, base_delay)
+    return [request["PutRequest"]["Item"] for request in failed]
+
+
+def batch_delete(table_name, keys, dynamodb=None, max_attempts=MAX_ATTEMPTS, base_delay=BASE_DELAY):
+    """Delete the items with ``keys`` from ``table_name`` using ``BatchWriteItem``.
+
+    Returns the keys still unprocessed after ``max_attempts`` rounds.
+    """
+    requests = ({"DeleteRequest": {"Key": key}} for key in keys)
+    failed = _write_requests(table_name, requests, dynamodb, max_attempts, base_delay)
+    return [request["DeleteRequest"]["Key"] for request in failed]
+
+
+def batch_get(table_name, keys, dynamodb=None, attributes=None, max_attempts=MAX_ATTEMPTS, base_delay=BASE_DELAY):
+    """Read ``keys`` from ``table_name`` using ``BatchGetItem``.
+
+    ``attributes`` limits the attributes returned. Returns ``(items,
+    unprocessed, capacity_units)``: the items found (keys with no item are
+    simply absent), the keys still unread after ``max_attempts`` rounds, and
+    the read capacity the calls consumed.
+    """
+    dynamodb = dynamodb or aws_clients.get_resource("dynamodb")
+    items, unprocessed, capacity_units = [], [], 0.0
+
+    for chunk in _chunks(list(keys), BATCH_GET_LIMIT):
+        request = {"Keys": chunk}
+        if attributes:
+            names = {f"#a{index}": name for index, name in enumerate(attributes)}
+            request["ProjectionExpression"] = ", ".join(names)
+            request["ExpressionAttributeNames"] = names
+        pending = {table_name: request}
+        for attempt in range(max_attempts):
+            response = dynamodb.batch_get_item(RequestItems=pending, ReturnConsumedCapacity="TOTAL")
+            items.extend(response.get("Responses", {}).get(table_name, []))
+            capacity_units += sum(used.get("CapacityUnits", 0) for used in response.get("ConsumedCapacity") or [])
+            pending = response.get("UnprocessedKeys") or {}
+            if not pending:
+                break
+            if attempt < max_attempts - 1:
+                _backoff(attempt, base_delay)
+        unprocessed.extend(pending.get(table_name, {}).get("Keys", []))
+
+    return items, unprocessed, capacity_units
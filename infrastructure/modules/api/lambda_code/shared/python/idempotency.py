@@ -0,0 +1,178 @@
+"""``Idempotency-Key`` support: answer client retries with the first response.
+
+One ``idempotency`` table, partition key ``pk`` = ``<scope>#<caller>#<key>``.
+The caller is the authenticated user or IAM principal; an anonymous
+request (public /signup) has none, so its key is scoped to the request's
+fingerprint instead and clients that happen to pick the same key never
+meet each other's records. A request
+with a new key claims it with a conditional put of an ``IN_PROGRESS``
+record, runs, and stores its response on the record; a retry with the
+same key gets that response back (with ``Idempotent-Replayed: true``)
+without running again. The conditional put is what catches duplicates that
+arrive while the first request is still running: they get a 409 and retry.
+
+* Each record carries a fingerprint of the request; reusing a key for a
+  different request is a 422 rather than someone else's response.
+* Only responses that a retry would reproduce are stored (below 500, not
+  429). Otherwise the claim is released so the retry runs normally.
+* A claim whose Lambda died is taken over after ``IN_PROGRESS_SECONDS``;
+  records expire (``expiresAt`` TTL) after the scope's ``ttl``.
+* Failures of the store itself run the request as if it had no key.
+"""
+import json
+import os
+import time
+
+import aws_clients
+
+IDEMPOTENCY_TABLE_NAME = os.environ.get("IDEMPOTENCY_TABLE_NAME")
+
+HEADER = "idempotency-key"
+MAX_KEY_LENGTH = 255
+DEFAULT_TTL_SECONDS = int(os.environ.get("IDEMPOTENCY_TTL_SECONDS", "86400"))
+# Longer than the API's 30 s integration timeout
+IN_PROGRESS_SECONDS = 60
+
+IN_PROGRESS = "IN_PROGRESS"
+COMPLETED = "COMPLETED"
+
+# --- Precomputed response bodies ---
+INVALID_KEY_BODY = json.dumps({"message": f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters."})
+IN_PROGRESS_BODY = json.dumps({"message": "A request with this Idempotency-Key is still in progress."})
+MISMATCH_BODY = json.dumps({"message": "This Idempotency-Key was already used for a different request."})
+
+
+def _table():
+    return aws_clients.get_resource("dynamodb").Table(IDEMPOTENCY_TABLE_NAME)
+
+
+def request_key(event):
+    """Return the request's ``Idempotency-Key`` header (any case), or None."""
+    for name, value in (event.get("headers") or {}).items():
+        if name.lower() == HEADER:
+            return value
+    return None
+
+
+def fingerprint(material):
+    """Digest of the parts of a request that must match on replay (JSON-serialisable)."""
+    # Only requests that carry a key pay for importing hashlib
+    import hashlib
+
+    return hashlib.sha256(json.dumps(material, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _cacheable(response):
+    status = response.get("statusCode", 200)
+    return status < 500 and status != 429
+
+
+def _stored(item):
+    # Items returned by a failed condition check are in the low-level format
+    from boto3.dynamodb.types import TypeDeserializer
+
+    deserializer = TypeDeserializer()
+    return {name: deserializer.deserialize(value) for name, value in item.items()}
+
+
+def _replay(item, headers):
+    response = item["response"]
+    return {
+        "statusCode": int(response["statusCode"]),
+        "headers": {**headers, "Idempotent-Replayed": "true"},
+        "body": response.get("body"),
+    }
+
+
+def _claim(pk, digest, ttl):
+    """Claim ``pk``; returns the existing record if someone else holds or completed it."""
+    now = int(time.time())
+    try:
+        _table().put_item(
+            Item={
+                "pk": pk,
+                "status": IN_PROGRESS,
+                "fingerprint": digest,
+                "lockedUntil": now + IN_PROGRESS_SECONDS,
+                "expiresAt": now + ttl,
+            },
+            # Expired records linger until TTL deletes them; stale claims are abandoned
+            ConditionExpression="attribute_not_exists(pk) OR expiresAt < :now "
+                                "OR (#status = :in_progress AND lockedUntil < :now)",
+            ExpressionAttributeNames={"#status": "status"},
+            ExpressionAttributeValues={":now": now, ":in_progress": IN_PROGRESS},
+            ReturnValuesOnConditionCheckFailure="ALL_OLD",
+        )
+    except aws_clients.ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        return _stored(e.response.get("Item") or {})
+    return None
+
+
+def _complete(pk, response, ttl):
+    # Headers are the handler's static CORS set, so only status and body are kept
+    stored = {"statusCode": response.get("statusCode", 200), "body": response.get("body")}
+    _table().update_item(
+        Key={"pk": pk},
+        UpdateExpression="SET #status = :completed, #response = :response, expiresAt = :expires",
+        ExpressionAttributeNames={"#status": "status", "#response": "response"},
+        ExpressionAttributeValues={
+            ":completed": COMPLETED,
+            ":response": stored,
+            ":expires": int(time.time()) + ttl,
+        },
+    )
+
+
+def _release(pk):
+    _table().delete_item(Key={"pk": pk})
+
+
+def handle(scope, event, caller, material, run, headers, ttl=DEFAULT_TTL_SECONDS):
+    """Return ``run()``'s response, or the stored one if this key has been seen.
+
+    ``material`` is what identifies the request for the fingerprint (e.g.
+    the parsed body without secrets); ``caller`` is None for anonymous
+    requests. ``headers`` are added to the responses built here. Without a
+    key, or without a table, it is just ``run()``.
+    """
+    key = request_key(event)
+    if key is None or not IDEMPOTENCY_TABLE_NAME:
+        return run()
+    if not isinstance(key, str) or not 0 < len(key) <= MAX_KEY_LENGTH:
+        return {"statusCode": 400, "headers": headers, "body": INVALID_KEY_BODY}
+
+    digest = fingerprint(material)
+    pk = f"{scope}#{caller or digest}#{key}"
+    try:
+        existing = _claim(pk, digest, ttl)
+    except (aws_clients.ClientError, aws_clients.BotoCoreError) as e:
+        print(f"Idempotency store unavailable, running without it: {e}")
+        return run()
+
+    if existing is not None:
+        if existing.get("fingerprint") != digest:
+            return {"statusCode": 422, "headers": headers, "body": MISMATCH_BODY}
+        if existing.get("status") == COMPLETED:
+            return _replay(existing, headers)
+        return {"statusCode": 409, "headers": {**headers, "Retry-After": "1"}, "body": IN_PROGRESS_BODY}
+
+    try:
+        response = run()
+    except Exception:
+        _safely(_release, pk)
+        raise
+    if _cacheable(response):
+        _safely(_complete, pk, response, ttl)
+    else:
+        _safely(_release, pk)
+    return response
+
+
+def _safely(operation, *args):
+    try:
+        operation(*args)
+    except (aws_clients.ClientError, aws_clients.BotoCoreError) as e:
+        # The claim then lapses after IN_PROGRESS_SECONDS
+        print(f"Idempotency store update failed: {e}")
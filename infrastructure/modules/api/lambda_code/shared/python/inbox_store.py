@@ -0,0 +1,202 @@
+"""Per-user inbox: one summary item per (user, conversation).
+
+Key design:
+
+* ``inbox`` - partition ``userID``, sort key ``conversationID``, with the
+  local secondary index ``userID-lastActivityAt-index`` ordering a user's
+  summaries by recency. Opening the app is one paginated Query on that
+  index, however many conversations the user is in.
+* Each summary holds the conversation name, the last message (ID, sender,
+  a preview of its body and when it was sent) and ``unreadCount``.
+
+Summaries are written when a conversation is created and updated when a
+message is sent: one UpdateItem per member that bumps ``unreadCount`` with
+``ADD`` (except for the sender) and sets the last message, conditional on
+it being newer than the one stored. Message IDs sort by send time, so a
+late write never replaces a newer message; when the condition fails only
+the counter is bumped. ``mark_read`` resets the counter.
+"""
+import base64
+import json
+import os
+import time
+
+import aws_clients
+
+INBOX_TABLE_NAME = os.environ.get("INBOX_TABLE_NAME")
+RECENCY_INDEX_NAME = "userID-lastActivityAt-index"
+
+UPDATE_WORKERS = int(os.environ.get("INBOX_UPDATE_WORKERS", "16"))
+PREVIEW_LENGTH = 200
+MAX_PAGE_SIZE = 100
+
+_CURSOR_FIELDS = {"userID", "conversationID", "lastActivityAt"}
+
+
+def _table(table_name=None):
+    return aws_clients.get_resource("dynamodb").Table(table_name or INBOX_TABLE_NAME)
+
+
+def _is_conditional_failure(error):
+    return error.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException"
+
+
+def summary(item):
+    """Client view of an inbox item (numbers as ints, no partition key)."""
+    result = {
+        "conversationID": item["conversationID"],
+        "unreadCount": int(item.get("unreadCount", 0)),
+        "lastActivityAt": int(item["lastActivityAt"]),
+    }
+    if "conversationName" in item:
+        result["name"] = item["conversationName"]
+    for field in ("lastMessageID", "lastSenderID", "lastMessagePreview"):
+        if field in item:
+            result[field] = item[field]
+    return result
+
+
+# --- Writes ---
+
+def add_conversation(conversation, table_name=None):
+    """Give every member of a new conversation an empty summary; return the items not written."""
+    import dynamo_batch
+
+    items = []
+    for member in conversation["members"]:
+        item = {
+            "userID": member,
+            "conversationID": conversation["conversationID"],
+            "unreadCount": 0,
+            "lastActivityAt": conversation["createdAt"],
+        }
+        if conversation.get("name"):
+            item["conversationName"] = conversation["name"]
+        items.append(item)
+    return dynamo_batch.batch_write(table_name or INBOX_TABLE_NAME, items)
+
+
+def _record_for_member(table, conversation, message, member):
+    increment = 0 if member == message["senderID"] else 1
+    key = {"userID": member, "conversationID": conversation["conversationID"]}
+    assignments = ["lastMessageID = :id", "lastSenderID = :sender", "lastMessagePreview = :preview",
+                   "lastActivityAt = :at"]
+    values = {
+        ":id": message["messageID"],
+        ":sender": message["senderID"],
+        ":preview": message["body"][:PREVIEW_LENGTH],
+        ":at": message["sentAt"],
+        ":inc": increment,
+    }
+    if conversation.get("name"):
+        # Also fills in summaries of conversations created before the inbox existed
+        assignments.append("conversationName = :name")
+        values[":name"] = conversation["name"]
+    try:
+        table.update_item(
+            Key=key,
+            UpdateExpression=f"SET {', '.join(assignments)} ADD unreadCount :inc",
+            ConditionExpression="attribute_not_exists(lastMessageID) OR lastMessageID < :id",
+            ExpressionAttributeValues=values,
+        )
+    except aws_clients.ClientError as e:
+        if not _is_conditional_failure(e):
+            raise
+        # A newer message is already recorded; this one still counts as unread
+        if increment:
+            table.update_item(Key=key, UpdateExpression="ADD unreadCount :inc",
+                              ExpressionAttributeValues={":inc": increment})
+
+
+def record_message(conversation, message, table_name=None):
+    """Update every member's summary for a new ``message``; return the members whose update failed."""
+    table = _table(table_name)
+
+    def record(member):
+        try:
+            _record_for_member(table, conversation, message, member)
+            return None
+        except aws_clients.ClientError as e:
+            print(f"Could not update the inbox of {member}: {e}")
+            return member
+
+    members = conversation["members"]
+    if len(members) == 1:
+        outcomes = [record(members[0])]
+    else:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=min(UPDATE_WORKERS, len(members))) as pool:
+            outcomes = list(pool.map(record, members))
+    return [member for member in outcomes if member is not None]
+
+
+def mark_read(user_id, conversation_id, up_to=None, table_name=None, now=None):
+    """Reset ``user_id``'s unread count for a conversation; return ``(summary, reset)``.
+
+    With ``up_to`` (the last message ID the client has shown), the counter is
+    only reset if no newer message has arrived since; otherwise the current
+    summary is returned with ``reset`` False. ``summary`` is None if the
+    user has no summary for the conversation.
+    """
+    table = _table(table_name)
+    key = {"userID": user_id, "conversationID": conversation_id}
+    condition = "attribute_exists(userID)"
+    values = {":zero": 0, ":now": int((time.time() if now is None else now) * 1000)}
+    if up_to:
+        condition += " AND (attribute_not_exists(lastMessageID) OR lastMessageID <= :upTo)"
+        values[":upTo"] = up_to
+    try:
+        response = table.update_item(
+            Key=key,
+            UpdateExpression="SET unreadCount = :zero, readAt = :now",
+            ConditionExpression=condition,
+            ExpressionAttributeValues=values,
+            ReturnValues="ALL_NEW",
+        )
+    except aws_clients.ClientError as e:
+        if not _is_conditional_failure(e):
+            raise
+        item = table.get_item(Key=key).get("Item")
+        return (summary(item) if item else None), False
+    return summary(response["Attributes"]), True
+
+
+# --- Reads ---
+
+def encode_cursor(last_evaluated_key):
+    if not last_evaluated_key:
+        return None
+    key = {name: int(value) if name == "lastActivityAt" else value for name, value in last_evaluated_key.items()}
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return the ExclusiveStartKey for ``cursor``. Raises ValueError if it is not one of ours."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(key, dict) or set(key) != _CURSOR_FIELDS:
+        raise ValueError("Invalid cursor")
+    return key
+
+
+def list_inbox(user_id, limit=20, cursor=None, table_name=None):
+    """Return ``(summaries, next_cursor)`` for one page of ``user_id``'s inbox, most recent first."""
+    from boto3.dynamodb.conditions import Key
+
+    kwargs = {
+        "IndexName": RECENCY_INDEX_NAME,
+        "KeyConditionExpression": Key("userID").eq(user_id),
+        "ScanIndexForward": False,
+        "Limit": max(1, min(limit, MAX_PAGE_SIZE)),
+    }
+    if cursor:
+        start_key = decode_cursor(cursor)
+        if start_key["userID"] != user_id:
+            raise ValueError("Invalid cursor")
+        kwargs["ExclusiveStartKey"] = start_key
+
+    response = _table(table_name).query(**kwargs)
+    return [summary(item) for item in response.get("Items", [])], encode_cursor(response.get("LastEvaluatedKey"))
@@ -0,0 +1,256 @@
+"""Local verification of Cognito id/access tokens (RS256 JWTs).
+
+Tokens are checked against the user pool's JWKS without calling Cognito:
+
+* the JWKS is cached in memory and in ``/tmp`` (so a restarted runtime in the
+  same execution environment does not refetch it), refreshed when it is older
+  than ``JWKS_MAX_AGE`` and refetched early when a token names an unknown
+  ``kid`` (key rotation), rate-limited so junk ``kid`` values cannot turn into
+  a fetch per request;
+* RS256 signatures are verified in pure Python (PKCS#1 v1.5 over SHA-256), so
+  no crypto dependency has to be shipped in the layer;
+* the claims of every verified token are memoized until the token expires, so
+  repeat requests with the same token cost a dictionary lookup.
+
+Handlers normally only need ``authenticate(event)``, which reads the
+``Authorization: Bearer <token>`` header and returns the verified claims or
+raises ``TokenError``.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+
+from ttl_cache import TTLCache
+
+JWKS_MAX_AGE = int(os.environ.get("JWKS_MAX_AGE_SECONDS", "3600"))
+JWKS_MIN_REFETCH_INTERVAL = 60
+JWKS_CACHE_DIR = os.environ.get("JWKS_CACHE_DIR", "/tmp")
+CLAIMS_CACHE_SIZE = 4096
+CLOCK_LEEWAY = 5
+
+# DER-encoded DigestInfo prefix for SHA-256 (RFC 8017, section 9.2)
+_SHA256_DIGEST_INFO = bytes.fromhex("3031300d060960864801650304020105000420")
+
+
+class TokenError(Exception):
+    """Raised when a token is missing, malformed, expired or not signed by the pool."""
+
+
+def _b64url_decode(segment):
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+def _b64url_int(segment):
+    return int.from_bytes(_b64url_decode(segment), "big")
+
+
+def rsa_sha256_verify(signing_input, signature, n, e):
+    """Verify an RSASSA-PKCS1-v1_5 SHA-256 signature against public key ``(n, e)``."""
+    k = (n.bit_length() + 7) // 8
+    if len(signature) != k:
+        return False
+    s = int.from_bytes(signature, "big")
+    if s >= n:
+        return False
+    encoded = pow(s, e, n).to_bytes(k, "big")
+    digest_info = _SHA256_DIGEST_INFO + hashlib.sha256(signing_input).digest()
+    expected = b"\x00\x01" + b"\xff" * (k - len(digest_info) - 3) + b"\x00" + digest_info
+    return hmac.compare_digest(encoded, expected)
+
+
+def _http_get_json(url):
+    # urllib pulls in http.client/ssl; only pay for it when a fetch happens
+    import urllib.request
+
+    with urllib.request.urlopen(url, timeout=3) as response:
+        return json.loads(response.read())
+
+
+class JWKSCache:
+    """In-memory + on-disk cache of a JWKS document, keyed by ``kid``."""
+
+    def __init__(self, url, fetch=_http_get_json, cache_dir=JWKS_CACHE_DIR,
+                 max_age=JWKS_MAX_AGE, min_refetch_interval=JWKS_MIN_REFETCH_INTERVAL, clock=time.time):
+        self.url = url
+        self.fetch = fetch
+        self.max_age = max_age
+        self.min_refetch_interval = min_refetch_interval
+        self.clock = clock
+        self.path = None
+        if cache_dir:
+            self.path = os.path.join(cache_dir, f"jwks-{hashlib.sha256(url.encode()).hexdigest()[:16]}.json")
+        self.fetches = 0
+        self._keys = {}
+        self._fetched_at = 0.0
+        self._last_attempt = 0.0
+        self._lock = threading.Lock()
+
+    def _install(self, document, fetched_at):
+        keys = {}
+        for jwk in document.get("keys", []):
+            if jwk.get("kty") == "RSA" and jwk.get("kid"):
+                keys[jwk["kid"]] = (_b64url_int(jwk["n"]), _b64url_int(jwk["e"]))
+        self._keys = keys
+        self._fetched_at = fetched_at
+
+    def _load_from_disk(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path) as f:
+                cached = json.load(f)
+            self._install(cached["jwks"], cached["fetched_at"])
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def _save_to_disk(self, document):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"fetched_at": self._fetched_at, "jwks": document}, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+    def _refresh(self, now):
+        self._last_attempt = now
+        try:
+            document = self.fetch(self.url)
+            self._install(document, now)
+        except Exception as e:
+            # Keep serving the keys we already have if Cognito is unreachable
+            # or returns something that is not a JWKS
+            print(f"JWKS fetch failed: {e}")
+            return
+        self.fetches += 1
+        self._save_to_disk(document)
+
+    def preload(self):
+        """Load the keys (from disk, else Cognito) if none are held yet; True once some are."""
+        with self._lock:
+            if not self._keys:
+                self._load_from_disk()
+            if not self._keys and self.clock() - self._last_attempt >= self.min_refetch_interval:
+                self._refresh(self.clock())
+            return bool(self._keys)
+
+    def get_key(self, kid):
+        """Return ``(n, e)`` for ``kid``, refreshing the JWKS when needed."""
+        now = self.clock()
+        key = self._keys.get(kid)
+        if key is not None and now - self._fetched_at < self.max_age:
+            return key
+
+        with self._lock:
+            if not self._keys:
+                self._load_from_disk()
+            key = self._keys.get(kid)
+            stale = now - self._fetched_at >= self.max_age
+            can_refetch = now - self._last_attempt >= self.min_refetch_interval
+            if (key is None or stale) and (can_refetch or not self._keys):
+                self._refresh(now)
+                key = self._keys.get(kid)
+        return key
+
+
+class CognitoVerifier:
+    """Verifies tokens issued by one Cognito user pool (and optionally one app client)."""
+
+    def __init__(self, region, user_pool_id, client_id=None, jwks=None, clock=time.time):
+        self.issuer = f"https://cognito-idp.{region}.amazonaws.com/{user_pool_id}"
+        self.client_id = client_id
+        self.jwks = jwks or JWKSCache(f"{self.issuer}/.well-known/jwks.json")
+        self.clock = clock
+        self.claims_cache = TTLCache(maxsize=CLAIMS_CACHE_SIZE, ttl=3600, clock=clock)
+
+    def verify(self, token, token_use=None):
+        """Return the claims of a valid token, or raise ``TokenError``.
+
+        ``token_use`` restricts the accepted type to ``"id"`` or ``"access"``.
+        """
+        claims = self.claims_cache.get(token)
+        if claims is None:
+            claims = self._verify(token)
+            self.claims_cache.set(token, claims, ttl=max(claims["exp"] - self.clock(), 0))
+        elif claims["exp"] + CLOCK_LEEWAY < self.clock():
+            raise TokenError("Token has expired")
+
+        if token_use and claims.get("token_use") != token_use:
+            raise TokenError(f"Expected an {token_use} token")
+        return claims
+
+    def _verify(self, token):
+        try:
+            header_b64, payload_b64, signature_b64 = token.split(".")
+            header = json.loads(_b64url_decode(header_b64))
+            claims = json.loads(_b64url_decode(payload_b64))
+            signature = _b64url_decode(signature_b64)
+        except (AttributeError, ValueError, TypeError):
+            raise TokenError("Malformed token")
+        if not isinstance(header, dict) or not isinstance(claims, dict):
+            raise TokenError("Malformed token")
+
+        if header.get("alg") != "RS256":
+            raise TokenError("Unsupported token algorithm")
+        key = self.jwks.get_key(header.get("kid"))
+        if key is None:
+            raise TokenError("Unknown signing key")
+        if not rsa_sha256_verify(f"{header_b64}.{payload_b64}".encode(), signature, *key):
+            raise TokenError("Invalid token signature")
+
+        if not isinstance(claims.get("exp"), (int, float)) or claims["exp"] + CLOCK_LEEWAY < self.clock():
+            raise TokenError("Token has expired")
+        if claims.get("iss") != self.issuer:
+            raise TokenError("Token was not issued by this user pool")
+        token_use = claims.get("token_use")
+        if token_use not in ("id", "access"):
+            raise TokenError("Unsupported token_use")
+        if self.client_id:
+            audience = claims.get("aud") if token_use == "id" else claims.get("client_id")
+            if audience != self.client_id:
+                raise TokenError("Token was issued for a different app client")
+        return claims
+
+
+_default_verifier = None
+
+
+def get_verifier():
+    """Return the process-wide verifier configured from the Lambda environment."""
+    global _default_verifier
+    if _default_verifier is None:
+        _default_verifier = CognitoVerifier(
+            os.environ.get("AWS_REGION", "us-east-1"),
+            os.environ["COGNITO_USER_POOL_ID"],
+            os.environ.get("COGNITO_CLIENT_ID"),
+        )
+    return _default_verifier
+
+
+def set_verifier(verifier):
+    """Replace the process-wide verifier (tests, local emulation); ``None`` resets it."""
+    global _default_verifier
+    _default_verifier = verifier
+
+
+def bearer_token(event):
+    """Extract the bearer token from an API Gateway proxy event, or None."""
+    for name, value in (event.get("headers") or {}).items():
+        if name.lower() == "authorization" and value:
+            scheme, _, token = value.partition(" ")
+            return token.strip() if scheme.lower() == "bearer" else value.strip()
+    return None
+
+
+def authenticate(event, token_use=None):
+    """Return the verified claims for the request's bearer token or raise ``TokenError``."""
+    token = bearer_token(event)
+    if not token:
+        raise TokenError("Missing Authorization header")
+    return get_verifier().verify(token, token_use)
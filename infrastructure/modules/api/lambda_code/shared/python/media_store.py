@@ -0,0 +1,294 @@
+"""Reads and writes for the media metadata table.
+
+Row lifecycle:
+
+* ``PENDING`` - written when an upload URL is handed out. Carries an
+  ``expiresAt`` TTL so abandoned uploads clean themselves up.
+* ``READY`` - set by the completion step once the object exists in S3. This
+  also sets ``uploadedAt`` and removes the TTL.
+
+The ``userID-uploadedAt-index`` GSI is keyed on ``userID`` with
+``uploadedAt`` as the sort key. Only READY rows have ``uploadedAt``, so the
+index is sparse: it holds finished media only, and a user's listing is a
+single newest-first Query whose pages are always full.
+
+Content-addressed uploads use ``sha256-<hex>`` as their mediaID, so every
+user who shares the same bytes owns a row under one mediaID (the table's
+range key is userID) and all of them point at a single object. Knowing a
+hash is enough to get a PENDING row for it, so such a row only becomes
+READY when that user's own signed upload writes the object (its
+``x-amz-meta-uploader`` metadata names them) and records ``uploadedBy``.
+Dedupe is therefore per user: a hit is someone re-uploading their own file.
+
+Attaching media to a message writes a grant row under the same mediaID with
+``userID`` = ``conversation#<conversationID>``. Grant rows have no
+``uploadedAt``, so they never show up in anyone's listing; they let the
+members of that conversation read the media (see ``readable``).
+"""
+import base64
+import json
+import os
+import time
+
+import aws_clients
+import media_types
+
+MEDIA_METADATA_TABLE_NAME = os.environ.get("MEDIA_METADATA_TABLE_NAME")
+USER_INDEX_NAME = "userID-uploadedAt-index"
+
+PENDING = "PENDING"
+READY = "READY"
+PENDING_TTL_SECONDS = 24 * 3600
+MAX_PAGE_SIZE = 100
+CONTENT_ID_PREFIX = "sha256-"
+GRANT_PREFIX = "conversation#"
+# Object metadata naming the user whose signed upload wrote a content-addressed object
+UPLOADER_METADATA = "uploader"
+
+
+def _table(table_name=None):
+    return aws_clients.get_resource("dynamodb").Table(table_name or MEDIA_METADATA_TABLE_NAME)
+
+
+def media_id_from_key(key):
+    """``uploads/<mediaID>.<ext>`` -> ``<mediaID>`` (None for keys outside uploads/)."""
+    if not key.startswith("uploads/"):
+        return None
+    name = key[len("uploads/"):]
+    return name.split(".", 1)[0] or None
+
+
+def media_id_of(key):
+    """mediaID behind an original (``uploads/``) or rendition (``derived/<mediaID>/...``) key, or None."""
+    if key.startswith(media_types.RENDITION_PREFIX):
+        return key[len(media_types.RENDITION_PREFIX):].split("/", 1)[0] or None
+    return media_id_from_key(key)
+
+
+def content_media_id(content_hash):
+    """mediaID for content-addressed media (``content_hash`` is lowercase hex SHA-256)."""
+    return f"{CONTENT_ID_PREFIX}{content_hash}"
+
+
+def content_hash_of(media_id):
+    """The content hash behind a content-addressed mediaID, or None."""
+    return media_id[len(CONTENT_ID_PREFIX):] if media_id.startswith(CONTENT_ID_PREFIX) else None
+
+
+def pending_item(media_id, user_id, key, content_type, size=None, now=None):
+    now = time.time() if now is None else now
+    item = {
+        "mediaID": media_id,
+        "userID": user_id,
+        "key": key,
+        "contentType": content_type,
+        "status": PENDING,
+        "requestedAt": int(now * 1000),
+        "expiresAt": int(now) + PENDING_TTL_SECONDS,
+    }
+    if size is not None:
+        item["size"] = size
+    return item
+
+
+def record_pending(items, table_name=None):
+    """Write PENDING rows. A single item is a PutItem; several use BatchWriteItem.
+
+    Returns the items that could not be written.
+    """
+    if len(items) == 1:
+        _table(table_name).put_item(Item=items[0])
+        return []
+
+    import dynamo_batch
+
+    return dynamo_batch.batch_write(table_name or MEDIA_METADATA_TABLE_NAME, items)
+
+
+def grant_conversation(media_ids, conversation_id, table_name=None, now=None):
+    """Let the members of ``conversation_id`` read ``media_ids`` (attached to a message there).
+
+    Returns the grant rows that could not be written.
+    """
+    now = time.time() if now is None else now
+    items = [{"mediaID": media_id, "userID": GRANT_PREFIX + conversation_id, "grantedAt": int(now * 1000)}
+             for media_id in dict.fromkeys(media_ids)]
+    return record_pending(items, table_name) if items else []
+
+
+def owns(row, user_id):
+    """True if ``row`` makes ``user_id`` an owner of its media.
+
+    The row must be READY, and a content-addressed row must also have been
+    finalized by this user's own upload (``uploadedBy``): a READY row whose
+    object someone else uploaded only shows that the user knew the hash.
+    """
+    if row.get("status") != READY:
+        return False
+    return content_hash_of(row["mediaID"]) is None or row.get("uploadedBy") == user_id
+
+
+def find_own(user_id, media_ids, table_name=None):
+    """Return ``{mediaID: row}`` for the ``media_ids`` that ``user_id`` owns (see ``owns``).
+
+    One BatchGetItem per 100 IDs. Keys still unprocessed after the retries
+    are logged and treated as not owned.
+    """
+    import dynamo_batch
+
+    rows, unprocessed, _ = dynamo_batch.batch_get(
+        table_name or MEDIA_METADATA_TABLE_NAME,
+        [{"mediaID": media_id, "userID": user_id} for media_id in dict.fromkeys(media_ids)],
+    )
+    if unprocessed:
+        print(f"{len(unprocessed)} media rows of {user_id} could not be read")
+    return {row["mediaID"]: _plain(row) for row in rows if owns(row, user_id)}
+
+
+def readable(user_id, media_ids, is_member, table_name=None):
+    """Return the subset of ``media_ids`` that ``user_id`` may read.
+
+    A user may read media they uploaded (see ``owns``) and media
+    attached to a message in a conversation they belong to
+    (``is_member(conversation_id)``). Own media costs one BatchGetItem per
+    100 IDs; only IDs the user does not own need a Query for their grants.
+    A mediaID alone proves nothing: content-addressed IDs are just the hash
+    of the bytes.
+    """
+    from boto3.dynamodb.conditions import Key
+
+    table_name = table_name or MEDIA_METADATA_TABLE_NAME
+    unique = list(dict.fromkeys(media_ids))
+    allowed = set(find_own(user_id, unique, table_name))
+
+    for media_id in unique:
+        if media_id in allowed:
+            continue
+        grants = _table(table_name).query(
+            KeyConditionExpression=Key("mediaID").eq(media_id) & Key("userID").begins_with(GRANT_PREFIX),
+            ProjectionExpression="userID",
+        ).get("Items", [])
+        if any(is_member(grant["userID"][len(GRANT_PREFIX):]) for grant in grants):
+            allowed.add(media_id)
+    return allowed
+
+
+def find(media_id, table_name=None):
+    """Return the row for ``media_id`` (the table's hash key) or None."""
+    from boto3.dynamodb.conditions import Key
+
+    items = _table(table_name).query(KeyConditionExpression=Key("mediaID").eq(media_id), Limit=1).get("Items")
+    return items[0] if items else None
+
+
+def find_all(media_id, table_name=None):
+    """Return every user's row for ``media_id`` (several for content-addressed media)."""
+    from boto3.dynamodb.conditions import Key
+
+    kwargs = {"KeyConditionExpression": Key("mediaID").eq(media_id)}
+    items = []
+    while True:
+        page = _table(table_name).query(**kwargs)
+        items.extend(page.get("Items", []))
+        if "LastEvaluatedKey" not in page:
+            return items
+        kwargs["ExclusiveStartKey"] = page["LastEvaluatedKey"]
+
+
+def finalize(media_id, user_id, size, extra=None, table_name=None, now=None):
+    """Mark a row READY. Returns False if it was not PENDING.
+
+    This covers a missing row and a redelivered S3 event, so it is safe to
+    call more than once.
+    """
+    now = time.time() if now is None else now
+    names = {"#status": "status", "#size": "size"}
+    values = {":ready": READY, ":pending": PENDING, ":size": size, ":now": int(now * 1000)}
+    assignments = ["#status = :ready", "#size = :size", "uploadedAt = :now"]
+    for index, (name, value) in enumerate((extra or {}).items()):
+        names[f"#x{index}"] = name
+        values[f":x{index}"] = value
+        assignments.append(f"#x{index} = :x{index}")
+
+    try:
+        _table(table_name).update_item(
+            Key={"mediaID": media_id, "userID": user_id},
+            UpdateExpression=f"SET {', '.join(assignments)} REMOVE expiresAt",
+            ConditionExpression="#status = :pending",
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+        )
+    except aws_clients.ClientError as e:
+        if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+            return False
+        raise
+    return True
+
+
+def record_renditions(media_id, user_id, renditions, table_name=None):
+    """Attach generated renditions (``{name: {key, contentType, ...}}``) to a row.
+
+    Works on PENDING and READY rows alike. Returns False if the row does not exist.
+    """
+    try:
+        _table(table_name).update_item(
+            Key={"mediaID": media_id, "userID": user_id},
+            UpdateExpression="SET renditions = :renditions",
+            ConditionExpression="attribute_exists(mediaID)",
+            ExpressionAttributeValues={":renditions": renditions},
+        )
+    except aws_clients.ClientError as e:
+        if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+            return False
+        raise
+    return True
+
+
+def _plain(value):
+    # Numbers come back from the resource API as Decimal
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if hasattr(value, "as_integer_ratio") and not isinstance(value, (int, float)):
+        return int(value) if value == int(value) else float(value)
+    return value
+
+
+def encode_cursor(last_evaluated_key):
+    if not last_evaluated_key:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(_plain(last_evaluated_key)).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return the ExclusiveStartKey for ``cursor``. Raises ValueError if it is not one of ours."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(key, dict) or set(key) != {"mediaID", "userID", "uploadedAt"}:
+        raise ValueError("Invalid cursor")
+    return key
+
+
+def list_user_media(user_id, limit=20, cursor=None, table_name=None):
+    """Return ``(items, next_cursor)`` for one page of a user's READY media, newest first.
+
+    Always a Query on the sparse user index, never a Scan, so the cost of a
+    page does not depend on how big the table is.
+    """
+    from boto3.dynamodb.conditions import Key
+
+    kwargs = {
+        "IndexName": USER_INDEX_NAME,
+        "KeyConditionExpression": Key("userID").eq(user_id),
+        "ScanIndexForward": False,
+        "Limit": max(1, min(limit, MAX_PAGE_SIZE)),
+    }
+    if cursor:
+        start_key = decode_cursor(cursor)
+        if start_key["userID"] != user_id:
+            raise ValueError("Invalid cursor")
+        kwargs["ExclusiveStartKey"] = start_key
+
+    response = _table(table_name).query(**kwargs)
+    return [_plain(item) for item in response.get("Items", [])], encode_cursor(response.get("LastEvaluatedKey"))
@@ -0,0 +1,40 @@
+"""Media types accepted for upload, shared by the upload Lambdas.
+
+Matches the API's ``binary_media_types``. ``max_size`` is the largest file
+of the type either upload flow accepts; the multipart flow is for uploads
+that need to resume, not a way around it.
+"""
+import os
+
+MEDIA_TYPES = {
+    "image/jpeg": {"extension": ".jpg", "max_size": 5000000},
+    "image/png": {"extension": ".png", "max_size": 5000000},
+    "video/mp4": {"extension": ".mp4", "max_size": 100000000},
+}
+
+MIN_UPLOAD_SIZE = 100
+
+# --- Multipart limits (S3: parts of 5 MiB..5 GiB, at most 10,000 parts) ---
+MIN_PART_SIZE = 5 * 1024 * 1024
+MAX_PART_SIZE = 5 * 1024 * 1024 * 1024
+MAX_PARTS = 10000
+MAX_MULTIPART_SIZE = int(os.environ.get("MAX_MULTIPART_UPLOAD_SIZE", str(4 * 1024 * 1024 * 1024)))
+
+
+def object_key(content_type, name):
+    """Return the ``uploads/`` key for an object called ``name`` of ``content_type``."""
+    return f"uploads/{name}{MEDIA_TYPES[content_type]['extension']}"
+
+
+# --- Renditions generated from uploads (thumbnails, previews) ---
+RENDITION_PREFIX = "derived/"
+RENDITION_EXTENSIONS = {"image/webp": ".webp", "image/jpeg": ".jpg"}
+
+
+def rendition_key(media_id, name, content_type):
+    """Return the key for rendition ``name`` of ``media_id``.
+
+    Renditions live beside the originals in the media bucket but outside
+    ``uploads/``, so writing them does not re-trigger upload processing.
+    """
+    return f"{RENDITION_PREFIX}{media_id}/{name}{RENDITION_EXTENSIONS[content_type]}"
@@ -0,0 +1,363 @@
+"""Cold storage for quiet conversations: compressed, range-readable archives in S3.
+
+Key design:
+
+* ``archive_conversation`` moves the messages of a conversation that has
+  been quiet for ``ARCHIVE_AFTER_DAYS`` out of the messages table into
+  segment objects in ``MESSAGE_ARCHIVE_BUCKET_NAME``, keyed
+  ``<conversationID>/<first message ID>-<last message ID>``, at most
+  ``SEGMENT_MESSAGES`` messages each.
+* A segment is a run of chunks followed by its index. A chunk is
+  ``CHUNK_MESSAGES`` consecutive messages, oldest first, as a
+  zlib-compressed JSON array of ``[messageID, senderID, sentAt, body]``
+  rows, with the attachment keys appended as a fifth element when the
+  message has any. Chunks are compressed independently, so any run of adjacent chunks
+  is one ranged GET. The index is a JSON array with, per chunk, its first
+  and last message IDs, byte offset, length and message count.
+* The conversation item lists its segments, oldest first, in
+  ``archiveSegments`` (key, first and last message IDs, message count and
+  the byte range of the index) and carries ``archivedThrough``, the newest
+  archived message ID. A segment is recorded before its messages are deleted from the
+  table, so every archived message is older than every message left there,
+  apart from deletes that failed; the next run clears those. It deletes only
+  messages a recorded segment actually holds: a message written late, with
+  an ID below ``archivedThrough``, was never archived and stays in the table.
+
+``history`` reads the table like ``message_store.history`` until it runs
+out, then the segments, newest first. Once a segment's index is cached in
+the container, a page of up to ``CHUNK_MESSAGES`` messages is one ranged
+GET of at most two chunks.
+"""
+import bisect
+import heapq
+import json
+import os
+import time
+import zlib
+
+import aws_clients
+import message_store
+from ttl_cache import TTLCache
+
+MESSAGE_ARCHIVE_BUCKET_NAME = os.environ.get("MESSAGE_ARCHIVE_BUCKET_NAME")
+ARCHIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_AFTER_DAYS", "90"))
+
+CHUNK_MESSAGES = message_store.MAX_PAGE_SIZE
+SEGMENT_MESSAGES = 50000
+COMPRESSION_LEVEL = 9
+
+# Segment objects never change, so their indexes can be kept as long as memory allows
+_indexes = TTLCache(maxsize=1024, ttl=24 * 3600)
+
+
+def _s3():
+    return aws_clients.get_client("s3")
+
+
+def _table(name):
+    return aws_clients.get_resource("dynamodb").Table(name)
+
+
+def _range(key, offset, length):
+    response = _s3().get_object(Bucket=MESSAGE_ARCHIVE_BUCKET_NAME, Key=key,
+                                Range=f"bytes={offset}-{offset + length - 1}")
+    return response["Body"].read()
+
+
+# --- Writing ---
+
+def encode_segment(messages):
+    """Return ``(data, index, raw_bytes)`` for ``messages`` (oldest first).
+
+    ``data`` is the compressed chunks, ``index`` the chunk list described
+    above and ``raw_bytes`` the size of the chunks before compression.
+    """
+    data, index, raw_bytes = bytearray(), [], 0
+    for start in range(0, len(messages), CHUNK_MESSAGES):
+        rows = [[m["messageID"], m["senderID"], int(m["sentAt"]), m["body"]]
+                + ([list(m["attachments"])] if m.get("attachments") else [])
+                for m in messages[start:start + CHUNK_MESSAGES]]
+        raw = json.dumps(rows, ensure_ascii=False, separators=(",", ":")).encode()
+        compressed = zlib.compress(raw, COMPRESSION_LEVEL)
+        index.append([rows[0][0], rows[-1][0], len(data), len(compressed), len(rows)])
+        data += compressed
+        raw_bytes += len(raw)
+    return bytes(data), index, raw_bytes
+
+
+def write_segment(conversation_id, messages):
+    """Store ``messages`` (oldest first) as one segment object.
+
+    Returns ``(segment, raw_bytes)``: the ``archiveSegments`` entry to record on the
+    conversation and the uncompressed size of the messages.
+    """
+    data, index, raw_bytes = encode_segment(messages)
+    index_data = json.dumps(index, separators=(",", ":")).encode()
+    first, last = messages[0]["messageID"], messages[-1]["messageID"]
+    key = f"{conversation_id}/{first}-{last}"
+    _s3().put_object(Bucket=MESSAGE_ARCHIVE_BUCKET_NAME, Key=key, Body=data + index_data,
+                     ContentType="application/octet-stream")
+    segment = {"key": key, "first": first, "last": last, "count": len(messages),
+               "indexOffset": len(data), "indexLength": len(index_data)}
+    return segment, raw_bytes
+
+
+def _record(conversation_id, segment):
+    _table(message_store.CONVERSATIONS_TABLE_NAME).update_item(
+        Key={"conversationID": conversation_id},
+        UpdateExpression="SET archiveSegments = list_append(if_not_exists(archiveSegments, :empty), :segment), "
+                         "archivedThrough = :last",
+        ConditionExpression="attribute_exists(conversationID) AND "
+                            "(attribute_not_exists(archivedThrough) OR archivedThrough < :first)",
+        ExpressionAttributeValues={":empty": [], ":segment": [segment], ":first": segment["first"],
+                                   ":last": segment["last"]},
+    )
+
+
+def _delete(items):
+    """Delete message items from the table; return how many could not be deleted."""
+    import dynamo_batch
+
+    keys = [{"pk": item["pk"], "messageID": item["messageID"]} for item in items]
+    failed = dynamo_batch.batch_delete(message_store.MESSAGES_TABLE_NAME, keys)
+    if failed:
+        print(f"Could not delete {len(failed)} archived messages; the next run retries them")
+    return len(failed)
+
+
+def _archived(conversation_id, items):
+    """Return the ``items`` (oldest first) that a recorded segment holds, reading only the chunks that could."""
+    archive = segments(conversation_id)
+    lasts = [segment["last"] for segment in archive]
+    wanted = {}
+    for item in items:
+        message_id = item["messageID"]
+        s = bisect.bisect_left(lasts, message_id)
+        if s == len(archive) or archive[s]["first"] > message_id:
+            continue
+        index = _chunk_index(archive[s])
+        c = bisect.bisect_left([chunk[1] for chunk in index], message_id)
+        if c < len(index) and index[c][0] <= message_id:
+            wanted.setdefault((s, c), set()).add(message_id)
+
+    held = set()
+    for (s, c), message_ids in wanted.items():
+        _, _, offset, length, _ = _chunk_index(archive[s])[c]
+        rows = json.loads(zlib.decompress(_range(archive[s]["key"], offset, length)))
+        held.update(message_ids.intersection(row[0] for row in rows))
+    return [item for item in items if item["messageID"] in held]
+
+
+def _shard_items(conversation_id, shard):
+    """Yield every message item in one shard, oldest first."""
+    from boto3.dynamodb.conditions import Key
+
+    query = {"KeyConditionExpression": Key("pk").eq(message_store.partition_key(conversation_id, shard))}
+    table = _table(message_store.MESSAGES_TABLE_NAME)
+    while True:
+        response = table.query(**query)
+        yield from response.get("Items", [])
+        if "LastEvaluatedKey" not in response:
+            return
+        query["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def _newest_id(conversation_id, shard):
+    from boto3.dynamodb.conditions import Key
+
+    response = _table(message_store.MESSAGES_TABLE_NAME).query(
+        KeyConditionExpression=Key("pk").eq(message_store.partition_key(conversation_id, shard)),
+        ScanIndexForward=False,
+        Limit=1,
+        ProjectionExpression="messageID",
+    )
+    items = response.get("Items", [])
+    return items[0]["messageID"] if items else None
+
+
+def archive_conversation(conversation, quiet_since_ms):
+    """Archive the conversation's messages if none was sent after ``quiet_since_ms`` (epoch ms).
+
+    ``conversation`` needs ``conversationID``, ``shardCount`` and, if it has
+    been archived before, ``archivedThrough``. Returns None for an empty or
+    active conversation, else ``{"messages", "segments", "bytes",
+    "rawBytes", "undeleted"}``.
+    """
+    conversation_id = conversation["conversationID"]
+    shards = range(int(conversation.get("shardCount", 1)))
+    newest = [message_id for message_id in (_newest_id(conversation_id, shard) for shard in shards) if message_id]
+    if not newest or message_store.message_id_ms(max(newest)) >= quiet_since_ms:
+        return None
+
+    archived_through = conversation.get("archivedThrough")
+    stats = {"messages": 0, "segments": 0, "bytes": 0, "rawBytes": 0, "undeleted": 0}
+    leftovers, batch = [], []
+
+    def move(items):
+        segment, raw_bytes = write_segment(conversation_id, items)
+        _record(conversation_id, segment)
+        stats["messages"] += len(items)
+        stats["segments"] += 1
+        stats["bytes"] += segment["indexOffset"] + segment["indexLength"]
+        stats["rawBytes"] += raw_bytes
+        stats["undeleted"] += _delete(items)
+
+    merged = heapq.merge(*(_shard_items(conversation_id, shard) for shard in shards),
+                         key=lambda item: item["messageID"])
+    for item in merged:
+        if archived_through and item["messageID"] <= archived_through:
+            # Archived by an earlier run whose delete did not go through, or
+            # written late and never archived (see _archived)
+            leftovers.append(item)
+            continue
+        batch.append(item)
+        if len(batch) == SEGMENT_MESSAGES:
+            move(batch)
+            batch = []
+    if batch:
+        move(batch)
+    archived = _archived(conversation_id, leftovers) if leftovers else []
+    if len(archived) < len(leftovers):
+        print(f"{len(leftovers) - len(archived)} messages of {conversation_id} below archivedThrough "
+              f"are in no segment; leaving them in the table")
+    if archived:
+        stats["undeleted"] += _delete(archived)
+    return stats
+
+
+def compact(quiet_days=None, segment=0, total_segments=1, now=None, deadline=None):
+    """Archive the quiet conversations in one segment of a parallel scan of the conversations table.
+
+    ``deadline`` is a ``time.monotonic()`` value after which no further
+    conversation is started. Returns the run's totals; ``complete`` is False
+    if the deadline cut the scan short.
+    """
+    now = time.time() if now is None else now
+    quiet_days = ARCHIVE_AFTER_DAYS if quiet_days is None else quiet_days
+    quiet_since_ms = int((now - quiet_days * 24 * 3600) * 1000)
+    totals = {"scanned": 0, "archived": 0, "failed": 0, "messages": 0, "segments": 0, "bytes": 0,
+              "rawBytes": 0, "undeleted": 0, "complete": True}
+
+    scan = {"ProjectionExpression": "conversationID, shardCount, archivedThrough",
+            "Segment": segment, "TotalSegments": total_segments}
+    table = _table(message_store.CONVERSATIONS_TABLE_NAME)
+    while True:
+        response = table.scan(**scan)
+        for conversation in response.get("Items", []):
+            if deadline is not None and time.monotonic() > deadline:
+                totals["complete"] = False
+                return totals
+            totals["scanned"] += 1
+            try:
+                stats = archive_conversation(conversation, quiet_since_ms)
+            except aws_clients.ClientError as e:
+                # Whatever was recorded stays consistent; the next run picks up the rest
+                print(f"Could not archive {conversation['conversationID']}: {e}")
+                totals["failed"] += 1
+                continue
+            if stats:
+                totals["archived"] += 1
+                for name, value in stats.items():
+                    totals[name] += value
+        if "LastEvaluatedKey" not in response:
+            return totals
+        scan["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+# --- Reading ---
+
+def segments(conversation_id):
+    """Return the conversation's segments, oldest first, read from the table rather than the container cache."""
+    item = _table(message_store.CONVERSATIONS_TABLE_NAME).get_item(
+        Key={"conversationID": conversation_id},
+        ProjectionExpression="archiveSegments",
+        ConsistentRead=True,
+    ).get("Item") or {}
+    return [dict(segment, count=int(segment["count"]), indexOffset=int(segment["indexOffset"]),
+                 indexLength=int(segment["indexLength"])) for segment in item.get("archiveSegments", [])]
+
+
+def _chunk_index(segment):
+    index = _indexes.get(segment["key"])
+    if index is None:
+        index = json.loads(_range(segment["key"], segment["indexOffset"], segment["indexLength"]))
+        _indexes.set(segment["key"], index)
+    return index
+
+
+def _read_segment(conversation_id, segment, limit, before):
+    """Return ``(messages, more)``: the segment's newest ``limit`` messages older than ``before``."""
+    index = _chunk_index(segment)
+    end = len(index) if before is None else bisect.bisect_left([chunk[0] for chunk in index], before)
+    if end == 0:
+        return [], False
+    # The newest chunk may hold only a few messages older than before; read
+    # older chunks until they alone could fill the page
+    start, older = end - 1, 0
+    while start > 0 and older < limit:
+        start -= 1
+        older += index[start][4]
+
+    offset = index[start][2]
+    data = _range(segment["key"], offset, index[end - 1][2] + index[end - 1][3] - offset)
+    rows = []
+    for _, _, chunk_offset, length, _ in index[start:end]:
+        rows += json.loads(zlib.decompress(data[chunk_offset - offset:chunk_offset - offset + length]))
+    if before is not None:
+        rows = [row for row in rows if row[0] < before]
+    messages = [_row_message(conversation_id, row) for row in reversed(rows[-limit:])]
+    return messages, len(rows) > limit or start > 0
+
+
+def _row_message(conversation_id, row):
+    message_id, sender_id, sent_at, body = row[:4]
+    message = {"conversationID": conversation_id, "messageID": message_id, "senderID": sender_id,
+               "body": body, "sentAt": sent_at}
+    if len(row) > 4:
+        message["attachments"] = row[4]
+    return message
+
+
+def read_archive(conversation_id, archive, limit, before=None):
+    """Return ``(messages, more)``: up to ``limit`` archived messages older than ``before``, newest first."""
+    remaining = [segment for segment in archive if before is None or segment["first"] < before]
+    messages = []
+    while remaining and len(messages) < limit:
+        page, more = _read_segment(conversation_id, remaining.pop(), limit - len(messages), before)
+        messages += page
+        if more:
+            return messages, True
+        if page:
+            before = page[-1]["messageID"]
+    return messages, bool(remaining)
+
+
+def history(conversation, limit=50, before=None):
+    """``message_store.history`` that continues into the archive once the table runs out.
+
+    Pages older than the conversation's cached ``archivedThrough`` skip the
+    table. The segment list itself is always read from the table, because the
+    cached conversation may predate the latest archival run.
+    """
+    if not MESSAGE_ARCHIVE_BUCKET_NAME:
+        return message_store.history(conversation, limit, before)
+    archived_through = conversation.get("archivedThrough")
+    if before and archived_through and before <= archived_through:
+        messages = []
+    else:
+        messages, cursor = message_store.history(conversation, limit, before)
+        if cursor is not None:
+            return messages, cursor
+
+    archive = segments(conversation["conversationID"])
+    if not archive:
+        return messages, None
+    # Undeleted leftovers of an earlier run are served from the archive instead
+    messages = [message for message in messages if message["messageID"] > archive[-1]["last"]]
+    boundary = messages[-1]["messageID"] if messages else before
+    if len(messages) == limit:
+        return messages, boundary
+
+    archived, more = read_archive(conversation["conversationID"], archive, limit - len(messages), boundary)
+    messages += archived
+    return messages, (messages[-1]["messageID"] if more else None)
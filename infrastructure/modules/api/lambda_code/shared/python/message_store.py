@@ -0,0 +1,289 @@
+"""Conversations, messages and per-user delivery feeds.
+
+Key design:
+
+* ``messages`` - partition ``pk = <conversationID>#<shard>``, sort key
+  ``messageID``. Message IDs are ULID-style (48-bit millisecond timestamp +
+  80 random bits, Crockford base32), so they sort by send time and the last
+  N messages of a shard are one ``ScanIndexForward=False, Limit=N`` Query.
+  Ordinary conversations have a single shard (``#0``); groups of
+  ``HOT_CONVERSATION_MEMBERS`` or more are created with ``WRITE_SHARDS``
+  shards so a busy group spreads its writes over several partitions.
+  History reads every shard with the same bounded Query and merges them.
+  Shard 0 always exists, so raising a conversation's shard count later keeps
+  its old messages readable.
+* ``message_deliveries`` - partition ``userID``, sort key ``messageID``: one
+  copy of each message per member, written with BatchWriteItem when the
+  message is sent. A reconnecting client catches up on all of its
+  conversations with one Query for IDs after its cursor. Items expire after
+  ``DELIVERY_TTL_SECONDS``.
+* ``conversations`` - ``conversationID`` -> members, name and shard count;
+  cached per container because membership is read on every send.
+* ``inbox`` - one summary per member per conversation, kept up to date by
+  ``create_conversation`` and ``send_message`` when ``INBOX_TABLE_NAME`` is
+  set (see ``inbox_store``).
+"""
+import heapq
+import os
+import random
+import time
+
+import aws_clients
+import inbox_store
+from ttl_cache import TTLCache
+
+CONVERSATIONS_TABLE_NAME = os.environ.get("CONVERSATIONS_TABLE_NAME")
+MESSAGES_TABLE_NAME = os.environ.get("MESSAGES_TABLE_NAME")
+MESSAGE_DELIVERIES_TABLE_NAME = os.environ.get("MESSAGE_DELIVERIES_TABLE_NAME")
+
+HOT_CONVERSATION_MEMBERS = int(os.environ.get("HOT_CONVERSATION_MEMBERS", "50"))
+WRITE_SHARDS = int(os.environ.get("MESSAGE_WRITE_SHARDS", "8"))
+MAX_MEMBERS = 1000
+MAX_BODY_LENGTH = 4000
+MAX_ATTACHMENTS = 10
+MAX_PAGE_SIZE = 100
+DELIVERY_TTL_SECONDS = 30 * 24 * 3600
+
+_CROCKFORD = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_CROCKFORD_VALUES = {c: i for i, c in enumerate(_CROCKFORD)}
+MESSAGE_ID_LENGTH = 26
+
+_conversations = TTLCache(maxsize=4096, ttl=60)
+
+
+class NotAMember(Exception):
+    """The caller is not a member of the conversation (or it does not exist)."""
+
+
+class AttachmentNotReadable(Exception):
+    """The sender may not read one of the media they tried to attach."""
+
+
+def _table(name):
+    return aws_clients.get_resource("dynamodb").Table(name)
+
+
+def new_message_id(now=None):
+    """Return a 26-character ID that sorts by creation time (millisecond resolution)."""
+    ms = int((time.time() if now is None else now) * 1000)
+    value = (ms << 80) | random.getrandbits(80)
+    chars = []
+    for _ in range(MESSAGE_ID_LENGTH):
+        chars.append(_CROCKFORD[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+def is_message_id(value):
+    return isinstance(value, str) and len(value) == MESSAGE_ID_LENGTH and all(c in _CROCKFORD for c in value)
+
+
+def message_id_bytes(message_id):
+    """The 16-byte big-endian form of a message ID; byte order matches ID order."""
+    value = 0
+    for c in message_id:
+        value = (value << 5) | _CROCKFORD_VALUES[c]
+    return value.to_bytes(16, "big")
+
+
+def message_id_from_bytes(data):
+    value = int.from_bytes(data, "big")
+    chars = []
+    for _ in range(MESSAGE_ID_LENGTH):
+        chars.append(_CROCKFORD[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+def message_id_ms(message_id):
+    """The send time (epoch milliseconds) encoded in a message ID."""
+    return int.from_bytes(message_id_bytes(message_id), "big") >> 80
+
+
+def partition_key(conversation_id, shard):
+    return f"{conversation_id}#{shard}"
+
+
+# --- Conversations ---
+
+def create_conversation(creator_id, member_ids, name=None, now=None):
+    """Create a conversation of ``creator_id`` plus ``member_ids`` and return it."""
+    import uuid
+
+    members = list(dict.fromkeys([creator_id] + list(member_ids)))
+    if len(members) > MAX_MEMBERS:
+        raise ValueError(f"A conversation can have at most {MAX_MEMBERS} members.")
+    conversation = {
+        "conversationID": str(uuid.uuid4()),
+        "members": members,
+        "createdBy": creator_id,
+        "createdAt": int((time.time() if now is None else now) * 1000),
+        "shardCount": WRITE_SHARDS if len(members) >= HOT_CONVERSATION_MEMBERS else 1,
+    }
+    if name:
+        conversation["name"] = name
+    _table(CONVERSATIONS_TABLE_NAME).put_item(
+        Item=conversation,
+        ConditionExpression="attribute_not_exists(conversationID)"
+    )
+    _conversations.set(conversation["conversationID"], conversation)
+    if inbox_store.INBOX_TABLE_NAME:
+        inbox_store.add_conversation(conversation)
+    return conversation
+
+
+def get_conversation(conversation_id):
+    """Return the conversation (cached for a minute) or None."""
+    conversation = _conversations.get(conversation_id)
+    if conversation is None:
+        conversation = _table(CONVERSATIONS_TABLE_NAME).get_item(Key={"conversationID": conversation_id}).get("Item")
+        if conversation is None:
+            return None
+        conversation["shardCount"] = int(conversation.get("shardCount", 1))
+        _conversations.set(conversation_id, conversation)
+    return conversation
+
+
+def member_conversation(conversation_id, user_id):
+    """Return the conversation if ``user_id`` belongs to it, else raise ``NotAMember``."""
+    conversation = get_conversation(conversation_id) if isinstance(conversation_id, str) else None
+    if conversation is None or user_id not in conversation["members"]:
+        raise NotAMember(conversation_id)
+    return conversation
+
+
+def member_of(user_id):
+    """An ``is_member(conversation_id)`` check for ``user_id`` (for ``media_store.readable``)."""
+    def is_member(conversation_id):
+        conversation = get_conversation(conversation_id)
+        return conversation is not None and user_id in conversation["members"]
+    return is_member
+
+
+# --- Messages ---
+
+def valid_attachments(attachments):
+    """True for no attachments or a list of at most ``MAX_ATTACHMENTS`` media keys."""
+    if attachments is None:
+        return True
+    import media_store
+
+    return (isinstance(attachments, list) and len(attachments) <= MAX_ATTACHMENTS
+            and all(isinstance(key, str) and len(key) <= 1024 and ".." not in key.split("/")
+                    and media_store.media_id_of(key) for key in attachments))
+
+
+def _grant_attachments(conversation, sender_id, attachments):
+    """Check the sender may read every attached key, then let the conversation's members read them."""
+    import media_store
+
+    media_ids = {media_store.media_id_of(key) for key in attachments}
+    if media_store.readable(sender_id, media_ids, member_of(sender_id)) != media_ids:
+        raise AttachmentNotReadable(conversation["conversationID"])
+    failed = media_store.grant_conversation(media_ids, conversation["conversationID"])
+    if failed:
+        print(f"{len(failed)} attachment grants for {conversation['conversationID']} were not written")
+
+
+def send_message(conversation, sender_id, body, now=None, attachments=None):
+    """Store a message, fan it out to every member's delivery feed and update their inboxes.
+
+    ``attachments`` is an optional list of media keys (see
+    ``valid_attachments``). The sender must be able to read each one; the
+    conversation's members are then granted read access to them. Raises
+    ``AttachmentNotReadable`` otherwise.
+
+    Returns ``(message, undelivered)``, where ``undelivered`` lists the
+    delivery items BatchWriteItem could not write after its retries.
+    Inbox updates that fail are logged by ``inbox_store``.
+    """
+    import dynamo_batch
+
+    if attachments:
+        _grant_attachments(conversation, sender_id, attachments)
+
+    now = time.time() if now is None else now
+    message_id = new_message_id(now)
+    message = {
+        "conversationID": conversation["conversationID"],
+        "messageID": message_id,
+        "senderID": sender_id,
+        "body": body,
+        "sentAt": int(now * 1000),
+    }
+    if attachments:
+        message["attachments"] = list(dict.fromkeys(attachments))
+    shard = random.randrange(conversation["shardCount"])
+    _table(MESSAGES_TABLE_NAME).put_item(Item=dict(message, pk=partition_key(conversation["conversationID"], shard)))
+
+    expires_at = int(now) + DELIVERY_TTL_SECONDS
+    deliveries = [dict(message, userID=member, expiresAt=expires_at) for member in conversation["members"]]
+    undelivered = dynamo_batch.batch_write(MESSAGE_DELIVERIES_TABLE_NAME, deliveries)
+    if inbox_store.INBOX_TABLE_NAME:
+        inbox_store.record_message(conversation, message)
+    return message, undelivered
+
+
+def _message(item):
+    message = {
+        "conversationID": item["conversationID"],
+        "messageID": item["messageID"],
+        "senderID": item["senderID"],
+        "body": item["body"],
+        "sentAt": int(item["sentAt"]),
+    }
+    if item.get("attachments"):
+        message["attachments"] = list(item["attachments"])
+    return message
+
+
+def _query_shard(conversation_id, shard, limit, before):
+    from boto3.dynamodb.conditions import Key
+
+    condition = Key("pk").eq(partition_key(conversation_id, shard))
+    if before:
+        condition = condition & Key("messageID").lt(before)
+    response = _table(MESSAGES_TABLE_NAME).query(KeyConditionExpression=condition, ScanIndexForward=False, Limit=limit)
+    return response.get("Items", []), "LastEvaluatedKey" in response
+
+
+def history(conversation, limit=50, before=None):
+    """Return ``(messages, next_cursor)``: up to ``limit`` messages older than ``before``, newest first.
+
+    One bounded Query per shard (run concurrently when there are several),
+    merged by message ID. ``next_cursor`` is the ``before`` for the next page,
+    or None once the start of the conversation is reached.
+    """
+    conversation_id = conversation["conversationID"]
+    shards = range(conversation["shardCount"])
+    if len(shards) == 1:
+        results = [_query_shard(conversation_id, 0, limit, before)]
+    else:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=len(shards)) as pool:
+            results = list(pool.map(lambda shard: _query_shard(conversation_id, shard, limit, before), shards))
+
+    items = [item for shard_items, _ in results for item in shard_items]
+    page = heapq.nlargest(limit, items, key=lambda item: item["messageID"])
+    more = len(items) > limit or any(truncated for _, truncated in results)
+    return [_message(item) for item in page], (page[-1]["messageID"] if more and page else None)
+
+
+def since(user_id, cursor=None, limit=MAX_PAGE_SIZE):
+    """Return ``(messages, cursor, has_more)`` from ``user_id``'s delivery feed, oldest first.
+
+    ``cursor`` is the last message ID the client has seen; the returned
+    cursor is the one to send next time (unchanged if nothing is new).
+    """
+    from boto3.dynamodb.conditions import Key
+
+    condition = Key("userID").eq(user_id)
+    if cursor:
+        condition = condition & Key("messageID").gt(cursor)
+    response = _table(MESSAGE_DELIVERIES_TABLE_NAME).query(
+        KeyConditionExpression=condition, ScanIndexForward=True, Limit=limit
+    )
+    messages = [_message(item) for item in response.get("Items", [])]
+    next_cursor = messages[-1]["messageID"] if messages else cursor
+    return messages, next_cursor, "LastEvaluatedKey" in response
@@ -0,0 +1,247 @@
+"""Per-invocation metrics for the ChatApp Lambda functions (CloudWatch EMF).
+
+``@metrics.instrument`` wraps a ``lambda_handler`` and prints one Embedded
+Metric Format line per invocation, which CloudWatch turns into metrics
+without any API calls:
+
+* ``Duration``, ``ColdStart`` and ``Errors`` (raised or 5xx), dimension
+  ``Function``;
+* ``AwsCalls`` / ``AwsTime`` and ``AwsTime.<service>``, from timers that
+  aws_clients hooks onto every boto3 session (``before-call`` /
+  ``after-call``, so retries are included), plus ``CodeTime``, the rest of
+  the duration. Per-operation counts and times go in the ``AwsCallDetail``
+  property for Logs Insights;
+* anything the handler records with ``timer()`` or ``add()``.
+
+Sampling: ``METRICS_SAMPLE_RATE`` (default 1) is the fraction of warm
+invocations that get the full record; the rest only log when they fail or
+carry ``add()`` metrics. The cost of building and printing a record is
+tracked, and when it averages more than ``METRICS_OVERHEAD_BUDGET_US`` the
+rate is lowered so the mean overhead per invocation stays within budget.
+Cold starts are always recorded. Every record carries its ``SampleRate``.
+Warm-up events (``warmup.is_warmup``) log nothing. They still take the cold
+start, because the request after them finds the environment ready.
+
+The invocation being recorded is process-wide, not per thread, so AWS calls
+a handler makes from its own worker threads are counted. That matches
+Lambda, which runs one invocation per process at a time; anything that
+runs handlers concurrently in one process (``benchmarks/local_api.py``)
+has to serialize them.
+"""
+import functools
+import json
+import os
+import time
+
+NAMESPACE = os.environ.get("METRICS_NAMESPACE", "ChatApp")
+SAMPLE_RATE = float(os.environ.get("METRICS_SAMPLE_RATE", "1"))
+OVERHEAD_BUDGET_US = float(os.environ.get("METRICS_OVERHEAD_BUDGET_US", "50"))
+_OVERHEAD_WEIGHT = 0.05
+
+_FUNCTION_METRICS = [
+    {"Name": "Duration", "Unit": "Milliseconds"},
+    {"Name": "ColdStart", "Unit": "Count"},
+    {"Name": "Errors", "Unit": "Count"},
+]
+_TIMING_METRICS = [
+    {"Name": "AwsCalls", "Unit": "Count"},
+    {"Name": "AwsTime", "Unit": "Milliseconds"},
+    {"Name": "CodeTime", "Unit": "Milliseconds"},
+]
+
+_cold_start = True
+_current = None
+_overhead_us = 0.0
+
+
+class _Invocation:
+    __slots__ = ("sampled", "calls", "timers", "custom")
+
+    def __init__(self, sampled):
+        self.sampled = sampled
+        self.calls = []
+        self.timers = {}
+        self.custom = {}
+
+
+def sample_rate():
+    """Return the fraction of warm invocations currently getting a full record."""
+    if _overhead_us <= OVERHEAD_BUDGET_US:
+        return SAMPLE_RATE
+    return min(SAMPLE_RATE, OVERHEAD_BUDGET_US / _overhead_us)
+
+
+# --- AWS call timers (registered on each session by aws_clients) ---
+
+def _before_call(context=None, **kwargs):
+    invocation = _current
+    if invocation is not None and invocation.sampled and context is not None:
+        context["metrics_start"] = time.perf_counter()
+
+
+def _after_call(model=None, context=None, **kwargs):
+    start = context.pop("metrics_start", None) if context is not None else None
+    invocation = _current
+    if start is not None and invocation is not None:
+        invocation.calls.append((model.service_model.service_name, model.name, time.perf_counter() - start))
+
+
+def track(events):
+    """Time every API call made through a botocore event emitter (a session's or a client's)."""
+    events.register("before-call", _before_call, unique_id="metrics-before-call")
+    events.register("after-call", _after_call, unique_id="metrics-after-call")
+    events.register("after-call-error", _after_call, unique_id="metrics-after-call-error")
+
+
+# --- Handler API ---
+
+def add(name, value, unit="Count", namespace=None):
+    """Record a custom metric (no dimensions) in ``namespace``, default ``METRICS_NAMESPACE``.
+
+    Inside an instrumented invocation it joins that invocation's record and
+    is logged whether or not the invocation is sampled; outside one it is
+    logged straight away.
+    """
+    namespace = namespace or NAMESPACE
+    if _current is None:
+        emit({name: value}, {name: unit}, namespace)
+    else:
+        _current.custom.setdefault(namespace, {})[name] = (value, unit)
+
+
+class timer:
+    """``with metrics.timer("Render"):`` records the block's duration (sampled invocations only)."""
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        invocation = _current
+        if invocation is not None and invocation.sampled:
+            elapsed = (time.perf_counter() - self.start) * 1000
+            invocation.timers[self.name] = invocation.timers.get(self.name, 0.0) + elapsed
+
+
+def emit(values, units, namespace=None, dimensions=None, properties=None):
+    """Print one EMF record for ``values`` (``{name: value}``) with ``units`` (``{name: unit}``)."""
+    record = {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": namespace or NAMESPACE,
+                "Dimensions": [list(dimensions or {})],
+                "Metrics": [{"Name": name, "Unit": units.get(name, "None")} for name in values]
+            }]
+        }
+    }
+    record.update(dimensions or {})
+    record.update(properties or {})
+    record.update(values)
+    print(json.dumps(record))
+
+
+def _record(invocation, function_name, duration, cold, error, status, rate, request_id):
+    directives = []
+    record = {"_aws": {"Timestamp": int(time.time() * 1000), "CloudWatchMetrics": directives}}
+
+    if invocation.sampled or error:
+        metrics = list(_FUNCTION_METRICS)
+        record.update({
+            "Function": function_name,
+            "Duration": round(duration * 1000, 3),
+            "ColdStart": int(cold),
+            "Errors": int(error),
+            "SampleRate": 1 if cold else rate,
+        })
+        if status is not None:
+            record["StatusCode"] = status
+        if request_id:
+            record["RequestId"] = request_id
+        if invocation.sampled:
+            metrics += _TIMING_METRICS
+            detail, by_service = {}, {}
+            for service, operation, seconds in invocation.calls:
+                count, total = detail.get(f"{service}.{operation}", (0, 0.0))
+                detail[f"{service}.{operation}"] = (count + 1, total + seconds)
+                by_service[service] = by_service.get(service, 0.0) + seconds
+            aws_time = sum(by_service.values())
+            record["AwsCalls"] = len(invocation.calls)
+            record["AwsTime"] = round(aws_time * 1000, 3)
+            # Concurrent calls can add up to more than the wall-clock duration
+            record["CodeTime"] = round(max(duration - aws_time, 0.0) * 1000, 3)
+            for service, seconds in by_service.items():
+                metrics.append({"Name": f"AwsTime.{service}", "Unit": "Milliseconds"})
+                record[f"AwsTime.{service}"] = round(seconds * 1000, 3)
+            for name, ms in invocation.timers.items():
+                metrics.append({"Name": name, "Unit": "Milliseconds"})
+                record[name] = round(ms, 3)
+            record["AwsCallDetail"] = {
+                key: {"count": count, "ms": round(seconds * 1000, 3)} for key, (count, seconds) in detail.items()
+            }
+        directives.append({"Namespace": NAMESPACE, "Dimensions": [["Function"]], "Metrics": metrics})
+
+    for namespace, values in invocation.custom.items():
+        directives.append({
+            "Namespace": namespace,
+            "Dimensions": [[]],
+            "Metrics": [{"Name": name, "Unit": unit} for name, (_, unit) in values.items()]
+        })
+        record.update({name: value for name, (value, _) in values.items()})
+
+    if directives:
+        print(json.dumps(record))
+
+
+def _context_value(context, name):
+    value = getattr(context, name, None)
+    return value if isinstance(value, str) else None
+
+
+def instrument(handler):
+    """Decorate a ``lambda_handler`` to log its per-invocation metrics record."""
+    # Imported here: warmup imports aws_clients, which imports this module
+    import warmup
+
+    default_name = os.environ.get("AWS_LAMBDA_FUNCTION_NAME") or handler.__module__
+
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        global _cold_start, _current, _overhead_us
+
+        cold, _cold_start = _cold_start, False
+        if warmup.is_warmup(event):
+            return handler(event, context)
+        rate = sample_rate()
+        if cold or rate >= 1:
+            sampled = True
+        else:
+            import random
+
+            sampled = random.random() < rate
+        # A handler invoked from inside another (a local stand-in calling a
+        # trigger) gets its own record, and the outer one is restored after
+        outer = _current
+        invocation = _current = _Invocation(sampled)
+        error, status = True, None
+        start = time.perf_counter()
+        try:
+            result = handler(event, context)
+            status = result.get("statusCode") if isinstance(result, dict) else None
+            error = isinstance(status, int) and status >= 500
+            return result
+        finally:
+            finished = time.perf_counter()
+            _current = outer
+            _record(invocation, _context_value(context, "function_name") or default_name, finished - start,
+                    cold, error, status, rate, _context_value(context, "aws_request_id"))
+            if sampled and not cold:
+                cost_us = (time.perf_counter() - finished) * 1e6
+                _overhead_us += _OVERHEAD_WEIGHT * (cost_us - _overhead_us)
+
+    return wrapper
@@ -0,0 +1,175 @@
+"""Online presence and typing indicators.
+
+Key design: one ``presence#<userID>`` item per user in the ``connections``
+table, holding ``lastSeenAt`` and ``onlineUntil`` (epoch ms) and, while the
+user is typing, ``typingIn`` (a conversation ID) and ``typingUntil``. A
+user types in one conversation at a time, so the members of a conversation
+are read in one BatchGetItem (per 100 members) that returns both who is
+online and who is typing. Items carry the table's ``expiresAt`` TTL so a
+user's last-seen time is kept for ``RETENTION_SECONDS`` after they leave;
+TTL deletion runs late, so readers go by ``onlineUntil`` and ``typingUntil``
+rather than by whether the item exists.
+
+Writes are coalesced. A heartbeat extends ``onlineUntil`` by
+``ONLINE_SECONDS`` but is only written once per ``WRITE_WINDOW_SECONDS``:
+heartbeats inside the window are skipped by a per-container cache of the
+users it has seen. API Gateway spreads a user's WebSocket messages over
+containers, so on a cache miss the item is read first (an eventually
+consistent GetItem costs a tenth of a write) and only rewritten if its
+window has passed. Repeated typing-starts are skipped the same way for
+``TYPING_REFRESH_SECONDS``.
+"""
+import os
+import time
+
+import aws_clients
+from ttl_cache import TTLCache
+
+CONNECTIONS_TABLE_NAME = os.environ.get("CONNECTIONS_TABLE_NAME")
+
+WRITE_WINDOW_SECONDS = int(os.environ.get("PRESENCE_WRITE_WINDOW_SECONDS", "60"))
+# Longer than the window plus a client's heartbeat interval, so a user who
+# keeps heartbeating never appears offline between writes
+ONLINE_SECONDS = int(os.environ.get("PRESENCE_ONLINE_SECONDS", "120"))
+TYPING_SECONDS = 6
+TYPING_REFRESH_SECONDS = 3
+RETENTION_SECONDS = 24 * 3600
+CACHE_SIZE = int(os.environ.get("PRESENCE_CACHE_SIZE", "50000"))
+
+_FIELDS = ("pk", "lastSeenAt", "onlineUntil", "typingIn", "typingUntil")
+
+
+def _table():
+    return aws_clients.get_resource("dynamodb").Table(CONNECTIONS_TABLE_NAME)
+
+
+def _key(user_id):
+    return {"pk": f"presence#{user_id}"}
+
+
+def _ms(now):
+    return int((time.time() if now is None else now) * 1000)
+
+
+class WriteCache:
+    """Per-container memory of when each user's presence was last written (epoch ms)."""
+
+    def __init__(self, maxsize=CACHE_SIZE, clock=time.monotonic):
+        self.heartbeats = TTLCache(maxsize=maxsize, ttl=WRITE_WINDOW_SECONDS, clock=clock)
+        self.typing = TTLCache(maxsize=maxsize, ttl=TYPING_REFRESH_SECONDS, clock=clock)
+
+
+_cache = WriteCache()
+
+
+def set_cache(cache):
+    """Replace the container's write cache (tests, simulations); ``None`` resets it."""
+    global _cache
+    _cache = cache or WriteCache()
+
+
+def _write_fields(now_ms):
+    return {
+        ":seen": now_ms,
+        ":online": now_ms + ONLINE_SECONDS * 1000,
+        ":expires": now_ms // 1000 + RETENTION_SECONDS,
+    }
+
+
+def heartbeat(user_id, now=None):
+    """Mark ``user_id`` online; return True if the item was written, False if the heartbeat was coalesced."""
+    now_ms = _ms(now)
+    last_written = _cache.heartbeats.get(user_id)
+    if last_written is None:
+        item = _table().get_item(Key=_key(user_id), ProjectionExpression="lastSeenAt").get("Item")
+        last_written = int(item["lastSeenAt"]) if item else None
+    if last_written is not None and now_ms - last_written < WRITE_WINDOW_SECONDS * 1000:
+        _cache.heartbeats.set(user_id, last_written, ttl=WRITE_WINDOW_SECONDS - (now_ms - last_written) / 1000)
+        return False
+
+    _table().update_item(
+        Key=_key(user_id),
+        UpdateExpression="SET lastSeenAt = :seen, onlineUntil = :online, expiresAt = :expires",
+        ExpressionAttributeValues=_write_fields(now_ms),
+    )
+    _cache.heartbeats.set(user_id, now_ms)
+    return True
+
+
+def start_typing(user_id, conversation_id, now=None):
+    """Mark ``user_id`` as typing in a conversation (and online); return True if written."""
+    if _cache.typing.get(user_id) == conversation_id:
+        return False
+    now_ms = _ms(now)
+    values = _write_fields(now_ms)
+    values.update({":conversation": conversation_id, ":until": now_ms + TYPING_SECONDS * 1000})
+    _table().update_item(
+        Key=_key(user_id),
+        UpdateExpression="SET lastSeenAt = :seen, onlineUntil = :online, expiresAt = :expires, "
+                         "typingIn = :conversation, typingUntil = :until",
+        ExpressionAttributeValues=values,
+    )
+    _cache.typing.set(user_id, conversation_id)
+    _cache.heartbeats.set(user_id, now_ms)
+    return True
+
+
+def stop_typing(user_id, conversation_id):
+    """Clear ``user_id``'s typing state if it is for this conversation; return True if it was."""
+    _cache.typing.pop(user_id)
+    try:
+        _table().update_item(
+            Key=_key(user_id),
+            UpdateExpression="REMOVE typingIn, typingUntil",
+            ConditionExpression="typingIn = :conversation",
+            ExpressionAttributeValues={":conversation": conversation_id},
+        )
+    except aws_clients.ClientError as e:
+        if e.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+            raise
+        return False
+    return True
+
+
+def _status(item, now_ms):
+    status = {"online": False, "lastSeenAt": None}
+    if item:
+        status["online"] = int(item.get("onlineUntil", 0)) > now_ms
+        status["lastSeenAt"] = int(item["lastSeenAt"]) if "lastSeenAt" in item else None
+        if item.get("typingIn") and int(item.get("typingUntil", 0)) > now_ms:
+            status["typingIn"] = item["typingIn"]
+    return status
+
+
+def _read(user_ids, now):
+    import dynamo_batch
+
+    user_ids = list(dict.fromkeys(user_ids))
+    items, unprocessed, _ = dynamo_batch.batch_get(
+        CONNECTIONS_TABLE_NAME, [_key(user_id) for user_id in user_ids], attributes=_FIELDS)
+    by_user = {item["pk"].split("#", 1)[1]: item for item in items}
+    now_ms = _ms(now)
+    statuses = {user_id: _status(by_user.get(user_id), now_ms) for user_id in user_ids}
+    return statuses, [key["pk"].split("#", 1)[1] for key in unprocessed]
+
+
+def presence_of(user_ids, now=None):
+    """Return ``(statuses, unprocessed)`` for ``user_ids``, read with BatchGetItem.
+
+    ``statuses`` maps every user ID to ``{"online", "lastSeenAt"}``;
+    ``unprocessed`` lists the IDs DynamoDB left unread (they are reported
+    offline). Where a user is typing is only revealed per conversation, by
+    ``conversation_presence``.
+    """
+    statuses, unprocessed = _read(user_ids, now)
+    for status in statuses.values():
+        status.pop("typingIn", None)
+    return statuses, unprocessed
+
+
+def conversation_presence(conversation, now=None):
+    """Return ``{"members": statuses, "typing": [user IDs]}`` for a conversation's members."""
+    statuses, _ = _read(conversation["members"], now)
+    typing = [user_id for user_id, status in statuses.items()
+              if status.pop("typingIn", None) == conversation["conversationID"]]
+    return {"members": statuses, "typing": typing}
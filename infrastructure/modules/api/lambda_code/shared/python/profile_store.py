@@ -0,0 +1,115 @@
+"""Batched, cached reads of the user profile table (``userId`` hash key).
+
+``get_profiles`` resolves many user IDs at once, which is what rendering a
+group chat needs. Every profile it reads is kept in a per-container LRU/TTL
+cache, so a warm container only goes to DynamoDB for members it has not
+seen in ``PROFILE_CACHE_TTL_SECONDS``. IDs with no profile are cached too,
+for ``PROFILE_NEGATIVE_CACHE_TTL_SECONDS``, so repeated lookups of unknown
+or deleted users do not each cost a read. Keys DynamoDB left unprocessed
+are never cached; the caller can ask for them again.
+
+Each cache hit saves the read it would have cost. That cost is taken from
+the ``ConsumedCapacity`` DynamoDB reports for this container's own batch
+reads, so it reflects the table's real item sizes.
+"""
+import os
+
+import dynamo_batch
+from ttl_cache import TTLCache
+
+USER_PROFILE_TABLE_NAME = os.environ.get("USER_PROFILE_TABLE_NAME")
+
+CACHE_SIZE = int(os.environ.get("PROFILE_CACHE_SIZE", "10000"))
+CACHE_TTL_SECONDS = float(os.environ.get("PROFILE_CACHE_TTL_SECONDS", "300"))
+NEGATIVE_CACHE_TTL_SECONDS = float(os.environ.get("PROFILE_NEGATIVE_CACHE_TTL_SECONDS", "60"))
+
+# Attributes returned to clients. Any signed-in user can look anyone up, so
+# nothing private (such as the email address) is read or cached.
+PROFILE_FIELDS = ("userId", "createdAt")
+
+# An eventually consistent read of an item under 4 KB, until DynamoDB reports otherwise
+DEFAULT_UNITS_PER_KEY = 0.5
+
+_NOT_FOUND = object()
+_MISSING = object()
+
+_cache = TTLCache(maxsize=CACHE_SIZE, ttl=CACHE_TTL_SECONDS)
+_units = {"read": 0.0, "keys": 0}
+
+
+class Lookup:
+    """What ``get_profiles`` found, in request order, and what the cache saved."""
+
+    __slots__ = ("profiles", "not_found", "unprocessed", "hits", "misses", "units_saved")
+
+    def __init__(self):
+        self.profiles = []
+        self.not_found = []
+        self.unprocessed = []
+        self.hits = 0
+        self.misses = 0
+        self.units_saved = 0.0
+
+
+def units_per_key():
+    """Average read units one key has cost this container so far."""
+    if not _units["keys"]:
+        return DEFAULT_UNITS_PER_KEY
+    return _units["read"] / _units["keys"]
+
+
+def hit_ratio():
+    """Share of this container's profile lookups answered from the cache (0.0-1.0)."""
+    total = _cache.hits + _cache.misses
+    return _cache.hits / total if total else 0.0
+
+
+def get_profiles(user_ids, table_name=None, dynamodb=None):
+    """Resolve ``user_ids`` (already de-duplicated) to a ``Lookup``."""
+    table_name = table_name or USER_PROFILE_TABLE_NAME
+    lookup = Lookup()
+    resolved = {}
+    for user_id in user_ids:
+        cached = _cache.get(user_id, _MISSING)
+        if cached is _MISSING:
+            continue
+        resolved[user_id] = cached
+    lookup.hits = len(resolved)
+    lookup.misses = len(user_ids) - lookup.hits
+
+    if lookup.misses:
+        keys = [{"userId": user_id} for user_id in user_ids if user_id not in resolved]
+        items, unprocessed, consumed = dynamo_batch.batch_get(table_name, keys, dynamodb, attributes=PROFILE_FIELDS)
+        _units["read"] += consumed
+        _units["keys"] += len(keys) - len(unprocessed)
+
+        unprocessed_ids = {key["userId"] for key in unprocessed}
+        found = {item["userId"]: item for item in items}
+        for key in keys:
+            user_id = key["userId"]
+            if user_id in unprocessed_ids:
+                continue
+            profile = found.get(user_id)
+            if profile is None:
+                resolved[user_id] = _NOT_FOUND
+                _cache.set(user_id, _NOT_FOUND, ttl=NEGATIVE_CACHE_TTL_SECONDS)
+            else:
+                resolved[user_id] = profile
+                _cache.set(user_id, profile)
+
+    lookup.units_saved = lookup.hits * units_per_key()
+    for user_id in user_ids:
+        profile = resolved.get(user_id, _MISSING)
+        if profile is _MISSING:
+            lookup.unprocessed.append(user_id)
+        elif profile is _NOT_FOUND:
+            lookup.not_found.append(user_id)
+        else:
+            lookup.profiles.append(profile)
+    return lookup
+
+
+def clear_cache():
+    """Forget every cached profile and the container's hit and read-unit counts."""
+    _cache.clear()
+    _units.update(read=0.0, keys=0)
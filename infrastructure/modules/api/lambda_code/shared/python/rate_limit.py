@@ -0,0 +1,197 @@
+"""Token-bucket rate limiting for the unauthenticated auth endpoints.
+
+Buckets are shared by every container through the ``rate-limits`` table
+(partition key ``pk`` = ``<scope>#<kind>#<id>``, e.g. ``login#ip#1.2.3.4``;
+usernames are stored as a SHA-256 digest). An item holds the bucket's
+``milliTokens`` as of ``updatedAt`` (epoch ms); the refill since then is
+computed by whoever touches it next, and the write is conditional on
+``updatedAt`` being unchanged, so concurrent containers never spend the
+same tokens.
+Items expire (``expiresAt`` TTL) once the bucket would be full again,
+which is the same as having no item at all.
+
+The hot state stays in the container, so the allowed path is usually free:
+
+* a container takes a small lease of tokens (``LEASE_FRACTION`` of the
+  burst) per write and spends it locally for up to ``LEASE_SECONDS``;
+* the last state it saw for a bucket is the expected value of its next
+  conditional write; a bucket it has never seen is written with
+  "absent or already full", so a new key costs a single UpdateItem;
+* an empty bucket is remembered until it has refilled by one token, so a
+  burst is answered with 429s without any DynamoDB calls.
+
+Failures of the table itself let the request through: the limiter is
+there to protect Cognito, not to take /login down with it.
+"""
+import math
+import os
+import threading
+import time
+
+import aws_clients
+from ttl_cache import TTLCache
+
+RATE_LIMIT_TABLE_NAME = os.environ.get("RATE_LIMIT_TABLE_NAME")
+
+# (burst, tokens per minute) per key kind
+LIMITS = {
+    "ip": (int(os.environ.get("RATE_LIMIT_IP_BURST", "30")),
+           float(os.environ.get("RATE_LIMIT_IP_PER_MINUTE", "60"))),
+    "user": (int(os.environ.get("RATE_LIMIT_USER_BURST", "5")),
+             float(os.environ.get("RATE_LIMIT_USER_PER_MINUTE", "5"))),
+    # IAM callers of /signup/bulk, charged one token per user created
+    "caller": (int(os.environ.get("RATE_LIMIT_BULK_BURST", "500")),
+               float(os.environ.get("RATE_LIMIT_BULK_PER_MINUTE", "500"))),
+}
+LEASE_FRACTION = 0.1
+LEASE_SECONDS = 5.0
+MAX_ATTEMPTS = 3
+TTL_MARGIN_SECONDS = 60
+
+_buckets = TTLCache(maxsize=8192, ttl=600)
+_lock = threading.Lock()
+
+
+class Limited(Exception):
+    """The request is over a limit; retry after ``retry_after`` seconds."""
+
+    def __init__(self, key, retry_after):
+        super().__init__(f"Rate limited: {key}")
+        self.key = key
+        self.retry_after = retry_after
+
+
+class _Bucket:
+    __slots__ = ("leased", "lease_expires", "blocked_until", "tokens", "updated_ms")
+
+    def __init__(self):
+        self.leased = 0
+        self.lease_expires = 0.0
+        self.blocked_until = 0.0
+        # Last state seen in the table (None: never seen, assume absent or full)
+        self.tokens = None
+        self.updated_ms = None
+
+
+def _table():
+    return aws_clients.get_resource("dynamodb").Table(RATE_LIMIT_TABLE_NAME)
+
+
+def bucket_key(scope, kind, value):
+    if kind == "user":
+        import hashlib
+
+        value = hashlib.sha256(value.strip().lower().encode()).hexdigest()
+    return f"{scope}#{kind}#{value}"
+
+
+def source_ip(event):
+    return ((event.get("requestContext") or {}).get("identity") or {}).get("sourceIp")
+
+
+def _state(item):
+    # Items returned with a failed condition are in the low-level format
+    if item is None:
+        return None, None
+    tokens, updated = item["milliTokens"], item["updatedAt"]
+    if isinstance(tokens, dict):
+        tokens, updated = tokens["N"], updated["N"]
+    return int(tokens) / 1000, int(updated)
+
+
+def _lease(key, bucket, burst, per_second, now_ms, cost=1):
+    """Take ``cost`` tokens, plus up to a lease, from the shared bucket; returns (granted, retry_after)."""
+    full_ms = int(burst / per_second * 1000)
+    want = max(cost, int(burst * LEASE_FRACTION))
+    for _ in range(MAX_ATTEMPTS):
+        if bucket.updated_ms is None:
+            tokens = float(burst)
+            condition = "attribute_not_exists(pk) OR updatedAt <= :full"
+            values = {":full": now_ms - full_ms}
+        else:
+            tokens = min(float(burst), bucket.tokens + (now_ms - bucket.updated_ms) / 1000 * per_second)
+            condition = "updatedAt = :seen"
+            values = {":seen": bucket.updated_ms}
+        granted = min(want, int(tokens))
+        if granted < cost:
+            return 0, (cost - tokens) / per_second
+
+        remaining = tokens - granted
+        try:
+            _table().update_item(
+                Key={"pk": key},
+                UpdateExpression="SET milliTokens = :tokens, updatedAt = :now, expiresAt = :expires",
+                ConditionExpression=condition,
+                ExpressionAttributeValues={
+                    ":tokens": int(remaining * 1000),
+                    ":now": now_ms,
+                    ":expires": (now_ms + full_ms) // 1000 + TTL_MARGIN_SECONDS,
+                    **values,
+                },
+                ReturnValuesOnConditionCheckFailure="ALL_OLD",
+            )
+        except aws_clients.ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+            # Someone else wrote the bucket first: retry against their state
+            bucket.tokens, bucket.updated_ms = _state(e.response.get("Item"))
+            continue
+        bucket.tokens, bucket.updated_ms = int(remaining * 1000) / 1000, now_ms
+        return granted, 0.0
+    return 0, 1.0
+
+
+def _take(key, burst, per_minute, cost=1):
+    now = time.monotonic()
+    with _lock:
+        bucket = _buckets.get(key)
+        if bucket is None:
+            bucket = _Bucket()
+            _buckets.set(key, bucket)
+        if bucket.blocked_until > now:
+            raise Limited(key, bucket.blocked_until - now)
+        if bucket.leased >= cost and bucket.lease_expires > now:
+            bucket.leased -= cost
+            return
+
+    per_second = per_minute / 60
+    # Containers share the table, so its timestamps are wall-clock time
+    granted, retry_after = _lease(key, bucket, burst, per_second, int(time.time() * 1000), cost)
+    with _lock:
+        if not granted:
+            if cost == 1:
+                # Only remember buckets that cannot pay for even one token
+                bucket.blocked_until = now + retry_after
+            raise Limited(key, retry_after)
+        bucket.leased = granted - cost
+        bucket.lease_expires = now + LEASE_SECONDS
+
+
+def check(scope, ip=None, username=None, caller=None, cost=1):
+    """Spend ``cost`` tokens from each of the request's buckets, or raise ``Limited``.
+
+    ``scope`` separates endpoints (``"login"``, ``"signup"``); ``caller``
+    is the IAM ARN of a signed request. A request that creates several
+    accounts costs one token per account, so batching them buys nothing; a
+    cost above a bucket's burst is always limited. Does nothing when
+    ``RATE_LIMIT_TABLE_NAME`` is not set.
+    """
+    if not RATE_LIMIT_TABLE_NAME:
+        return
+    for kind, value in (("ip", ip), ("user", username), ("caller", caller)):
+        if not value or not isinstance(value, str):
+            continue
+        burst, per_minute = LIMITS[kind]
+        try:
+            _take(bucket_key(scope, kind, value), burst, per_minute, cost)
+        except (aws_clients.ClientError, aws_clients.BotoCoreError) as e:
+            print(f"Rate limit check failed, allowing request: {e}")
+
+
+def retry_after_header(limited):
+    return str(max(1, math.ceil(limited.retry_after)))
+
+
+def reset():
+    """Forget all per-container bucket state (tests, benchmarks)."""
+    _buckets.clear()
@@ -0,0 +1,29 @@
+"""Normalise the S3 "object created" events the media Lambdas receive.
+
+Two shapes reach us: EventBridge events from the bucket's EventBridge
+integration (``detail.bucket.name`` / ``detail.object.key``) and classic S3
+notification records (``Records[].s3``), whose keys are URL-encoded.
+"""
+from urllib.parse import unquote_plus
+
+
+def created_objects(event):
+    """Yield ``(bucket, key, size)`` for every object in ``event``."""
+    for bucket, key, size, _ in created_versions(event):
+        yield bucket, key, size
+
+
+def created_versions(event):
+    """Yield ``(bucket, key, size, version_id)``; ``version_id`` is None for unversioned buckets."""
+    detail = event.get("detail")
+    if isinstance(detail, dict) and "object" in detail:
+        obj = detail["object"]
+        yield detail["bucket"]["name"], obj["key"], int(obj.get("size", 0)), obj.get("version-id")
+        return
+
+    for record in event.get("Records", []):
+        s3 = record.get("s3")
+        if not s3:
+            continue
+        obj = s3["object"]
+        yield s3["bucket"]["name"], unquote_plus(obj["key"]), int(obj.get("size", 0)), obj.get("versionId")
@@ -0,0 +1,323 @@
+"""Full-text search over conversation history: an inverted index of message terms.
+
+Key design:
+
+* ``search_index`` - partition ``pk = <conversationID>#<term>``, sort key
+  ``block`` (days since the epoch of the messages it covers). ``postings``
+  is a Binary Set with one 17-byte posting per message containing the
+  term: the message ID in its 16-byte form (``message_store.message_id_bytes``)
+  followed by the term's count in the message. A term's postings for one
+  conversation are therefore spread over one item per day it was used, and
+  the index is partitioned by conversation, so membership of the
+  conversation is the access check and a message costs one write per
+  distinct term however many members the conversation has.
+* Messages are indexed from the messages table's stream (``search_indexer``).
+  Each day's postings are appended with ``ADD postings :new``; set
+  semantics make redelivered stream records harmless.
+* An item holds at most ``MAX_POSTINGS_PER_ITEM`` postings (about 170 KB,
+  well under DynamoDB's 400 KB item limit). When a busy term fills its day,
+  further postings go to overflow parts of that day, sort key
+  ``<day>.0001``, ``<day>.0002`` and so on, which sort just above the day
+  and are merged back into it on read. The writer finds the first part
+  with room by conditional writes, and the container remembers it. A
+  redelivered posting may then land in a second part, which the merge
+  absorbs.
+
+``search`` tokenizes the query like a message and returns the messages
+containing every term, newest first, ``limit`` at a time, then ranks each
+page by term weight (more occurrences and rarer terms first). Each term's
+days are read newest first, a page of items per Query; when one term's next
+day is older than the others', the others seek straight to it with a
+``block <= day`` Query, so the rarest term decides how much is read. A
+page stops at the first day that fills it.
+
+The storage is pluggable: ``DynamoIndex`` (the table above) or
+``MemoryIndex``, an in-process stand-in with the same two methods for tests
+and benchmarks. ``get_backend`` returns the container's ``DynamoIndex``
+unless ``set_backend`` replaced it.
+"""
+import bisect
+import math
+import os
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+import aws_clients
+import message_store
+
+SEARCH_INDEX_TABLE_NAME = os.environ.get("SEARCH_INDEX_TABLE_NAME")
+
+BLOCK_MS = 24 * 3600 * 1000
+MAX_POSTINGS_PER_ITEM = 10000
+PART_DIGITS = 4
+BLOCKS_PER_QUERY = 8
+LATEST_BLOCK = 2 ** 31 - 1
+WRITE_WORKERS = int(os.environ.get("SEARCH_INDEX_WRITE_WORKERS", "16"))
+
+MIN_TERM_LENGTH = 2
+MAX_TERM_LENGTH = 32
+MAX_TERMS_PER_MESSAGE = 200
+MAX_QUERY_TERMS = 8
+MAX_PAGE_SIZE = 100
+
+_WORD = re.compile(r"[^\W_]+")
+STOPWORDS = frozenset("""
+    a an and are as at be but by for from has have he her his i if in is it its me my no not of on or our she so
+    that the their them then there they this to up us was we were what when which who will with you your
+""".split())
+
+
+def tokenize(text):
+    """Return a Counter of the index terms in ``text`` (normalized, case-folded, no stopwords)."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    counts = Counter()
+    for word in _WORD.findall(text):
+        if MIN_TERM_LENGTH <= len(word) <= MAX_TERM_LENGTH and word not in STOPWORDS:
+            if word not in counts and len(counts) == MAX_TERMS_PER_MESSAGE:
+                continue
+            counts[word] += 1
+    return counts
+
+
+def block_of(message_id):
+    return message_store.message_id_ms(message_id) // BLOCK_MS
+
+
+def postings_for(messages):
+    """Group the postings of ``messages`` by index item.
+
+    Returns ``{(conversationID, term, block): {posting, ...}}`` and, per
+    item, the IDs of the messages it holds postings for.
+    """
+    postings = defaultdict(set)
+    sources = defaultdict(list)
+    for message in messages:
+        id_bytes = message_store.message_id_bytes(message["messageID"])
+        block = (int.from_bytes(id_bytes, "big") >> 80) // BLOCK_MS
+        for term, count in tokenize(message["body"]).items():
+            key = (message["conversationID"], term, block)
+            postings[key].add(id_bytes + bytes((min(count, 255),)))
+            sources[key].append(message["messageID"])
+    return postings, sources
+
+
+def index_messages(messages, backend=None):
+    """Add ``messages`` to the index; return the IDs of messages whose postings were not all written."""
+    postings, sources = postings_for(messages)
+    failed = (backend or get_backend()).add(postings)
+    return sorted({message_id for key in failed for message_id in sources[key]})
+
+
+# --- Backends ---
+
+class DynamoIndex:
+    """The ``search_index`` table."""
+
+    def __init__(self, table_name=None):
+        self.table_name = table_name or SEARCH_INDEX_TABLE_NAME
+        # (pk, block) -> last overflow part written, for busy terms only
+        self.parts = {}
+
+    def _table(self):
+        return aws_clients.get_resource("dynamodb").Table(self.table_name)
+
+    def add(self, postings):
+        """Append each item's postings (one UpdateItem per item and part); return the keys not written."""
+        table = self._table()
+
+        def write(item):
+            (conversation_id, term, block), new = item
+            try:
+                new = list(new)
+                for start in range(0, len(new), MAX_POSTINGS_PER_ITEM):
+                    self._append(table, f"{conversation_id}#{term}", block, new[start:start + MAX_POSTINGS_PER_ITEM])
+                return None
+            except aws_clients.ClientError as e:
+                print(f"Could not index {term!r} in {conversation_id}: {e}")
+                return item[0]
+
+        items = list(postings.items())
+        if len(items) <= 1:
+            outcomes = [write(item) for item in items]
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+
+            with ThreadPoolExecutor(max_workers=min(WRITE_WORKERS, len(items))) as pool:
+                outcomes = list(pool.map(write, items))
+        return [key for key in outcomes if key is not None]
+
+    def _append(self, table, pk, block, new):
+        """Add ``new`` to the first part of ``block`` with room for it, starting at the last part used."""
+        part = self.parts.get((pk, block), 0)
+        while True:
+            try:
+                table.update_item(
+                    Key={"pk": pk, "block": part_key(block, part)},
+                    UpdateExpression="ADD postings :new",
+                    ConditionExpression="attribute_not_exists(postings) OR size(postings) <= :room",
+                    ExpressionAttributeValues={":new": set(new), ":room": MAX_POSTINGS_PER_ITEM - len(new)},
+                )
+            except aws_clients.ClientError as e:
+                if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                    raise
+                part += 1
+                continue
+            if part:
+                self.parts[(pk, block)] = part
+            return
+
+    def blocks(self, conversation_id, term, at_most, limit):
+        """Return up to ``limit`` ``(block, postings)`` for blocks <= ``at_most``, newest first.
+
+        A block's overflow parts sort above it, so its items arrive together
+        and end with the block itself.
+        """
+        from boto3.dynamodb.conditions import Key
+
+        request = {
+            "KeyConditionExpression": Key("pk").eq(f"{conversation_id}#{term}") & Key("block").lt(at_most + 1),
+            "ScanIndexForward": False,
+            "Limit": limit,
+        }
+        found = []
+        while True:
+            response = self._table().query(**request)
+            for item in response.get("Items", []):
+                block = int(item["block"])
+                if not found or found[-1][0] != block:
+                    found.append((block, set()))
+                found[-1][1].update(bytes(p) for p in item["postings"])
+                if len(found) == limit and item["block"] == block:
+                    return [(block, list(postings)) for block, postings in found]
+            if "LastEvaluatedKey" not in response:
+                return [(block, list(postings)) for block, postings in found]
+            request["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def part_key(block, part):
+    """Sort key of overflow ``part`` of ``block`` (the block itself is part 0)."""
+    if not part:
+        return block
+    from decimal import Decimal
+
+    return Decimal(f"{block}.{part:0{PART_DIGITS}d}")
+
+
+class MemoryIndex:
+    """In-process index with the same interface as ``DynamoIndex``."""
+
+    def __init__(self):
+        self.items = {}
+
+    def add(self, postings):
+        for (conversation_id, term, block), new in postings.items():
+            days = self.items.setdefault(f"{conversation_id}#{term}", ([], {}))
+            if block not in days[1]:
+                bisect.insort(days[0], block)
+                days[1][block] = set()
+            days[1][block].update(new)
+        return []
+
+    def blocks(self, conversation_id, term, at_most, limit):
+        order, by_block = self.items.get(f"{conversation_id}#{term}", ((), {}))
+        end = bisect.bisect_right(order, at_most)
+        return [(block, list(by_block[block])) for block in reversed(order[max(0, end - limit):end])]
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = DynamoIndex()
+    return _backend
+
+
+def set_backend(backend):
+    """Replace the container's backend (tests, benchmarks); ``None`` resets it."""
+    global _backend
+    _backend = backend
+
+
+# --- Queries ---
+
+class _TermBlocks:
+    """One term's blocks, newest first, fetched ``BLOCKS_PER_QUERY`` at a time."""
+
+    def __init__(self, backend, conversation_id, term):
+        self.backend = backend
+        self.conversation_id = conversation_id
+        self.term = term
+        self.buffer = []
+        self.exhausted = False
+
+    def seek(self, block):
+        """Return the newest ``(block, postings)`` at or before ``block``, or None if there is none."""
+        while True:
+            while self.buffer and self.buffer[-1][0] > block:
+                self.buffer.pop()
+            if self.buffer or self.exhausted:
+                return self.buffer[-1] if self.buffer else None
+            page = self.backend.blocks(self.conversation_id, self.term, block, BLOCKS_PER_QUERY)
+            self.exhausted = len(page) < BLOCKS_PER_QUERY
+            self.buffer = page[::-1]
+
+
+def search(conversation_id, query, limit=20, before=None, backend=None):
+    """Return ``(results, next_cursor)`` for messages in the conversation containing every term of ``query``.
+
+    Results are ``{"messageID", "score"}``, the newest ``limit`` matches
+    older than ``before`` (a message ID), ranked by score. ``next_cursor`` is
+    the ``before`` for the next page, or None once no older block matches.
+    Raises ValueError if the query has no searchable terms or ``before`` is
+    not a message ID.
+    """
+    terms = list(tokenize(query))[:MAX_QUERY_TERMS]
+    if not terms:
+        raise ValueError("The query has no searchable terms")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    try:
+        bound = message_store.message_id_bytes(before) if before else None
+        target = block_of(before) if before else LATEST_BLOCK
+    except (ValueError, OverflowError):
+        raise ValueError("Invalid cursor")
+
+    backend = backend or get_backend()
+    readers = [_TermBlocks(backend, conversation_id, term) for term in terms]
+    matches, frequency, more = [], Counter(), False
+    while target >= 0 and not more:
+        heads = [reader.seek(target) for reader in readers]
+        if any(head is None for head in heads):
+            break
+        oldest = min(block for block, _ in heads)
+        if any(block != oldest for block, _ in heads):
+            target = oldest
+            continue
+
+        counts = [{posting[:16]: posting[16] for posting in postings} for _, postings in heads]
+        for term, term_counts in zip(terms, counts):
+            frequency[term] += len(term_counts)
+        ids = set(min(counts, key=len)).intersection(*counts)
+        if bound is not None:
+            ids = {message_id for message_id in ids if message_id < bound}
+        for message_id in sorted(ids, reverse=True):
+            if len(matches) == limit:
+                break
+            matches.append((message_id, [term_counts[message_id] for term_counts in counts]))
+        # A full page stops the scan; the next page starts after its oldest match
+        more = len(matches) == limit
+        target = oldest - 1
+
+    if not matches:
+        return [], None
+    most = max(frequency.values())
+    weights = [1 + math.log(most / frequency[term]) for term in terms]
+    results = [{
+        "messageID": message_store.message_id_from_bytes(message_id),
+        "score": round(sum(w * (1 + math.log(c)) for w, c in zip(weights, term_counts)), 4),
+    } for message_id, term_counts in matches]
+    cursor = results[-1]["messageID"] if more else None
+    results.sort(key=lambda result: (result["score"], result["messageID"]), reverse=True)
+    return results, cursor
@@ -0,0 +1,64 @@
+import json
+from decimal import Decimal
+
+import pytest
+
+import api_responses
+
+HEADERS = api_responses.cors_headers("GET,OPTIONS", "Content-Type,Authorization")
+
+
+@pytest.fixture(params=["orjson", "json"])
+def backend(request, monkeypatch):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    monkeypatch.setattr(api_responses, "_BACKEND_SETTING", "auto" if request.param == "orjson" else "json")
+    monkeypatch.setattr(api_responses, "_backend", None)
+    assert api_responses.backend() == request.param
+    return request.param
+
+
+def test_static_responses_are_read_only():
+    response = api_responses.static(400, HEADERS, {"message": "bad"})
+
+    for change in (lambda: response.update(statusCode=500), lambda: response.pop("body"),
+                   lambda: response.__setitem__("body", "{}"), lambda: HEADERS.__delitem__("Access-Control-Allow-Origin")):
+        with pytest.raises(TypeError):
+            change()
+    # Derived copies are ordinary dicts
+    assert {**response["headers"], "Retry-After": "1"}["Retry-After"] == "1"
+
+
+def test_static_responses_serialize_like_plain_dicts():
+    response = api_responses.preflight(HEADERS)
+
+    assert json.loads(json.dumps(response)) == {
+        "statusCode": 200,
+        "headers": dict(HEADERS),
+        "body": '{"message":"CORS preflight OK"}',
+    }
+
+
+def test_backends_produce_the_same_body(backend):
+    payload = {"url": "https://bucket.s3.amazonaws.com/", "fields": {"key": "uploads/ü"}, "n": [1, 2.5, None, True]}
+
+    body = api_responses.response(200, HEADERS, payload)["body"]
+
+    assert body == '{"url":"https://bucket.s3.amazonaws.com/","fields":{"key":"uploads/ü"},"n":[1,2.5,null,true]}'
+    assert json.loads(body) == payload
+
+
+def test_string_bodies_are_passed_through(backend):
+    assert api_responses.response(201, HEADERS, '{"id": "x"}')["body"] == '{"id": "x"}'
+
+
+def test_unserializable_bodies_raise_type_error(backend):
+    with pytest.raises(TypeError):
+        api_responses.dumps({"n": Decimal("1")})
+
+
+def test_dynamic_responses_are_fresh_dicts():
+    first = api_responses.response(200, HEADERS, {})
+    first["headers"] = {**HEADERS, "Retry-After": "1"}
+
+    assert api_responses.response(200, HEADERS, {})["headers"] is HEADERS
@@ -0,0 +1,85 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+import aws_clients
+
+
+@pytest.fixture(autouse=True)
+def region(monkeypatch):
+    monkeypatch.setenv("AWS_REGION", "us-east-1")
+
+
+def test_client_is_cached_per_service_and_region():
+    first = aws_clients.get_client("s3")
+    second = aws_clients.get_client("s3")
+    other_region = aws_clients.get_client("s3", region_name="eu-west-1")
+
+    assert first is second
+    assert other_region is not first
+    assert other_region.meta.region_name == "eu-west-1"
+
+
+def test_client_is_cached_per_endpoint():
+    endpoint = "https://abc123.execute-api.us-east-1.amazonaws.com/dev"
+    client = aws_clients.get_client("apigatewaymanagementapi", endpoint_url=endpoint)
+
+    assert aws_clients.get_client("apigatewaymanagementapi", endpoint_url=endpoint) is client
+    assert client.meta.endpoint_url == endpoint
+    assert aws_clients.get_client("apigatewaymanagementapi", endpoint_url=endpoint + "x") is not client
+
+
+def test_client_is_cached_per_signature_version():
+    signer = aws_clients.get_client("s3", signature_version="s3v4")
+
+    assert aws_clients.get_client("s3", signature_version="s3v4") is signer
+    assert aws_clients.get_client("s3") is not signer
+    assert signer.meta.config.signature_version == "s3v4"
+    assert signer.meta.config.max_pool_connections == aws_clients.client_config().max_pool_connections
+    aws_clients.reset()
+    assert aws_clients.get_client("s3", signature_version="s3v4") is not signer
+
+
+def test_session_is_shared_between_clients():
+    aws_clients.get_client("s3")
+    aws_clients.get_client("cognito-idp")
+
+    assert list(aws_clients._sessions) == ["us-east-1"]
+
+
+def test_resource_is_cached():
+    assert aws_clients.get_resource("dynamodb") is aws_clients.get_resource("dynamodb")
+
+
+def test_client_uses_tuned_config():
+    client = aws_clients.get_client("dynamodb")
+
+    assert client.meta.config.max_pool_connections == aws_clients.client_config().max_pool_connections
+    assert client.meta.config.tcp_keepalive is True
+
+
+def test_injected_fakes_win_for_every_region():
+    fake_client = MagicMock()
+    fake_resource = MagicMock()
+    aws_clients.set_client("cognito-idp", fake_client)
+    aws_clients.set_resource("dynamodb", fake_resource)
+
+    assert aws_clients.get_client("cognito-idp") is fake_client
+    assert aws_clients.get_client("cognito-idp", region_name="eu-west-1") is fake_client
+    assert aws_clients.get_resource("dynamodb") is fake_resource
+
+
+def test_reset_drops_cache_and_fakes():
+    cached = aws_clients.get_client("s3")
+    aws_clients.set_client("cognito-idp", MagicMock())
+
+    aws_clients.reset()
+
+    assert aws_clients.get_client("s3") is not cached
+    assert not isinstance(aws_clients.get_client("cognito-idp"), MagicMock)
+
+
+def test_client_error_is_botocore_client_error():
+    from botocore.exceptions import ClientError
+
+    assert aws_clients.ClientError is ClientError
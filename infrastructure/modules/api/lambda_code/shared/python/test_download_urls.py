@@ -0,0 +1,63 @@
+import pytest
+
+from download_urls import DownloadUrlCache, is_downloadable
+from s3_signing import GetUrlSigner
+
+NOW = 1767225600.0  # 2026-01-01T00:00:00Z, a window boundary
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock(NOW)
+
+
+@pytest.fixture
+def cache(clock):
+    return DownloadUrlCache(GetUrlSigner("media", "eu-west-1", "AKIDEXAMPLE", "secret"), window=3600, clock=clock)
+
+
+def test_same_url_for_the_whole_window_and_a_new_one_after(cache, clock):
+    first, expires_at = cache.get("uploads/a.png")
+    clock.now += 3599
+    again, _ = cache.get("uploads/a.png")
+    clock.now += 1
+    next_window, next_expires_at = cache.get("uploads/a.png")
+
+    assert again == first
+    assert expires_at == NOW + 7200
+    assert next_window != first and next_expires_at == NOW + 10800
+    assert cache.signed == 2
+
+
+def test_urls_are_identical_across_containers_with_the_same_credentials(cache, clock):
+    clock.now += 1800
+    other = DownloadUrlCache(cache.signer, window=3600, clock=Clock(NOW + 42))
+
+    assert cache.get("uploads/a.png") == other.get("uploads/a.png")
+
+
+def test_every_url_stays_valid_for_at_least_a_window(cache, clock):
+    for offset in (0, 1, 1800, 3599):
+        clock.now = NOW + offset
+        _, expires_at = cache.get("uploads/a.png")
+        assert expires_at - clock.now >= 3600
+
+
+@pytest.mark.parametrize("key, allowed", [
+    ("uploads/a.png", True),
+    ("derived/a/thumb_320.webp", True),
+    ("uploads/../private/x", False),
+    ("private/x", False),
+    ("", False),
+    (None, False),
+])
+def test_only_media_keys_are_downloadable(key, allowed):
+    assert is_downloadable(key) is allowed
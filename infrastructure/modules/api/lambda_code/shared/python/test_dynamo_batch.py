@@ -0,0 +1,102 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import dynamo_batch
+
+
+@pytest.fixture(autouse=True)
+def no_sleep():
+    with patch("dynamo_batch.time.sleep"):
+        yield
+
+
+def put(item):
+    return {"PutRequest": {"Item": item}}
+
+
+def test_items_are_written_in_chunks_of_25():
+    dynamodb = MagicMock()
+    dynamodb.batch_write_item.return_value = {"UnprocessedItems": {}}
+    items = [{"userId": str(i)} for i in range(60)]
+
+    failed = dynamo_batch.batch_write("profiles", items, dynamodb=dynamodb)
+
+    assert failed == []
+    sizes = [len(c.kwargs["RequestItems"]["profiles"]) for c in dynamodb.batch_write_item.call_args_list]
+    assert sizes == [25, 25, 10]
+
+
+def test_unprocessed_items_are_retried():
+    dynamodb = MagicMock()
+    items = [{"userId": "a"}, {"userId": "b"}]
+    dynamodb.batch_write_item.side_effect = [
+        {"UnprocessedItems": {"profiles": [put(items[1])]}},
+        {"UnprocessedItems": {}},
+    ]
+
+    failed = dynamo_batch.batch_write("profiles", items, dynamodb=dynamodb)
+
+    assert failed == []
+    retry = dynamodb.batch_write_item.call_args_list[1].kwargs["RequestItems"]
+    assert retry == {"profiles": [put(items[1])]}
+
+
+def test_items_still_unprocessed_after_max_attempts_are_returned():
+    dynamodb = MagicMock()
+    items = [{"userId": "a"}, {"userId": "b"}]
+    dynamodb.batch_write_item.return_value = {"UnprocessedItems": {"profiles": [put(items[0])]}}
+
+    failed = dynamo_batch.batch_write("profiles", items, dynamodb=dynamodb, max_attempts=3)
+
+    assert failed == [items[0]]
+    assert dynamodb.batch_write_item.call_count == 3
+
+
+def test_deletes_are_chunked_and_unprocessed_keys_returned():
+    dynamodb = MagicMock()
+    keys = [{"pk": "c#0", "messageID": str(i)} for i in range(30)]
+    dynamodb.batch_write_item.side_effect = [
+        {"UnprocessedItems": {}},
+        {"UnprocessedItems": {"messages": [{"DeleteRequest": {"Key": keys[29]}}]}},
+        {"UnprocessedItems": {"messages": [{"DeleteRequest": {"Key": keys[29]}}]}},
+    ]
+
+    failed = dynamo_batch.batch_delete("messages", keys, dynamodb=dynamodb, max_attempts=2)
+
+    assert failed == [keys[29]]
+    first = dynamodb.batch_write_item.call_args_list[0].kwargs["RequestItems"]["messages"]
+    assert first[0] == {"DeleteRequest": {"Key": keys[0]}} and len(first) == 25
+
+
+def test_keys_are_read_in_chunks_of_100_with_the_requested_attributes():
+    dynamodb = MagicMock()
+    dynamodb.batch_get_item.return_value = {
+        "Responses": {"profiles": [{"userId": "1"}]},
+        "ConsumedCapacity": [{"TableName": "profiles", "CapacityUnits": 1.5}],
+    }
+    keys = [{"userId": str(i)} for i in range(150)]
+
+    items, unprocessed, units = dynamo_batch.batch_get("profiles", keys, dynamodb=dynamodb, attributes=["userId"])
+
+    assert (len(items), unprocessed, units) == (2, [], 3.0)
+    calls = [c.kwargs["RequestItems"]["profiles"] for c in dynamodb.batch_get_item.call_args_list]
+    assert [len(c["Keys"]) for c in calls] == [100, 50]
+    assert calls[0]["ProjectionExpression"] == "#a0"
+    assert calls[0]["ExpressionAttributeNames"] == {"#a0": "userId"}
+
+
+def test_unprocessed_keys_are_retried_and_returned_when_they_never_succeed():
+    dynamodb = MagicMock()
+    pending = {"profiles": {"Keys": [{"userId": "b"}]}}
+    dynamodb.batch_get_item.side_effect = [
+        {"Responses": {"profiles": [{"userId": "a"}]}, "UnprocessedKeys": pending},
+        {"Responses": {"profiles": []}, "UnprocessedKeys": pending},
+    ]
+
+    items, unprocessed, _ = dynamo_batch.batch_get(
+        "profiles", [{"userId": "a"}, {"userId": "b"}], dynamodb=dynamodb, max_attempts=2)
+
+    assert items == [{"userId": "a"}]
+    assert unprocessed == [{"userId": "b"}]
+    assert dynamodb.batch_get_item.call_args_list[1].kwargs["RequestItems"] == pending
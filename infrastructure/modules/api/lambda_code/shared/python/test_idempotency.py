@@ -0,0 +1,189 @@
+import json
+import time
+
+import pytest
+from botocore.exceptions import ClientError, ReadTimeoutError
+
+import idempotency
+
+HEADERS = {"Access-Control-Allow-Origin": "*"}
+
+
+def event(key="key-1"):
+    return {"headers": {"Idempotency-Key": key}} if key is not None else {"headers": {}}
+
+
+class Handler:
+    def __init__(self, *responses):
+        self.responses = list(responses) or [{"statusCode": 200, "headers": HEADERS, "body": '{"n": 1}'}]
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        response = self.responses[min(self.calls, len(self.responses)) - 1]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def handle(run, key="key-1", material="body", caller="user-1"):
+    return idempotency.handle("test", event(key), caller, material, run, HEADERS)
+
+
+def test_without_a_key_or_a_table_the_handler_just_runs(idempotency_table, monkeypatch):
+    run = Handler()
+    handle(run, key=None)
+    monkeypatch.setattr(idempotency, "IDEMPOTENCY_TABLE_NAME", None)
+    handle(run)
+
+    assert run.calls == 2
+    assert idempotency_table.scan()["Items"] == []
+
+
+def test_replay_returns_the_stored_response(idempotency_table):
+    run = Handler()
+
+    first = handle(run)
+    replay = handle(run)
+
+    assert run.calls == 1
+    assert (replay["statusCode"], replay["body"]) == (first["statusCode"], first["body"])
+    assert replay["headers"] == {**HEADERS, "Idempotent-Replayed": "true"}
+    item, = idempotency_table.scan()["Items"]
+    assert item["pk"] == "test#user-1#key-1" and item["status"] == "COMPLETED"
+
+
+def test_header_name_is_case_insensitive(idempotency_table):
+    run = Handler()
+    handle(run)
+    idempotency.handle("test", {"headers": {"idempotency-key": "key-1"}}, "user-1", "body", run, HEADERS)
+
+    assert run.calls == 1
+
+
+def test_keys_are_scoped_to_the_caller(idempotency_table):
+    run = Handler()
+    handle(run, caller="user-1")
+    handle(run, caller="user-2")
+
+    assert run.calls == 2
+
+
+def test_anonymous_keys_are_scoped_to_the_request(idempotency_table):
+    run = Handler()
+    handle(run, material={"email": "a@example.com"}, caller=None)
+
+    other = handle(run, material={"email": "b@example.com"}, caller=None)
+    retry = handle(run, material={"email": "a@example.com"}, caller=None)
+
+    assert other["statusCode"] == 200 and "Idempotent-Replayed" not in other["headers"]
+    assert retry["headers"]["Idempotent-Replayed"] == "true"
+    assert run.calls == 2
+
+
+def test_reused_key_with_a_different_request_is_rejected(idempotency_table):
+    run = Handler()
+    handle(run, material={"size": 1})
+
+    response = handle(run, material={"size": 2})
+
+    assert response["statusCode"] == 422
+    assert json.loads(response["body"])["message"] == json.loads(idempotency.MISMATCH_BODY)["message"]
+    assert run.calls == 1
+
+
+def test_duplicate_in_flight_gets_a_409(idempotency_table):
+    def first_request():
+        # The client times out and retries while this is still running
+        inner = handle(Handler())
+        return {"statusCode": 201, "body": json.dumps({"inner": inner["statusCode"]})}
+
+    response = handle(first_request)
+
+    assert json.loads(response["body"]) == {"inner": 409}
+    assert handle(Handler())["statusCode"] == 201
+
+
+def test_abandoned_claim_is_taken_over(idempotency_table, monkeypatch):
+    monkeypatch.setattr(idempotency, "IN_PROGRESS_SECONDS", -1)
+    idempotency._claim("test#user-1#key-1", idempotency.fingerprint("body"), 3600)
+
+    run = Handler()
+    assert handle(run)["statusCode"] == 200
+    assert run.calls == 1
+
+
+def test_expired_record_is_not_replayed(idempotency_table):
+    run = Handler()
+    handle(run)
+    idempotency_table.update_item(Key={"pk": "test#user-1#key-1"}, UpdateExpression="SET expiresAt = :past",
+                                  ExpressionAttributeValues={":past": int(time.time()) - 1})
+
+    handle(run)
+
+    assert run.calls == 2
+
+
+@pytest.mark.parametrize("status", [500, 503, 429])
+def test_transient_responses_are_not_stored(idempotency_table, status):
+    run = Handler({"statusCode": status, "body": "{}"}, {"statusCode": 200, "body": "{}"})
+
+    assert handle(run)["statusCode"] == status
+    assert handle(run)["statusCode"] == 200
+    assert run.calls == 2
+
+
+def test_client_errors_are_stored(idempotency_table):
+    run = Handler({"statusCode": 409, "body": '{"message": "exists"}'})
+
+    handle(run)
+    assert handle(run)["statusCode"] == 409
+    assert run.calls == 1
+
+
+def test_exception_releases_the_claim(idempotency_table):
+    run = Handler(RuntimeError("boom"), {"statusCode": 200, "body": "{}"})
+
+    with pytest.raises(RuntimeError):
+        handle(run)
+    assert handle(run)["statusCode"] == 200
+
+
+@pytest.mark.parametrize("key", ["", "k" * 256])
+def test_invalid_keys_are_rejected(idempotency_table, key):
+    run = Handler()
+
+    assert handle(run, key=key)["statusCode"] == 400
+    assert run.calls == 0
+
+
+STORE_ERRORS = [
+    ClientError({"Error": {"Code": "InternalServerError", "Message": "boom"}}, "PutItem"),
+    ReadTimeoutError(endpoint_url="https://dynamodb.us-east-1.amazonaws.com"),
+]
+
+
+@pytest.mark.parametrize("error", STORE_ERRORS)
+def test_store_failure_runs_the_request(idempotency_table, monkeypatch, error):
+    class BrokenTable:
+        def put_item(self, **kwargs):
+            raise error
+
+    monkeypatch.setattr(idempotency, "_table", BrokenTable)
+    run = Handler()
+
+    assert handle(run)["statusCode"] == 200
+    assert handle(run)["statusCode"] == 200
+    assert run.calls == 2
+
+
+@pytest.mark.parametrize("error", STORE_ERRORS)
+def test_failed_store_updates_still_return_the_response(idempotency_table, monkeypatch, error):
+    def broken(*args):
+        raise error
+
+    monkeypatch.setattr(idempotency, "_complete", broken)
+    monkeypatch.setattr(idempotency, "_release", broken)
+
+    assert handle(Handler())["statusCode"] == 200
+    assert handle(Handler({"statusCode": 503, "body": "{}"}), key="key-2")["statusCode"] == 503
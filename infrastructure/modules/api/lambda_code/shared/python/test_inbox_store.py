@@ -0,0 +1,88 @@
+import pytest
+
+import inbox_store
+
+
+@pytest.fixture
+def store(messaging_tables):
+    return messaging_tables
+
+
+def inbox(user_id):
+    summaries, _ = inbox_store.list_inbox(user_id, limit=100)
+    return {s["conversationID"]: s for s in summaries}
+
+
+def test_new_conversations_appear_in_every_members_inbox(store):
+    conversation = store.create_conversation("alice", ["bob"], name="Lunch", now=1700000000)
+
+    for member in ("alice", "bob"):
+        assert inbox(member)[conversation["conversationID"]] == {
+            "conversationID": conversation["conversationID"], "name": "Lunch",
+            "unreadCount": 0, "lastActivityAt": 1700000000000,
+        }
+
+
+def test_messages_update_the_last_message_and_count_unread_for_everyone_but_the_sender(store):
+    conversation = store.create_conversation("alice", ["bob", "carol"])
+    store.send_message(conversation, "alice", "hi", now=1700000001)
+    last, _ = store.send_message(conversation, "bob", "x" * 500, now=1700000002)
+
+    alice, bob, carol = (inbox(m)[conversation["conversationID"]] for m in ("alice", "bob", "carol"))
+    assert (alice["unreadCount"], bob["unreadCount"], carol["unreadCount"]) == (1, 1, 2)
+    assert carol["lastMessageID"] == last["messageID"]
+    assert carol["lastSenderID"] == "bob"
+    assert carol["lastMessagePreview"] == "x" * inbox_store.PREVIEW_LENGTH
+    assert carol["lastActivityAt"] == last["sentAt"]
+
+
+def test_a_late_write_counts_as_unread_but_does_not_replace_a_newer_message(store):
+    conversation = store.create_conversation("alice", ["bob"])
+    newer = {"conversationID": conversation["conversationID"], "senderID": "alice", "body": "newer",
+             "messageID": store.new_message_id(1700000002), "sentAt": 1700000002000}
+    older = dict(newer, body="older", messageID=store.new_message_id(1700000001), sentAt=1700000001000)
+
+    assert inbox_store.record_message(conversation, newer) == []
+    assert inbox_store.record_message(conversation, older) == []
+
+    bob = inbox("bob")[conversation["conversationID"]]
+    assert (bob["lastMessagePreview"], bob["unreadCount"]) == ("newer", 2)
+
+
+def test_inbox_pages_most_recent_first(store):
+    conversations = [store.create_conversation("alice", [f"user-{i}"], now=1700000000 + i) for i in range(7)]
+    store.send_message(conversations[2], "user-2", "bump", now=1700000100)
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = inbox_store.list_inbox("alice", limit=3, cursor=cursor)
+        seen += [s["conversationID"] for s in page]
+        if cursor is None:
+            break
+
+    order = [conversations[i]["conversationID"] for i in (2, 6, 5, 4, 3, 1, 0)]
+    assert seen == order
+
+
+def test_mark_read_resets_the_counter_unless_a_newer_message_arrived(store):
+    conversation = store.create_conversation("alice", ["bob"])
+    first, _ = store.send_message(conversation, "alice", "one", now=1700000001)
+    store.send_message(conversation, "alice", "two", now=1700000002)
+
+    summary, reset = inbox_store.mark_read("bob", conversation["conversationID"], up_to=first["messageID"])
+    assert (summary["unreadCount"], reset) == (2, False)
+
+    summary, reset = inbox_store.mark_read("bob", conversation["conversationID"])
+    assert (summary["unreadCount"], reset) == (0, True)
+    assert inbox_store.mark_read("mallory", conversation["conversationID"]) == (None, False)
+
+
+def test_cursors_from_another_user_are_rejected(store):
+    for i in range(3):
+        store.create_conversation("alice", [f"user-{i}"])
+    _, cursor = inbox_store.list_inbox("alice", limit=1)
+
+    with pytest.raises(ValueError):
+        inbox_store.list_inbox("bob", cursor=cursor)
+    with pytest.raises(ValueError):
+        inbox_store.list_inbox("alice", cursor="not-a-cursor")
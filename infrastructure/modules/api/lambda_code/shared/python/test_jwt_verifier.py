@@ -0,0 +1,151 @@
+import json
+import os
+
+import pytest
+
+import jwks_fixture
+import jwt_verifier
+from jwt_verifier import CognitoVerifier, JWKSCache, TokenError
+
+
+@pytest.fixture(scope="module")
+def key():
+    return jwks_fixture.make_key("key-1", seed=1)
+
+
+@pytest.fixture(scope="module")
+def rotated_key():
+    return jwks_fixture.make_key("key-2", seed=2)
+
+
+class FakeJWKSEndpoint:
+    def __init__(self, *keys):
+        self.document = jwks_fixture.jwks(*keys)
+        self.calls = 0
+
+    def __call__(self, url):
+        self.calls += 1
+        return self.document
+
+
+@pytest.fixture
+def endpoint(key):
+    return FakeJWKSEndpoint(key)
+
+
+@pytest.fixture
+def verifier(endpoint, tmp_path):
+    jwks = JWKSCache("https://example.test/jwks.json", fetch=endpoint, cache_dir=str(tmp_path))
+    return CognitoVerifier(jwks_fixture.REGION, jwks_fixture.USER_POOL_ID, jwks_fixture.CLIENT_ID, jwks=jwks)
+
+
+def test_valid_access_and_id_tokens(verifier, key):
+    access = jwks_fixture.sign(jwks_fixture.claims(token_use="access"), key)
+    id_token = jwks_fixture.sign(jwks_fixture.claims(token_use="id"), key)
+
+    assert verifier.verify(access)["sub"] == "user-123"
+    assert verifier.verify(id_token, token_use="id")["email"] == "user-123@example.com"
+
+
+def test_tampered_payload_is_rejected(verifier, key):
+    header, _, signature = jwks_fixture.sign(jwks_fixture.claims(), key).split(".")
+    forged = jwks_fixture._b64url(json.dumps(jwks_fixture.claims(sub="admin")).encode())
+
+    with pytest.raises(TokenError, match="signature"):
+        verifier.verify(f"{header}.{forged}.{signature}")
+
+
+@pytest.mark.parametrize("overrides, message", [
+    ({"ttl": -60}, "expired"),
+    ({"iss": "https://cognito-idp.us-east-1.amazonaws.com/other-pool"}, "user pool"),
+    ({"client_id": "other-client"}, "app client"),
+    ({"token_use": "refresh"}, "token_use"),
+])
+def test_claim_checks(verifier, key, overrides, message):
+    token = jwks_fixture.sign(jwks_fixture.claims(**overrides), key)
+
+    with pytest.raises(TokenError, match=message):
+        verifier.verify(token)
+
+
+def test_token_use_restriction(verifier, key):
+    token = jwks_fixture.sign(jwks_fixture.claims(token_use="access"), key)
+
+    with pytest.raises(TokenError, match="id token"):
+        verifier.verify(token, token_use="id")
+
+
+def test_malformed_token(verifier):
+    with pytest.raises(TokenError, match="Malformed"):
+        verifier.verify("not-a-jwt")
+
+
+def test_claims_are_memoized_per_token(verifier, key, monkeypatch):
+    token = jwks_fixture.sign(jwks_fixture.claims(), key)
+    verifier.verify(token)
+
+    def fail(*args):
+        raise AssertionError("signature checked twice")
+
+    monkeypatch.setattr(jwt_verifier, "rsa_sha256_verify", fail)
+    assert verifier.verify(token)["sub"] == "user-123"
+
+
+def test_jwks_is_fetched_once_and_persisted_to_tmp(verifier, endpoint, key, tmp_path):
+    for sub in ("a", "b", "c"):
+        verifier.verify(jwks_fixture.sign(jwks_fixture.claims(sub=sub), key))
+
+    assert endpoint.calls == 1
+    assert len(os.listdir(tmp_path)) == 1
+
+    # A fresh container-level cache (e.g. after a runtime restart) reads /tmp
+    cold = JWKSCache("https://example.test/jwks.json", fetch=endpoint, cache_dir=str(tmp_path))
+    assert cold.get_key("key-1") is not None
+    assert endpoint.calls == 1
+
+
+def test_unknown_kid_triggers_refetch_for_key_rotation(verifier, endpoint, key, rotated_key):
+    verifier.verify(jwks_fixture.sign(jwks_fixture.claims(), key))
+    endpoint.document = jwks_fixture.jwks(key, rotated_key)
+    verifier.jwks.min_refetch_interval = 0
+
+    claims = verifier.verify(jwks_fixture.sign(jwks_fixture.claims(sub="rotated"), rotated_key))
+
+    assert claims["sub"] == "rotated"
+    assert endpoint.calls == 2
+
+
+def test_unknown_kid_refetch_is_rate_limited(verifier, endpoint, key, rotated_key):
+    verifier.verify(jwks_fixture.sign(jwks_fixture.claims(), key))
+
+    for _ in range(3):
+        with pytest.raises(TokenError, match="Unknown signing key"):
+            verifier.verify(jwks_fixture.sign(jwks_fixture.claims(), rotated_key))
+
+    assert endpoint.calls == 1
+
+
+def test_stale_keys_are_kept_when_refresh_fails(key, tmp_path):
+    now = [1000.0]
+    endpoint = FakeJWKSEndpoint(key)
+    jwks = JWKSCache("https://example.test/jwks.json", fetch=endpoint, cache_dir=None,
+                     max_age=60, clock=lambda: now[0])
+    jwks.get_key("key-1")
+
+    endpoint.document = None  # the next fetch raises
+    now[0] += 120
+
+    assert jwks.get_key("key-1") is not None
+
+
+def test_authenticate_reads_bearer_header(verifier, key):
+    token = jwks_fixture.sign(jwks_fixture.claims(), key)
+    jwt_verifier.set_verifier(verifier)
+    try:
+        claims = jwt_verifier.authenticate({"headers": {"authorization": f"Bearer {token}"}})
+        assert claims["sub"] == "user-123"
+
+        with pytest.raises(TokenError, match="Missing"):
+            jwt_verifier.authenticate({"headers": {}})
+    finally:
+        jwt_verifier.set_verifier(None)
@@ -0,0 +1,135 @@
+from unittest.mock import patch
+
+import pytest
+
+import aws_clients
+import message_archive
+import message_store
+
+T0 = 1700000000
+DAY = 24 * 3600
+
+
+@pytest.fixture(autouse=True)
+def bucket(archive_bucket):
+    return archive_bucket
+
+
+def send(conversation, count, start, sender="user-1"):
+    return [message_store.send_message(conversation, sender, f"message {i} about the release plan", now=start + i)[0]
+            for i in range(count)]
+
+
+def read_all(conversation, limit):
+    messages, cursor = [], None
+    while True:
+        page, cursor = message_archive.history(conversation, limit, cursor)
+        messages += page
+        if cursor is None:
+            return [message["messageID"] for message in messages]
+
+
+def hot_ids(conversation):
+    return [message["messageID"] for message in message_store.history(conversation, limit=100)[0]]
+
+
+def test_quiet_conversations_move_to_s3_and_read_back_identically():
+    conversation = message_store.create_conversation("user-1", ["user-2"])
+    sent = send(conversation, 250, T0)
+    expected = read_all(conversation, 40)
+
+    totals = message_archive.compact(now=T0 + 100 * DAY)
+
+    assert totals["archived"] == 1 and totals["messages"] == 250 and totals["undeleted"] == 0
+    assert totals["bytes"] < totals["rawBytes"] / 3
+    assert hot_ids(conversation) == []
+    assert expected == [message["messageID"] for message in reversed(sent)]
+    assert read_all(conversation, 40) == expected
+    assert read_all(conversation, 100) == expected
+    page, _ = message_archive.history(conversation, 1)
+    assert page == [sent[-1]]
+
+
+def test_attachments_survive_archiving(media_table):
+    import media_store
+
+    media_table.put_item(Item=media_store.pending_item("a", "user-1", "uploads/a.png", "image/png"))
+    media_store.finalize("a", "user-1", 9)
+    conversation = message_store.create_conversation("user-1", ["user-2"])
+    send(conversation, 2, T0)
+    attached, _ = message_store.send_message(conversation, "user-1", "photo", now=T0 + 5, attachments=["uploads/a.png"])
+
+    message_archive.compact(now=T0 + 100 * DAY)
+
+    page, _ = message_archive.history(conversation, 3)
+    assert page[0] == attached and "attachments" not in page[1]
+
+
+def test_active_and_empty_conversations_are_left_alone():
+    active = message_store.create_conversation("user-1", ["user-2"])
+    message_store.create_conversation("user-1", ["user-3"])
+    send(active, 3, T0 + 95 * DAY)
+
+    totals = message_archive.compact(now=T0 + 100 * DAY)
+
+    assert totals["scanned"] == 2 and totals["archived"] == 0
+    assert len(hot_ids(active)) == 3
+
+
+def test_reactivated_sharded_conversation_reads_the_table_then_each_segment(monkeypatch):
+    monkeypatch.setattr(message_store, "HOT_CONVERSATION_MEMBERS", 3)
+    group = message_store.create_conversation("user-1", ["user-2", "user-3"])
+    assert group["shardCount"] > 1
+    sent = send(group, 30, T0)
+    message_archive.compact(now=T0 + 100 * DAY)
+    sent += send(group, 20, T0 + 101 * DAY)
+    message_archive.compact(now=T0 + 300 * DAY)
+    sent += send(group, 12, T0 + 301 * DAY)
+
+    assert [segment["count"] for segment in message_archive.segments(group["conversationID"])] == [30, 20]
+    assert len(hot_ids(group)) == 12
+    assert read_all(group, 7) == [message["messageID"] for message in reversed(sent)]
+
+
+def test_failed_deletes_are_not_served_twice_and_are_retried():
+    conversation = message_store.create_conversation("user-1", ["user-2"])
+    sent = send(conversation, 10, T0)
+    with patch("dynamo_batch.batch_delete", side_effect=lambda table, keys: keys):
+        assert message_archive.compact(now=T0 + 100 * DAY)["undeleted"] == 10
+    sent += send(conversation, 2, T0 + 101 * DAY)
+
+    assert read_all(conversation, 5) == [message["messageID"] for message in reversed(sent)]
+
+    totals = message_archive.compact(now=T0 + 200 * DAY)
+    assert totals["undeleted"] == 0 and totals["segments"] == 1
+    assert hot_ids(conversation) == []
+    assert read_all(conversation, 5) == [message["messageID"] for message in reversed(sent)]
+
+
+def test_a_late_message_below_archived_through_is_not_deleted(capsys):
+    conversation = message_store.create_conversation("user-1", ["user-2"])
+    send(conversation, 10, T0)
+    message_archive.compact(now=T0 + 100 * DAY)
+    # Written after the run but stamped inside the archived range
+    late, _ = message_store.send_message(conversation, "user-2", "sent late", now=T0 + 4.5)
+    assert late["messageID"] <= message_archive.segments(conversation["conversationID"])[-1]["last"]
+
+    totals = message_archive.compact(now=T0 + 200 * DAY)
+
+    assert totals["undeleted"] == 0 and totals["segments"] == 0
+    assert hot_ids(conversation) == [late["messageID"]]
+    assert "1 messages of" in capsys.readouterr().out
+
+
+def test_an_archived_page_is_one_ranged_get_once_the_index_is_cached():
+    conversation = message_store.create_conversation("user-1", ["user-2"])
+    send(conversation, 250, T0)
+    message_archive.compact(now=T0 + 100 * DAY)
+    ranges = []
+    aws_clients.get_client("s3").meta.events.register(
+        "provide-client-params.s3.GetObject", lambda params, **_: ranges.append(params["Range"]))
+
+    page, cursor = message_archive.history(conversation, 50)
+    assert len(page) == 50 and len(ranges) == 2
+    page, cursor = message_archive.history(conversation, 50, cursor)
+    assert len(page) == 50 and len(ranges) == 3
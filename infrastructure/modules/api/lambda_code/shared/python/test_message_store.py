@@ -0,0 +1,65 @@
+import pytest
+
+import message_store
+
+
+def test_message_ids_sort_by_time():
+    ids = [message_store.new_message_id(now=1700000000 + i / 1000) for i in range(50)]
+
+    assert ids == sorted(ids)
+    assert all(message_store.is_message_id(i) for i in ids)
+    assert not message_store.is_message_id("not-an-id")
+
+
+def test_small_conversations_have_one_shard_and_hot_groups_are_sharded(messaging_tables):
+    store = messaging_tables
+    pair = store.create_conversation("alice", ["bob"])
+    group = store.create_conversation("alice", [f"user-{i}" for i in range(store.HOT_CONVERSATION_MEMBERS)])
+
+    assert pair["members"] == ["alice", "bob"]
+    assert pair["shardCount"] == 1
+    assert group["shardCount"] == store.WRITE_SHARDS
+
+
+@pytest.mark.parametrize("members", [["bob"], [f"user-{i}" for i in range(60)]])
+def test_history_pages_newest_first_across_shards(messaging_tables, members):
+    store = messaging_tables
+    conversation = store.create_conversation("alice", members)
+    sent = [store.send_message(conversation, "alice", f"m{i}", now=1700000000 + i)[0]["messageID"] for i in range(23)]
+
+    pages, before = [], None
+    while True:
+        messages, before = store.history(conversation, limit=10, before=before)
+        pages.append([m["messageID"] for m in messages])
+        if before is None:
+            break
+
+    assert [len(page) for page in pages] == [10, 10, 3]
+    assert [m for page in pages for m in page] == sent[::-1]
+
+
+def test_send_fans_out_to_every_member_feed(messaging_tables):
+    store = messaging_tables
+    conversation = store.create_conversation("alice", ["bob", "carol"])
+    other = store.create_conversation("bob", ["dave"])
+    first, undelivered = store.send_message(conversation, "alice", "hi", now=1700000000)
+    second, _ = store.send_message(other, "dave", "yo", now=1700000001)
+
+    assert undelivered == []
+    messages, cursor, has_more = store.since("bob")
+    assert [m["body"] for m in messages] == ["hi", "yo"]
+    assert (cursor, has_more) == (second["messageID"], False)
+
+    assert store.since("bob", cursor) == ([], cursor, False)
+    assert [m["messageID"] for m in store.since("carol", limit=1)[0]] == [first["messageID"]]
+
+
+def test_membership_is_enforced(messaging_tables):
+    store = messaging_tables
+    conversation = store.create_conversation("alice", ["bob"])
+
+    assert store.member_conversation(conversation["conversationID"], "bob") is not None
+    with pytest.raises(store.NotAMember):
+        store.member_conversation(conversation["conversationID"], "mallory")
+    with pytest.raises(store.NotAMember):
+        store.member_conversation("missing", "alice")
@@ -0,0 +1,202 @@
+import json
+import os
+import sys
+import time
+
+import boto3
+import pytest
+from moto import mock_aws
+
+import aws_clients
+import metrics
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics(monkeypatch):
+    monkeypatch.setenv("AWS_REGION", "us-east-1")
+    monkeypatch.setattr(metrics, "_cold_start", True)
+    monkeypatch.setattr(metrics, "_overhead_us", 0.0)
+    monkeypatch.setattr(metrics, "SAMPLE_RATE", 1.0)
+
+
+def records(capsys):
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines() if line.startswith("{")]
+
+
+def ok_handler(event, context):
+    return {"statusCode": 200, "body": "{}"}
+
+
+def test_first_invocation_is_a_cold_start(capsys):
+    handler = metrics.instrument(ok_handler)
+
+    handler({}, None)
+    handler({}, None)
+
+    cold, warm = records(capsys)
+    assert (cold["ColdStart"], warm["ColdStart"]) == (1, 0)
+    assert cold["Function"] == __name__
+    assert cold["StatusCode"] == 200 and cold["Errors"] == 0
+    directive = cold["_aws"]["CloudWatchMetrics"][0]
+    assert directive["Namespace"] == metrics.NAMESPACE
+    assert directive["Dimensions"] == [["Function"]]
+    assert {m["Name"] for m in directive["Metrics"]} >= {"Duration", "ColdStart", "Errors", "AwsCalls", "CodeTime"}
+
+
+def test_warmup_events_log_no_record_but_take_the_cold_start(capsys):
+    import warmup
+
+    handler = metrics.instrument(warmup.primes()(ok_handler))
+
+    assert handler({"warmup": True}, None)["warmup"] is True
+    assert records(capsys) == []
+    handler({}, None)
+    record, = records(capsys)
+    assert record["ColdStart"] == 0
+
+
+def test_function_name_and_request_id_come_from_the_context(capsys):
+    class Context:
+        function_name = "chatapp-dev-login"
+        aws_request_id = "req-1"
+
+    metrics.instrument(ok_handler)({}, Context())
+
+    record, = records(capsys)
+    assert (record["Function"], record["RequestId"]) == ("chatapp-dev-login", "req-1")
+
+
+def test_aws_calls_are_timed_per_service_and_operation(capsys):
+    @metrics.instrument
+    def handler(event, context):
+        table = aws_clients.get_resource("dynamodb").Table("metrics-test")
+        table.put_item(Item={"pk": "a"})
+        table.get_item(Key={"pk": "a"})
+        return {"statusCode": 200}
+
+    with mock_aws():
+        boto3.client("dynamodb", region_name="us-east-1").create_table(
+            TableName="metrics-test",
+            KeySchema=[{"AttributeName": "pk", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "pk", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        capsys.readouterr()
+        handler({}, None)
+
+    record, = records(capsys)
+    assert record["AwsCalls"] == 2
+    assert set(record["AwsCallDetail"]) == {"dynamodb.PutItem", "dynamodb.GetItem"}
+    assert 0 < record["AwsTime.dynamodb"] == record["AwsTime"] <= record["Duration"]
+
+
+def test_raised_errors_and_5xx_count_as_errors(capsys):
+    def failing(event, context):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        metrics.instrument(failing)({}, None)
+    metrics.instrument(lambda event, context: {"statusCode": 503})({}, None)
+    metrics.instrument(lambda event, context: {"statusCode": 404})({}, None)
+
+    assert [record["Errors"] for record in records(capsys)] == [1, 1, 0]
+
+
+def test_timer_and_custom_metrics(capsys):
+    @metrics.instrument
+    def handler(event, context):
+        with metrics.timer("Render"):
+            pass
+        metrics.add("Widgets", 3, namespace="ChatApp/Test")
+        return {"statusCode": 200}
+
+    handler({}, None)
+
+    record, = records(capsys)
+    assert record["Render"] >= 0 and record["Widgets"] == 3
+    custom = record["_aws"]["CloudWatchMetrics"][1]
+    assert custom == {"Namespace": "ChatApp/Test", "Dimensions": [[]], "Metrics": [{"Name": "Widgets", "Unit": "Count"}]}
+
+
+def test_nested_invocations_keep_their_metrics_apart(capsys):
+    @metrics.instrument
+    def trigger(event, context):
+        metrics.add("ProfilesCreated", 1)
+        return {}
+
+    @metrics.instrument
+    def handler(event, context):
+        trigger({}, None)
+        metrics.add("Signups", 1)
+        return {"statusCode": 201}
+
+    handler({}, None)
+
+    inner, outer = records(capsys)
+    assert inner["ProfilesCreated"] == 1 and "Signups" not in inner
+    assert outer["Signups"] == 1 and "ProfilesCreated" not in outer
+
+
+def test_add_outside_an_invocation_is_logged_immediately(capsys):
+    metrics.add("Orphans", 1)
+
+    record, = records(capsys)
+    assert record["Orphans"] == 1
+    assert record["_aws"]["CloudWatchMetrics"][0]["Namespace"] == metrics.NAMESPACE
+
+
+def test_unsampled_warm_invocations_only_log_errors_and_custom_metrics(monkeypatch, capsys):
+    monkeypatch.setattr(metrics, "SAMPLE_RATE", 0.0)
+    handler = metrics.instrument(ok_handler)
+
+    handler({}, None)  # cold starts are always recorded
+    handler({}, None)
+    metrics.instrument(lambda event, context: {"statusCode": 500})({}, None)
+
+    @metrics.instrument
+    def counting(event, context):
+        metrics.add("Widgets", 1)
+        return {"statusCode": 200}
+
+    counting({}, None)
+
+    cold, error, custom = records(capsys)
+    assert cold["ColdStart"] == 1 and cold["SampleRate"] == 1
+    assert error["Errors"] == 1 and "AwsCalls" not in error and error["SampleRate"] == 0
+    assert custom == {"_aws": custom["_aws"], "Widgets": 1}
+
+
+def test_sample_rate_drops_when_records_cost_more_than_the_budget(monkeypatch):
+    monkeypatch.setattr(metrics, "OVERHEAD_BUDGET_US", 0.001)
+    handler = metrics.instrument(ok_handler)
+
+    with open(os.devnull, "w") as devnull:
+        monkeypatch.setattr(sys, "stdout", devnull)
+        for _ in range(50):
+            handler({}, None)
+
+    assert metrics._overhead_us > 0
+    assert metrics.sample_rate() < 0.01
+
+
+def test_overhead_per_invocation_is_microseconds(monkeypatch):
+    """Instrumented vs bare handler, printing to /dev/null; the budget is generous for CI noise."""
+    runs = 5000
+    handler = metrics.instrument(ok_handler)
+
+    with open(os.devnull, "w") as devnull:
+        monkeypatch.setattr(sys, "stdout", devnull)
+        handler({}, None)
+
+        def mean_us(fn):
+            best = float("inf")
+            for _ in range(3):
+                start = time.perf_counter()
+                for _ in range(runs):
+                    fn({}, None)
+                best = min(best, (time.perf_counter() - start) / runs * 1e6)
+            return best
+
+        overhead = mean_us(handler) - mean_us(ok_handler)
+
+    assert overhead < 100, f"{overhead:.1f} µs per invocation"
@@ -0,0 +1,82 @@
+import pytest
+
+import presence
+
+T0 = 1700000000.0
+
+
+class Clock:
+    def __init__(self, now=T0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(messaging_tables):
+    clock = Clock()
+    presence.set_cache(presence.WriteCache(clock=clock))
+    yield clock
+    presence.set_cache(None)
+
+
+def test_heartbeats_are_coalesced_within_the_write_window(clock):
+    assert presence.heartbeat("user-1", now=T0)
+    clock.now = T0 + 30
+    assert not presence.heartbeat("user-1", now=T0 + 30)
+    clock.now = T0 + presence.WRITE_WINDOW_SECONDS
+    assert presence.heartbeat("user-1", now=clock.now)
+
+    statuses, unprocessed = presence.presence_of(["user-1"], now=clock.now)
+    assert statuses == {"user-1": {"online": True, "lastSeenAt": int(clock.now * 1000)}}
+    assert unprocessed == []
+
+
+def test_another_container_reads_before_writing(clock):
+    assert presence.heartbeat("user-1", now=T0)
+    # A cold container has no memory of the write but finds it on the item
+    presence.set_cache(presence.WriteCache(clock=clock))
+    assert not presence.heartbeat("user-1", now=T0 + 10)
+    presence.set_cache(presence.WriteCache(clock=clock))
+    assert presence.heartbeat("user-1", now=T0 + presence.WRITE_WINDOW_SECONDS + 1)
+
+
+def test_users_go_offline_when_heartbeats_stop(clock):
+    presence.heartbeat("user-1", now=T0)
+    later = T0 + presence.ONLINE_SECONDS + 1
+
+    statuses, _ = presence.presence_of(["user-1", "user-2"], now=later)
+
+    assert statuses == {
+        "user-1": {"online": False, "lastSeenAt": int(T0 * 1000)},
+        "user-2": {"online": False, "lastSeenAt": None},
+    }
+
+
+def test_typing_is_shown_per_conversation_and_expires(clock, messaging_tables):
+    conversation = messaging_tables.create_conversation("user-1", ["user-2", "user-3"])
+    other = messaging_tables.create_conversation("user-1", ["user-3"])
+    conversation_id = conversation["conversationID"]
+
+    assert presence.start_typing("user-1", conversation_id, now=T0)
+    assert not presence.start_typing("user-1", conversation_id, now=T0 + 1)
+    presence.heartbeat("user-2", now=T0)
+
+    result = presence.conversation_presence(conversation, now=T0 + 1)
+    assert result["typing"] == ["user-1"]
+    assert result["members"]["user-1"] == {"online": True, "lastSeenAt": int(T0 * 1000)}
+    assert result["members"]["user-3"]["online"] is False
+    assert presence.conversation_presence(other, now=T0 + 1)["typing"] == []
+    assert presence.presence_of(["user-1"], now=T0 + 1)[0]["user-1"] == {
+        "online": True, "lastSeenAt": int(T0 * 1000)}
+    assert presence.conversation_presence(conversation, now=T0 + presence.TYPING_SECONDS + 1)["typing"] == []
+
+
+def test_stop_typing_only_clears_the_same_conversation(clock):
+    presence.start_typing("user-1", "conv-a", now=T0)
+
+    assert not presence.stop_typing("user-1", "conv-b")
+    assert presence.stop_typing("user-1", "conv-a")
+    assert not presence.stop_typing("user-1", "conv-a")
+    assert presence.presence_of(["user-1"], now=T0 + 1)[0]["user-1"]["online"] is True
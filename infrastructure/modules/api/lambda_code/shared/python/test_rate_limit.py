@@ -0,0 +1,158 @@
+import time
+
+import pytest
+from botocore.exceptions import ClientError, EndpointConnectionError
+
+import rate_limit
+
+
+class Clock:
+    """Drives both of rate_limit's clocks (wall time for the table, monotonic for the container)."""
+
+    def __init__(self):
+        self.now = time.time()
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def writes(rate_limit_table, monkeypatch):
+    """Count the UpdateItem calls the limiter makes."""
+    calls = []
+
+    class CountingTable:
+        def update_item(self, **kwargs):
+            calls.append(kwargs["Key"]["pk"])
+            return rate_limit_table.update_item(**kwargs)
+
+    monkeypatch.setattr(rate_limit, "_table", CountingTable)
+    return calls
+
+
+def spend(count, **kwargs):
+    allowed = 0
+    for _ in range(count):
+        try:
+            rate_limit.check("login", **kwargs)
+            allowed += 1
+        except rate_limit.Limited:
+            pass
+    return allowed
+
+
+def test_disabled_without_a_table(monkeypatch):
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_TABLE_NAME", None)
+
+    assert spend(100, ip="1.2.3.4", username="a@example.com") == 100
+
+
+def test_username_bucket_allows_its_burst_then_limits(writes, clock):
+    burst, per_minute = rate_limit.LIMITS["user"]
+
+    assert spend(burst, username="A@example.com ") == burst
+    with pytest.raises(rate_limit.Limited) as limited:
+        rate_limit.check("login", username="a@example.com")
+
+    assert limited.value.retry_after == pytest.approx(60 / per_minute)
+    assert rate_limit.retry_after_header(limited.value) == str(int(60 / per_minute))
+    # Usernames are normalised and never stored in the clear
+    assert all("example.com" not in key for key in writes)
+
+
+def test_allowed_requests_spend_a_local_lease(writes, clock):
+    burst, _ = rate_limit.LIMITS["ip"]
+    lease = int(burst * rate_limit.LEASE_FRACTION)
+
+    assert spend(lease * 4, ip="1.2.3.4") == lease * 4
+
+    assert len(writes) == 4
+
+
+def test_limited_bucket_is_rejected_without_table_calls(writes, clock):
+    burst, _ = rate_limit.LIMITS["user"]
+    spend(burst + 1, username="a@example.com")
+    calls = len(writes)
+
+    assert spend(1000, username="a@example.com") == 0
+    assert len(writes) == calls
+
+
+def test_bucket_refills_over_time(writes, clock):
+    burst, per_minute = rate_limit.LIMITS["user"]
+    spend(burst + 1, username="a@example.com")
+
+    clock.now += 60 / per_minute
+    assert spend(2, username="a@example.com") == 1
+
+    clock.now += 3600
+    assert spend(burst + 1, username="a@example.com") == burst
+
+
+def test_containers_share_the_bucket(writes, clock):
+    burst, _ = rate_limit.LIMITS["user"]
+    spend(burst - 1, username="a@example.com")
+
+    rate_limit.reset()  # a different container: no local state
+    assert spend(2, username="a@example.com") == 1
+
+
+def test_scopes_and_keys_are_separate(writes, clock):
+    burst, _ = rate_limit.LIMITS["user"]
+    spend(burst, username="a@example.com")
+
+    assert spend(1, username="b@example.com") == 1
+    rate_limit.check("signup", username="a@example.com")
+
+
+def test_every_bucket_of_the_request_is_checked(writes, clock):
+    burst, _ = rate_limit.LIMITS["user"]
+    spend(burst, ip="1.2.3.4", username="a@example.com")
+
+    with pytest.raises(rate_limit.Limited) as limited:
+        rate_limit.check("login", ip="1.2.3.4", username="a@example.com")
+    assert limited.value.key.startswith("login#user#")
+
+
+def test_a_request_can_cost_several_tokens(writes, clock):
+    burst, per_minute = rate_limit.LIMITS["caller"]
+    arn = "arn:aws:iam::123456789012:role/operator"
+
+    rate_limit.check("signup", caller=arn, cost=burst - 10)
+    with pytest.raises(rate_limit.Limited) as limited:
+        rate_limit.check("signup", caller=arn, cost=20)
+
+    assert limited.value.retry_after == pytest.approx(10 / (per_minute / 60))
+    # The ten tokens left can still be spent
+    rate_limit.check("signup", caller=arn, cost=10)
+    with pytest.raises(rate_limit.Limited):
+        rate_limit.check("signup", caller=arn)
+
+
+@pytest.mark.parametrize("error", [
+    ClientError({"Error": {"Code": "InternalServerError", "Message": "boom"}}, "UpdateItem"),
+    EndpointConnectionError(endpoint_url="https://dynamodb.us-east-1.amazonaws.com"),
+])
+def test_table_errors_let_requests_through(rate_limit_table, monkeypatch, error):
+    class BrokenTable:
+        def update_item(self, **kwargs):
+            raise error
+
+    monkeypatch.setattr(rate_limit, "_table", BrokenTable)
+
+    assert spend(20, ip="1.2.3.4", username="a@example.com") == 20
+
+
+def test_source_ip():
+    assert rate_limit.source_ip({"requestContext": {"identity": {"sourceIp": "1.2.3.4"}}}) == "1.2.3.4"
+    assert rate_limit.source_ip({}) is None
@@ -0,0 +1,74 @@
+import base64
+import datetime
+import json
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlsplit
+
+import boto3
+import pytest
+from botocore.auth import SigV4Auth
+from botocore.awsrequest import AWSRequest
+from botocore.config import Config
+from botocore.credentials import Credentials
+
+from s3_signing import GetUrlSigner, PostPolicySigner
+
+NOW = 1767225600.0  # 2026-01-01T00:00:00Z
+
+
+def botocore_signature(string_to_sign, amz_date, token=None):
+    auth = SigV4Auth(Credentials("AKIDEXAMPLE", "secret", token), "s3", "eu-west-1")
+    request = AWSRequest(method="POST", url="https://example.com")
+    request.context["timestamp"] = amz_date
+    return auth.signature(string_to_sign, request)
+
+
+def test_signature_matches_botocore_sigv4():
+    signer = PostPolicySigner("media", "eu-west-1", "AKIDEXAMPLE", "secret", clock=lambda: NOW)
+
+    fields = signer.presign_post("uploads/a.png", fields={"Content-Type": "image/png"})["fields"]
+
+    assert fields["x-amz-date"] == "20260101T000000Z"
+    assert fields["x-amz-credential"] == "AKIDEXAMPLE/20260101/eu-west-1/s3/aws4_request"
+    assert fields["x-amz-signature"] == botocore_signature(fields["policy"], fields["x-amz-date"])
+
+
+def test_policy_binds_bucket_key_fields_and_conditions():
+    signer = PostPolicySigner("media", "eu-west-1", "AKIDEXAMPLE", "secret", token="session", clock=lambda: NOW)
+
+    post = signer.presign_post(
+        "uploads/a.mp4",
+        fields={"Content-Type": "video/mp4"},
+        conditions=[["content-length-range", 100, 2000]],
+        expires_in=600,
+    )
+    policy = json.loads(base64.b64decode(post["fields"]["policy"]))
+
+    assert post["url"] == "https://media.s3.eu-west-1.amazonaws.com/"
+    assert policy["expiration"] == "2026-01-01T00:10:00Z"
+    assert {"bucket": "media"} in policy["conditions"]
+    assert {"key": "uploads/a.mp4"} in policy["conditions"]
+    assert {"Content-Type": "video/mp4"} in policy["conditions"]
+    assert ["content-length-range", 100, 2000] in policy["conditions"]
+    assert {"x-amz-security-token": "session"} in policy["conditions"]
+    assert post["fields"]["x-amz-security-token"] == "session"
+    assert post["fields"]["x-amz-signature"] == botocore_signature(
+        post["fields"]["policy"], post["fields"]["x-amz-date"], token="session"
+    )
+
+
+@pytest.mark.parametrize("token", [None, "session"])
+def test_get_url_matches_botocore_presigned_url(token):
+    client = boto3.client("s3", region_name="eu-west-1", endpoint_url="https://s3.eu-west-1.amazonaws.com",
+                          config=Config(signature_version="s3v4", s3={"addressing_style": "virtual"}),
+                          aws_access_key_id="AKIDEXAMPLE", aws_secret_access_key="secret", aws_session_token=token)
+    with patch("botocore.auth.get_current_datetime", return_value=datetime.datetime(2026, 1, 1)):
+        expected = client.generate_presigned_url("get_object", ExpiresIn=7200, Params={
+            "Bucket": "media", "Key": "uploads/a b+c.png", "ResponseCacheControl": "private, max-age=60"})
+    signer = GetUrlSigner("media", "eu-west-1", "AKIDEXAMPLE", "secret", token)
+
+    url = signer.signed_url("uploads/a b+c.png", NOW, 7200, {"response-cache-control": "private, max-age=60"})
+
+    assert url.split("?")[0] == expected.split("?")[0]
+    assert parse_qs(urlsplit(url).query) == parse_qs(urlsplit(expected).query)
+    assert url == signer.signed_url("uploads/a b+c.png", NOW, 7200, {"response-cache-control": "private, max-age=60"})
@@ -0,0 +1,115 @@
+import random
+
+import pytest
+
+import message_store
+import search_index
+from search_index import DynamoIndex, MemoryIndex, search, tokenize
+
+DAY = 24 * 3600
+
+
+def message(body, now, conversation_id="c1"):
+    return {"conversationID": conversation_id, "messageID": message_store.new_message_id(now), "body": body}
+
+
+def ids(results):
+    return [result["messageID"] for result in results]
+
+
+def test_tokenize_normalizes_and_drops_stopwords():
+    assert tokenize("The Café's café, CAFÉ! and ｆｕｌｌ-width x") == {"café": 3, "full": 1, "width": 1}
+
+
+def test_only_messages_with_every_term_match_ranked_by_weight():
+    index = MemoryIndex()
+    lunch = message("lunch at noon", 1700000000)
+    both = message("pizza for lunch, pizza pizza", 1700000001)
+    pizza = message("pizza tonight", 1700000002)
+    other = message("lunch is served at the pizza place; lunch lunch lunch", 1700000003, conversation_id="c2")
+    search_index.index_messages([lunch, both, pizza, other], backend=index)
+
+    assert ids(search("c1", "lunch", backend=index)[0]) == [both["messageID"], lunch["messageID"]]
+    results, cursor = search("c1", "Pizza LUNCH", backend=index)
+    assert ids(results) == [both["messageID"]]
+    assert cursor is None
+    assert search("c1", "sushi", backend=index) == ([], None)
+
+
+def test_pages_back_across_days_without_repeats():
+    index = MemoryIndex()
+    messages = [message(f"standup notes {i}", 1700000000 + (i // 3) * DAY + i) for i in range(10)]
+    messages.append(message("unrelated", 1700000000 + 20 * DAY))
+    search_index.index_messages(messages, backend=index)
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        results, cursor = search("c1", "standup", limit=4, before=cursor, backend=index)
+        seen += sorted(ids(results), reverse=True)
+        pages += 1
+        if cursor is None:
+            break
+
+    assert seen == [m["messageID"] for m in reversed(messages[:10])]
+    assert pages == 3
+
+
+def test_matches_brute_force_on_random_history():
+    rng = random.Random(3)
+    words = [f"w{i}" for i in range(12)]
+    messages = [message(" ".join(rng.choices(words, k=4)), 1700000000 + rng.randrange(60) * DAY + i)
+                for i in range(600)]
+    index = MemoryIndex()
+    search_index.index_messages(messages, backend=index)
+
+    for query in ("w1", "w1 w2", "w3 w7 w11"):
+        terms = set(query.split())
+        expected = sorted((m["messageID"] for m in messages if terms <= set(m["body"].split())), reverse=True)
+        seen, cursor = [], None
+        while True:
+            results, cursor = search("c1", query, limit=25, before=cursor, backend=index)
+            seen += sorted(ids(results), reverse=True)
+            if cursor is None:
+                break
+        assert seen == expected
+
+
+def test_rejects_queries_without_terms_and_bad_cursors():
+    with pytest.raises(ValueError):
+        search("c1", "the and", backend=MemoryIndex())
+    with pytest.raises(ValueError):
+        search("c1", "lunch", before="Z" * message_store.MESSAGE_ID_LENGTH, backend=MemoryIndex())
+
+
+def test_dynamodb_backend_matches_the_memory_backend_and_tolerates_redelivery(search_tables):
+    messages = [message(f"deploy {'failed' if i % 3 else 'ok'} on day {i // 4}", 1700000000 + (i // 4) * DAY + i)
+                for i in range(24)]
+    memory, dynamo = MemoryIndex(), DynamoIndex()
+    search_index.index_messages(messages, backend=memory)
+    assert search_index.index_messages(messages, backend=dynamo) == []
+    assert search_index.index_messages(messages[:5], backend=dynamo) == []
+
+    for query in ("deploy", "deploy failed", "ok"):
+        assert search("c1", query, limit=5, backend=dynamo) == search("c1", query, limit=5, backend=memory)
+
+
+def test_full_items_overflow_into_parts_of_the_same_day(search_tables, monkeypatch):
+    import boto3
+
+    monkeypatch.setattr(search_index, "MAX_POSTINGS_PER_ITEM", 3)
+    messages = [message(f"deploy number{i}", 1700000000 + (i // 8) * DAY + i) for i in range(16)]
+    memory = MemoryIndex()
+    search_index.index_messages(messages, backend=memory)
+    assert search_index.index_messages(messages[:5], backend=DynamoIndex()) == []
+    # A second container starts from the first part again; a redelivery lands wherever there is room
+    assert search_index.index_messages(messages[3:], backend=DynamoIndex()) == []
+
+    items = boto3.resource("dynamodb", region_name="us-east-1").Table("test-search-index").query(
+        KeyConditionExpression="pk = :pk", ExpressionAttributeValues={":pk": "c1#deploy"})["Items"]
+    assert len(items) >= 6  # 16 postings, at most 3 per item
+    assert all(len(item["postings"]) <= 3 for item in items)
+    for limit in (1, 5, 20):
+        assert search("c1", "deploy", limit=limit, backend=DynamoIndex()) == \
+            search("c1", "deploy", limit=limit, backend=memory)
+    assert DynamoIndex().blocks("c1", "deploy", search_index.LATEST_BLOCK, 1)[0][0] == \
+        search_index.block_of(messages[-1]["messageID"])
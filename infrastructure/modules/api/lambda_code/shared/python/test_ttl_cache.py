@@ -0,0 +1,62 @@
+from ttl_cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_get_returns_value_until_ttl_expires():
+    clock = FakeClock()
+    cache = TTLCache(ttl=10, clock=clock)
+    cache.set("a", 1)
+
+    clock.now += 9.9
+    assert cache.get("a") == 1
+
+    clock.now += 0.2
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_per_entry_ttl_overrides_default():
+    clock = FakeClock()
+    cache = TTLCache(ttl=10, clock=clock)
+    cache.set("short", 1, ttl=1)
+    cache.set("long", 2)
+
+    clock.now += 5
+    assert cache.get("short") is None
+    assert cache.get("long") == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+
+
+def test_hit_and_miss_counters():
+    cache = TTLCache()
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("missing")
+
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_falsy_values_are_cached():
+    cache = TTLCache()
+    cache.set("none", None)
+
+    assert "none" in cache
+    assert cache.get("none", "default") is None
@@ -0,0 +1,87 @@
+import json
+
+import pytest
+
+import aws_clients
+import jwks_fixture
+import warmup
+from jwt_verifier import JWKSCache
+
+
+def handler(event, context):
+    return {"statusCode": 200, "body": json.dumps(event)}
+
+
+class FakeSession:
+    def __init__(self):
+        self.created = []
+
+    def client(self, service, **kwargs):
+        self.created.append(("client", service))
+        return object()
+
+    def resource(self, service, **kwargs):
+        self.created.append(("resource", service))
+        return object()
+
+
+@pytest.fixture
+def session(monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(aws_clients, "get_session", lambda region_name=None: session)
+    monkeypatch.setattr(aws_clients, "client_config", lambda: None)
+    return session
+
+
+def test_requests_go_to_the_handler(session):
+    wrapped = warmup.primes(clients=("s3",))(handler)
+
+    assert wrapped({"httpMethod": "GET"}, None)["statusCode"] == 200
+    assert wrapped({"warmup": "yes"}, None)["statusCode"] == 200
+    assert session.created == []
+
+
+def test_warmup_event_primes_without_calling_the_handler(session):
+    def must_not_run(event, context):
+        raise AssertionError("handler ran")
+
+    wrapped = warmup.primes(clients=("s3",), resources=("dynamodb",), modules=("uuid",))(must_not_run)
+
+    response = wrapped({"warmup": True}, None)
+    again = wrapped({"warmup": True}, None)
+
+    assert response["primed"] == ["client:s3", "resource:dynamodb", "module:uuid"]
+    assert again["primed"] == response["primed"]
+    # Cached by aws_clients, so the second warm-up builds nothing
+    assert session.created == [("client", "s3"), ("resource", "dynamodb")]
+
+
+def test_provisioned_environments_prime_at_init(session, monkeypatch):
+    monkeypatch.setattr(warmup, "PROVISIONED", True)
+
+    warmup.primes(clients=("cognito-idp",))
+
+    assert session.created == [("client", "cognito-idp")]
+
+
+def test_init_priming_failures_are_not_fatal(monkeypatch, capsys):
+    monkeypatch.setattr(warmup, "PROVISIONED", True)
+    monkeypatch.setattr(aws_clients, "get_client", lambda service: 1 / 0)
+
+    wrapped = warmup.primes(clients=("s3",))(handler)
+
+    assert "Warm-up at init failed" in capsys.readouterr().out
+    assert wrapped({}, None)["statusCode"] == 200
+
+
+def test_jwks_preload_uses_the_disk_cache_before_cognito(tmp_path):
+    document = jwks_fixture.jwks(jwks_fixture.make_key("kid-1", 512, 1))
+    fetches = []
+
+    def fetch(url):
+        fetches.append(url)
+        return document
+
+    assert JWKSCache("https://example/jwks.json", fetch=fetch, cache_dir=str(tmp_path)).preload()
+    assert JWKSCache("https://example/jwks.json", fetch=fetch, cache_dir=str(tmp_path)).preload()
+    assert len(fetches) == 1
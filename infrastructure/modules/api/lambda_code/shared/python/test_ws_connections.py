@@ -0,0 +1,100 @@
+import json
+
+import pytest
+from botocore.exceptions import ReadTimeoutError
+
+import aws_clients
+
+
+@pytest.fixture
+def registry(messaging_tables):
+    import ws_connections
+
+    return ws_connections
+
+
+def user_item(user_id):
+    table = aws_clients.get_resource("dynamodb").Table("test-connections")
+    return table.get_item(Key={"pk": f"user#{user_id}"}).get("Item")
+
+
+def test_register_tracks_every_connection_of_a_user(registry):
+    registry.register("c1", "user-1")
+    registry.register("c2", "user-1")
+    registry.register("c3", "user-2")
+
+    assert registry.connections_for(["user-1", "user-2", "user-3"]) == {"user-1": ["c1", "c2"], "user-2": ["c3"]}
+    assert registry.connection_user("c3") == "user-2"
+
+
+def test_unregister_removes_the_connection(registry):
+    registry.register("c1", "user-1")
+    registry.register("c2", "user-1")
+
+    assert registry.unregister("c1") == "user-1"
+    assert registry.unregister("c1") is None
+    assert registry.connections_for(["user-1"]) == {"user-1": ["c2"]}
+    assert registry.connection_user("c1") is None
+
+
+def test_connections_for_batches_large_conversations(registry):
+    for i in range(250):
+        registry.register(f"c{i}", f"user-{i}")
+
+    found = registry.connections_for([f"user-{i}" for i in range(300)])
+
+    assert len(found) == 250
+
+
+def test_users_left_unprocessed_are_logged_and_skipped(registry, monkeypatch, capsys):
+    import dynamo_batch
+
+    registry.register("c1", "user-1")
+    registry.register("c2", "user-2")
+    batch_get = dynamo_batch.batch_get
+
+    def throttled(table_name, keys, *args, **kwargs):
+        items, _, units = batch_get(table_name, keys[:1], *args, **kwargs)
+        return items, keys[1:], units
+
+    monkeypatch.setattr(dynamo_batch, "batch_get", throttled)
+
+    assert registry.connections_for(["user-1", "user-2"]) == {"user-1": ["c1"]}
+    assert "Connections of 1 users could not be read: user-2" in capsys.readouterr().out
+
+
+def test_broadcast_posts_once_per_connection_and_prunes_gone_ones(registry, management_api):
+    for connection_id, user_id in (("c1", "user-1"), ("c2", "user-1"), ("c3", "user-2")):
+        registry.register(connection_id, user_id)
+    management_api.connect("c1")
+    management_api.connect("c3")  # c2 went away without a $disconnect
+
+    delivered, pruned = registry.broadcast("https://example", registry.connections_for(["user-1", "user-2"]),
+                                           {"type": "message"})
+
+    assert (delivered, pruned) == (2, 1)
+    assert json.loads(management_api.received["c1"][0]) == {"type": "message"}
+    assert set(user_item("user-1")["connectionIDs"]) == {"c1"}
+    assert registry.connection_user("c2") is None
+
+
+@pytest.mark.parametrize("error", [
+    aws_clients.ClientError({"Error": {"Code": "LimitExceededException", "Message": ""}}, "PostToConnection"),
+    ReadTimeoutError(endpoint_url="https://example"),
+])
+def test_broadcast_keeps_connections_on_other_errors(registry, management_api, monkeypatch, error):
+    registry.register("c1", "user-1")
+
+    def failing(ConnectionId, Data):
+        raise error
+
+    monkeypatch.setattr(management_api, "post_to_connection", failing)
+
+    assert registry.broadcast("https://example", {"user-1": ["c1"]}, b"{}") == (0, 0)
+    assert registry.connection_user("c1") == "user-1"
+
+
+def test_endpoint_url_comes_from_the_request_context(registry):
+    event = {"requestContext": {"domainName": "abc.execute-api.us-east-1.amazonaws.com", "stage": "dev"}}
+
+    assert registry.endpoint_url(event) == "https://abc.execute-api.us-east-1.amazonaws.com/dev"
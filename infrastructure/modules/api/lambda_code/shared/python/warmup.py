@@ -0,0 +1,79 @@
+"""Warm-up invocations: prime an execution environment without doing real work.
+
+The handlers defer everything expensive (importing boto3, building clients,
+fetching the Cognito JWKS) to the first request that needs it, which keeps
+cold-start imports small but leaves that cost on the first real request.
+``@warmup.primes(...)`` moves it off the request path:
+
+* An invocation with ``{"warmup": true}`` (the api module's warm-up
+  schedule, or a post-deploy ping) builds the handler's clients and keys and
+  returns without calling the handler.
+* In an environment Lambda initialises for provisioned concurrency
+  (``AWS_LAMBDA_INITIALIZATION_TYPE=provisioned-concurrency``) the same
+  priming runs at module load, which happens before any traffic is routed
+  to it.
+
+Priming only creates objects and reads the JWKS; it never calls the
+handler's tables, buckets or user pool.
+"""
+import functools
+import os
+import time
+
+import aws_clients
+
+EVENT_KEY = "warmup"
+PROVISIONED = os.environ.get("AWS_LAMBDA_INITIALIZATION_TYPE") == "provisioned-concurrency"
+
+
+def is_warmup(event):
+    """True for a warm-up event (``{"warmup": true}``) rather than a real request."""
+    return isinstance(event, dict) and event.get(EVENT_KEY) is True
+
+
+def prime(clients=(), resources=(), jwks=False, modules=()):
+    """Build the given clients and resources, load the JWKS and import ``modules``.
+
+    Returns the names of what was primed, e.g. ``["client:s3", "jwks"]``.
+    """
+    primed = []
+    for service in clients:
+        aws_clients.get_client(service)
+        primed.append(f"client:{service}")
+    for service in resources:
+        aws_clients.get_resource(service)
+        primed.append(f"resource:{service}")
+    if jwks:
+        import jwt_verifier
+
+        if jwt_verifier.get_verifier().jwks.preload():
+            primed.append("jwks")
+    for module in modules:
+        __import__(module)
+        primed.append(f"module:{module}")
+    return primed
+
+
+def primes(clients=(), resources=(), jwks=False, modules=()):
+    """Decorate a ``lambda_handler`` to answer warm-up events by priming what it uses."""
+    setup = functools.partial(prime, clients, resources, jwks, modules)
+
+    if PROVISIONED:
+        try:
+            setup()
+        except Exception as e:
+            # The first request builds whatever is missing instead
+            print(f"Warm-up at init failed: {e}")
+
+    def decorate(handler):
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            if not is_warmup(event):
+                return handler(event, context)
+            start = time.perf_counter()
+            primed = setup()
+            return {"warmup": True, "primed": primed, "durationMs": round((time.perf_counter() - start) * 1000, 1)}
+
+        return wrapper
+
+    return decorate
@@ -0,0 +1,165 @@
+"""WebSocket connection registry and message fan-out.
+
+Key design (one ``connections`` table, partition key ``pk``):
+
+* ``connection#<connectionID>`` -> ``userID``, ``connectedAt``. Written on
+  ``$connect`` and deleted on ``$disconnect``; the user of a connection never
+  changes, so it is also cached per container.
+* ``user#<userID>`` -> ``connectionIDs``, a string set of that user's open
+  connections (phones, tabs, ...). ``ADD``/``DELETE`` on the set are atomic,
+  so concurrent connects and disconnects never lose each other's updates.
+
+A conversation's live connections are its members' ``user#`` items, read
+with one BatchGetItem per 100 members (``dynamo_batch``), so the registry needs no per-
+conversation bookkeeping when membership changes. API Gateway closes
+connections after two hours at most; both item types carry an ``expiresAt``
+TTL a little past that in case ``$disconnect`` is never delivered, and any
+connection the management API reports as gone is pruned during fan-out.
+"""
+import json
+import os
+import time
+
+import aws_clients
+from ttl_cache import TTLCache
+
+CONNECTIONS_TABLE_NAME = os.environ.get("CONNECTIONS_TABLE_NAME")
+# Overrides the https://<domainName>/<stage> endpoint (e.g. behind a custom domain)
+WEBSOCKET_ENDPOINT = os.environ.get("WEBSOCKET_ENDPOINT")
+
+CONNECTION_TTL_SECONDS = 3 * 3600
+BROADCAST_WORKERS = int(os.environ.get("BROADCAST_WORKERS", "32"))
+GONE_ERRORS = ("GoneException", "410")
+
+_connection_users = TTLCache(maxsize=8192, ttl=CONNECTION_TTL_SECONDS)
+
+
+def _table():
+    return aws_clients.get_resource("dynamodb").Table(CONNECTIONS_TABLE_NAME)
+
+
+def _connection_key(connection_id):
+    return {"pk": f"connection#{connection_id}"}
+
+
+def _user_key(user_id):
+    return {"pk": f"user#{user_id}"}
+
+
+def endpoint_url(event):
+    """Return the management API endpoint for the stage that delivered ``event``."""
+    if WEBSOCKET_ENDPOINT:
+        return WEBSOCKET_ENDPOINT
+    context = event.get("requestContext") or {}
+    return f"https://{context['domainName']}/{context['stage']}"
+
+
+def register(connection_id, user_id, now=None):
+    """Record a new connection for ``user_id``."""
+    now = time.time() if now is None else now
+    expires_at = int(now) + CONNECTION_TTL_SECONDS
+    table = _table()
+    table.put_item(Item=dict(
+        _connection_key(connection_id),
+        userID=user_id,
+        connectedAt=int(now * 1000),
+        expiresAt=expires_at
+    ))
+    table.update_item(
+        Key=_user_key(user_id),
+        UpdateExpression="ADD connectionIDs :c SET expiresAt = :e",
+        ExpressionAttributeValues={":c": {connection_id}, ":e": expires_at}
+    )
+    _connection_users.set(connection_id, user_id)
+
+
+def unregister(connection_id, user_id=None):
+    """Forget a connection; returns its user ID, or None if it was not registered."""
+    old = _table().delete_item(Key=_connection_key(connection_id), ReturnValues="ALL_OLD").get("Attributes")
+    _connection_users.pop(connection_id)
+    user_id = user_id or (old or {}).get("userID")
+    if user_id:
+        _table().update_item(
+            Key=_user_key(user_id),
+            UpdateExpression="DELETE connectionIDs :c",
+            ExpressionAttributeValues={":c": {connection_id}}
+        )
+    return user_id
+
+
+def connection_user(connection_id):
+    """Return the user ID a connection was opened by, or None."""
+    user_id = _connection_users.get(connection_id)
+    if user_id is None:
+        item = _table().get_item(Key=_connection_key(connection_id)).get("Item")
+        if item is None:
+            return None
+        user_id = item["userID"]
+        _connection_users.set(connection_id, user_id)
+    return user_id
+
+
+def connections_for(user_ids):
+    """Return ``{user_id: [connection_id, ...]}`` for the users with open connections.
+
+    Reads go through ``dynamo_batch.batch_get`` (jittered backoff on
+    unprocessed keys). Users still unread after its retries are logged and
+    left out, so they miss this push and catch up from their delivery feed.
+    """
+    import dynamo_batch
+
+    items, unprocessed, _ = dynamo_batch.batch_get(
+        CONNECTIONS_TABLE_NAME, [_user_key(user_id) for user_id in dict.fromkeys(user_ids)],
+        attributes=("pk", "connectionIDs"),
+    )
+    if unprocessed:
+        print(f"Connections of {len(unprocessed)} users could not be read: "
+              f"{', '.join(key['pk'][len('user#'):] for key in unprocessed)}")
+    return {item["pk"][len("user#"):]: sorted(item["connectionIDs"]) for item in items if item.get("connectionIDs")}
+
+
+def broadcast(endpoint, connections, payload, management_api=None):
+    """Post ``payload`` to every connection in ``{user_id: [connection_id, ...]}``.
+
+    The payload is serialized once and posted concurrently (the shared
+    client's connection pool is sized for it). Connections the management
+    API reports as gone are unregistered on the spot. Returns
+    ``(delivered, pruned)`` counts; other errors, including timeouts and
+    connection errors, are logged and counted as neither.
+    """
+    targets = [(user_id, connection_id) for user_id, ids in connections.items() for connection_id in ids]
+    if not targets:
+        return 0, 0
+    data = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+    client = management_api or aws_clients.get_client("apigatewaymanagementapi", endpoint_url=endpoint)
+
+    def post(target):
+        user_id, connection_id = target
+        try:
+            client.post_to_connection(ConnectionId=connection_id, Data=data)
+            return "delivered"
+        except aws_clients.ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in GONE_ERRORS:
+                print(f"Could not post to {connection_id}: {e}")
+                return "failed"
+        except aws_clients.BotoCoreError as e:
+            # A timeout or dropped connection says nothing about the WebSocket itself
+            print(f"Could not post to {connection_id}: {e}")
+            return "failed"
+        unregister(connection_id, user_id)
+        return "pruned"
+
+    if len(targets) == 1:
+        outcomes = [post(targets[0])]
+    else:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=min(BROADCAST_WORKERS, len(targets))) as pool:
+            outcomes = list(pool.map(post, targets))
+    return outcomes.count("delivered"), outcomes.count("pruned")
+
+
+def notify_members(endpoint, conversation, message):
+    """Push a new message to every connected member of ``conversation``."""
+    connections = connections_for(conversation["members"])
+    return broadcast(endpoint, connections, {"type": "message", "message": message})
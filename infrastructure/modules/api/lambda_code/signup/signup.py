@@ -1,79 +1,236 @@
-import boto3
 import os
 import json
 import re
-import datetime # Added for timestamps
 
-from botocore.exceptions import ClientError
+# boto3/botocore are loaded lazily by aws_clients on the first AWS call.
+import api_responses
+import aws_clients
+import idempotency
+import metrics
+import rate_limit
+import warmup
 
 # --- CORS Headers ---
 # Define headers here to be reused in all responses
-cors_headers = {
-    'Access-Control-Allow-Origin': '*',
-    'Access-Control-Allow-Headers': 'Content-Type',
-    'Access-Control-Allow-Methods': 'OPTIONS,POST'
+cors_headers = api_responses.cors_headers('OPTIONS,POST', 'Content-Type,Idempotency-Key')
+
+EMAIL_RE = re.compile(r"[^@]+@[^@]+\.[^@]+")
+
+# --- Bulk signup: only on the IAM-authorized route, for operators ---
+BULK_RESOURCE = '/signup/bulk'
+MAX_BULK_USERS = int(os.environ.get('MAX_BULK_SIGNUP_USERS', '500'))
+BULK_CONCURRENCY = int(os.environ.get('BULK_SIGNUP_CONCURRENCY', '10'))
+
+# --- Validation messages ---
+MISSING_FIELDS = 'Email and password are required.'
+INVALID_EMAIL = 'Invalid email format.'
+SHORT_PASSWORD = 'Password must be at least 6 characters.'
+USER_EXISTS = 'This email already exists.'
+
+# --- Precomputed responses ---
+INVALID_JSON = api_responses.static(400, cors_headers, {'message': 'Invalid JSON format in request body.'})
+VALIDATION_ERRORS = {
+    message: api_responses.static(400, cors_headers, {'message': message})
+    for message in (MISSING_FIELDS, INVALID_EMAIL, SHORT_PASSWORD)
 }
+EMPTY_BULK = api_responses.static(400, cors_headers, {'message': 'users must be a non-empty list.'})
+BULK_TOO_LARGE = api_responses.static(
+    400, cors_headers, {'message': f'At most {MAX_BULK_USERS} users can be created per request.'}
+)
+BULK_FORBIDDEN = api_responses.static(
+    403, cors_headers, {'message': f'Bulk signup is only available on the IAM-authorized {BULK_RESOURCE} route.'}
+)
+USER_EXISTS_RESPONSE = api_responses.static(409, cors_headers, {'message': USER_EXISTS})
+RATE_LIMITED_BODY = json.dumps({'message': 'Too many signup attempts. Try again later.'})
 
-def lambda_handler(event, context):
-    
-    region = os.environ.get('AWS_REGION')
 
-    dynamodb = boto3.resource('dynamodb', region_name=region)
-    cognito = boto3.client('cognito-idp', region_name=region)
+def validate_credentials(email, password):
+    """Return the validation error for an email/password pair, or None if valid."""
+    if not all([email, password]):
+        return MISSING_FIELDS
+    if not isinstance(email, str) or not EMAIL_RE.match(email):
+        return INVALID_EMAIL
+    # --- FIX 2: Match password policy from Terraform ---
+    if not isinstance(password, str) or len(password) < 6:
+        return SHORT_PASSWORD
+    return None
+
+
+def _rate_limited(event, email=None, caller=None, cost=1):
+    """Return a 429 response if the caller (its IP, or its IAM ARN for bulk) or the email is over its signup limit."""
+    try:
+        if caller:
+            rate_limit.check('signup', caller=caller, cost=cost)
+        else:
+            rate_limit.check('signup', ip=rate_limit.source_ip(event), username=email)
+    except rate_limit.Limited as limited:
+        return {
+            'statusCode': 429,
+            'headers': {**cors_headers, 'Retry-After': rate_limit.retry_after_header(limited)},
+            'body': RATE_LIMITED_BODY
+        }
+    return None
+
+
+def _bulk_caller(event):
+    """The IAM ARN that signed a ``/signup/bulk`` request, or None.
+
+    API Gateway only routes ``/signup/bulk`` (``authorization = "AWS_IAM"``)
+    once it has verified the SigV4 signature, and then sets the caller's ARN
+    in the request identity. Public ``/signup`` requests carry neither.
+    """
+    if event.get('resource') != BULK_RESOURCE:
+        return None
+    identity = (event.get('requestContext') or {}).get('identity') or {}
+    return identity.get('userArn')
+
+
+def _sign_up_one(cognito, client_id, email, password):
+    """Create one Cognito user. Returns (user_sub, None) or (None, (status, message))."""
+    try:
+        # The same per-email limit as a single signup
+        rate_limit.check('signup', username=email)
+    except rate_limit.Limited:
+        return None, (429, 'Too many signup attempts for this email. Try again later.')
+    try:
+        response = cognito.sign_up(
+            ClientId=client_id,
+            Username=email,
+            Password=password,
+            UserAttributes=[
+                {'Name': 'email', 'Value': email}
+            ]
+        )
+        return response['UserSub'], None
+    except aws_clients.ClientError as e:
+        code = e.response['Error']['Code']
+        if code == 'UsernameExistsException':
+            return None, (409, USER_EXISTS)
+        if code == 'InvalidParameterException':
+            return None, (400, f'Invalid parameter: {str(e)}')
+        return None, (500, f'Cognito error: {str(e)}')
+    except Exception as e:
+        return None, (500, f'An internal server error occurred: {str(e)}')
+
+
+def bulk_signup(users, client_id):
+    """Provision a list of ``{'email', 'password'}`` users in one invocation.
+
+    Every entry is validated up front; the valid ones are signed up in
+    Cognito over a bounded thread pool. As with a single signup, profiles
+    are written by the post_confirmation trigger when each user confirms.
+    Returns per-user results in request order.
+    """
+    if not isinstance(users, list) or not users:
+        return EMPTY_BULK
+    if len(users) > MAX_BULK_USERS:
+        return BULK_TOO_LARGE
+
+    # Only the bulk path needs these; keep them off the single-signup cold start
+    from concurrent.futures import ThreadPoolExecutor
+
+    results = [None] * len(users)
+    valid = []
+    seen = set()
+    for index, user in enumerate(users):
+        email = user.get('email') if isinstance(user, dict) else None
+        password = user.get('password') if isinstance(user, dict) else None
+        error = validate_credentials(email, password)
+        if error is None and email.lower() in seen:
+            error = 'Duplicate email in request.'
+        if error:
+            results[index] = {'email': email, 'statusCode': 400, 'message': error}
+            continue
+        seen.add(email.lower())
+        valid.append((index, email, password))
+
+    if valid:
+        cognito = aws_clients.get_client('cognito-idp')
+        with ThreadPoolExecutor(max_workers=min(BULK_CONCURRENCY, len(valid))) as pool:
+            outcomes = pool.map(lambda user: _sign_up_one(cognito, client_id, user[1], user[2]), valid)
+            for (index, email, _), (user_sub, error) in zip(valid, outcomes):
+                if error:
+                    results[index] = {'email': email, 'statusCode': error[0], 'message': error[1]}
+                else:
+                    results[index] = {'email': email, 'statusCode': 201, 'id': user_sub}
+
+    created_count = sum(1 for result in results if result['statusCode'] == 201)
+    return api_responses.response(200, cors_headers, {
+        'created': created_count,
+        'failed': len(results) - created_count,
+        'results': results
+    })
+
+
+@metrics.instrument
+@warmup.primes(clients=("cognito-idp",), resources=("dynamodb",), modules=("hashlib",))
+def lambda_handler(event, context):
     
     try:
-        USER_PROFILE_TABLE = os.environ['USER_PROFILE_TABLE_NAME']
         COGNITO_CLIENT_ID = os.environ['COGNITO_CLIENT_ID']
         # We don't need COGNITO_USER_POOL_ID for sign_up
     except KeyError as e:
         print(f"ERROR: Missing environment variable: {e}")
-        return {
-            'statusCode': 500,
-            'headers': cors_headers,
-            'body': json.dumps({'message': f'Server configuration error: {e}'})
-        }
+        return api_responses.response(500, cors_headers, {'message': f'Server configuration error: {e}'})
     
     try:
         body = json.loads(event.get('body', '{}'))
     except json.JSONDecodeError:
-        return {
-            'statusCode': 400,
-            'headers': cors_headers,
-            'body': json.dumps({'message': 'Invalid JSON format in request body.'})
-        }
+        return INVALID_JSON
+
+    # Client retries with the same Idempotency-Key get the first response
+    # instead of a second sign_up (and its 409)
+    return idempotency.handle(
+        'signup', event, _bulk_caller(event), _request_emails(body),
+        lambda: sign_up(event, body, COGNITO_CLIENT_ID), cors_headers
+    )
+
+
+def _request_emails(body):
+    # What a replay must match; passwords are kept out of the stored fingerprint
+    if not isinstance(body, dict):
+        return body
+    if 'users' in body and isinstance(body['users'], list):
+        return [user.get('email') if isinstance(user, dict) else user for user in body['users']]
+    return body.get('email')
+
+
+def sign_up(event, body, client_id):
+    """Sign up the user in a parsed /signup body, or provision several on /signup/bulk."""
+    # --- Bulk provisioning: {"users": [{"email": ..., "password": ...}, ...]} ---
+    if 'users' in body or event.get('resource') == BULK_RESOURCE:
+        caller = _bulk_caller(event)
+        if caller is None:
+            return BULK_FORBIDDEN
+        print(f"Bulk signup requested by {caller}")
+        # One token per user, as if each had signed up on its own
+        users = body.get('users')
+        cost = len(users) if isinstance(users, list) and 0 < len(users) <= MAX_BULK_USERS else 1
+        limited = _rate_limited(event, caller=caller, cost=cost)
+        if limited:
+            return limited
+        return bulk_signup(body.get('users'), client_id)
 
     # --- FIX 1: Remove 'username' ---
     # We only need email and password
     email = body.get('email')
     password = body.get('password')
 
-    if not all([email, password]):
-        return {
-            'statusCode': 400,
-            'headers': cors_headers,
-            'body': json.dumps({'message': 'Email and password are required.'})
-        }
+    error = validate_credentials(email, password)
+    if error:
+        return VALIDATION_ERRORS[error]
 
-    if not re.match(r"[^@]+@[^@]+\.[^@]+", email):
-        return {
-            'statusCode': 400,
-            'headers': cors_headers,
-            'body': json.dumps({'message': 'Invalid email format.'})
-        }
-    
-    # --- FIX 2: Match password policy from Terraform ---
-    if len(password) < 6:
-        return {
-            'statusCode': 400,
-            'headers': cors_headers,
-            'body': json.dumps({'message': 'Password must be at least 6 characters.'})
-        }
+    limited = _rate_limited(event, email)
+    if limited:
+        return limited
+
+    cognito = aws_clients.get_client('cognito-idp')
 
     user_sub = None
     try:
         # --- FIX 3: Pass 'email' as the 'Username' parameter ---
         response = cognito.sign_up(
-            ClientId=COGNITO_CLIENT_ID,
+            ClientId=client_id,
             Username=email,  # Use email as the username
             Password=password,
             UserAttributes=[
@@ -82,63 +239,24 @@ def lambda_handler(event, context):
         )
         
         user_sub = response['UserSub']
-
-        try:
-            table = dynamodb.Table(USER_PROFILE_TABLE)
-            table.put_item(
-                Item={
-                    # --- FIX 4: Match 'userId' hash_key from Terraform ---
-                    'userId': user_sub, 
-                    'email': email,
-                    'createdAt': datetime.datetime.utcnow().isoformat()
-                }
-            )
-        
-        except ClientError as db_error:
-            print(f"DynamoDB Error: {db_error}")
-            # User is created in Cognito, but profile failed. This is a 500 state.
-            return {
-                'statusCode': 500,
-                'headers': cors_headers,
-                'body': json.dumps({'error': 'User created in Cognito, but failed to create user profile.'})
-            }
+        # The profile is written by the post_confirmation trigger once the
+        # user confirms, so the response only waits for Cognito
 
         # --- FIX 5: Return 'id' to match Postman test ---
-        return {
-            'statusCode': 201,
-            'headers': cors_headers,
-            'body': json.dumps({
-                'id': user_sub
-            })
-        }
+        return api_responses.response(201, cors_headers, {'id': user_sub})
 
-    except ClientError as e:
+    except aws_clients.ClientError as e:
         if e.response['Error']['Code'] == 'UsernameExistsException':
-            return {
-                'statusCode': 409, # 409 Conflict is more specific
-                'headers': cors_headers,
-                'body': json.dumps({'message': 'This email already exists.'})
-            }
+            # 409 Conflict is more specific
+            return USER_EXISTS_RESPONSE
         elif e.response['Error']['Code'] == 'InvalidParameterException':
             # This is the 400 error you were getting before
-            return {
-                'statusCode': 400,
-                'headers': cors_headers,
-                'body': json.dumps({'message': f'Invalid parameter: {str(e)}'})
-            }
+            return api_responses.response(400, cors_headers, {'message': f'Invalid parameter: {str(e)}'})
         
         # Catch other Cognito errors
-        return {
-            'statusCode': 500,
-            'headers': cors_headers,
-            'body': json.dumps({'message': f'Cognito error: {str(e)}'})
-        }
+        return api_responses.response(500, cors_headers, {'message': f'Cognito error: {str(e)}'})
         
     except Exception as e:
         # This is a general catch-all for other unexpected errors
-        return {
-            'statusCode': 500,
-            'headers': cors_headers,
-            'body': json.dumps({'message': f'An internal server error occurred: {str(e)}'})
-        }
+        return api_responses.response(500, cors_headers, {'message': f'An internal server error occurred: {str(e)}'})
 
@@ -4,17 +4,30 @@ from unittest.mock import patch, MagicMock
 from botocore.exceptions import ClientError
 import os # Import os to use for @patch.dict
 
+import aws_clients
+import idempotency
+import rate_limit
 # Import lambda_handler at the top
 from signup import lambda_handler
 
 mock_os_environ = {
     # 'COGNITO_USER_POOL_ID': 'test_pool_id', # Not needed for sign_up
     'COGNITO_CLIENT_ID': 'test_client_id',
-    'USER_PROFILE_TABLE_NAME': 'test_profile_table',
     'AWS_REGION': 'us-east-1' # Add region to prevent NoRegionError
 }
 
 mock_boto3_client = MagicMock()
+OPERATOR_ARN = 'arn:aws:iam::123456789012:role/operator'
+
+
+def bulk_event(users, resource='/signup/bulk', user_arn=OPERATOR_ARN):
+    """A /signup/bulk request as API Gateway passes it on after IAM authorization."""
+    return {
+        'resource': resource,
+        'body': json.dumps({'users': users}),
+        'requestContext': {'identity': {'sourceIp': '203.0.113.7', 'userArn': user_arn}}
+    }
+
 mock_boto3_resource = MagicMock()
 
 class TestSignupLambda(unittest.TestCase):
@@ -22,14 +35,16 @@ class TestSignupLambda(unittest.TestCase):
     def setUp(self):
         # Set up patchers
         self.patchers = [
-            patch.dict(os.environ, mock_os_environ, clear=True),
-            patch('boto3.client', return_value=mock_boto3_client),
-            patch('boto3.resource', return_value=mock_boto3_resource)
+            patch.dict(os.environ, mock_os_environ, clear=True)
         ]
         # Start patchers
         for p in self.patchers:
             p.start()
 
+        # Inject the fakes into the shared client cache
+        aws_clients.set_client('cognito-idp', mock_boto3_client)
+        aws_clients.set_resource('dynamodb', mock_boto3_resource)
+
         # This mocks the cognito client
         self.cognito_client = mock_boto3_client
         
@@ -39,7 +54,7 @@ class TestSignupLambda(unittest.TestCase):
         self.dynamodb_resource.Table.return_value = self.mock_table
         
         # Reset mocks before each test
-        self.cognito_client.reset_mock()
+        self.cognito_client.reset_mock(return_value=True, side_effect=True)
         self.dynamodb_resource.reset_mock()
         self.mock_table.reset_mock()
 
@@ -52,8 +67,6 @@ class TestSignupLambda(unittest.TestCase):
             'UserSub': 'new-user-uuid-12345'
         }
         
-        self.mock_table.put_item.return_value = {}
-
         event_body = {
             'email': 'test@example.com',
             'password': 'Password123!',
@@ -81,16 +94,8 @@ class TestSignupLambda(unittest.TestCase):
             ]
         )
 
-        # Assert DynamoDB Table resource was called
-        self.dynamodb_resource.Table.assert_called_once_with('test_profile_table')
-        
-        # Assert put_item was called on the table object
-        self.mock_table.put_item.assert_called_once()
-        put_item_call_args = self.mock_table.put_item.call_args[1]
-        self.assertEqual(put_item_call_args['Item']['userId'], 'new-user-uuid-12345')
-        self.assertEqual(put_item_call_args['Item']['email'], 'test@example.com')
-        # We can also assert that 'createdAt' exists
-        self.assertIn('createdAt', put_item_call_args['Item'])
+        # The profile is left to the post-confirmation trigger
+        self.dynamodb_resource.Table.assert_not_called()
 
     def test_username_exists(self):
         error_response = {
@@ -122,36 +127,129 @@ class TestSignupLambda(unittest.TestCase):
         body = json.loads(response['body'])
         self.assertEqual(body['message'], 'Invalid JSON format in request body.')
 
-    def test_dynamodb_put_fails(self):
-        self.cognito_client.sign_up.return_value = {
-            'UserSub': 'new-user-uuid-12345'
-        }
-        
-        error_response = {
-            'Error': {
-                'Code': 'ProvisionedThroughputExceededException',
-                'Message': 'Rate limit exceeded'
-            }
-        }
-        # Make the mock table's put_item fail
-        self.mock_table.put_item.side_effect = ClientError(error_response, 'put_item')
-        
-        event_body = {
-            'email': 'test@example.com',
-            'password': 'Password123!',
+    def test_bulk_signup_creates_users_and_leaves_profiles_to_the_trigger(self):
+        self.cognito_client.sign_up.side_effect = lambda **kwargs: {'UserSub': 'sub-' + kwargs['Username']}
+
+        users = [{'email': f'user{i}@example.com', 'password': 'Password123!'} for i in range(3)]
+        response = lambda_handler(bulk_event(users), {})
+
+        self.assertEqual(response['statusCode'], 200)
+        body = json.loads(response['body'])
+        self.assertEqual(body['created'], 3)
+        self.assertEqual(body['failed'], 0)
+        self.assertEqual([r['id'] for r in body['results']], [f'sub-user{i}@example.com' for i in range(3)])
+        self.assertEqual(self.cognito_client.sign_up.call_count, 3)
+
+        # Profiles are written by post_confirmation, as for a single signup
+        self.mock_table.put_item.assert_not_called()
+        self.dynamodb_resource.batch_write_item.assert_not_called()
+
+    def test_bulk_signup_reports_per_user_failures(self):
+        def sign_up(**kwargs):
+            if kwargs['Username'] == 'existing@example.com':
+                raise ClientError({'Error': {'Code': 'UsernameExistsException', 'Message': 'exists'}}, 'sign_up')
+            return {'UserSub': 'sub-' + kwargs['Username']}
+
+        self.cognito_client.sign_up.side_effect = sign_up
+
+        users = [
+            {'email': 'new@example.com', 'password': 'Password123!'},
+            {'email': 'existing@example.com', 'password': 'Password123!'},
+            {'email': 'not-an-email', 'password': 'Password123!'},
+            {'email': 'new@example.com', 'password': 'Password123!'},
+            {'email': 'short@example.com', 'password': '123'},
+        ]
+        response = lambda_handler(bulk_event(users), {})
+
+        body = json.loads(response['body'])
+        self.assertEqual(body['created'], 1)
+        self.assertEqual(body['failed'], 4)
+        self.assertEqual([r['statusCode'] for r in body['results']], [201, 409, 400, 400, 400])
+        self.assertEqual(body['results'][2]['message'], 'Invalid email format.')
+        self.assertEqual(body['results'][3]['message'], 'Duplicate email in request.')
+        # Invalid entries never reach Cognito
+        self.assertEqual(self.cognito_client.sign_up.call_count, 2)
+
+    def test_bulk_signup_rejects_oversized_batches(self):
+        users = [{'email': f'u{i}@example.com', 'password': 'Password123!'} for i in range(501)]
+
+        response = lambda_handler(bulk_event(users), {})
+
+        self.assertEqual(response['statusCode'], 400)
+        self.cognito_client.sign_up.assert_not_called()
+
+    def test_bulk_signup_needs_the_iam_authorized_route(self):
+        users = [{'email': 'a@example.com', 'password': 'Password123!'}]
+
+        for event in (bulk_event(users, resource='/signup'), bulk_event(users, user_arn=None),
+                      {'body': json.dumps({'users': users})}):
+            response = lambda_handler(event, {})
+
+            self.assertEqual(response['statusCode'], 403)
+        self.cognito_client.sign_up.assert_not_called()
+
+    @patch('signup.rate_limit.check')
+    def test_rate_limited_signup_skips_cognito(self, check):
+        check.side_effect = rate_limit.Limited('signup#ip#203.0.113.7', 2.5)
+        event = {
+            'body': json.dumps({'email': 'test@example.com', 'password': 'Password123!'}),
+            'requestContext': {'identity': {'sourceIp': '203.0.113.7'}}
         }
-        event = {'body': json.dumps(event_body)}
 
-        # This is a mock context object
-        mock_context = MagicMock()
-        mock_context.aws_request_id = 'test-request-id'
-        
-        response = lambda_handler(event, mock_context)
-        
-        self.assertEqual(response['statusCode'], 500)
+        response = lambda_handler(event, {})
+
+        self.assertEqual(response['statusCode'], 429)
+        self.assertEqual(response['headers']['Retry-After'], '3')
+        check.assert_called_once_with('signup', ip='203.0.113.7', username='test@example.com')
+        self.cognito_client.sign_up.assert_not_called()
+
+    @patch('signup.rate_limit.check')
+    def test_bulk_signup_is_charged_per_user(self, check):
+        self.cognito_client.sign_up.side_effect = lambda **kwargs: {'UserSub': 'sub-' + kwargs['Username']}
+
+        def limit(scope, username=None, **kwargs):
+            if username == 'b@example.com':
+                raise rate_limit.Limited('signup#user#b', 60)
+
+        check.side_effect = limit
+        users = [{'email': e, 'password': 'Password123!'} for e in ('a@example.com', 'b@example.com')]
+
+        response = lambda_handler(bulk_event(users), {})
+
+        check.assert_any_call('signup', caller=OPERATOR_ARN, cost=2)
+        check.assert_any_call('signup', username='a@example.com')
         body = json.loads(response['body'])
-        # This now matches the error key from the updated signup.py
-        self.assertEqual(body['error'], 'User created in Cognito, but failed to create user profile.')
+        self.assertEqual([r['statusCode'] for r in body['results']], [201, 429])
+        self.cognito_client.sign_up.assert_called_once()
+
+    def test_retried_signup_is_answered_from_the_idempotency_store(self):
+        import boto3
+        from moto import mock_aws
+
+        self.cognito_client.sign_up.return_value = {'UserSub': 'new-user-uuid-12345'}
+        event = {
+            'headers': {'idempotency-key': 'signup-attempt-1'},
+            'body': json.dumps({'email': 'test@example.com', 'password': 'Password123!'})
+        }
+
+        with mock_aws(), patch.object(idempotency, 'IDEMPOTENCY_TABLE_NAME', 'test-idempotency'):
+            boto3.client('dynamodb', region_name='us-east-1').create_table(
+                TableName='test-idempotency',
+                KeySchema=[{'AttributeName': 'pk', 'KeyType': 'HASH'}],
+                AttributeDefinitions=[{'AttributeName': 'pk', 'AttributeType': 'S'}],
+                BillingMode='PAY_PER_REQUEST'
+            )
+            aws_clients.reset()  # use moto, not the injected DynamoDB fake
+            aws_clients.set_client('cognito-idp', self.cognito_client)
+            first = lambda_handler(event, {})
+            retry = lambda_handler(event, {})
+            stored = boto3.resource('dynamodb', region_name='us-east-1').Table('test-idempotency').scan()['Items']
+
+        self.assertEqual((first['statusCode'], retry['statusCode']), (201, 201))
+        self.assertEqual(retry['body'], first['body'])
+        self.cognito_client.sign_up.assert_called_once()
+        # The fingerprint covers the email only; the password is never stored
+        self.assertNotIn('Password123!', json.dumps(stored, default=str))
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,90 @@
+import importlib
+import io
+
+import boto3
+import pytest
+from moto import mock_aws
+from PIL import Image
+
+import media_store
+import thumbnails
+
+BUCKET = "test-media-bucket"
+TABLE = "test-media"
+
+
+@pytest.fixture(autouse=True)
+def aws(monkeypatch):
+    monkeypatch.setenv("AWS_REGION", "us-east-1")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("MEDIA_METADATA_TABLE_NAME", TABLE)
+    importlib.reload(media_store)
+
+    with mock_aws():
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket=BUCKET)
+        boto3.client("dynamodb", region_name="us-east-1").create_table(
+            TableName=TABLE,
+            KeySchema=[{"AttributeName": "mediaID", "KeyType": "HASH"},
+                       {"AttributeName": "userID", "KeyType": "RANGE"}],
+            AttributeDefinitions=[{"AttributeName": "mediaID", "AttributeType": "S"},
+                                  {"AttributeName": "userID", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        yield
+
+
+def image_bytes(size=(3000, 2000), mode="RGB", fmt="JPEG"):
+    buffer = io.BytesIO()
+    Image.new(mode, size, (200, 40, 40, 128) if mode == "RGBA" else (200, 40, 40)).save(buffer, fmt)
+    return buffer.getvalue()
+
+
+def upload(key, data, content_type):
+    boto3.client("s3", region_name="us-east-1").put_object(Bucket=BUCKET, Key=key, Body=data, ContentType=content_type)
+    return {"detail": {"bucket": {"name": BUCKET}, "object": {"key": key, "size": len(data)}}}
+
+
+def test_render_produces_every_size_from_one_decode():
+    renditions = thumbnails.render_renditions(image_bytes())
+
+    assert [(name, w, h) for name, _, _, w, h in renditions] == [
+        ("preview", 1280, 853), ("thumb_320", 320, 213), ("thumb_128", 128, 85)
+    ]
+    assert all(content_type == "image/webp" for _, content_type, _, _, _ in renditions)
+
+
+def test_render_falls_back_to_jpeg_and_flattens_alpha():
+    renditions = thumbnails.render_renditions(image_bytes(mode="RGBA", fmt="PNG"), webp=False)
+
+    for _, content_type, body, _, _ in renditions:
+        assert content_type == "image/jpeg"
+        assert Image.open(io.BytesIO(body)).mode == "RGB"
+
+
+def test_small_images_are_not_upscaled():
+    renditions = thumbnails.render_renditions(image_bytes(size=(200, 100)))
+
+    assert [(w, h) for _, _, _, w, h in renditions] == [(200, 100), (200, 100), (128, 64)]
+
+
+def test_handler_stores_renditions_and_records_them():
+    table = boto3.resource("dynamodb", region_name="us-east-1").Table(TABLE)
+    table.put_item(Item=media_store.pending_item("abc", "user-1", "uploads/abc.jpg", "image/jpeg"))
+
+    result = thumbnails.lambda_handler(upload("uploads/abc.jpg", image_bytes(), "image/jpeg"), None)
+
+    assert result == {"processed": 1}
+    row = table.get_item(Key={"mediaID": "abc", "userID": "user-1"})["Item"]
+    assert set(row["renditions"]) == {"preview", "thumb_320", "thumb_128"}
+    thumb = row["renditions"]["thumb_128"]
+    assert thumb["key"] == "derived/abc/thumb_128.webp"
+    head = boto3.client("s3", region_name="us-east-1").head_object(Bucket=BUCKET, Key=thumb["key"])
+    assert head["ContentType"] == "image/webp"
+    assert head["ContentLength"] == thumb["size"]
+
+
+def test_non_images_and_corrupt_files_are_skipped():
+    assert thumbnails.lambda_handler(upload("uploads/v.mp4", b"\x00" * 1000, "video/mp4"), None) == {"processed": 0}
+    assert thumbnails.lambda_handler(upload("uploads/bad.jpg", b"not a jpeg", "image/jpeg"), None) == {"processed": 0}
+    assert thumbnails.lambda_handler(upload("derived/abc/thumb_128.webp", b"x", "image/webp"), None) == {"processed": 0}
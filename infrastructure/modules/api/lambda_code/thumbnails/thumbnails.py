@@ -0,0 +1,122 @@
+# boto3/botocore are loaded lazily by aws_clients, Pillow on the first image.
+import aws_clients
+import media_store
+import metrics
+import s3_events
+import warmup
+from media_types import MEDIA_TYPES, rendition_key
+
+IMAGE_TYPES = ("image/jpeg", "image/png")
+
+# --- Renditions, largest first: each one is resized from the previous ---
+PREVIEW = ("preview", 1280, 75)
+THUMBNAILS = (("thumb_320", 320, 80), ("thumb_128", 128, 80))
+RENDITIONS = (PREVIEW,) + THUMBNAILS
+
+# Refuse images that would decode to more than this many pixels
+MAX_IMAGE_PIXELS = 50000000
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def _encode(image, quality, webp):
+    import io
+
+    buffer = io.BytesIO()
+    if webp:
+        image.save(buffer, "WEBP", quality=quality, method=4)
+        return "image/webp", buffer.getvalue()
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    image.save(buffer, "JPEG", quality=quality, optimize=True, progressive=True)
+    return "image/jpeg", buffer.getvalue()
+
+
+def render_renditions(data, webp=None):
+    """Decode ``data`` once and return ``[(name, content_type, bytes, width, height)]``.
+
+    JPEGs are decoded straight to the smallest DCT scale that still covers
+    the preview, and every rendition is resized in place from the one
+    before it, so a 12 MP photo is never held at full size or decoded twice.
+    """
+    import io
+    from PIL import Image, ImageOps, features
+
+    Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+    if webp is None:
+        webp = features.check("webp")
+
+    image = Image.open(io.BytesIO(data))
+    box = PREVIEW[1]
+    image.draft("RGB", (box, box))
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if image.has_transparency_data else "RGB")
+
+    renditions = []
+    for name, box, quality in RENDITIONS:
+        image.thumbnail((box, box), Image.Resampling.LANCZOS, reducing_gap=2.0)
+        content_type, body = _encode(image, quality, webp)
+        renditions.append((name, content_type, body, image.width, image.height))
+    return renditions
+
+
+def process(bucket, key):
+    """Generate, store and record the renditions for one upload; None if skipped."""
+    from PIL import Image
+
+    media_id = media_store.media_id_from_key(key)
+    s3_client = aws_clients.get_client("s3")
+    obj = s3_client.get_object(Bucket=bucket, Key=key)
+    content_type = obj.get("ContentType")
+    if content_type not in IMAGE_TYPES or obj["ContentLength"] > MEDIA_TYPES[content_type]["max_size"]:
+        obj["Body"].close()
+        return None
+
+    try:
+        renditions = render_renditions(obj["Body"].read())
+    except (OSError, Image.DecompressionBombError) as e:
+        print(f"Could not decode {key}: {e}")
+        return None
+
+    records = {}
+    for name, rendition_type, body, width, height in renditions:
+        out_key = rendition_key(media_id, name, rendition_type)
+        s3_client.put_object(
+            Bucket=bucket,
+            Key=out_key,
+            Body=body,
+            ContentType=rendition_type,
+            CacheControl=CACHE_CONTROL
+        )
+        records[name] = {
+            "key": out_key,
+            "contentType": rendition_type,
+            "width": width,
+            "height": height,
+            "size": len(body)
+        }
+
+    rows = media_store.find_all(media_id)
+    for row in rows:
+        media_store.record_renditions(media_id, row["userID"], records)
+    if not rows:
+        print(f"No media row for {key}; renditions stored but not recorded")
+    return records
+
+
+@metrics.instrument
+@warmup.primes(clients=("s3",), resources=("dynamodb",), modules=("PIL.Image",))
+def lambda_handler(event, context):
+    """Thumbnail and preview images created under ``uploads/``.
+
+    Invoked by the same EventBridge rule as media-complete. Non-images and
+    undecodable files are skipped; S3 and DynamoDB errors propagate so the
+    event is retried (outputs are overwritten, so a retry is harmless).
+    """
+    processed = 0
+    for bucket, key, size in s3_events.created_objects(event):
+        if media_store.media_id_from_key(key) is None:
+            continue
+        if process(bucket, key) is not None:
+            processed += 1
+    return {"processed": processed}
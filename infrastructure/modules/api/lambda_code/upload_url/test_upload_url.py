@@ -1,14 +1,22 @@
+import base64
 import json
 import os
 import pytest
-from unittest.mock import patch
+from unittest.mock import MagicMock
+import aws_clients
+import media_store
 import upload_url
 
+AUTH = {"Authorization": "Bearer user-123"}
+
+pytestmark = pytest.mark.usefixtures("stub_verifier")
+
 
 @pytest.fixture(autouse=True)
 def setup_env(monkeypatch):
     # Set up environment variable for bucket
     monkeypatch.setenv("MEDIA_BUCKET_NAME", "test-bucket")
+    monkeypatch.delenv("MEDIA_METADATA_TABLE_NAME", raising=False)
     # Reload module so env var is picked up
     import importlib
     importlib.reload(upload_url)
@@ -24,17 +32,24 @@ def test_cors_preflight():
     assert "Access-Control-Allow-Origin" in response["headers"]
 
 
-from botocore.exceptions import ClientError
+from botocore.exceptions import ClientError, NoCredentialsError
+
+
+@pytest.fixture
+def mock_s3_client():
+    # Inject a fake S3 client into the shared client cache
+    client = MagicMock()
+    aws_clients.set_client("s3", client)
+    return client
 
 
-@patch("upload_url.s3_client")
 def test_successful_response(mock_s3_client):
     mock_s3_client.generate_presigned_post.return_value = {
         "url": "https://test-bucket.s3.amazonaws.com/",
         "fields": {"key": "uploads/some-uuid"}
     }
 
-    event = {"httpMethod": "GET"}
+    event = {"httpMethod": "GET", "headers": AUTH}
     response = upload_url.lambda_handler(event, None)
     body = json.loads(response["body"])
 
@@ -58,16 +73,217 @@ def test_missing_env_var(monkeypatch):
     assert response["statusCode"] == 500
     assert "MEDIA_BUCKET_NAME" in body["message"]
 
-@patch("upload_url.s3_client")
-def test_s3_client_error(mock_s3_client):
-    mock_s3_client.generate_presigned_post.side_effect = ClientError(
-        {"Error": {"Code": "InternalError", "Message": "An internal error occurred"}},
-        "GeneratePresignedPost"
-    )
+@pytest.mark.parametrize("error", [
+    ClientError({"Error": {"Code": "InternalError", "Message": "An internal error occurred"}},
+                "GeneratePresignedPost"),
+    NoCredentialsError(),
+])
+def test_s3_client_error(mock_s3_client, error):
+    mock_s3_client.generate_presigned_post.side_effect = error
 
-    event = {"httpMethod": "GET"}
+    event = {"httpMethod": "GET", "headers": AUTH}
     response = upload_url.lambda_handler(event, None)
     body = json.loads(response["body"])
 
     assert response["statusCode"] == 500
     assert "Could not generate an upload URL" in body["message"]
+
+
+@pytest.fixture
+def fake_credentials(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "AKIDEXAMPLE")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "secret")
+    monkeypatch.setenv("AWS_REGION", "us-east-1")
+
+
+def manifest_event(files):
+    return {"httpMethod": "POST", "headers": AUTH, "body": json.dumps({"files": files})}
+
+
+def test_manifest_returns_one_presigned_post_per_file(fake_credentials):
+    files = [
+        {"contentType": "image/jpeg", "size": 2000},
+        {"contentType": "image/png", "size": 3000},
+        {"contentType": "video/mp4", "size": 20000000},
+    ]
+
+    response = upload_url.lambda_handler(manifest_event(files), None)
+    body = json.loads(response["body"])
+
+    assert response["statusCode"] == 200
+    uploads = body["uploads"]
+    assert [u["contentType"] for u in uploads] == ["image/jpeg", "image/png", "video/mp4"]
+    assert [u["key"].rsplit(".", 1)[1] for u in uploads] == ["jpg", "png", "mp4"]
+    assert len({u["key"] for u in uploads}) == 3
+    for upload in uploads:
+        assert upload["key"].startswith("uploads/")
+        assert upload["url"] == "https://test-bucket.s3.us-east-1.amazonaws.com/"
+        assert upload["fields"]["key"] == upload["key"]
+        assert upload["fields"]["Content-Type"] == upload["contentType"]
+        assert "x-amz-signature" in upload["fields"]
+
+
+def test_manifest_is_signed_without_the_s3_client(fake_credentials, mock_s3_client):
+    upload_url.lambda_handler(manifest_event([{"contentType": "image/png", "size": 2000}]), None)
+
+    mock_s3_client.generate_presigned_post.assert_not_called()
+
+
+@pytest.mark.parametrize("files, message", [
+    ([], "non-empty list"),
+    ([{"contentType": "image/gif", "size": 2000}], "unsupported content type"),
+    ([{"contentType": "image/png", "size": 10}], "at least 100 bytes"),
+    ([{"contentType": "image/png", "size": 6000000}], "limited to 5000000 bytes"),
+    ([{"contentType": "image/png", "size": 2000}] * 51, "At most 50 files"),
+    ([{"contentType": "image/png", "size": 2000, "sha256": "abc"}], "sha256 must be"),
+    ([{"contentType": "image/png", "size": 2000, "sha256": "zz" * 32}], "sha256 must be"),
+])
+def test_manifest_validation(files, message):
+    response = upload_url.lambda_handler(manifest_event(files), None)
+
+    assert response["statusCode"] == 400
+    assert message in json.loads(response["body"])["message"]
+
+
+def test_manifest_invalid_json():
+    response = upload_url.lambda_handler({"httpMethod": "POST", "headers": AUTH, "body": "{bad json"}, None)
+
+    assert response["statusCode"] == 400
+
+
+@pytest.mark.parametrize("headers", [{}, {"Authorization": "Bearer forged"}])
+def test_requires_a_valid_token(headers, mock_s3_client):
+    response = upload_url.lambda_handler({"httpMethod": "GET", "headers": headers}, None)
+
+    assert response["statusCode"] == 401
+    mock_s3_client.generate_presigned_post.assert_not_called()
+
+
+@pytest.fixture
+def media_tables(fake_credentials, monkeypatch):
+    from moto import mock_aws
+    import boto3
+
+    monkeypatch.setenv("MEDIA_METADATA_TABLE_NAME", "test-media")
+    import importlib
+    importlib.reload(upload_url)
+
+    with mock_aws():
+        dynamodb = boto3.client("dynamodb", region_name="us-east-1")
+        dynamodb.create_table(
+            TableName="test-media",
+            KeySchema=[{"AttributeName": "mediaID", "KeyType": "HASH"},
+                       {"AttributeName": "userID", "KeyType": "RANGE"}],
+            AttributeDefinitions=[{"AttributeName": "mediaID", "AttributeType": "S"},
+                                  {"AttributeName": "userID", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        yield boto3.resource("dynamodb", region_name="us-east-1").Table("test-media")
+
+
+def test_manifest_records_pending_media_rows(media_tables):
+    files = [{"contentType": "image/jpeg", "size": 2000}, {"contentType": "video/mp4", "size": 9000}]
+    response = upload_url.lambda_handler(manifest_event(files), None)
+    rows = media_tables.scan()["Items"]
+
+    uploads = json.loads(response["body"])["uploads"]
+    assert response["statusCode"] == 200
+    assert {row["mediaID"] for row in rows} == {upload["mediaID"] for upload in uploads}
+    for row in rows:
+        assert row["userID"] == "user-123"
+        assert row["status"] == "PENDING"
+        assert "expiresAt" in row
+
+
+SHA = "9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08"
+
+
+def uploaded(media_tables, owner, uploader, size, **extra):
+    """A READY row for SHA, finalized the way media-complete does after ``uploader``'s POST."""
+    media_id = f"sha256-{SHA}"
+    media_tables.put_item(Item=media_store.pending_item(media_id, owner, f"uploads/{media_id}.png", "image/png"))
+    media_store.finalize(media_id, owner, size, {"uploadedBy": uploader, **extra}, table_name="test-media")
+
+
+def test_unknown_hash_gets_a_post_bound_to_the_content(media_tables, capsys):
+    files = [{"contentType": "image/png", "size": 2000, "sha256": SHA.upper()}]
+
+    upload = json.loads(upload_url.lambda_handler(manifest_event(files), None)["body"])["uploads"][0]
+
+    assert upload["duplicate"] is False
+    assert upload["mediaID"] == f"sha256-{SHA}"
+    assert upload["key"] == f"uploads/sha256-{SHA}.png"
+    assert upload["fields"]["x-amz-checksum-sha256"] == "n4bQgYhMfWWaL+qgxVrQFaO/TxsrC4Is0V1sFbDwCgg="
+    assert upload["fields"]["x-amz-meta-uploader"] == "user-123"
+    policy = json.loads(base64.b64decode(upload["fields"]["policy"]))
+    assert {"x-amz-meta-uploader": "user-123"} in policy["conditions"]
+    row = media_tables.get_item(Key={"mediaID": upload["mediaID"], "userID": "user-123"})["Item"]
+    assert row["status"] == "PENDING"
+    assert '"DedupeMisses": 1' in capsys.readouterr().out
+
+
+def test_known_hash_skips_the_upload(media_tables, capsys):
+    key = f"uploads/sha256-{SHA}.png"
+    uploaded(media_tables, "user-123", "user-123", 2000,
+             renditions={"thumb_128": {"key": f"derived/sha256-{SHA}/thumb_128.webp"}})
+    files = [
+        {"contentType": "image/png", "size": 2000, "sha256": SHA},
+        {"contentType": "image/png", "size": 2000, "sha256": SHA},
+        {"contentType": "image/jpeg", "size": 3000},
+    ]
+
+    uploads = json.loads(upload_url.lambda_handler(manifest_event(files), None)["body"])["uploads"]
+
+    assert [u["duplicate"] for u in uploads] == [True, True, False]
+    assert uploads[0]["key"] == key
+    assert uploads[0]["renditions"]["thumb_128"]["key"].endswith("thumb_128.webp")
+    assert "url" not in uploads[0]
+    row = media_tables.get_item(Key={"mediaID": f"sha256-{SHA}", "userID": "user-123"})["Item"]
+    assert row["status"] == "READY"
+    metrics = json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+    assert (metrics["DedupeHits"], metrics["DedupeMisses"], metrics["DedupeBytesSaved"]) == (2, 0, 4000)
+
+
+@pytest.mark.parametrize("owner, uploader, size", [
+    ("user-999", "user-999", 2000),
+    ("user-123", "user-123", 5),
+    ("user-123", "user-999", 2000),  # user-123 only claimed the hash
+])
+def test_other_users_copies_and_size_mismatches_are_not_hits(media_tables, owner, uploader, size):
+    uploaded(media_tables, owner, uploader, size)
+
+    files = [{"contentType": "image/png", "size": 2000, "sha256": SHA}]
+    upload = json.loads(upload_url.lambda_handler(manifest_event(files), None)["body"])["uploads"][0]
+
+    assert upload["duplicate"] is False
+    assert upload["fields"]["x-amz-checksum-sha256"]
+    row = media_tables.get_item(Key={"mediaID": f"sha256-{SHA}", "userID": "user-123"})["Item"]
+    if owner != "user-123":
+        assert row["status"] == "PENDING"
+
+
+def test_retry_with_the_same_idempotency_key_replays_the_upload(fake_credentials, idempotency_table):
+    event = manifest_event([{"contentType": "image/png", "size": 2000}])
+    event["headers"] = {**AUTH, "Idempotency-Key": "retry-1"}
+
+    first = upload_url.lambda_handler(event, None)
+    retry = upload_url.lambda_handler(event, None)
+
+    assert retry["statusCode"] == 200
+    assert retry["body"] == first["body"]
+    assert retry["headers"]["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first["headers"]
+
+    other = dict(event, body=json.dumps({"files": [{"contentType": "image/png", "size": 4000}]}))
+    assert upload_url.lambda_handler(other, None)["statusCode"] == 422
+
+
+def test_idempotency_keys_are_per_user(mock_s3_client, idempotency_table):
+    mock_s3_client.generate_presigned_post.return_value = {"url": "https://test-bucket/", "fields": {}}
+
+    for token in ("user-1", "user-2"):
+        headers = {"Authorization": f"Bearer {token}", "Idempotency-Key": "same-key"}
+        response = upload_url.lambda_handler({"httpMethod": "GET", "headers": headers}, None)
+        assert "Idempotent-Replayed" not in response["headers"]
+
+    assert mock_s3_client.generate_presigned_post.call_count == 2
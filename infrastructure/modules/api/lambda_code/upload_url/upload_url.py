@@ -1,37 +1,244 @@
 import json
 import os
-import boto3
-from botocore.exceptions import ClientError
-import uuid
 
-s3_client = boto3.client('s3')
+# boto3/botocore are loaded lazily by aws_clients on the first S3 call.
+import api_responses
+import aws_clients
+import idempotency
+import media_store
+import metrics
+import warmup
+from jwt_verifier import TokenError, authenticate
+from media_types import MEDIA_TYPES, MIN_UPLOAD_SIZE, object_key as media_object_key
 
 MEDIA_BUCKET_NAME = os.environ.get('MEDIA_BUCKET_NAME')
+# When set, every handed-out upload is recorded as a PENDING media row and
+# manifest entries that carry a sha256 are deduplicated against the caller's media
+MEDIA_METADATA_TABLE_NAME = os.environ.get('MEDIA_METADATA_TABLE_NAME')
 
+# --- Upload manifest limits ---
+MAX_FILES_PER_REQUEST = int(os.environ.get('MAX_UPLOAD_FILES_PER_REQUEST', '50'))
+UPLOAD_URL_EXPIRES_IN = 3600
+SHA256_HEX_LENGTH = 64
+METRICS_NAMESPACE = "ChatApp/Media"
+# Retries within this window get the same URLs, which are still valid for
+# most of UPLOAD_URL_EXPIRES_IN
+IDEMPOTENCY_TTL_SECONDS = 600
+
+# --- Precomputed responses ---
+HEADERS = api_responses.cors_headers("GET,POST,OPTIONS", "Content-Type,Authorization,Idempotency-Key")
+PREFLIGHT = api_responses.preflight(HEADERS)
+MISSING_BUCKET = api_responses.static(
+    500, HEADERS, {"message": "MEDIA_BUCKET_NAME environment variable is not set."}
+)
+PRESIGN_FAILED = api_responses.static(500, HEADERS, {"message": "Could not generate an upload URL."})
+INVALID_JSON = api_responses.static(400, HEADERS, {"message": "Invalid JSON format in request body."})
+UNAUTHORIZED = api_responses.static(401, HEADERS, {"message": "Unauthorized"})
+
+
+def validate_manifest(files):
+    """Return an error message for an invalid upload manifest, or None."""
+    if not isinstance(files, list) or not files:
+        return "files must be a non-empty list."
+    if len(files) > MAX_FILES_PER_REQUEST:
+        return f"At most {MAX_FILES_PER_REQUEST} files can be uploaded per request."
+    for index, item in enumerate(files):
+        if not isinstance(item, dict):
+            return f"files[{index}] must be an object."
+        media_type = MEDIA_TYPES.get(item.get("contentType"))
+        if media_type is None:
+            return f"files[{index}]: unsupported content type. Allowed: {', '.join(MEDIA_TYPES)}."
+        size = item.get("size")
+        if not isinstance(size, int) or isinstance(size, bool) or size < MIN_UPLOAD_SIZE:
+            return f"files[{index}]: size must be an integer of at least {MIN_UPLOAD_SIZE} bytes."
+        if size > media_type["max_size"]:
+            return f"files[{index}]: {item['contentType']} uploads are limited to {media_type['max_size']} bytes."
+        content_hash = item.get("sha256")
+        if content_hash is not None and not _is_sha256_hex(content_hash):
+            return f"files[{index}]: sha256 must be the file's SHA-256 as {SHA256_HEX_LENGTH} hex characters."
+    return None
+
+
+def _is_sha256_hex(value):
+    if not isinstance(value, str) or len(value) != SHA256_HEX_LENGTH:
+        return False
+    try:
+        bytes.fromhex(value)
+    except ValueError:
+        return False
+    return True
+
+
+def record_media(user_id, uploads):
+    """Write a PENDING media row per presigned upload; raises if any row could not be written.
+
+    Deduplicated uploads are media the user already has a READY row for.
+    """
+    if not MEDIA_METADATA_TABLE_NAME:
+        return
+    items = {}
+    for upload in uploads:
+        if upload.get("duplicate"):
+            continue
+        # The same file twice in one manifest is one row
+        items[upload["mediaID"]] = media_store.pending_item(
+            upload["mediaID"], user_id, upload["key"], upload["contentType"], upload.get("size"))
+    if not items:
+        return
+    unprocessed = media_store.record_pending(list(items.values()), MEDIA_METADATA_TABLE_NAME)
+    if unprocessed:
+        raise RuntimeError(f"{len(unprocessed)} media rows could not be written")
+
+
+def lookup_existing(files, user_id):
+    """Return ``{sha256: media row}`` for manifest entries ``user_id`` has already uploaded.
+
+    Only media the caller owns counts (``media_store.owns``). Answering from another user's
+    copy would hand out their object for nothing more than its hash and
+    tell the caller that somebody has the file. Other users' copies are
+    still stored once: the same bytes always land on the same key.
+    """
+    hashes = {media_store.content_media_id(item["sha256"].lower()): item["sha256"].lower()
+              for item in files if item.get("sha256")}
+    if not hashes or not MEDIA_METADATA_TABLE_NAME:
+        return {}
+    owned = media_store.find_own(user_id, hashes, MEDIA_METADATA_TABLE_NAME)
+    return {hashes[media_id]: row for media_id, row in owned.items()}
+
+
+def presign_manifest(files, existing=None, user_id=None):
+    """Presign one POST per manifest entry, all signed locally in this process.
+
+    Entries with a ``sha256`` are content-addressed: if ``existing`` (the
+    caller's own media, see ``lookup_existing``) has it, the entry is
+    answered with a reference to it and nothing is uploaded; otherwise the
+    POST is bound to the hash-derived key and S3 rejects any body whose
+    SHA-256 or size differs from the claim. The POST also pins the
+    ``x-amz-meta-uploader`` metadata to ``user_id``, and media-complete only
+    finalizes the row of the user it names.
+    """
+    import base64
+    import uuid
+    from s3_signing import PostPolicySigner
+
+    existing = existing or {}
+    signer = None
+    uploads = []
+    for item in files:
+        content_type = item["contentType"]
+        content_hash = item["sha256"].lower() if item.get("sha256") else None
+        fields = {"Content-Type": content_type}
+        size_range = ["content-length-range", MIN_UPLOAD_SIZE, item["size"]]
+
+        if content_hash:
+            media_id = media_store.content_media_id(content_hash)
+            stored = existing.get(content_hash)
+            if stored and stored.get("size") == item["size"]:
+                uploads.append({
+                    "mediaID": media_id,
+                    "key": stored["key"],
+                    "contentType": stored.get("contentType") or content_type,
+                    "size": item["size"],
+                    "duplicate": True,
+                    "renditions": stored.get("renditions")
+                })
+                continue
+            fields[f"x-amz-meta-{media_store.UPLOADER_METADATA}"] = user_id
+            fields["x-amz-checksum-algorithm"] = "SHA256"
+            fields["x-amz-checksum-sha256"] = base64.b64encode(bytes.fromhex(content_hash)).decode()
+            size_range = ["content-length-range", item["size"], item["size"]]
+        else:
+            media_id = str(uuid.uuid4())
+
+        if signer is None:
+            signer = PostPolicySigner.from_session(MEDIA_BUCKET_NAME)
+        object_key = media_object_key(content_type, media_id)
+        post = signer.presign_post(
+            object_key,
+            fields=fields,
+            conditions=[size_range],
+            expires_in=UPLOAD_URL_EXPIRES_IN
+        )
+        uploads.append({
+            "mediaID": media_id,
+            "key": object_key,
+            "contentType": content_type,
+            "size": item["size"],
+            "duplicate": False,
+            "url": post["url"],
+            "fields": post["fields"]
+        })
+    return uploads
+
+
+def emit_dedupe_metrics(uploads):
+    """Record dedupe hits/misses in the invocation's metrics (CloudWatch EMF).
+
+    Hit rate is ``DedupeHits / (DedupeHits + DedupeMisses)`` in metric math.
+    A hit is a user re-sending a file they uploaded themselves, so these
+    count upload bytes saved per user, not storage shared across users
+    (identical bytes land on one key either way).
+    """
+    hashed = [upload for upload in uploads if upload["mediaID"].startswith(media_store.CONTENT_ID_PREFIX)]
+    if not hashed:
+        return
+    hits = [upload for upload in hashed if upload["duplicate"]]
+    metrics.add("DedupeHits", len(hits), namespace=METRICS_NAMESPACE)
+    metrics.add("DedupeMisses", len(hashed) - len(hits), namespace=METRICS_NAMESPACE)
+    metrics.add("DedupeBytesSaved", sum(upload["size"] for upload in hits), "Bytes", METRICS_NAMESPACE)
+
+
+@metrics.instrument
+@warmup.primes(clients=("s3",), resources=("dynamodb",), jwks=True, modules=("uuid", "s3_signing"))
 def lambda_handler(event, context):
-    
-    headers = {
-        "Access-Control-Allow-Origin": "*",
-        "Access-Control-Allow-Headers": "Content-Type",
-        "Access-Control-Allow-Methods": "GET,OPTIONS"
-    }
-    
     if event.get('httpMethod') == 'OPTIONS':
-        return {
-            "statusCode": 200,
-            "headers": headers,
-            "body": json.dumps({"message": "CORS preflight OK"})
-        }
+        return PREFLIGHT
     if not MEDIA_BUCKET_NAME:
-        return {
-            "statusCode": 500,
-            "headers": headers,
-            "body": json.dumps({"message": "MEDIA_BUCKET_NAME environment variable is not set."})
-        }
+        return MISSING_BUCKET
 
-    object_key = f"uploads/{uuid.uuid4()}"
+    try:
+        user_id = authenticate(event)["sub"]
+    except TokenError:
+        return UNAUTHORIZED
+
+    # Client retries with the same Idempotency-Key get the first response,
+    # not another set of upload keys
+    return idempotency.handle(
+        "upload_url", event, user_id, [event.get('httpMethod'), event.get('body')],
+        lambda: issue_upload_urls(event, user_id), HEADERS, ttl=IDEMPOTENCY_TTL_SECONDS
+    )
+
+
+def issue_upload_urls(event, user_id):
+    """Presign the upload(s) the request asks for and record them for ``user_id``."""
+    # --- Batch mode: POST {"files": [{"contentType": ..., "size": ...}, ...]} ---
+    if event.get('httpMethod') == 'POST':
+        try:
+            files = json.loads(event.get('body') or '{}').get('files')
+        except (json.JSONDecodeError, AttributeError):
+            return INVALID_JSON
+
+        error = validate_manifest(files)
+        if error:
+            return api_responses.response(400, HEADERS, {"message": error})
+
+        try:
+            uploads = presign_manifest(files, lookup_existing(files, user_id), user_id)
+            record_media(user_id, uploads)
+        except Exception as e:
+            print(f"Error generating presigned URLs: {e}")
+            return PRESIGN_FAILED
+        emit_dedupe_metrics(uploads)
+
+        return api_responses.response(200, HEADERS, {"uploads": uploads})
+
+    import uuid
+
+    media_id = str(uuid.uuid4())
+    object_key = f"uploads/{media_id}"
     try:
         # Generate a presigned S3 POST URL
+        s3_client = aws_clients.get_client('s3')
         response = s3_client.generate_presigned_post(
             Bucket=MEDIA_BUCKET_NAME,
             Key=object_key,
@@ -42,17 +249,10 @@ def lambda_handler(event, context):
             ],
             ExpiresIn=3600  # URL expires in 1 hour
         )
-    except ClientError as e:
+        record_media(user_id, [{"mediaID": media_id, "key": object_key, "contentType": "image/jpeg"}])
+    except (aws_clients.ClientError, aws_clients.BotoCoreError) as e:
         # Log the error and return a generic error message
         print(f"Error generating presigned URL: {e}")
-        return {
-            "statusCode": 500,
-            "headers": headers,
-            "body": json.dumps({"message": "Could not generate an upload URL."})
-        }
-
-    return {
-        "statusCode": 200,
-        "headers": headers,
-        "body": json.dumps(response)
-    }
+        return PRESIGN_FAILED
+
+    return api_responses.response(200, HEADERS, response)
@@ -0,0 +1,41 @@
+import importlib
+
+import pytest
+
+import ws_connect
+
+pytestmark = pytest.mark.usefixtures("stub_verifier")
+
+
+@pytest.fixture(autouse=True)
+def tables(messaging_tables):
+    importlib.reload(ws_connect)
+    return messaging_tables
+
+
+def connect(connection_id, headers=None, params=None):
+    event = {"requestContext": {"connectionId": connection_id, "eventType": "CONNECT"},
+             "headers": headers, "queryStringParameters": params}
+    return ws_connect.lambda_handler(event, None)["statusCode"]
+
+
+def test_registers_connection_from_query_string_token():
+    import ws_connections
+
+    assert connect("c1", params={"token": "user-1"}) == 200
+    assert ws_connections.connection_user("c1") == "user-1"
+
+
+def test_accepts_authorization_header():
+    import ws_connections
+
+    assert connect("c1", headers={"Authorization": "Bearer user-2"}) == 200
+    assert ws_connections.connections_for(["user-2"]) == {"user-2": ["c1"]}
+
+
+@pytest.mark.parametrize("params", [None, {"token": "forged"}])
+def test_rejects_missing_or_invalid_tokens(params):
+    import ws_connections
+
+    assert connect("c1", params=params) == 401
+    assert ws_connections.connection_user("c1") is None
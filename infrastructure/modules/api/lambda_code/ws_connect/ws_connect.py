@@ -0,0 +1,50 @@
+import json
+
+# boto3/botocore are loaded lazily by aws_clients on the first DynamoDB call.
+import aws_clients
+import metrics
+import warmup
+import ws_connections
+from jwt_verifier import TokenError, bearer_token, get_verifier
+
+# --- Precomputed response bodies ---
+MISSING_TABLE_BODY = json.dumps({"message": "CONNECTIONS_TABLE_NAME environment variable is not set."})
+UNAUTHORIZED_BODY = json.dumps({"message": "Unauthorized"})
+CONNECT_FAILED_BODY = json.dumps({"message": "Could not register the connection."})
+CONNECTED_BODY = json.dumps({"message": "Connected"})
+
+
+def _response(status_code, body):
+    return {"statusCode": status_code, "body": body}
+
+
+def _token(event):
+    # Browsers cannot set headers on a WebSocket handshake, so the ID token
+    # may also come as ?token=...
+    return bearer_token(event) or (event.get("queryStringParameters") or {}).get("token")
+
+
+@metrics.instrument
+@warmup.primes(resources=("dynamodb",), jwks=True)
+def lambda_handler(event, context):
+    """``$connect``: authenticate the handshake and register the connection.
+
+    Anything but 200 makes API Gateway reject the handshake.
+    """
+    if not ws_connections.CONNECTIONS_TABLE_NAME:
+        return _response(500, MISSING_TABLE_BODY)
+
+    token = _token(event)
+    try:
+        if not token:
+            raise TokenError("Missing token")
+        user_id = get_verifier().verify(token)["sub"]
+    except TokenError:
+        return _response(401, UNAUTHORIZED_BODY)
+
+    try:
+        ws_connections.register(event["requestContext"]["connectionId"], user_id)
+    except aws_clients.ClientError as e:
+        print(f"Error registering connection: {e}")
+        return _response(500, CONNECT_FAILED_BODY)
+    return _response(200, CONNECTED_BODY)
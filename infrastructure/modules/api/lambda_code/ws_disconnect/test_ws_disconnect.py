@@ -0,0 +1,17 @@
+import ws_disconnect
+
+
+def test_removes_connection_from_registry(messaging_tables):
+    import ws_connections
+
+    ws_connections.register("c1", "user-1")
+    ws_connections.register("c2", "user-1")
+
+    response = ws_disconnect.lambda_handler({"requestContext": {"connectionId": "c1"}}, None)
+
+    assert response["statusCode"] == 200
+    assert ws_connections.connections_for(["user-1"]) == {"user-1": ["c2"]}
+
+
+def test_unknown_connection_is_ignored(messaging_tables):
+    assert ws_disconnect.lambda_handler({"requestContext": {"connectionId": "nope"}}, None)["statusCode"] == 200
@@ -0,0 +1,20 @@
+# boto3/botocore are loaded lazily by aws_clients on the first DynamoDB call.
+import aws_clients
+import metrics
+import warmup
+import ws_connections
+
+
+@metrics.instrument
+@warmup.primes(resources=("dynamodb",))
+def lambda_handler(event, context):
+    """``$disconnect``: drop the connection from the registry.
+
+    API Gateway ignores the response (the socket is already closed); errors
+    are only logged because the TTL and fan-out pruning clean up anyway.
+    """
+    try:
+        ws_connections.unregister(event["requestContext"]["connectionId"])
+    except aws_clients.ClientError as e:
+        print(f"Error unregistering connection: {e}")
+    return {"statusCode": 200}
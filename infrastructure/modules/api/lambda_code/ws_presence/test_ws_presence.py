@@ -0,0 +1,57 @@
+import importlib
+import json
+
+import pytest
+
+import presence
+import ws_presence
+
+
+@pytest.fixture(autouse=True)
+def tables(messaging_tables, management_api):
+    import ws_connections
+
+    importlib.reload(ws_presence)
+    for connection_id, user_id in (("c1", "user-1"), ("c2", "user-2"), ("c3", "user-3")):
+        ws_connections.register(connection_id, user_id)
+        management_api.connect(connection_id)
+    return messaging_tables
+
+
+def send(body, connection_id="c1"):
+    event = {
+        "requestContext": {"connectionId": connection_id, "domainName": "abc.example", "stage": "dev",
+                           "routeKey": body.get("action")},
+        "body": json.dumps(body),
+    }
+    response = ws_presence.lambda_handler(event, None)
+    return response["statusCode"], json.loads(response["body"])
+
+
+def test_heartbeat_marks_the_user_online():
+    assert send({"action": "heartbeat"})[0] == 200
+    assert presence.presence_of(["user-1"])[0]["user-1"]["online"] is True
+
+
+def test_typing_changes_are_pushed_to_other_members_once(tables, management_api):
+    conversation_id = tables.create_conversation("user-1", ["user-2"])["conversationID"]
+
+    assert send({"action": "typing", "conversationId": conversation_id, "typing": True})[0] == 200
+    assert send({"action": "typing", "conversationId": conversation_id, "typing": True})[0] == 200
+    assert send({"action": "typing", "conversationId": conversation_id, "typing": False})[0] == 200
+
+    assert sorted(management_api.received) == ["c2"]
+    assert [json.loads(payload)["typing"] for payload in management_api.received["c2"]] == [True, False]
+    assert json.loads(management_api.received["c2"][0]) == {
+        "type": "typing", "conversationId": conversation_id, "userId": "user-1", "typing": True}
+
+
+def test_typing_requires_membership_and_a_boolean(tables):
+    conversation_id = tables.create_conversation("user-2", ["user-3"])["conversationID"]
+
+    assert send({"action": "typing", "conversationId": conversation_id, "typing": True})[0] == 404
+    assert send({"action": "typing", "conversationId": conversation_id, "typing": "yes"})[0] == 400
+
+
+def test_unknown_connection_is_rejected():
+    assert send({"action": "heartbeat"}, connection_id="gone")[0] == 401
@@ -0,0 +1,79 @@
+import json
+
+# boto3/botocore are loaded lazily by aws_clients on the first DynamoDB call.
+import aws_clients
+import message_store
+import metrics
+import presence
+import warmup
+import ws_connections
+
+# --- Precomputed response bodies ---
+MISSING_TABLE_BODY = json.dumps({"message": "CONNECTIONS_TABLE_NAME environment variable is not set."})
+UNAUTHORIZED_BODY = json.dumps({"message": "Unknown connection."})
+INVALID_JSON_BODY = json.dumps({"message": "Invalid JSON format in request body."})
+INVALID_TYPING_BODY = json.dumps({"message": "typing must be true or false."})
+UNKNOWN_CONVERSATION_BODY = json.dumps({"message": "Conversation not found."})
+PRESENCE_FAILED_BODY = json.dumps({"message": "Could not update presence."})
+OK_BODY = json.dumps({"message": "OK"})
+
+
+def _response(status_code, body):
+    return {"statusCode": status_code, "body": body}
+
+
+def typing(event, user_id, body):
+    """Record a typing start/stop and, when it was written, tell the conversation's other members."""
+    if not isinstance(body.get("typing"), bool):
+        return _response(400, INVALID_TYPING_BODY)
+    conversation = message_store.member_conversation(body.get("conversationId"), user_id)
+    conversation_id = conversation["conversationID"]
+    if body["typing"]:
+        changed = presence.start_typing(user_id, conversation_id)
+    else:
+        changed = presence.stop_typing(user_id, conversation_id)
+
+    if changed:
+        others = [member for member in conversation["members"] if member != user_id]
+        payload = {"type": "typing", "conversationId": conversation_id, "userId": user_id, "typing": body["typing"]}
+        try:
+            ws_connections.broadcast(ws_connections.endpoint_url(event), ws_connections.connections_for(others),
+                                     payload)
+        except aws_clients.ClientError as e:
+            # Typing indicators are best effort; the next keystroke sends another
+            print(f"Error pushing typing state for {conversation_id}: {e}")
+    return _response(200, OK_BODY)
+
+
+@metrics.instrument
+@warmup.primes(resources=("dynamodb",))
+def lambda_handler(event, context):
+    """``heartbeat`` and ``typing``: keep the connection's user online and share typing state.
+
+    Expects ``{"action": "heartbeat"}`` (every 30 s or so while the app is in
+    the foreground) or ``{"action": "typing", "conversationId": ...,
+    "typing": true|false}``. Writes are coalesced by ``presence``; a typing
+    change is pushed to the conversation's other connected members.
+    """
+    if not ws_connections.CONNECTIONS_TABLE_NAME:
+        return _response(500, MISSING_TABLE_BODY)
+
+    try:
+        body = json.loads(event.get("body") or "{}")
+        action = body.get("action")
+    except (json.JSONDecodeError, AttributeError):
+        return _response(400, INVALID_JSON_BODY)
+
+    try:
+        user_id = ws_connections.connection_user(event["requestContext"]["connectionId"])
+        if user_id is None:
+            return _response(401, UNAUTHORIZED_BODY)
+        if action == "typing":
+            return typing(event, user_id, body)
+        presence.heartbeat(user_id)
+    except message_store.NotAMember:
+        return _response(404, UNKNOWN_CONVERSATION_BODY)
+    except aws_clients.ClientError as e:
+        print(f"Error updating presence: {e}")
+        return _response(500, PRESENCE_FAILED_BODY)
+    return _response(200, OK_BODY)
@@ -0,0 +1,59 @@
+import importlib
+import json
+
+import pytest
+
+import ws_send_message
+
+
+@pytest.fixture(autouse=True)
+def tables(messaging_tables, management_api):
+    import ws_connections
+
+    importlib.reload(ws_send_message)
+    for connection_id, user_id in (("c1", "user-1"), ("c2", "user-2"), ("c3", "user-3")):
+        ws_connections.register(connection_id, user_id)
+        management_api.connect(connection_id)
+    return messaging_tables
+
+
+def send(body, connection_id="c1"):
+    event = {
+        "requestContext": {"connectionId": connection_id, "domainName": "abc.example", "stage": "dev",
+                           "routeKey": "sendMessage"},
+        "body": json.dumps(dict(body, action="sendMessage")),
+    }
+    response = ws_send_message.lambda_handler(event, None)
+    return response["statusCode"], json.loads(response["body"])
+
+
+def test_pushes_message_to_connected_members(tables, management_api):
+    conversation = tables.create_conversation("user-1", ["user-2"])
+
+    status, message = send({"conversationId": conversation["conversationID"], "body": "hello"})
+
+    assert status == 200
+    assert message["senderID"] == "user-1"
+    assert sorted(management_api.received) == ["c1", "c2"]
+    assert json.loads(management_api.received["c2"][0]) == {"type": "message", "message": message}
+    assert [m["messageID"] for m in tables.since("user-2")[0]] == [message["messageID"]]
+
+
+def test_non_member_gets_not_found(tables, management_api):
+    conversation = tables.create_conversation("user-1", ["user-2"])
+
+    assert send({"conversationId": conversation["conversationID"], "body": "hi"}, connection_id="c3")[0] == 404
+    assert management_api.received == {}
+
+
+def test_unknown_connection_is_rejected(tables):
+    conversation = tables.create_conversation("user-1", ["user-2"])
+
+    assert send({"conversationId": conversation["conversationID"], "body": "hi"}, connection_id="c9")[0] == 401
+
+
+@pytest.mark.parametrize("text", [None, "", "x" * 4001])
+def test_rejects_empty_or_oversized_bodies(tables, text):
+    conversation = tables.create_conversation("user-1", ["user-2"])
+
+    assert send({"conversationId": conversation["conversationID"], "body": text})[0] == 400
@@ -0,0 +1,77 @@
+import json
+
+# boto3/botocore are loaded lazily by aws_clients on the first DynamoDB call.
+import aws_clients
+import message_store
+import metrics
+import warmup
+import ws_connections
+
+# --- Precomputed response bodies ---
+MISSING_TABLE_BODY = json.dumps({"message": "CONNECTIONS_TABLE_NAME environment variable is not set."})
+UNAUTHORIZED_BODY = json.dumps({"message": "Unknown connection."})
+INVALID_JSON_BODY = json.dumps({"message": "Invalid JSON format in request body."})
+INVALID_BODY_BODY = json.dumps({
+    "message": f"body must be a non-empty string of at most {message_store.MAX_BODY_LENGTH} characters."
+})
+INVALID_ATTACHMENTS_BODY = json.dumps({
+    "message": f"attachments must be a list of at most {message_store.MAX_ATTACHMENTS} media keys."
+})
+UNREADABLE_ATTACHMENT_BODY = json.dumps({"message": "You can only attach media you uploaded or were sent."})
+UNKNOWN_CONVERSATION_BODY = json.dumps({"message": "Conversation not found."})
+SEND_FAILED_BODY = json.dumps({"message": "Could not send the message."})
+
+
+def _response(status_code, body):
+    return {"statusCode": status_code, "body": body if isinstance(body, str) else json.dumps(body)}
+
+
+@metrics.instrument
+@warmup.primes(resources=("dynamodb",))
+def lambda_handler(event, context):
+    """``sendMessage``: store a message and push it to every connected member.
+
+    Expects ``{"action": "sendMessage", "conversationId": ..., "body": ...}``
+    with an optional ``"attachments"`` list of media keys.
+    The sender is the user the connection was authenticated as on
+    ``$connect``; the sender's own connections get the message too, which
+    doubles as the acknowledgement.
+    """
+    if not ws_connections.CONNECTIONS_TABLE_NAME:
+        return _response(500, MISSING_TABLE_BODY)
+
+    try:
+        body = json.loads(event.get("body") or "{}")
+        conversation_id = body.get("conversationId")
+        text = body.get("body")
+        attachments = body.get("attachments")
+    except (json.JSONDecodeError, AttributeError):
+        return _response(400, INVALID_JSON_BODY)
+
+    if not isinstance(text, str) or not text.strip() or len(text) > message_store.MAX_BODY_LENGTH:
+        return _response(400, INVALID_BODY_BODY)
+    if not message_store.valid_attachments(attachments):
+        return _response(400, INVALID_ATTACHMENTS_BODY)
+
+    try:
+        user_id = ws_connections.connection_user(event["requestContext"]["connectionId"])
+        if user_id is None:
+            return _response(401, UNAUTHORIZED_BODY)
+        conversation = message_store.member_conversation(conversation_id, user_id)
+        message, undelivered = message_store.send_message(conversation, user_id, text, attachments=attachments)
+    except message_store.NotAMember:
+        return _response(404, UNKNOWN_CONVERSATION_BODY)
+    except message_store.AttachmentNotReadable:
+        return _response(403, UNREADABLE_ATTACHMENT_BODY)
+    except aws_clients.ClientError as e:
+        print(f"Error sending message: {e}")
+        return _response(500, SEND_FAILED_BODY)
+
+    if undelivered:
+        print(f"{len(undelivered)} deliveries of {message['messageID']} were not written")
+    try:
+        ws_connections.notify_members(ws_connections.endpoint_url(event), conversation, message)
+    except aws_clients.ClientError as e:
+        # Stored and in every delivery feed; clients catch up via /messages/since
+        print(f"Error pushing {message['messageID']}: {e}")
+    return _response(200, message)
@@ -57,7 +57,77 @@ resource "aws_iam_policy" "lambda_app_permissions" {
         ]
       },
       {
-        # Permission for Signup to write to the user profile table
+        # Thumbnails: read originals (renditions are written with s3:PutObject);
+        # media-complete: head the uploaded version for its uploader metadata
+        Effect = "Allow"
+        Action = [
+          "s3:GetObject",
+          "s3:GetObjectVersion"
+        ]
+        Resource = [
+          "${var.media_bucket_arn}/uploads/*"
+        ]
+      },
+      {
+        # Download URLs: a presigned GET is only as good as the permissions
+        # of the role that signed it
+        Effect = "Allow"
+        Action = [
+          "s3:GetObject"
+        ]
+        Resource = [
+          "${var.media_bucket_arn}/uploads/*",
+          "${var.media_bucket_arn}/derived/*"
+        ]
+      },
+      {
+        # Multipart uploads: abort and list parts (create/upload/complete
+        # are covered by s3:PutObject)
+        Effect = "Allow"
+        Action = [
+          "s3:AbortMultipartUpload",
+          "s3:ListMultipartUploadParts"
+        ]
+        Resource = [
+          "${var.media_bucket_arn}/*"
+        ]
+      },
+      {
+        # Multipart upload session state
+        Effect = "Allow"
+        Action = [
+          "dynamodb:PutItem",
+          "dynamodb:GetItem",
+          "dynamodb:UpdateItem"
+        ]
+        Resource = [
+          var.upload_sessions_table_arn
+        ]
+      },
+      {
+        # Auth rate limits: conditional token-bucket updates from login/signup
+        Effect = "Allow"
+        Action = [
+          "dynamodb:UpdateItem"
+        ]
+        Resource = [
+          var.rate_limit_table_arn
+        ]
+      },
+      {
+        # Idempotency-Key claims and stored responses (signup, get-upload-url)
+        Effect = "Allow"
+        Action = [
+          "dynamodb:PutItem",
+          "dynamodb:UpdateItem",
+          "dynamodb:DeleteItem"
+        ]
+        Resource = [
+          var.idempotency_table_arn
+        ]
+      },
+      {
+        # Profile writes: the post-confirmation trigger and its retry consumer
         Effect = "Allow"
         Action = [
           "dynamodb:PutItem"
@@ -66,6 +136,167 @@ resource "aws_iam_policy" "lambda_app_permissions" {
           var.user_profile_table_arn
         ]
       },
+      {
+        # Profile writes that failed in the trigger are queued and retried
+        Effect = "Allow"
+        Action = [
+          "sqs:SendMessage",
+          "sqs:ReceiveMessage",
+          "sqs:DeleteMessage",
+          "sqs:GetQueueAttributes"
+        ]
+        Resource = [
+          aws_sqs_queue.profile_retries.arn
+        ]
+      },
+      {
+        # Media rows: PENDING rows from get-upload-url/multipart-upload,
+        # finalized by media-complete; conversation grants written by the
+        # send-message functions; ownership batch-read by get-download-url
+        Effect = "Allow"
+        Action = [
+          "dynamodb:PutItem",
+          "dynamodb:BatchWriteItem",
+          "dynamodb:BatchGetItem",
+          "dynamodb:UpdateItem"
+        ]
+        Resource = [
+          var.media_metadata_table_arn
+        ]
+      },
+      {
+        # Per-user media listing (list-media) queries the table's GSI
+        Effect = "Allow"
+        Action = [
+          "dynamodb:Query"
+        ]
+        Resource = [
+          "${var.media_metadata_table_arn}/index/*"
+        ]
+      },
+      {
+        # Messaging: conversations, messages and delivery fan-out
+        Effect = "Allow"
+        Action = [
+          "dynamodb:PutItem",
+          "dynamodb:GetItem",
+          "dynamodb:Query",
+          "dynamodb:BatchWriteItem"
+        ]
+        Resource = [
+          var.conversations_table_arn,
+          var.messages_table_arn,
+          var.message_deliveries_table_arn
+        ]
+      },
+      {
+        # archive-messages scans conversations for quiet ones and records
+        # their archived segments (messages are deleted with BatchWriteItem)
+        Effect = "Allow"
+        Action = [
+          "dynamodb:Scan",
+          "dynamodb:UpdateItem"
+        ]
+        Resource = [
+          var.conversations_table_arn
+        ]
+      },
+      {
+        # Archived segments: written by archive-messages, read with ranged
+        # GETs by message-history
+        Effect = "Allow"
+        Action = [
+          "s3:GetObject",
+          "s3:PutObject"
+        ]
+        Resource = [
+          "${var.message_archive_bucket_arn}/*"
+        ]
+      },
+      {
+        # Inbox summaries: written on create/send, counters reset by mark-read,
+        # listed by recency through the table's LSI
+        Effect = "Allow"
+        Action = [
+          "dynamodb:GetItem",
+          "dynamodb:UpdateItem",
+          "dynamodb:BatchWriteItem",
+          "dynamodb:Query"
+        ]
+        Resource = [
+          var.inbox_table_arn,
+          "${var.inbox_table_arn}/index/*"
+        ]
+      },
+      {
+        # Search index: postings appended by search-indexer, read by search-messages
+        Effect = "Allow"
+        Action = [
+          "dynamodb:UpdateItem",
+          "dynamodb:Query"
+        ]
+        Resource = [
+          var.search_index_table_arn
+        ]
+      },
+      {
+        # search-indexer reads new messages from the messages table's stream
+        Effect = "Allow"
+        Action = [
+          "dynamodb:DescribeStream",
+          "dynamodb:GetRecords",
+          "dynamodb:GetShardIterator",
+          "dynamodb:ListStreams"
+        ]
+        Resource = [
+          var.messages_table_stream_arn
+        ]
+      },
+      {
+        # Stream batches search-indexer gave up on (its on-failure destination)
+        Effect = "Allow"
+        Action = [
+          "sqs:SendMessage"
+        ]
+        Resource = [
+          aws_sqs_queue.search_indexer_failures.arn
+        ]
+      },
+      {
+        # WebSocket connection registry (ws-connect/-disconnect, fan-out pruning)
+        # and presence items (heartbeats, typing, batched presence reads)
+        Effect = "Allow"
+        Action = [
+          "dynamodb:PutItem",
+          "dynamodb:GetItem",
+          "dynamodb:UpdateItem",
+          "dynamodb:DeleteItem",
+          "dynamodb:BatchGetItem"
+        ]
+        Resource = [
+          var.connections_table_arn
+        ]
+      },
+      {
+        # Push messages to WebSocket clients
+        Effect = "Allow"
+        Action = [
+          "execute-api:ManageConnections"
+        ]
+        Resource = [
+          "${aws_apigatewayv2_api.websocket.execution_arn}/*"
+        ]
+      },
+      {
+        # Batched profile reads for the profiles endpoint
+        Effect = "Allow"
+        Action = [
+          "dynamodb:BatchGetItem"
+        ]
+        Resource = [
+          var.user_profile_table_arn
+        ]
+      },
       {
         # Read-only permissions for other functions (e.g., login, get-media)
         Effect = "Allow"
@@ -87,6 +318,29 @@ resource "aws_iam_role_policy_attachment" "lambda_app_permissions" {
   policy_arn = aws_iam_policy.lambda_app_permissions.arn
 }
 
+data "aws_caller_identity" "current" {}
+
+# get-download-url reads the CloudFront signing key, when the CDN is enabled
+resource "aws_iam_role_policy" "cdn_signing_key" {
+  count = var.cdn_private_key_parameter != "" ? 1 : 0
+
+  name = "${var.project_name}-cdn-signing-key-${var.environment_name}"
+  role = aws_iam_role.lambda_exec_role.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [{
+      Effect = "Allow"
+      Action = [
+        "ssm:GetParameter"
+      ]
+      Resource = [
+        "arn:aws:ssm:${var.aws_region}:${data.aws_caller_identity.current.account_id}:parameter/${trimprefix(var.cdn_private_key_parameter, "/")}"
+      ]
+    }]
+  })
+}
+
 
 # --- API Gateway REST API ---
 resource "aws_api_gateway_rest_api" "api" {
@@ -96,6 +350,127 @@ resource "aws_api_gateway_rest_api" "api" {
   binary_media_types = ["image/jpeg", "image/png", "video/mp4"]
 }
 
+# --- Lambda Layer: shared runtime (aws_clients, ...) ---
+# Packaged as python/<module>.py so it lands on sys.path at /opt/python.
+data "archive_file" "shared_layer_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/lambda_code/shared"
+  output_path = "${path.module}/lambda_code/shared.zip"
+}
+
+resource "aws_lambda_layer_version" "shared" {
+  layer_name               = "${var.project_name}-shared-${var.environment_name}"
+  filename                 = data.archive_file.shared_layer_zip.output_path
+  source_code_hash         = data.archive_file.shared_layer_zip.output_base64sha256
+  compatible_runtimes      = ["python3.11"]
+  compatible_architectures = ["x86_64", "arm64"]
+}
+
+# --- Lambda sizing, aliases and warm-up ---
+# Every function publishes a version per deploy and is invoked through its
+# "live" alias, which is what provisioned concurrency attaches to. Sizes and
+# concurrency come from var.lambda_settings, falling back to the defaults
+# below and then to var.lambda_memory_size / var.lambda_architecture.
+locals {
+  lambda_names = [
+    "login", "signup", "post_confirmation", "get_upload_url", "get_download_url", "multipart_upload", "media_complete",
+    "thumbnails", "list_media", "get_profiles", "create_conversation", "send_message", "message_history",
+    "messages_since", "inbox", "search_messages", "search_indexer", "get_presence", "archive_messages",
+    "ws_connect", "ws_disconnect", "ws_send_message", "ws_presence",
+  ]
+
+  lambda_defaults = {
+    # Decoding and resizing are CPU bound; more memory buys proportionally more CPU.
+    # The Pillow layers in var.image_processing_layer_arns are x86_64 builds.
+    thumbnails = { memory_size = 1536, architecture = "x86_64" }
+  }
+
+  lambda_settings = {
+    for name in local.lambda_names : name => {
+      memory_size             = try(var.lambda_settings[name].memory_size, local.lambda_defaults[name].memory_size, var.lambda_memory_size)
+      architecture            = try(var.lambda_settings[name].architecture, local.lambda_defaults[name].architecture, var.lambda_architecture)
+      reserved_concurrency    = try(var.lambda_settings[name].reserved_concurrency, -1)
+      provisioned_concurrency = try(var.lambda_settings[name].provisioned_concurrency, 0)
+      warmup                  = try(var.lambda_settings[name].warmup, false)
+    }
+  }
+
+  lambda_functions = {
+    login               = aws_lambda_function.login
+    signup              = aws_lambda_function.signup
+    post_confirmation   = aws_lambda_function.post_confirmation
+    get_upload_url      = aws_lambda_function.get_upload_url
+    get_download_url    = aws_lambda_function.get_download_url
+    multipart_upload    = aws_lambda_function.multipart_upload
+    media_complete      = aws_lambda_function.media_complete
+    thumbnails          = aws_lambda_function.thumbnails
+    list_media          = aws_lambda_function.list_media
+    get_profiles        = aws_lambda_function.get_profiles
+    create_conversation = aws_lambda_function.create_conversation
+    send_message        = aws_lambda_function.send_message
+    message_history     = aws_lambda_function.message_history
+    messages_since      = aws_lambda_function.messages_since
+    inbox               = aws_lambda_function.inbox
+    search_messages     = aws_lambda_function.search_messages
+    search_indexer      = aws_lambda_function.search_indexer
+    get_presence        = aws_lambda_function.get_presence
+    archive_messages    = aws_lambda_function.archive_messages
+    ws_connect          = aws_lambda_function.ws_connect
+    ws_disconnect       = aws_lambda_function.ws_disconnect
+    ws_send_message     = aws_lambda_function.ws_send_message
+    ws_presence         = aws_lambda_function.ws_presence
+  }
+
+  warmup_functions = toset([for name, settings in local.lambda_settings : name if settings.warmup])
+}
+
+resource "aws_lambda_alias" "live" {
+  for_each = toset(local.lambda_names)
+
+  name             = "live"
+  description      = "Latest published version; everything that invokes the function uses this alias"
+  function_name    = local.lambda_functions[each.key].function_name
+  function_version = local.lambda_functions[each.key].version
+}
+
+resource "aws_lambda_provisioned_concurrency_config" "live" {
+  for_each = { for name, settings in local.lambda_settings : name => settings if settings.provisioned_concurrency > 0 }
+
+  function_name                     = aws_lambda_alias.live[each.key].function_name
+  qualifier                         = aws_lambda_alias.live[each.key].name
+  provisioned_concurrent_executions = each.value.provisioned_concurrency
+}
+
+# Functions without provisioned concurrency can still be kept warm: the
+# handlers answer {"warmup": true} by building their clients and loading the
+# JWKS, without touching any table, bucket or user pool.
+resource "aws_cloudwatch_event_rule" "lambda_warmup" {
+  count = length(local.warmup_functions) > 0 ? 1 : 0
+
+  name                = "${var.project_name}-lambda-warmup-${var.environment_name}"
+  description         = "Keeps the functions with warmup = true in lambda_settings primed"
+  schedule_expression = var.lambda_warmup_schedule
+}
+
+resource "aws_cloudwatch_event_target" "lambda_warmup" {
+  for_each = local.warmup_functions
+
+  rule  = aws_cloudwatch_event_rule.lambda_warmup[0].name
+  arn   = aws_lambda_alias.live[each.key].arn
+  input = jsonencode({ warmup = true })
+}
+
+resource "aws_lambda_permission" "eventbridge_invoke_warmup" {
+  for_each = local.warmup_functions
+
+  statement_id  = "AllowEventBridgeInvokeWarmup"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_alias.live[each.key].function_name
+  qualifier     = aws_lambda_alias.live[each.key].name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.lambda_warmup[0].arn
+}
+
 # --- Lambda: login ---
 data "archive_file" "login_lambda_zip" {
   type        = "zip"
@@ -111,11 +486,18 @@ resource "aws_lambda_function" "login" {
   filename         = data.archive_file.login_lambda_zip.output_path
   source_code_hash = data.archive_file.login_lambda_zip.output_base64sha256
   timeout          = 30
+  layers           = [aws_lambda_layer_version.shared.arn]
+
+  memory_size                    = local.lambda_settings["login"].memory_size
+  architectures                  = [local.lambda_settings["login"].architecture]
+  reserved_concurrent_executions = local.lambda_settings["login"].reserved_concurrency
+  publish                        = true
 
   environment {
     variables = {
-      COGNITO_USER_POOL_ID = var.cognito_user_pool_id
-      COGNITO_CLIENT_ID    = var.cognito_client_id
+      COGNITO_USER_POOL_ID  = var.cognito_user_pool_id
+      COGNITO_CLIENT_ID     = var.cognito_client_id
+      RATE_LIMIT_TABLE_NAME = var.rate_limit_table_name
     }
   }
 }
@@ -135,16 +517,94 @@ resource "aws_lambda_function" "signup" {
   filename         = data.archive_file.signup_lambda_zip.output_path
   source_code_hash = data.archive_file.signup_lambda_zip.output_base64sha256
   timeout          = 30
+  layers           = [aws_lambda_layer_version.shared.arn]
+
+  memory_size                    = local.lambda_settings["signup"].memory_size
+  architectures                  = [local.lambda_settings["signup"].architecture]
+  reserved_concurrent_executions = local.lambda_settings["signup"].reserved_concurrency
+  publish                        = true
 
   environment {
     variables = {
       COGNITO_USER_POOL_ID    = var.cognito_user_pool_id
       COGNITO_CLIENT_ID       = var.cognito_client_id
+      RATE_LIMIT_TABLE_NAME   = var.rate_limit_table_name
+      IDEMPOTENCY_TABLE_NAME  = var.idempotency_table_name
+    }
+  }
+}
+
+# --- Lambda: post-confirmation (Cognito trigger, creates the user profile) ---
+data "archive_file" "post_confirmation_lambda_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/lambda_code/post_confirmation"
+  output_path = "${path.module}/lambda_code/post_confirmation.zip"
+}
+
+resource "aws_lambda_function" "post_confirmation" {
+  function_name    = "${var.project_name}-post-confirmation-${var.environment_name}"
+  role             = aws_iam_role.lambda_exec_role.arn
+  handler          = "post_confirmation.lambda_handler"
+  runtime          = "python3.11"
+  filename         = data.archive_file.post_confirmation_lambda_zip.output_path
+  source_code_hash = data.archive_file.post_confirmation_lambda_zip.output_base64sha256
+  # Cognito gives a trigger 5 seconds before retrying it
+  timeout = 5
+  layers  = [aws_lambda_layer_version.shared.arn]
+
+  memory_size                    = local.lambda_settings["post_confirmation"].memory_size
+  architectures                  = [local.lambda_settings["post_confirmation"].architecture]
+  reserved_concurrent_executions = local.lambda_settings["post_confirmation"].reserved_concurrency
+  publish                        = true
+
+  environment {
+    variables = {
       USER_PROFILE_TABLE_NAME = var.user_profile_table_name
+      PROFILE_RETRY_QUEUE_URL = aws_sqs_queue.profile_retries.url
     }
   }
 }
 
+# The trigger runs after Cognito has confirmed the user, and a confirmation
+# cannot be repeated, so a profile write that fails there is queued here and
+# retried by the same function with the same conditional put. Messages that
+# still fail after 10 receives (about 5 minutes) move to the dead-letter
+# queue for a replay.
+resource "aws_sqs_queue" "profile_retries_dlq" {
+  name                      = "${var.project_name}-profile-retries-dlq-${var.environment_name}"
+  message_retention_seconds = 1209600
+  sqs_managed_sse_enabled   = true
+}
+
+resource "aws_sqs_queue" "profile_retries" {
+  name                       = "${var.project_name}-profile-retries-${var.environment_name}"
+  visibility_timeout_seconds = 30
+  message_retention_seconds  = 1209600
+  sqs_managed_sse_enabled    = true
+
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.profile_retries_dlq.arn
+    maxReceiveCount     = 10
+  })
+}
+
+resource "aws_lambda_event_source_mapping" "profile_retries" {
+  event_source_arn        = aws_sqs_queue.profile_retries.arn
+  function_name           = aws_lambda_alias.live["post_confirmation"].arn
+  batch_size              = 10
+  function_response_types = ["ReportBatchItemFailures"]
+}
+
+# Let the user pool invoke the trigger (wired up in the identity module)
+resource "aws_lambda_permission" "cognito_invoke_post_confirmation" {
+  statement_id  = "AllowCognitoInvokePostConfirmation"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.post_confirmation.function_name
+  qualifier     = aws_lambda_alias.live["post_confirmation"].name
+  principal     = "cognito-idp.amazonaws.com"
+  source_arn    = var.cognito_user_pool_arn
+}
+
 # --- Lambda: get-upload-url ---
 data "archive_file" "upload_url_lambda_zip" {
   type        = "zip"
@@ -160,112 +620,1213 @@ resource "aws_lambda_function" "get_upload_url" {
   filename         = data.archive_file.upload_url_lambda_zip.output_path
   source_code_hash = data.archive_file.upload_url_lambda_zip.output_base64sha256
   timeout          = 30
+  layers           = [aws_lambda_layer_version.shared.arn]
+
+  memory_size                    = local.lambda_settings["get_upload_url"].memory_size
+  architectures                  = [local.lambda_settings["get_upload_url"].architecture]
+  reserved_concurrent_executions = local.lambda_settings["get_upload_url"].reserved_concurrency
+  publish                        = true
 
   environment {
     variables = {
       MEDIA_BUCKET_NAME         = var.media_bucket_name
       MEDIA_METADATA_TABLE_NAME = var.media_metadata_table_name
+      IDEMPOTENCY_TABLE_NAME    = var.idempotency_table_name
+      COGNITO_USER_POOL_ID      = var.cognito_user_pool_id
+      COGNITO_CLIENT_ID         = var.cognito_client_id
     }
   }
 }
 
-# --- API Gateway Wiring: /login ---
-resource "aws_api_gateway_resource" "login" {
-  rest_api_id = aws_api_gateway_rest_api.api.id
-  parent_id   = aws_api_gateway_rest_api.api.root_resource_id
-  path_part   = "login"
-}
-
-resource "aws_api_gateway_method" "login" {
-  rest_api_id   = aws_api_gateway_rest_api.api.id
-  resource_id   = aws_api_gateway_resource.login.id
-  http_method   = "POST"
-  authorization = "NONE"
+# --- Lambda: get-download-url ---
+data "archive_file" "download_url_lambda_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/lambda_code/download_url"
+  output_path = "${path.module}/lambda_code/download_url.zip"
 }
 
-resource "aws_api_gateway_integration" "login" {
-  rest_api_id = aws_api_gateway_rest_api.api.id
-  resource_id = aws_api_gateway_resource.login.id
-  http_method = aws_api_gateway_method.login.http_method
+resource "aws_lambda_function" "get_download_url" {
+  function_name    = "${var.project_name}-get-download-url-${var.environment_name}"
+  role             = aws_iam_role.lambda_exec_role.arn
+  handler          = "download_url.lambda_handler"
+  runtime          = "python3.11"
+  filename         = data.archive_file.download_url_lambda_zip.output_path
+  source_code_hash = data.archive_file.download_url_lambda_zip.output_base64sha256
+  timeout          = 30
+  layers           = [aws_lambda_layer_version.shared.arn]
 
-  integration_http_method = "POST"
-  type                    = "AWS_PROXY"
-  uri                     = aws_lambda_function.login.invoke_arn
-}
+  memory_size                    = local.lambda_settings["get_download_url"].memory_size
+  architectures                  = [local.lambda_settings["get_download_url"].architecture]
+  reserved_concurrent_executions = local.lambda_settings["get_download_url"].reserved_concurrency
+  publish                        = true
 
-# Give API Gateway permission to invoke the signup Lambda
-resource "aws_lambda_permission" "api_gateway_invoke_signup" {
-  statement_id  = "AllowAPIGatewayInvokeSignup"
-  action        = "lambda:InvokeFunction"
-  function_name = aws_lambda_function.signup.function_name
-  principal     = "apigateway.amazonaws.com"
-  source_arn    = "${aws_api_gateway_rest_api.api.execution_arn}/*/*/*"
+  environment {
+    variables = {
+      MEDIA_BUCKET_NAME           = var.media_bucket_name
+      CDN_DOMAIN_NAME             = var.cdn_domain_name
+      CDN_KEY_PAIR_ID             = var.cdn_key_pair_id
+      CDN_PRIVATE_KEY_PARAMETER   = var.cdn_private_key_parameter
+      DOWNLOAD_URL_WINDOW_SECONDS = var.download_url_window_seconds
+      MEDIA_METADATA_TABLE_NAME   = var.media_metadata_table_name
+      CONVERSATIONS_TABLE_NAME    = var.conversations_table_name
+      COGNITO_USER_POOL_ID        = var.cognito_user_pool_id
+      COGNITO_CLIENT_ID           = var.cognito_client_id
+    }
+  }
 }
 
-# Give API Gateway permission to invoke the login Lambda
-resource "aws_lambda_permission" "api_gateway_invoke_login" {
-  statement_id  = "AllowAPIGateayInvokeLogin"
-  action        = "lambda:InvokeFunction"
-  function_name = aws_lambda_function.login.function_name
-  principal     = "apigateway.amazonaws.com"
-  source_arn    = "${aws_api_gateway_rest_api.api.execution_arn}/*/*/*"
+# --- Lambda: multipart-upload ---
+data "archive_file" "multipart_upload_lambda_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/lambda_code/multipart_upload"
+  output_path = "${path.module}/lambda_code/multipart_upload.zip"
+}
+
+resource "aws_lambda_function" "multipart_upload" {
+  function_name    = "${var.project_name}-multipart-upload-${var.environment_name}"
+  role             = aws_iam_role.lambda_exec_role.arn
+  handler          = "multipart_upload.lambda_handler"
+  runtime          = "python3.11"
+  filename         = data.archive_file.multipart_upload_lambda_zip.output_path
+  source_code_hash = data.archive_file.multipart_upload_lambda_zip.output_base64sha256
+  timeout          = 30
+  layers           = [aws_lambda_layer_version.shared.arn]
+
+  memory_size                    = local.lambda_settings["multipart_upload"].memory_size
+  architectures                  = [local.lambda_settings["multipart_upload"].architecture]
+  reserved_concurrent_executions = local.lambda_settings["multipart_upload"].reserved_concurrency
+  publish                        = true
+
+  environment {
+    variables = {
+      MEDIA_BUCKET_NAME          = var.media_bucket_name
+      UPLOAD_SESSIONS_TABLE_NAME = var.upload_sessions_table_name
+      MEDIA_METADATA_TABLE_NAME  = var.media_metadata_table_name
+      COGNITO_USER_POOL_ID       = var.cognito_user_pool_id
+      COGNITO_CLIENT_ID          = var.cognito_client_id
+    }
+  }
+}
+
+# --- Lambda: media-complete (S3 Object Created -> media row READY) ---
+data "archive_file" "media_complete_lambda_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/lambda_code/media_complete"
+  output_path = "${path.module}/lambda_code/media_complete.zip"
+}
+
+resource "aws_lambda_function" "media_complete" {
+  function_name    = "${var.project_name}-media-complete-${var.environment_name}"
+  role             = aws_iam_role.lambda_exec_role.arn
+  handler          = "media_complete.lambda_handler"
+  runtime          = "python3.11"
+  filename         = data.archive_file.media_complete_lambda_zip.output_path
+  source_code_hash = data.archive_file.media_complete_lambda_zip.output_base64sha256
+  timeout          = 30
+  layers           = [aws_lambda_layer_version.shared.arn]
+
+  memory_size                    = local.lambda_settings["media_complete"].memory_size
+  architectures                  = [local.lambda_settings["media_complete"].architecture]
+  reserved_concurrent_executions = local.lambda_settings["media_complete"].reserved_concurrency
+  publish                        = true
+
+  environment {
+    variables = {
+      MEDIA_METADATA_TABLE_NAME = var.media_metadata_table_name
+    }
+  }
+}
+
+resource "aws_cloudwatch_event_rule" "media_uploaded" {
+  name        = "${var.project_name}-media-uploaded-${var.environment_name}"
+  description = "Objects created under uploads/ in the media bucket"
+
+  event_pattern = jsonencode({
+    source        = ["aws.s3"]
+    "detail-type" = ["Object Created"]
+    detail = {
+      bucket = { name = [var.media_bucket_name] }
+      object = { key = [{ prefix = "uploads/" }] }
+    }
+  })
+}
+
+resource "aws_cloudwatch_event_target" "media_complete" {
+  rule = aws_cloudwatch_event_rule.media_uploaded.name
+  arn  = aws_lambda_alias.live["media_complete"].arn
+}
+
+resource "aws_lambda_permission" "eventbridge_invoke_media_complete" {
+  statement_id  = "AllowEventBridgeInvokeMediaComplete"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.media_complete.function_name
+  qualifier     = aws_lambda_alias.live["media_complete"].name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.media_uploaded.arn
+}
+
+# --- Lambda: thumbnails (S3 Object Created -> previews and thumbnails) ---
+data "archive_file" "thumbnails_lambda_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/lambda_code/thumbnails"
+  output_path = "${path.module}/lambda_code/thumbnails.zip"
+}
+
+resource "aws_lambda_function" "thumbnails" {
+  function_name    = "${var.project_name}-thumbnails-${var.environment_name}"
+  role             = aws_iam_role.lambda_exec_role.arn
+  handler          = "thumbnails.lambda_handler"
+  runtime          = "python3.11"
+  filename         = data.archive_file.thumbnails_lambda_zip.output_path
+  source_code_hash = data.archive_file.thumbnails_lambda_zip.output_base64sha256
+  timeout          = 60
+  layers           = concat([aws_lambda_layer_version.shared.arn], var.image_processing_layer_arns)
+
+  memory_size                    = local.lambda_settings["thumbnails"].memory_size
+  architectures                  = [local.lambda_settings["thumbnails"].architecture]
+  reserved_concurrent_executions = local.lambda_settings["thumbnails"].reserved_concurrency
+  publish                        = true
+
+  environment {
+    variables = {
+      MEDIA_METADATA_TABLE_NAME = var.media_metadata_table_name
+    }
+  }
+}
+
+resource "aws_cloudwatch_event_target" "thumbnails" {
+  rule = aws_cloudwatch_event_rule.media_uploaded.name
+  arn  = aws_lambda_alias.live["thumbnails"].arn
+}
+
+resource "aws_lambda_permission" "eventbridge_invoke_thumbnails" {
+  statement_id  = "AllowEventBridgeInvokeThumbnails"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.thumbnails.function_name
+  qualifier     = aws_lambda_alias.live["thumbnails"].name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.media_uploaded.arn
+}
+
+# --- Lambda: list-media ---
+data "archive_file" "list_media_lambda_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/lambda_code/list_media"
+  output_path = "${path.module}/lambda_code/list_media.zip"
+}
+
+resource "aws_lambda_function" "list_media" {
+  function_name    = "${var.project_name}-list-media-${var.environment_name}"
+  role             = aws_iam_role.lambda_exec_role.arn
+  handler          = "list_media.lambda_handler"
+  runtime          = "python3.11"
+  filename         = data.archive_file.list_media_lambda_zip.output_path
+  source_code_hash = data.archive_file.list_media_lambda_zip.output_base64sha256
+  timeout          = 30
+  layers           = [aws_lambda_layer_version.shared.arn]
+
+  memory_size                    = local.lambda_settings["list_media"].memory_size
+  architectures                  = [local.lambda_settings["list_media"].architecture]
+  reserved_concurrent_executions = local.lambda_settings["list_media"].reserved_concurrency
+  publish                        = true
+
+  environment {
+    variables = {
+      MEDIA_METADATA_TABLE_NAME = var.media_metadata_table_name
+      COGNITO_USER_POOL_ID      = var.cognito_user_pool_id
+      COGNITO_CLIENT_ID         = var.cognito_client_id
+    }
+  }
+}
+
+# --- Lambda: get-profiles ---
+data "archive_file" "get_profiles_lambda_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/lambda_code/get_profiles"
+  output_path = "${path.module}/lambda_code/get_profiles.zip"
+}
+
+resource "aws_lambda_function" "get_profiles" {
+  function_name    = "${var.project_name}-get-profiles-${var.environment_name}"
+  role             = aws_iam_role.lambda_exec_role.arn
+  handler          = "get_profiles.lambda_handler"
+  runtime          = "python3.11"
+  filename         = data.archive_file.get_profiles_lambda_zip.output_path
+  source_code_hash = data.archive_file.get_profiles_lambda_zip.output_base64sha256
+  timeout          = 30
+  layers           = [aws_lambda_layer_version.shared.arn]
+
+  memory_size                    = local.lambda_settings["get_profiles"].memory_size
+  architectures                  = [local.lambda_settings["get_profiles"].architecture]
+  reserved_concurrent_executions = local.lambda_settings["get_profiles"].reserved_concurrency
+  publish                        = true
+
+  environment {
+    variables = {
+      USER_PROFILE_TABLE_NAME = var.user_profile_table_name
+      COGNITO_USER_POOL_ID    = var.cognito_user_pool_id
+      COGNITO_CLIENT_ID       = var.cognito_client_id
+    }
+  }
+}
+
+# --- Messaging Lambdas (share one environment) ---
+locals {
+  # Management API of the WebSocket stage, built from the API ID so the
+  # Lambdas don't depend on the stage that depends on them
+  websocket_endpoint = "https://${aws_apigatewayv2_api.websocket.id}.execute-api.${var.aws_region}.amazonaws.com/${var.environment_name}"
+
+  messaging_environment = {
+    CONVERSATIONS_TABLE_NAME      = var.conversations_table_name
+    MESSAGES_TABLE_NAME           = var.messages_table_name
+    MESSAGE_DELIVERIES_TABLE_NAME = var.message_deliveries_table_name
+    INBOX_TABLE_NAME              = var.inbox_table_name
+    SEARCH_INDEX_TABLE_NAME       = var.search_index_table_name
+    CONNECTIONS_TABLE_NAME        = var.connections_table_name
+    MESSAGE_ARCHIVE_BUCKET_NAME   = var.message_archive_bucket_name
+    MEDIA_METADATA_TABLE_NAME     = var.media_metadata_table_name
+    WEBSOCKET_ENDPOINT            = local.websocket_endpoint
+    COGNITO_USER_POOL_ID          = var.cognito_user_pool_id
+    COGNITO_CLIENT_ID             = var.cognito_client_id
+  }
+}
+
+# --- Lambda: create-conversation ---
+data "archive_file" "create_conversation_lambda_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/lambda_code/create_conversation"
+  output_path = "${path.module}/lambda_code/create_conversation.zip"
+}
+
+resource "aws_lambda_function" "create_conversation" {
+  function_name    = "${var.project_name}-create-conversation-${var.environment_name}"
+  role             = aws_iam_role.lambda_exec_role.arn
+  handler          = "create_conversation.lambda_handler"
+  runtime          = "python3.11"
+  filename         = data.archive_file.create_conversation_lambda_zip.output_path
+  source_code_hash = data.archive_file.create_conversation_lambda_zip.output_base64sha256
+  timeout          = 30
+  layers           = [aws_lambda_layer_version.shared.arn]
+
+  memory_size                    = local.lambda_settings["create_conversation"].memory_size
+  architectures                  = [local.lambda_settings["create_conversation"].architecture]
+  reserved_concurrent_executions = local.lambda_settings["create_conversation"].reserved_concurrency
+  publish                        = true
+
+  environment {
+    variables = local.messaging_environment
+  }
+}
+
+# --- Lambda: send-message ---
+data "archive_file" "send_message_lambda_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/lambda_code/send_message"
+  output_path = "${path.module}/lambda_code/send_message.zip"
+}
+
+resource "aws_lambda_function" "send_message" {
+  function_name    = "${var.project_name}-send-message-${var.environment_name}"
+  role             = aws_iam_role.lambda_exec_role.arn
+  handler          = "send_message.lambda_handler"
+  runtime          = "python3.11"
+  filename         = data.archive_file.send_message_lambda_zip.output_path
+  source_code_hash = data.archive_file.send_message_lambda_zip.output_base64sha256
+  timeout          = 30
+  layers           = [aws_lambda_layer_version.shared.arn]
+
+  memory_size                    = local.lambda_settings["send_message"].memory_size
+  architectures                  = [local.lambda_settings["send_message"].architecture]
+  reserved_concurrent_executions = local.lambda_settings["send_message"].reserved_concurrency
+  publish                        = true
+
+  environment {
+    variables = local.messaging_environment
+  }
+}
+
+# --- Lambda: message-history ---
+data "archive_file" "message_history_lambda_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/lambda_code/message_history"
+  output_path = "${path.module}/lambda_code/message_history.zip"
+}
+
+resource "aws_lambda_function" "message_history" {
+  function_name    = "${var.project_name}-message-history-${var.environment_name}"
+  role             = aws_iam_role.lambda_exec_role.arn
+  handler          = "message_history.lambda_handler"
+  runtime          = "python3.11"
+  filename         = data.archive_file.message_history_lambda_zip.output_path
+  source_code_hash = data.archive_file.message_history_lambda_zip.output_base64sha256
+  timeout          = 30
+  layers           = [aws_lambda_layer_version.shared.arn]
+
+  memory_size                    = local.lambda_settings["message_history"].memory_size
+  architectures                  = [local.lambda_settings["message_history"].architecture]
+  reserved_concurrent_executions = local.lambda_settings["message_history"].reserved_concurrency
+  publish                        = true
+
+  environment {
+    variables = local.messaging_environment
+  }
+}
+
+# --- Lambda: messages-since ---
+data "archive_file" "messages_since_lambda_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/lambda_code/messages_since"
+  output_path = "${path.module}/lambda_code/messages_since.zip"
+}
+
+resource "aws_lambda_function" "messages_since" {
+  function_name    = "${var.project_name}-messages-since-${var.environment_name}"
+  role             = aws_iam_role.lambda_exec_role.arn
+  handler          = "messages_since.lambda_handler"
+  runtime          = "python3.11"
+  filename         = data.archive_file.messages_since_lambda_zip.output_path
+  source_code_hash = data.archive_file.messages_since_lambda_zip.output_base64sha256
+  timeout          = 30
+  layers           = [aws_lambda_layer_version.shared.arn]
+
+  memory_size                    = local.lambda_settings["messages_since"].memory_size
+  architectures                  = [local.lambda_settings["messages_since"].architecture]
+  reserved_concurrent_executions = local.lambda_settings["messages_since"].reserved_concurrency
+  publish                        = true
+
+  environment {
+    variables = local.messaging_environment
+  }
+}
+
+# --- Lambda: inbox ---
+data "archive_file" "inbox_lambda_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/lambda_code/inbox"
+  output_path = "${path.module}/lambda_code/inbox.zip"
+}
+
+resource "aws_lambda_function" "inbox" {
+  function_name    = "${var.project_name}-inbox-${var.environment_name}"
+  role             = aws_iam_role.lambda_exec_role.arn
+  handler          = "inbox.lambda_handler"
+  runtime          = "python3.11"
+  filename         = data.archive_file.inbox_lambda_zip.output_path
+  source_code_hash = data.archive_file.inbox_lambda_zip.output_base64sha256
+  timeout          = 30
+  layers           = [aws_lambda_layer_version.shared.arn]
+
+  memory_size                    = local.lambda_settings["inbox"].memory_size
+  architectures                  = [local.lambda_settings["inbox"].architecture]
+  reserved_concurrent_executions = local.lambda_settings["inbox"].reserved_concurrency
+  publish                        = true
+
+  environment {
+    variables = local.messaging_environment
+  }
+}
+
+# --- Lambda: search-messages ---
+data "archive_file" "search_messages_lambda_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/lambda_code/search_messages"
+  output_path = "${path.module}/lambda_code/search_messages.zip"
+}
+
+resource "aws_lambda_function" "search_messages" {
+  function_name    = "${var.project_name}-search-messages-${var.environment_name}"
+  role             = aws_iam_role.lambda_exec_role.arn
+  handler          = "search_messages.lambda_handler"
+  runtime          = "python3.11"
+  filename         = data.archive_file.search_messages_lambda_zip.output_path
+  source_code_hash = data.archive_file.search_messages_lambda_zip.output_base64sha256
+  timeout          = 30
+  layers           = [aws_lambda_layer_version.shared.arn]
+
+  memory_size                    = local.lambda_settings["search_messages"].memory_size
+  architectures                  = [local.lambda_settings["search_messages"].architecture]
+  reserved_concurrent_executions = local.lambda_settings["search_messages"].reserved_concurrency
+  publish                        = true
+
+  environment {
+    variables = local.messaging_environment
+  }
+}
+
+# --- Lambda: get-presence ---
+data "archive_file" "get_presence_lambda_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/lambda_code/get_presence"
+  output_path = "${path.module}/lambda_code/get_presence.zip"
+}
+
+resource "aws_lambda_function" "get_presence" {
+  function_name    = "${var.project_name}-get-presence-${var.environment_name}"
+  role             = aws_iam_role.lambda_exec_role.arn
+  handler          = "get_presence.lambda_handler"
+  runtime          = "python3.11"
+  filename         = data.archive_file.get_presence_lambda_zip.output_path
+  source_code_hash = data.archive_file.get_presence_lambda_zip.output_base64sha256
+  timeout          = 30
+  layers           = [aws_lambda_layer_version.shared.arn]
+
+  memory_size                    = local.lambda_settings["get_presence"].memory_size
+  architectures                  = [local.lambda_settings["get_presence"].architecture]
+  reserved_concurrent_executions = local.lambda_settings["get_presence"].reserved_concurrency
+  publish                        = true
+
+  environment {
+    variables = local.messaging_environment
+  }
+}
+
+# --- Lambda: search-indexer (messages stream -> search index) ---
+data "archive_file" "search_indexer_lambda_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/lambda_code/search_indexer"
+  output_path = "${path.module}/lambda_code/search_indexer.zip"
+}
+
+resource "aws_lambda_function" "search_indexer" {
+  function_name    = "${var.project_name}-search-indexer-${var.environment_name}"
+  role             = aws_iam_role.lambda_exec_role.arn
+  handler          = "search_indexer.lambda_handler"
+  runtime          = "python3.11"
+  filename         = data.archive_file.search_indexer_lambda_zip.output_path
+  source_code_hash = data.archive_file.search_indexer_lambda_zip.output_base64sha256
+  timeout          = 60
+  layers           = [aws_lambda_layer_version.shared.arn]
+
+  memory_size                    = local.lambda_settings["search_indexer"].memory_size
+  architectures                  = [local.lambda_settings["search_indexer"].architecture]
+  reserved_concurrent_executions = local.lambda_settings["search_indexer"].reserved_concurrency
+  publish                        = true
+
+  environment {
+    variables = {
+      SEARCH_INDEX_TABLE_NAME = var.search_index_table_name
+    }
+  }
+}
+
+# Records the indexer gave up on, as stream batch descriptions (shard and
+# sequence-number range) for a replay
+resource "aws_sqs_queue" "search_indexer_failures" {
+  name                      = "${var.project_name}-search-indexer-failures-${var.environment_name}"
+  message_retention_seconds = 1209600
+  sqs_managed_sse_enabled   = true
+}
+
+# Batches of up to 100 new messages; failed records are retried on their own
+# (postings are set-added, so replays are harmless). After 10 retries or a
+# day they are sent to the failure queue instead of blocking the shard.
+resource "aws_lambda_event_source_mapping" "search_indexer" {
+  event_source_arn  = var.messages_table_stream_arn
+  function_name     = aws_lambda_alias.live["search_indexer"].arn
+  starting_position = "LATEST"
+
+  batch_size                         = 100
+  maximum_batching_window_in_seconds = 1
+  maximum_record_age_in_seconds      = 86400
+  maximum_retry_attempts             = 10
+  bisect_batch_on_function_error     = true
+  function_response_types            = ["ReportBatchItemFailures"]
+
+  destination_config {
+    on_failure {
+      destination_arn = aws_sqs_queue.search_indexer_failures.arn
+    }
+  }
+
+  filter_criteria {
+    filter {
+      pattern = jsonencode({ eventName = ["INSERT"] })
+    }
+  }
+}
+
+# --- Lambda: archive-messages (quiet conversations -> S3 segments) ---
+data "archive_file" "archive_messages_lambda_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/lambda_code/archive_messages"
+  output_path = "${path.module}/lambda_code/archive_messages.zip"
+}
+
+resource "aws_lambda_function" "archive_messages" {
+  function_name    = "${var.project_name}-archive-messages-${var.environment_name}"
+  role             = aws_iam_role.lambda_exec_role.arn
+  handler          = "archive_messages.lambda_handler"
+  runtime          = "python3.11"
+  filename         = data.archive_file.archive_messages_lambda_zip.output_path
+  source_code_hash = data.archive_file.archive_messages_lambda_zip.output_base64sha256
+  timeout          = 900
+  layers           = [aws_lambda_layer_version.shared.arn]
+
+  memory_size                    = local.lambda_settings["archive_messages"].memory_size
+  architectures                  = [local.lambda_settings["archive_messages"].architecture]
+  reserved_concurrent_executions = local.lambda_settings["archive_messages"].reserved_concurrency
+  publish                        = true
+
+  environment {
+    variables = merge(local.messaging_environment, {
+      ARCHIVE_AFTER_DAYS = tostring(var.archive_after_days)
+    })
+  }
+}
+
+# Each hourly run compacts one of the 24 segments of a parallel scan of the
+# conversations table, so every conversation is looked at once a day
+resource "aws_cloudwatch_event_rule" "archive_messages" {
+  name                = "${var.project_name}-archive-messages-${var.environment_name}"
+  description         = "Archives conversations quiet for archive_after_days to S3"
+  schedule_expression = "rate(1 hour)"
+}
+
+resource "aws_cloudwatch_event_target" "archive_messages" {
+  rule = aws_cloudwatch_event_rule.archive_messages.name
+  arn  = aws_lambda_alias.live["archive_messages"].arn
+}
+
+resource "aws_lambda_permission" "eventbridge_invoke_archive_messages" {
+  statement_id  = "AllowEventBridgeInvokeArchiveMessages"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.archive_messages.function_name
+  qualifier     = aws_lambda_alias.live["archive_messages"].name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.archive_messages.arn
+}
+
+# --- Lambda: ws-connect ---
+data "archive_file" "ws_connect_lambda_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/lambda_code/ws_connect"
+  output_path = "${path.module}/lambda_code/ws_connect.zip"
+}
+
+resource "aws_lambda_function" "ws_connect" {
+  function_name    = "${var.project_name}-ws-connect-${var.environment_name}"
+  role             = aws_iam_role.lambda_exec_role.arn
+  handler          = "ws_connect.lambda_handler"
+  runtime          = "python3.11"
+  filename         = data.archive_file.ws_connect_lambda_zip.output_path
+  source_code_hash = data.archive_file.ws_connect_lambda_zip.output_base64sha256
+  timeout          = 30
+  layers           = [aws_lambda_layer_version.shared.arn]
+
+  memory_size                    = local.lambda_settings["ws_connect"].memory_size
+  architectures                  = [local.lambda_settings["ws_connect"].architecture]
+  reserved_concurrent_executions = local.lambda_settings["ws_connect"].reserved_concurrency
+  publish                        = true
+
+  environment {
+    variables = local.messaging_environment
+  }
+}
+
+# --- Lambda: ws-disconnect ---
+data "archive_file" "ws_disconnect_lambda_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/lambda_code/ws_disconnect"
+  output_path = "${path.module}/lambda_code/ws_disconnect.zip"
+}
+
+resource "aws_lambda_function" "ws_disconnect" {
+  function_name    = "${var.project_name}-ws-disconnect-${var.environment_name}"
+  role             = aws_iam_role.lambda_exec_role.arn
+  handler          = "ws_disconnect.lambda_handler"
+  runtime          = "python3.11"
+  filename         = data.archive_file.ws_disconnect_lambda_zip.output_path
+  source_code_hash = data.archive_file.ws_disconnect_lambda_zip.output_base64sha256
+  timeout          = 30
+  layers           = [aws_lambda_layer_version.shared.arn]
+
+  memory_size                    = local.lambda_settings["ws_disconnect"].memory_size
+  architectures                  = [local.lambda_settings["ws_disconnect"].architecture]
+  reserved_concurrent_executions = local.lambda_settings["ws_disconnect"].reserved_concurrency
+  publish                        = true
+
+  environment {
+    variables = local.messaging_environment
+  }
+}
+
+# --- Lambda: ws-send-message ---
+data "archive_file" "ws_send_message_lambda_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/lambda_code/ws_send_message"
+  output_path = "${path.module}/lambda_code/ws_send_message.zip"
+}
+
+resource "aws_lambda_function" "ws_send_message" {
+  function_name    = "${var.project_name}-ws-send-message-${var.environment_name}"
+  role             = aws_iam_role.lambda_exec_role.arn
+  handler          = "ws_send_message.lambda_handler"
+  runtime          = "python3.11"
+  filename         = data.archive_file.ws_send_message_lambda_zip.output_path
+  source_code_hash = data.archive_file.ws_send_message_lambda_zip.output_base64sha256
+  timeout          = 30
+  layers           = [aws_lambda_layer_version.shared.arn]
+
+  memory_size                    = local.lambda_settings["ws_send_message"].memory_size
+  architectures                  = [local.lambda_settings["ws_send_message"].architecture]
+  reserved_concurrent_executions = local.lambda_settings["ws_send_message"].reserved_concurrency
+  publish                        = true
+
+  environment {
+    variables = local.messaging_environment
+  }
+}
+
+# --- Lambda: ws-presence (heartbeat, typing) ---
+data "archive_file" "ws_presence_lambda_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/lambda_code/ws_presence"
+  output_path = "${path.module}/lambda_code/ws_presence.zip"
+}
+
+resource "aws_lambda_function" "ws_presence" {
+  function_name    = "${var.project_name}-ws-presence-${var.environment_name}"
+  role             = aws_iam_role.lambda_exec_role.arn
+  handler          = "ws_presence.lambda_handler"
+  runtime          = "python3.11"
+  filename         = data.archive_file.ws_presence_lambda_zip.output_path
+  source_code_hash = data.archive_file.ws_presence_lambda_zip.output_base64sha256
+  timeout          = 30
+  layers           = [aws_lambda_layer_version.shared.arn]
+
+  memory_size                    = local.lambda_settings["ws_presence"].memory_size
+  architectures                  = [local.lambda_settings["ws_presence"].architecture]
+  reserved_concurrent_executions = local.lambda_settings["ws_presence"].reserved_concurrency
+  publish                        = true
+
+  environment {
+    variables = local.messaging_environment
+  }
+}
+
+# --- API Gateway Wiring: /login ---
+resource "aws_api_gateway_resource" "login" {
+  rest_api_id = aws_api_gateway_rest_api.api.id
+  parent_id   = aws_api_gateway_rest_api.api.root_resource_id
+  path_part   = "login"
+}
+
+resource "aws_api_gateway_method" "login" {
+  rest_api_id   = aws_api_gateway_rest_api.api.id
+  resource_id   = aws_api_gateway_resource.login.id
+  http_method   = "POST"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "login" {
+  rest_api_id = aws_api_gateway_rest_api.api.id
+  resource_id = aws_api_gateway_resource.login.id
+  http_method = aws_api_gateway_method.login.http_method
+
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = aws_lambda_alias.live["login"].invoke_arn
+}
+
+# Give API Gateway permission to invoke the signup Lambda
+resource "aws_lambda_permission" "api_gateway_invoke_signup" {
+  statement_id  = "AllowAPIGatewayInvokeSignup"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.signup.function_name
+  qualifier     = aws_lambda_alias.live["signup"].name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_api_gateway_rest_api.api.execution_arn}/*/*/*"
+}
+
+# Give API Gateway permission to invoke the login Lambda
+resource "aws_lambda_permission" "api_gateway_invoke_login" {
+  statement_id  = "AllowAPIGateayInvokeLogin"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.login.function_name
+  qualifier     = aws_lambda_alias.live["login"].name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_api_gateway_rest_api.api.execution_arn}/*/*/*"
 }
 
 # Give API Gateway permission to invoke the get_upload_url Lambda
 resource "aws_lambda_permission" "api_gateway_invoke_get_upload_url" {
   statement_id  = "AllowAPIGatewayInvokeGetUploadUrl"
   action        = "lambda:InvokeFunction"
-  function_name = aws_lambda_function.get_upload_url.function_name
+  function_name = aws_lambda_function.get_upload_url.function_name
+  qualifier     = aws_lambda_alias.live["get_upload_url"].name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_api_gateway_rest_api.api.execution_arn}/*/*/*"
+}
+
+# --- API Gateway Wiring: /signup [NEW] ---
+resource "aws_api_gateway_resource" "signup" {
+  rest_api_id = aws_api_gateway_rest_api.api.id
+  parent_id   = aws_api_gateway_rest_api.api.root_resource_id
+  path_part   = "signup"
+}
+
+resource "aws_api_gateway_method" "signup" {
+  rest_api_id   = aws_api_gateway_rest_api.api.id
+  resource_id   = aws_api_gateway_resource.signup.id
+  http_method   = "POST"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "signup" {
+  rest_api_id = aws_api_gateway_rest_api.api.id
+  resource_id = aws_api_gateway_resource.signup.id
+  http_method = aws_api_gateway_method.signup.http_method
+
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = aws_lambda_alias.live["signup"].invoke_arn
+}
+
+# /signup/bulk provisions up to 500 users per request, so only IAM
+# principals allowed execute-api:Invoke on it (operators, scripts) can call
+# it: API Gateway checks the SigV4 signature before the Lambda runs
+resource "aws_api_gateway_resource" "signup_bulk" {
+  rest_api_id = aws_api_gateway_rest_api.api.id
+  parent_id   = aws_api_gateway_resource.signup.id
+  path_part   = "bulk"
+}
+
+resource "aws_api_gateway_method" "signup_bulk" {
+  rest_api_id   = aws_api_gateway_rest_api.api.id
+  resource_id   = aws_api_gateway_resource.signup_bulk.id
+  http_method   = "POST"
+  authorization = "AWS_IAM"
+}
+
+resource "aws_api_gateway_integration" "signup_bulk" {
+  rest_api_id = aws_api_gateway_rest_api.api.id
+  resource_id = aws_api_gateway_resource.signup_bulk.id
+  http_method = aws_api_gateway_method.signup_bulk.http_method
+
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = aws_lambda_alias.live["signup"].invoke_arn
+}
+
+# --- API Gateway Wiring: /get-upload-url ---
+resource "aws_api_gateway_resource" "get_upload_url" {
+  rest_api_id = aws_api_gateway_rest_api.api.id
+  parent_id   = aws_api_gateway_rest_api.api.root_resource_id
+  path_part   = "get-upload-url"
+}
+
+resource "aws_api_gateway_method" "get_upload_url" {
+  rest_api_id   = aws_api_gateway_rest_api.api.id
+  resource_id   = aws_api_gateway_resource.get_upload_url.id
+  http_method   = "GET"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "get_upload_url" {
+  rest_api_id = aws_api_gateway_rest_api.api.id
+  resource_id = aws_api_gateway_resource.get_upload_url.id
+  http_method = aws_api_gateway_method.get_upload_url.http_method
+
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = aws_lambda_alias.live["get_upload_url"].invoke_arn
+}
+
+# POST accepts a manifest of files and returns one presigned post per file
+resource "aws_api_gateway_method" "get_upload_url_batch" {
+  rest_api_id   = aws_api_gateway_rest_api.api.id
+  resource_id   = aws_api_gateway_resource.get_upload_url.id
+  http_method   = "POST"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "get_upload_url_batch" {
+  rest_api_id = aws_api_gateway_rest_api.api.id
+  resource_id = aws_api_gateway_resource.get_upload_url.id
+  http_method = aws_api_gateway_method.get_upload_url_batch.http_method
+
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = aws_lambda_alias.live["get_upload_url"].invoke_arn
+}
+
+# --- API Gateway Wiring: /get-download-url ---
+resource "aws_api_gateway_resource" "get_download_url" {
+  rest_api_id = aws_api_gateway_rest_api.api.id
+  parent_id   = aws_api_gateway_rest_api.api.root_resource_id
+  path_part   = "get-download-url"
+}
+
+resource "aws_api_gateway_method" "get_download_url" {
+  rest_api_id   = aws_api_gateway_rest_api.api.id
+  resource_id   = aws_api_gateway_resource.get_download_url.id
+  http_method   = "POST"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "get_download_url" {
+  rest_api_id = aws_api_gateway_rest_api.api.id
+  resource_id = aws_api_gateway_resource.get_download_url.id
+  http_method = aws_api_gateway_method.get_download_url.http_method
+
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = aws_lambda_alias.live["get_download_url"].invoke_arn
+}
+
+resource "aws_lambda_permission" "api_gateway_invoke_get_download_url" {
+  statement_id  = "AllowAPIGatewayInvokeGetDownloadUrl"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.get_download_url.function_name
+  qualifier     = aws_lambda_alias.live["get_download_url"].name
   principal     = "apigateway.amazonaws.com"
   source_arn    = "${aws_api_gateway_rest_api.api.execution_arn}/*/*/*"
 }
 
-# --- API Gateway Wiring: /signup [NEW] ---
-resource "aws_api_gateway_resource" "signup" {
+# --- API Gateway Wiring: /multipart-upload ---
+resource "aws_api_gateway_resource" "multipart_upload" {
   rest_api_id = aws_api_gateway_rest_api.api.id
   parent_id   = aws_api_gateway_rest_api.api.root_resource_id
-  path_part   = "signup"
+  path_part   = "multipart-upload"
 }
 
-resource "aws_api_gateway_method" "signup" {
+resource "aws_api_gateway_method" "multipart_upload" {
   rest_api_id   = aws_api_gateway_rest_api.api.id
-  resource_id   = aws_api_gateway_resource.signup.id
+  resource_id   = aws_api_gateway_resource.multipart_upload.id
   http_method   = "POST"
   authorization = "NONE"
 }
 
-resource "aws_api_gateway_integration" "signup" {
+resource "aws_api_gateway_integration" "multipart_upload" {
   rest_api_id = aws_api_gateway_rest_api.api.id
-  resource_id = aws_api_gateway_resource.signup.id
-  http_method = aws_api_gateway_method.signup.http_method
+  resource_id = aws_api_gateway_resource.multipart_upload.id
+  http_method = aws_api_gateway_method.multipart_upload.http_method
 
   integration_http_method = "POST"
   type                    = "AWS_PROXY"
-  uri                     = aws_lambda_function.signup.invoke_arn
+  uri                     = aws_lambda_alias.live["multipart_upload"].invoke_arn
 }
 
-# --- API Gateway Wiring: /get-upload-url ---
-resource "aws_api_gateway_resource" "get_upload_url" {
+resource "aws_lambda_permission" "api_gateway_invoke_multipart_upload" {
+  statement_id  = "AllowAPIGatewayInvokeMultipartUpload"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.multipart_upload.function_name
+  qualifier     = aws_lambda_alias.live["multipart_upload"].name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_api_gateway_rest_api.api.execution_arn}/*/*/*"
+}
+
+# --- API Gateway Wiring: /media ---
+resource "aws_api_gateway_resource" "list_media" {
   rest_api_id = aws_api_gateway_rest_api.api.id
   parent_id   = aws_api_gateway_rest_api.api.root_resource_id
-  path_part   = "get-upload-url"
+  path_part   = "media"
 }
 
-resource "aws_api_gateway_method" "get_upload_url" {
+resource "aws_api_gateway_method" "list_media" {
   rest_api_id   = aws_api_gateway_rest_api.api.id
-  resource_id   = aws_api_gateway_resource.get_upload_url.id
+  resource_id   = aws_api_gateway_resource.list_media.id
   http_method   = "GET"
   authorization = "NONE"
 }
 
-resource "aws_api_gateway_integration" "get_upload_url" {
+resource "aws_api_gateway_integration" "list_media" {
   rest_api_id = aws_api_gateway_rest_api.api.id
-  resource_id = aws_api_gateway_resource.get_upload_url.id
-  http_method = aws_api_gateway_method.get_upload_url.http_method
+  resource_id = aws_api_gateway_resource.list_media.id
+  http_method = aws_api_gateway_method.list_media.http_method
+
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = aws_lambda_alias.live["list_media"].invoke_arn
+}
+
+resource "aws_lambda_permission" "api_gateway_invoke_list_media" {
+  statement_id  = "AllowAPIGatewayInvokeListMedia"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.list_media.function_name
+  qualifier     = aws_lambda_alias.live["list_media"].name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_api_gateway_rest_api.api.execution_arn}/*/*/*"
+}
+
+# --- API Gateway Wiring: /profiles ---
+resource "aws_api_gateway_resource" "get_profiles" {
+  rest_api_id = aws_api_gateway_rest_api.api.id
+  parent_id   = aws_api_gateway_rest_api.api.root_resource_id
+  path_part   = "profiles"
+}
+
+resource "aws_api_gateway_method" "get_profiles" {
+  rest_api_id   = aws_api_gateway_rest_api.api.id
+  resource_id   = aws_api_gateway_resource.get_profiles.id
+  http_method   = "POST"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "get_profiles" {
+  rest_api_id = aws_api_gateway_rest_api.api.id
+  resource_id = aws_api_gateway_resource.get_profiles.id
+  http_method = aws_api_gateway_method.get_profiles.http_method
+
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = aws_lambda_alias.live["get_profiles"].invoke_arn
+}
+
+resource "aws_lambda_permission" "api_gateway_invoke_get_profiles" {
+  statement_id  = "AllowAPIGatewayInvokeGetProfiles"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.get_profiles.function_name
+  qualifier     = aws_lambda_alias.live["get_profiles"].name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_api_gateway_rest_api.api.execution_arn}/*/*/*"
+}
+
+# --- API Gateway Wiring: /conversations ---
+resource "aws_api_gateway_resource" "conversations" {
+  rest_api_id = aws_api_gateway_rest_api.api.id
+  parent_id   = aws_api_gateway_rest_api.api.root_resource_id
+  path_part   = "conversations"
+}
+
+resource "aws_api_gateway_method" "create_conversation" {
+  rest_api_id   = aws_api_gateway_rest_api.api.id
+  resource_id   = aws_api_gateway_resource.conversations.id
+  http_method   = "POST"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "create_conversation" {
+  rest_api_id = aws_api_gateway_rest_api.api.id
+  resource_id = aws_api_gateway_resource.conversations.id
+  http_method = aws_api_gateway_method.create_conversation.http_method
+
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = aws_lambda_alias.live["create_conversation"].invoke_arn
+}
+
+# --- API Gateway Wiring: /messages (POST send, GET history) ---
+resource "aws_api_gateway_resource" "messages" {
+  rest_api_id = aws_api_gateway_rest_api.api.id
+  parent_id   = aws_api_gateway_rest_api.api.root_resource_id
+  path_part   = "messages"
+}
+
+resource "aws_api_gateway_method" "send_message" {
+  rest_api_id   = aws_api_gateway_rest_api.api.id
+  resource_id   = aws_api_gateway_resource.messages.id
+  http_method   = "POST"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "send_message" {
+  rest_api_id = aws_api_gateway_rest_api.api.id
+  resource_id = aws_api_gateway_resource.messages.id
+  http_method = aws_api_gateway_method.send_message.http_method
+
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = aws_lambda_alias.live["send_message"].invoke_arn
+}
+
+resource "aws_api_gateway_method" "message_history" {
+  rest_api_id   = aws_api_gateway_rest_api.api.id
+  resource_id   = aws_api_gateway_resource.messages.id
+  http_method   = "GET"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "message_history" {
+  rest_api_id = aws_api_gateway_rest_api.api.id
+  resource_id = aws_api_gateway_resource.messages.id
+  http_method = aws_api_gateway_method.message_history.http_method
+
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = aws_lambda_alias.live["message_history"].invoke_arn
+}
+
+# --- API Gateway Wiring: /messages/since ---
+resource "aws_api_gateway_resource" "messages_since" {
+  rest_api_id = aws_api_gateway_rest_api.api.id
+  parent_id   = aws_api_gateway_resource.messages.id
+  path_part   = "since"
+}
+
+resource "aws_api_gateway_method" "messages_since" {
+  rest_api_id   = aws_api_gateway_rest_api.api.id
+  resource_id   = aws_api_gateway_resource.messages_since.id
+  http_method   = "GET"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "messages_since" {
+  rest_api_id = aws_api_gateway_rest_api.api.id
+  resource_id = aws_api_gateway_resource.messages_since.id
+  http_method = aws_api_gateway_method.messages_since.http_method
+
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = aws_lambda_alias.live["messages_since"].invoke_arn
+}
+
+# --- API Gateway Wiring: /inbox and /inbox/read ---
+resource "aws_api_gateway_resource" "inbox" {
+  rest_api_id = aws_api_gateway_rest_api.api.id
+  parent_id   = aws_api_gateway_rest_api.api.root_resource_id
+  path_part   = "inbox"
+}
+
+resource "aws_api_gateway_method" "inbox" {
+  rest_api_id   = aws_api_gateway_rest_api.api.id
+  resource_id   = aws_api_gateway_resource.inbox.id
+  http_method   = "GET"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "inbox" {
+  rest_api_id = aws_api_gateway_rest_api.api.id
+  resource_id = aws_api_gateway_resource.inbox.id
+  http_method = aws_api_gateway_method.inbox.http_method
+
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = aws_lambda_alias.live["inbox"].invoke_arn
+}
+
+resource "aws_api_gateway_resource" "inbox_read" {
+  rest_api_id = aws_api_gateway_rest_api.api.id
+  parent_id   = aws_api_gateway_resource.inbox.id
+  path_part   = "read"
+}
+
+resource "aws_api_gateway_method" "inbox_read" {
+  rest_api_id   = aws_api_gateway_rest_api.api.id
+  resource_id   = aws_api_gateway_resource.inbox_read.id
+  http_method   = "POST"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "inbox_read" {
+  rest_api_id = aws_api_gateway_rest_api.api.id
+  resource_id = aws_api_gateway_resource.inbox_read.id
+  http_method = aws_api_gateway_method.inbox_read.http_method
+
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = aws_lambda_alias.live["inbox"].invoke_arn
+}
+
+# --- API Gateway Wiring: /search ---
+resource "aws_api_gateway_resource" "search" {
+  rest_api_id = aws_api_gateway_rest_api.api.id
+  parent_id   = aws_api_gateway_rest_api.api.root_resource_id
+  path_part   = "search"
+}
+
+resource "aws_api_gateway_method" "search_messages" {
+  rest_api_id   = aws_api_gateway_rest_api.api.id
+  resource_id   = aws_api_gateway_resource.search.id
+  http_method   = "GET"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "search_messages" {
+  rest_api_id = aws_api_gateway_rest_api.api.id
+  resource_id = aws_api_gateway_resource.search.id
+  http_method = aws_api_gateway_method.search_messages.http_method
+
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = aws_lambda_alias.live["search_messages"].invoke_arn
+}
+
+# --- API Gateway Wiring: /presence ---
+resource "aws_api_gateway_resource" "presence" {
+  rest_api_id = aws_api_gateway_rest_api.api.id
+  parent_id   = aws_api_gateway_rest_api.api.root_resource_id
+  path_part   = "presence"
+}
+
+resource "aws_api_gateway_method" "get_presence" {
+  rest_api_id   = aws_api_gateway_rest_api.api.id
+  resource_id   = aws_api_gateway_resource.presence.id
+  http_method   = "POST"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "get_presence" {
+  rest_api_id = aws_api_gateway_rest_api.api.id
+  resource_id = aws_api_gateway_resource.presence.id
+  http_method = aws_api_gateway_method.get_presence.http_method
 
   integration_http_method = "POST"
   type                    = "AWS_PROXY"
-  uri                     = aws_lambda_function.get_upload_url.invoke_arn
+  uri                     = aws_lambda_alias.live["get_presence"].invoke_arn
+}
+
+resource "aws_lambda_permission" "api_gateway_invoke_create_conversation" {
+  statement_id  = "AllowAPIGatewayInvokeCreateConversation"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.create_conversation.function_name
+  qualifier     = aws_lambda_alias.live["create_conversation"].name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_api_gateway_rest_api.api.execution_arn}/*/*/*"
+}
+
+resource "aws_lambda_permission" "api_gateway_invoke_send_message" {
+  statement_id  = "AllowAPIGatewayInvokeSendMessage"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.send_message.function_name
+  qualifier     = aws_lambda_alias.live["send_message"].name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_api_gateway_rest_api.api.execution_arn}/*/*/*"
+}
+
+resource "aws_lambda_permission" "api_gateway_invoke_message_history" {
+  statement_id  = "AllowAPIGatewayInvokeMessageHistory"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.message_history.function_name
+  qualifier     = aws_lambda_alias.live["message_history"].name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_api_gateway_rest_api.api.execution_arn}/*/*/*"
+}
+
+resource "aws_lambda_permission" "api_gateway_invoke_messages_since" {
+  statement_id  = "AllowAPIGatewayInvokeMessagesSince"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.messages_since.function_name
+  qualifier     = aws_lambda_alias.live["messages_since"].name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_api_gateway_rest_api.api.execution_arn}/*/*/*"
+}
+
+resource "aws_lambda_permission" "api_gateway_invoke_inbox" {
+  statement_id  = "AllowAPIGatewayInvokeInbox"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.inbox.function_name
+  qualifier     = aws_lambda_alias.live["inbox"].name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_api_gateway_rest_api.api.execution_arn}/*/*/*"
+}
+
+resource "aws_lambda_permission" "api_gateway_invoke_search_messages" {
+  statement_id  = "AllowAPIGatewayInvokeSearchMessages"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.search_messages.function_name
+  qualifier     = aws_lambda_alias.live["search_messages"].name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_api_gateway_rest_api.api.execution_arn}/*/*/*"
+}
+
+resource "aws_lambda_permission" "api_gateway_invoke_get_presence" {
+  statement_id  = "AllowAPIGatewayInvokeGetPresence"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.get_presence.function_name
+  qualifier     = aws_lambda_alias.live["get_presence"].name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_api_gateway_rest_api.api.execution_arn}/*/*/*"
 }
 
 
@@ -280,11 +1841,39 @@ resource "aws_api_gateway_deployment" "api_deployment" {
   depends_on = [
     aws_api_gateway_integration.login,
     aws_api_gateway_integration.signup,
+    aws_api_gateway_integration.signup_bulk,
     aws_api_gateway_integration.get_upload_url,
+    aws_api_gateway_integration.get_upload_url_batch,
+    aws_api_gateway_integration.get_download_url,
+    aws_api_gateway_integration.multipart_upload,
+    aws_api_gateway_integration.list_media,
+    aws_api_gateway_integration.get_profiles,
+    aws_api_gateway_integration.create_conversation,
+    aws_api_gateway_integration.send_message,
+    aws_api_gateway_integration.message_history,
+    aws_api_gateway_integration.messages_since,
+    aws_api_gateway_integration.inbox,
+    aws_api_gateway_integration.inbox_read,
+    aws_api_gateway_integration.search_messages,
+    aws_api_gateway_integration.get_presence,
 
     aws_api_gateway_method.login,
     aws_api_gateway_method.signup,
-    aws_api_gateway_method.get_upload_url
+    aws_api_gateway_method.signup_bulk,
+    aws_api_gateway_method.get_upload_url,
+    aws_api_gateway_method.get_upload_url_batch,
+    aws_api_gateway_method.get_download_url,
+    aws_api_gateway_method.multipart_upload,
+    aws_api_gateway_method.list_media,
+    aws_api_gateway_method.get_profiles,
+    aws_api_gateway_method.create_conversation,
+    aws_api_gateway_method.send_message,
+    aws_api_gateway_method.message_history,
+    aws_api_gateway_method.messages_since,
+    aws_api_gateway_method.inbox,
+    aws_api_gateway_method.inbox_read,
+    aws_api_gateway_method.search_messages,
+    aws_api_gateway_method.get_presence
   ]
 
   lifecycle {
@@ -297,3 +1886,121 @@ resource "aws_api_gateway_stage" "api_stage" {
   rest_api_id   = aws_api_gateway_rest_api.api.id
   stage_name    = var.environment_name
 }
+
+
+# --- API Gateway WebSocket API: real-time delivery ---
+# Clients connect with wss://...?token=<Cognito ID token> and send
+# {"action": "sendMessage", ...}; messages are pushed back over the socket.
+# {"action": "heartbeat"} and {"action": "typing", ...} keep presence current.
+resource "aws_apigatewayv2_api" "websocket" {
+  name                       = "${var.project_name}-ws-${var.environment_name}"
+  protocol_type              = "WEBSOCKET"
+  route_selection_expression = "$request.body.action"
+}
+
+# --- WebSocket Wiring: $connect ---
+resource "aws_apigatewayv2_integration" "ws_connect" {
+  api_id             = aws_apigatewayv2_api.websocket.id
+  integration_type   = "AWS_PROXY"
+  integration_method = "POST"
+  integration_uri    = aws_lambda_alias.live["ws_connect"].invoke_arn
+}
+
+resource "aws_apigatewayv2_route" "ws_connect" {
+  api_id    = aws_apigatewayv2_api.websocket.id
+  route_key = "$connect"
+  target    = "integrations/${aws_apigatewayv2_integration.ws_connect.id}"
+}
+
+resource "aws_lambda_permission" "api_gateway_invoke_ws_connect" {
+  statement_id  = "AllowAPIGatewayInvokeWsConnect"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.ws_connect.function_name
+  qualifier     = aws_lambda_alias.live["ws_connect"].name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_apigatewayv2_api.websocket.execution_arn}/*/$connect"
+}
+
+# --- WebSocket Wiring: $disconnect ---
+resource "aws_apigatewayv2_integration" "ws_disconnect" {
+  api_id             = aws_apigatewayv2_api.websocket.id
+  integration_type   = "AWS_PROXY"
+  integration_method = "POST"
+  integration_uri    = aws_lambda_alias.live["ws_disconnect"].invoke_arn
+}
+
+resource "aws_apigatewayv2_route" "ws_disconnect" {
+  api_id    = aws_apigatewayv2_api.websocket.id
+  route_key = "$disconnect"
+  target    = "integrations/${aws_apigatewayv2_integration.ws_disconnect.id}"
+}
+
+resource "aws_lambda_permission" "api_gateway_invoke_ws_disconnect" {
+  statement_id  = "AllowAPIGatewayInvokeWsDisconnect"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.ws_disconnect.function_name
+  qualifier     = aws_lambda_alias.live["ws_disconnect"].name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_apigatewayv2_api.websocket.execution_arn}/*/$disconnect"
+}
+
+# --- WebSocket Wiring: sendMessage ---
+resource "aws_apigatewayv2_integration" "ws_send_message" {
+  api_id             = aws_apigatewayv2_api.websocket.id
+  integration_type   = "AWS_PROXY"
+  integration_method = "POST"
+  integration_uri    = aws_lambda_alias.live["ws_send_message"].invoke_arn
+}
+
+resource "aws_apigatewayv2_route" "ws_send_message" {
+  api_id    = aws_apigatewayv2_api.websocket.id
+  route_key = "sendMessage"
+  target    = "integrations/${aws_apigatewayv2_integration.ws_send_message.id}"
+}
+
+resource "aws_lambda_permission" "api_gateway_invoke_ws_send_message" {
+  statement_id  = "AllowAPIGatewayInvokeWsSendMessage"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.ws_send_message.function_name
+  qualifier     = aws_lambda_alias.live["ws_send_message"].name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_apigatewayv2_api.websocket.execution_arn}/*/sendMessage"
+}
+
+# --- WebSocket Wiring: heartbeat, typing ---
+resource "aws_apigatewayv2_integration" "ws_presence" {
+  api_id             = aws_apigatewayv2_api.websocket.id
+  integration_type   = "AWS_PROXY"
+  integration_method = "POST"
+  integration_uri    = aws_lambda_alias.live["ws_presence"].invoke_arn
+}
+
+resource "aws_apigatewayv2_route" "ws_presence" {
+  for_each = toset(["heartbeat", "typing"])
+
+  api_id    = aws_apigatewayv2_api.websocket.id
+  route_key = each.key
+  target    = "integrations/${aws_apigatewayv2_integration.ws_presence.id}"
+}
+
+resource "aws_lambda_permission" "api_gateway_invoke_ws_presence" {
+  statement_id  = "AllowAPIGatewayInvokeWsPresence"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.ws_presence.function_name
+  qualifier     = aws_lambda_alias.live["ws_presence"].name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_apigatewayv2_api.websocket.execution_arn}/*/*"
+}
+
+resource "aws_apigatewayv2_stage" "websocket" {
+  api_id      = aws_apigatewayv2_api.websocket.id
+  name        = var.environment_name
+  auto_deploy = true
+
+  depends_on = [
+    aws_apigatewayv2_route.ws_connect,
+    aws_apigatewayv2_route.ws_disconnect,
+    aws_apigatewayv2_route.ws_send_message,
+    aws_apigatewayv2_route.ws_presence
+  ]
+}
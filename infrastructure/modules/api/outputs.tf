@@ -10,17 +10,42 @@ output "api_gateway_rest_api_root_resource_id" {
 
 output "login_lambda_invoke_arn" {
   description = "The Invoke ARN of the login Lambda function."
-  value       = aws_lambda_function.login.invoke_arn
+  value       = aws_lambda_alias.live["login"].invoke_arn
 }
 
 output "get_upload_url_lambda_invoke_arn" {
   description = "The Invoke ARN of the get_upload_url Lambda function."
-  value       = aws_lambda_function.get_upload_url.invoke_arn
+  value       = aws_lambda_alias.live["get_upload_url"].invoke_arn
 }
 
 output "signup_lambda_invoke_arn" {
   description = "The Invoke ARN of the signup Lambda function."
-  value       = aws_lambda_function.signup.invoke_arn
+  value       = aws_lambda_alias.live["signup"].invoke_arn
+}
+
+output "post_confirmation_lambda_arn" {
+  description = "The ARN (live alias) of the Cognito post-confirmation trigger that creates user profiles."
+  value       = aws_lambda_alias.live["post_confirmation"].arn
+}
+
+output "multipart_upload_lambda_invoke_arn" {
+  description = "The Invoke ARN of the multipart_upload Lambda function."
+  value       = aws_lambda_alias.live["multipart_upload"].invoke_arn
+}
+
+output "get_download_url_lambda_invoke_arn" {
+  description = "The Invoke ARN of the get_download_url Lambda function."
+  value       = aws_lambda_alias.live["get_download_url"].invoke_arn
+}
+
+output "list_media_lambda_invoke_arn" {
+  description = "The Invoke ARN of the list_media Lambda function."
+  value       = aws_lambda_alias.live["list_media"].invoke_arn
+}
+
+output "get_profiles_lambda_invoke_arn" {
+  description = "The Invoke ARN of the get_profiles Lambda function."
+  value       = aws_lambda_alias.live["get_profiles"].invoke_arn
 }
 
 output "api_invoke_url" {
@@ -28,6 +53,11 @@ output "api_invoke_url" {
   value       = "https://${aws_api_gateway_rest_api.api.id}.execute-api.${var.aws_region}.amazonaws.com/${var.environment_name}"
 }
 
+output "websocket_url" {
+  description = "The wss:// URL clients connect to for real-time delivery."
+  value       = aws_apigatewayv2_stage.websocket.invoke_url
+}
+
 output "api_gateway_deployment_id" {
   description = "The ID of the API Gateway deployment."
   value       = aws_api_gateway_deployment.api_deployment.id
@@ -39,6 +39,26 @@ variable "user_profile_table_arn" {
   type        = string
 }
 
+variable "rate_limit_table_name" {
+  description = "The name of the DynamoDB table holding the /login and /signup rate-limit buckets"
+  type        = string
+}
+
+variable "rate_limit_table_arn" {
+  description = "The ARN of the DynamoDB table holding the /login and /signup rate-limit buckets"
+  type        = string
+}
+
+variable "idempotency_table_name" {
+  description = "The name of the DynamoDB table holding Idempotency-Key responses"
+  type        = string
+}
+
+variable "idempotency_table_arn" {
+  description = "The ARN of the DynamoDB table holding Idempotency-Key responses"
+  type        = string
+}
+
 # --- Inputs from 'media-storage' module ---
 variable "media_bucket_name" {
   description = "The name of the S3 bucket for media uploads"
@@ -58,4 +78,152 @@ variable "media_metadata_table_arn" {
 variable "media_metadata_table_name" {
   description = "The name of the DynamoDB table for media metadata"
   type        = string
-}
\ No newline at end of file
+}
+
+variable "upload_sessions_table_name" {
+  description = "The name of the DynamoDB table for multipart upload sessions"
+  type        = string
+}
+
+variable "upload_sessions_table_arn" {
+  description = "The ARN of the DynamoDB table for multipart upload sessions"
+  type        = string
+}
+
+variable "cdn_domain_name" {
+  description = "Domain of the media CloudFront distribution; download URLs point at the bucket when empty"
+  type        = string
+  default     = ""
+}
+
+variable "cdn_key_pair_id" {
+  description = "ID of the CloudFront public key download URLs are signed for"
+  type        = string
+  default     = ""
+}
+
+variable "cdn_private_key_parameter" {
+  description = "Name of the SSM SecureString parameter holding the PEM private key for cdn_key_pair_id"
+  type        = string
+  default     = ""
+}
+
+variable "download_url_window_seconds" {
+  description = "Download URLs are reused for windows of this length and stay valid for at least one window"
+  type        = number
+  default     = 3600
+}
+
+# --- Inputs from 'messaging' module ---
+variable "conversations_table_name" {
+  description = "The name of the DynamoDB table for conversations"
+  type        = string
+}
+
+variable "conversations_table_arn" {
+  description = "The ARN of the DynamoDB table for conversations"
+  type        = string
+}
+
+variable "messages_table_name" {
+  description = "The name of the DynamoDB table for messages"
+  type        = string
+}
+
+variable "messages_table_arn" {
+  description = "The ARN of the DynamoDB table for messages"
+  type        = string
+}
+
+variable "messages_table_stream_arn" {
+  description = "The ARN of the messages table's stream, consumed by the search indexer"
+  type        = string
+}
+
+variable "message_deliveries_table_name" {
+  description = "The name of the DynamoDB table for per-user message deliveries"
+  type        = string
+}
+
+variable "message_deliveries_table_arn" {
+  description = "The ARN of the DynamoDB table for per-user message deliveries"
+  type        = string
+}
+
+variable "inbox_table_name" {
+  description = "The name of the DynamoDB table for per-user inbox summaries"
+  type        = string
+}
+
+variable "inbox_table_arn" {
+  description = "The ARN of the DynamoDB table for per-user inbox summaries"
+  type        = string
+}
+
+variable "search_index_table_name" {
+  description = "The name of the DynamoDB table for the message search index"
+  type        = string
+}
+
+variable "search_index_table_arn" {
+  description = "The ARN of the DynamoDB table for the message search index"
+  type        = string
+}
+
+variable "connections_table_name" {
+  description = "The name of the DynamoDB table for WebSocket connections"
+  type        = string
+}
+
+variable "connections_table_arn" {
+  description = "The ARN of the DynamoDB table for WebSocket connections"
+  type        = string
+}
+
+variable "message_archive_bucket_name" {
+  description = "The name of the S3 bucket for archived conversation segments"
+  type        = string
+}
+
+variable "message_archive_bucket_arn" {
+  description = "The ARN of the S3 bucket for archived conversation segments"
+  type        = string
+}
+
+variable "archive_after_days" {
+  description = "Conversations with no new message for this many days have their messages moved to the archive bucket"
+  type        = number
+  default     = 90
+}
+
+# --- Media processing ---
+variable "image_processing_layer_arns" {
+  description = "Lambda layer ARNs that provide Pillow (with WebP support) for the thumbnails function"
+  type        = list(string)
+  default     = []
+}
+
+# --- Lambda sizing and warm-up ---
+variable "lambda_memory_size" {
+  description = "Memory (MB) for the functions that lambda_settings does not size"
+  type        = number
+  default     = 128
+}
+
+variable "lambda_architecture" {
+  description = "Instruction set (arm64 or x86_64) for the functions that lambda_settings does not set; thumbnails defaults to x86_64 for its Pillow layer"
+  type        = string
+  default     = "arm64"
+}
+
+variable "lambda_settings" {
+  description = "Per-function overrides keyed by function name (login, signup, get_upload_url, ...): memory_size, architecture, reserved_concurrency (-1 for unreserved), provisioned_concurrency (on the live alias) and warmup (invoke on lambda_warmup_schedule). E.g. { login = { memory_size = 512, provisioned_concurrency = 2 } }"
+  type        = any
+  default     = {}
+}
+
+variable "lambda_warmup_schedule" {
+  description = "EventBridge schedule for the warm-up invocations of the functions with warmup = true"
+  type        = string
+  default     = "rate(5 minutes)"
+}
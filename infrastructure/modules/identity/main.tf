@@ -30,6 +30,17 @@ resource "aws_cognito_user_pool" "user_pool" {
 
   auto_verified_attributes = ["email"]
 
+  # Profiles are created here rather than by /signup, so the signup
+  # response does not wait on DynamoDB. The trigger runs after the user is
+  # confirmed, so a failed write cannot fail the confirmation: the api
+  # module's post_confirmation queues it and retries it from SQS
+  dynamic "lambda_config" {
+    for_each = var.post_confirmation_lambda_arn == null ? [] : [var.post_confirmation_lambda_arn]
+    content {
+      post_confirmation = lambda_config.value
+    }
+  }
+
   tags = {
     Environment = var.environment_name
     Project     = var.project_name
@@ -67,4 +78,51 @@ resource "aws_dynamodb_table" "user_profile_table" {
   }
 }
 
+# Token buckets for the rate limit on /login and /signup (shared by all
+# containers; see lambda_code/shared/python/rate_limit.py)
+resource "aws_dynamodb_table" "rate_limits" {
+  name         = "${var.project_name}-${var.environment_name}-rate-limits"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "pk"
+
+  attribute {
+    name = "pk"
+    type = "S"
+  }
+
+  # A bucket that has refilled is the same as no bucket
+  ttl {
+    attribute_name = "expiresAt"
+    enabled        = true
+  }
 
+  tags = {
+    Environment = var.environment_name
+    Project     = var.project_name
+    ManagedBy   = "Terraform"
+  }
+}
+
+# Responses stored under client Idempotency-Keys (/signup, /get-upload-url;
+# see lambda_code/shared/python/idempotency.py)
+resource "aws_dynamodb_table" "idempotency" {
+  name         = "${var.project_name}-${var.environment_name}-idempotency"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "pk"
+
+  attribute {
+    name = "pk"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expiresAt"
+    enabled        = true
+  }
+
+  tags = {
+    Environment = var.environment_name
+    Project     = var.project_name
+    ManagedBy   = "Terraform"
+  }
+}
@@ -26,3 +26,23 @@ output "user_profile_table_arn" {
   description = "The ARN of the DynamoDB table for user profiles"
   value       = aws_dynamodb_table.user_profile_table.arn
 }
+
+output "rate_limit_table_name" {
+  description = "The name of the DynamoDB table holding the auth rate-limit buckets"
+  value       = aws_dynamodb_table.rate_limits.name
+}
+
+output "rate_limit_table_arn" {
+  description = "The ARN of the DynamoDB table holding the auth rate-limit buckets"
+  value       = aws_dynamodb_table.rate_limits.arn
+}
+
+output "idempotency_table_name" {
+  description = "The name of the DynamoDB table holding Idempotency-Key responses"
+  value       = aws_dynamodb_table.idempotency.name
+}
+
+output "idempotency_table_arn" {
+  description = "The ARN of the DynamoDB table holding Idempotency-Key responses"
+  value       = aws_dynamodb_table.idempotency.arn
+}
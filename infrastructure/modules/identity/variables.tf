@@ -6,4 +6,10 @@ variable "project_name" {
 variable "environment_name" {
   type        = string
   description = "The name of the environment (e.g., 'dev', 'uat', 'prod')."
-}
\ No newline at end of file
+}
+
+variable "post_confirmation_lambda_arn" {
+  type        = string
+  description = "ARN of the Lambda run after a user confirms their signup (creates the user profile). Null for none."
+  default     = null
+}
@@ -52,6 +52,13 @@ resource "aws_s3_bucket_cors_configuration" "media_bucket_cors" {
   }
 }
 
+# Object Created events go to EventBridge, where the api module's
+# media-complete rule picks up new uploads
+resource "aws_s3_bucket_notification" "media_bucket_events" {
+  bucket      = aws_s3_bucket.media_bucket.id
+  eventbridge = true
+}
+
 resource "aws_dynamodb_table" "media_metadata" {
   name = "${var.project_name}-media-metadata-${var.environment_name}"
 
@@ -69,6 +76,25 @@ resource "aws_dynamodb_table" "media_metadata" {
     type = "S"
   }
 
+  attribute {
+    name = "uploadedAt"
+    type = "N"
+  }
+
+  # Per-user listing, newest first. Sparse: only READY rows have uploadedAt.
+  global_secondary_index {
+    name            = "userID-uploadedAt-index"
+    hash_key        = "userID"
+    range_key       = "uploadedAt"
+    projection_type = "ALL"
+  }
+
+  # PENDING rows for uploads that never finish expire on their own
+  ttl {
+    attribute_name = "expiresAt"
+    enabled        = true
+  }
+
   server_side_encryption {
     enabled = true
   }
@@ -82,3 +108,224 @@ resource "aws_dynamodb_table" "media_metadata" {
     Environment = var.environment_name
   }
 }
+
+# Clean up multipart uploads that were started but never completed or
+# aborted, old object versions, and tier uploads that have gone quiet
+resource "aws_s3_bucket_lifecycle_configuration" "media_bucket_lifecycle" {
+  bucket = aws_s3_bucket.media_bucket.id
+
+  rule {
+    id     = "abort-incomplete-multipart-uploads"
+    status = "Enabled"
+
+    filter {}
+
+    abort_incomplete_multipart_upload {
+      days_after_initiation = 7
+    }
+  }
+
+  # Content-addressed objects never change, so an overwrite (two clients
+  # racing to upload the same bytes) only leaves a redundant old version
+  rule {
+    id     = "expire-redundant-content-addressed-versions"
+    status = "Enabled"
+
+    filter {
+      prefix = "uploads/sha256-"
+    }
+
+    noncurrent_version_expiration {
+      noncurrent_days = 1
+    }
+  }
+
+  # Versioning keeps every overwritten or deleted object: move old versions
+  # to Standard-IA after 30 days and drop them after the retention period,
+  # then clear the delete markers left with no versions behind them
+  rule {
+    id     = "tier-and-expire-noncurrent-versions"
+    status = "Enabled"
+
+    filter {}
+
+    noncurrent_version_transition {
+      noncurrent_days = 30
+      storage_class   = "STANDARD_IA"
+    }
+
+    noncurrent_version_expiration {
+      noncurrent_days = var.noncurrent_version_retention_days
+    }
+
+    expiration {
+      expired_object_delete_marker = true
+    }
+  }
+
+  # Most uploads are read in the days after they are sent and rarely after.
+  # Intelligent-Tiering moves objects nobody reads to cheaper tiers and back
+  # on the next read, with no retrieval fee, so old media stays servable
+  # (and CDN-cacheable) at the same URL
+  rule {
+    id     = "tier-stale-uploads"
+    status = "Enabled"
+
+    filter {
+      prefix = "uploads/"
+    }
+
+    transition {
+      days          = var.uploads_tiering_days
+      storage_class = "INTELLIGENT_TIERING"
+    }
+  }
+}
+
+# Server-side state for resumable multipart uploads
+resource "aws_dynamodb_table" "upload_sessions" {
+  name = "${var.project_name}-upload-sessions-${var.environment_name}"
+
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "uploadId"
+
+  attribute {
+    name = "uploadId"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expiresAt"
+    enabled        = true
+  }
+
+  server_side_encryption {
+    enabled = true
+  }
+
+  tags = {
+    Name        = "${var.project_name}-upload-sessions"
+    Environment = var.environment_name
+  }
+}
+
+# --- Optional CDN: CloudFront in front of the private bucket ---
+# Only signed URLs are served (trusted key group), and only CloudFront can
+# read the bucket (origin access control), so the bucket stays private. The
+# signed query string is left out of the cache key, so each object is
+# cached at the edge once however many URLs point at it.
+resource "aws_cloudfront_origin_access_control" "media" {
+  count = var.enable_cdn ? 1 : 0
+
+  name                              = "${var.project_name}-media-${var.environment_name}"
+  description                       = "CloudFront access to the media bucket"
+  origin_access_control_origin_type = "s3"
+  signing_behavior                  = "always"
+  signing_protocol                  = "sigv4"
+}
+
+resource "aws_cloudfront_public_key" "media" {
+  count = var.enable_cdn ? 1 : 0
+
+  name        = "${var.project_name}-media-${var.environment_name}"
+  comment     = "Verifies signed media download URLs"
+  encoded_key = var.cdn_public_key_pem
+}
+
+resource "aws_cloudfront_key_group" "media" {
+  count = var.enable_cdn ? 1 : 0
+
+  name  = "${var.project_name}-media-${var.environment_name}"
+  items = [aws_cloudfront_public_key.media[0].id]
+}
+
+data "aws_cloudfront_cache_policy" "caching_optimized" {
+  count = var.enable_cdn ? 1 : 0
+
+  name = "Managed-CachingOptimized"
+}
+
+# Media objects never change once written, so browsers may keep them for
+# as long as a signed URL lasts
+resource "aws_cloudfront_response_headers_policy" "media" {
+  count = var.enable_cdn ? 1 : 0
+
+  name = "${var.project_name}-media-${var.environment_name}"
+
+  custom_headers_config {
+    items {
+      header   = "Cache-Control"
+      value    = "private, max-age=${var.cdn_browser_max_age_seconds}, immutable"
+      override = true
+    }
+  }
+}
+
+resource "aws_cloudfront_distribution" "media" {
+  count = var.enable_cdn ? 1 : 0
+
+  enabled     = true
+  comment     = "${var.project_name} media (${var.environment_name})"
+  price_class = var.cdn_price_class
+
+  origin {
+    origin_id                = "media-bucket"
+    domain_name              = aws_s3_bucket.media_bucket.bucket_regional_domain_name
+    origin_access_control_id = aws_cloudfront_origin_access_control.media[0].id
+  }
+
+  default_cache_behavior {
+    target_origin_id           = "media-bucket"
+    viewer_protocol_policy     = "redirect-to-https"
+    allowed_methods            = ["GET", "HEAD"]
+    cached_methods             = ["GET", "HEAD"]
+    compress                   = true
+    cache_policy_id            = data.aws_cloudfront_cache_policy.caching_optimized[0].id
+    response_headers_policy_id = aws_cloudfront_response_headers_policy.media[0].id
+    trusted_key_groups         = [aws_cloudfront_key_group.media[0].id]
+  }
+
+  restrictions {
+    geo_restriction {
+      restriction_type = "none"
+    }
+  }
+
+  viewer_certificate {
+    cloudfront_default_certificate = true
+  }
+
+  tags = {
+    Name        = "${var.project_name}-media-cdn"
+    Environment = var.environment_name
+  }
+}
+
+# Let the distribution (and nothing else) read media objects
+resource "aws_s3_bucket_policy" "media_cdn" {
+  count = var.enable_cdn ? 1 : 0
+
+  bucket = aws_s3_bucket.media_bucket.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [{
+      Effect = "Allow"
+      Principal = {
+        Service = "cloudfront.amazonaws.com"
+      }
+      Action = "s3:GetObject"
+      Resource = [
+        "${aws_s3_bucket.media_bucket.arn}/uploads/*",
+        "${aws_s3_bucket.media_bucket.arn}/derived/*"
+      ]
+      Condition = {
+        StringEquals = {
+          "AWS:SourceArn" = aws_cloudfront_distribution.media[0].arn
+        }
+      }
+    }]
+  })
+
+  depends_on = [aws_s3_bucket_public_access_block.media_bucket_access]
+}
@@ -16,4 +16,24 @@ output "media_metadata_table_name" {
 output "media_metadata_table_arn" {
   description = "The ARN of the DynamoDB table for media metadata"
   value       = aws_dynamodb_table.media_metadata.arn
-}
\ No newline at end of file
+}
+
+output "upload_sessions_table_name" {
+  description = "The name of the DynamoDB table for multipart upload sessions"
+  value       = aws_dynamodb_table.upload_sessions.name
+}
+
+output "upload_sessions_table_arn" {
+  description = "The ARN of the DynamoDB table for multipart upload sessions"
+  value       = aws_dynamodb_table.upload_sessions.arn
+}
+
+output "cdn_domain_name" {
+  description = "Domain of the media CloudFront distribution (empty when enable_cdn is false)"
+  value       = try(aws_cloudfront_distribution.media[0].domain_name, "")
+}
+
+output "cdn_key_pair_id" {
+  description = "ID of the CloudFront public key that signed download URLs must use (empty when enable_cdn is false)"
+  value       = try(aws_cloudfront_public_key.media[0].id, "")
+}
@@ -12,4 +12,39 @@ variable "allowed_cors_origins" {
   type        = list(string)
   description = "A list of origins (URLs) allowed to upload to the S3 bucket."
   default     = ["*"]
-}
\ No newline at end of file
+}
+variable "enable_cdn" {
+  type        = bool
+  description = "Serve media through a CloudFront distribution that reads the bucket with origin access control."
+  default     = false
+}
+
+variable "cdn_public_key_pem" {
+  type        = string
+  description = "PEM public key CloudFront verifies signed download URLs with. Required when enable_cdn is true."
+  default     = ""
+}
+
+variable "cdn_price_class" {
+  type        = string
+  description = "CloudFront price class (edge locations) for the media distribution."
+  default     = "PriceClass_100"
+}
+
+variable "cdn_browser_max_age_seconds" {
+  type        = number
+  description = "Cache-Control max-age for media served by the CDN; twice the api module's download_url_window_seconds."
+  default     = 7200
+}
+
+variable "noncurrent_version_retention_days" {
+  type        = number
+  description = "Days an overwritten or deleted media object's old version is kept before it expires."
+  default     = 90
+}
+
+variable "uploads_tiering_days" {
+  type        = number
+  description = "Days after upload before media objects move to S3 Intelligent-Tiering."
+  default     = 30
+}
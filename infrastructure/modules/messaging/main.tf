@@ -0,0 +1,248 @@
+# Messaging layer: conversations, messages, per-user delivery feeds and
+# inboxes, the message search index, the WebSocket connection registry and
+# the S3 archive of quiet conversations. Key design is described in
+# lambda_code/shared/python/message_store.py, inbox_store.py,
+# search_index.py, presence.py, ws_connections.py and message_archive.py.
+
+# conversationID -> members, name, write shard count
+resource "aws_dynamodb_table" "conversations" {
+  name = "${var.project_name}-conversations-${var.environment_name}"
+
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "conversationID"
+
+  attribute {
+    name = "conversationID"
+    type = "S"
+  }
+
+  server_side_encryption {
+    enabled = true
+  }
+
+  point_in_time_recovery {
+    enabled = true
+  }
+
+  tags = {
+    Name        = "${var.project_name}-conversations"
+    Environment = var.environment_name
+  }
+}
+
+# pk = <conversationID>#<shard>, messageID = time-sortable ULID
+resource "aws_dynamodb_table" "messages" {
+  name = "${var.project_name}-messages-${var.environment_name}"
+
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "pk"
+  range_key    = "messageID"
+
+  # New messages feed the search indexer
+  stream_enabled   = true
+  stream_view_type = "NEW_IMAGE"
+
+  attribute {
+    name = "pk"
+    type = "S"
+  }
+
+  attribute {
+    name = "messageID"
+    type = "S"
+  }
+
+  server_side_encryption {
+    enabled = true
+  }
+
+  point_in_time_recovery {
+    enabled = true
+  }
+
+  tags = {
+    Name        = "${var.project_name}-messages"
+    Environment = var.environment_name
+  }
+}
+
+# One copy of each message per member, for catch-up sync; expires after 30 days
+resource "aws_dynamodb_table" "message_deliveries" {
+  name = "${var.project_name}-message-deliveries-${var.environment_name}"
+
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "userID"
+  range_key    = "messageID"
+
+  attribute {
+    name = "userID"
+    type = "S"
+  }
+
+  attribute {
+    name = "messageID"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expiresAt"
+    enabled        = true
+  }
+
+  server_side_encryption {
+    enabled = true
+  }
+
+  tags = {
+    Name        = "${var.project_name}-message-deliveries"
+    Environment = var.environment_name
+  }
+}
+
+# Inbox: one summary per (user, conversation) with the last message and an
+# unread counter; the LSI lists a user's conversations by recent activity
+resource "aws_dynamodb_table" "inbox" {
+  name = "${var.project_name}-inbox-${var.environment_name}"
+
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "userID"
+  range_key    = "conversationID"
+
+  attribute {
+    name = "userID"
+    type = "S"
+  }
+
+  attribute {
+    name = "conversationID"
+    type = "S"
+  }
+
+  attribute {
+    name = "lastActivityAt"
+    type = "N"
+  }
+
+  local_secondary_index {
+    name            = "userID-lastActivityAt-index"
+    range_key       = "lastActivityAt"
+    projection_type = "ALL"
+  }
+
+  server_side_encryption {
+    enabled = true
+  }
+
+  tags = {
+    Name        = "${var.project_name}-inbox"
+    Environment = var.environment_name
+  }
+}
+
+# Search: pk = <conversationID>#<term>, block = day; postings is a Binary Set
+# of (message ID, term count) written by the search indexer
+resource "aws_dynamodb_table" "search_index" {
+  name = "${var.project_name}-search-index-${var.environment_name}"
+
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "pk"
+  range_key    = "block"
+
+  attribute {
+    name = "pk"
+    type = "S"
+  }
+
+  attribute {
+    name = "block"
+    type = "N"
+  }
+
+  server_side_encryption {
+    enabled = true
+  }
+
+  tags = {
+    Name        = "${var.project_name}-search-index"
+    Environment = var.environment_name
+  }
+}
+
+# WebSocket connections: connection#<id> -> userID, user#<id> -> connectionIDs,
+# presence#<id> -> last seen / online until / typing in (see presence.py).
+# API Gateway drops connections after 2 hours; the TTL catches missed $disconnects
+# and drops presence items a day after the user was last seen.
+resource "aws_dynamodb_table" "connections" {
+  name = "${var.project_name}-connections-${var.environment_name}"
+
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "pk"
+
+  attribute {
+    name = "pk"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expiresAt"
+    enabled        = true
+  }
+
+  server_side_encryption {
+    enabled = true
+  }
+
+  tags = {
+    Name        = "${var.project_name}-connections"
+    Environment = var.environment_name
+  }
+}
+
+# Archive: messages of conversations quiet for archive_after_days, moved out
+# of the messages table as compressed segments (<conversationID>/<first>-<last>)
+# that history pages read with ranged GETs. Segments are written once and
+# never overwritten, so the bucket is not versioned.
+resource "aws_s3_bucket" "message_archive" {
+  bucket = "${var.project_name}-message-archive-${var.environment_name}"
+
+  tags = {
+    Name        = "${var.project_name}-message-archive"
+    Environment = var.environment_name
+  }
+}
+
+resource "aws_s3_bucket_public_access_block" "message_archive_access" {
+  bucket = aws_s3_bucket.message_archive.id
+
+  block_public_acls       = true
+  block_public_policy     = true
+  ignore_public_acls      = true
+  restrict_public_buckets = true
+}
+
+resource "aws_s3_bucket_server_side_encryption_configuration" "message_archive_encryption" {
+  bucket = aws_s3_bucket.message_archive.id
+  rule {
+    apply_server_side_encryption_by_default {
+      sse_algorithm = "AES256"
+    }
+  }
+}
+
+# Glacier Instant Retrieval still serves ranged GETs in milliseconds, so
+# old segments move there once history reads of them have become rare
+resource "aws_s3_bucket_lifecycle_configuration" "message_archive_lifecycle" {
+  bucket = aws_s3_bucket.message_archive.id
+
+  rule {
+    id     = "tier-old-segments"
+    status = "Enabled"
+
+    filter {}
+
+    transition {
+      days          = 90
+      storage_class = "GLACIER_IR"
+    }
+  }
+}
@@ -0,0 +1,74 @@
+output "conversations_table_name" {
+  description = "The name of the DynamoDB table for conversations"
+  value       = aws_dynamodb_table.conversations.name
+}
+
+output "conversations_table_arn" {
+  description = "The ARN of the DynamoDB table for conversations"
+  value       = aws_dynamodb_table.conversations.arn
+}
+
+output "messages_table_name" {
+  description = "The name of the DynamoDB table for messages"
+  value       = aws_dynamodb_table.messages.name
+}
+
+output "messages_table_arn" {
+  description = "The ARN of the DynamoDB table for messages"
+  value       = aws_dynamodb_table.messages.arn
+}
+
+output "messages_table_stream_arn" {
+  description = "The ARN of the messages table's stream of new messages"
+  value       = aws_dynamodb_table.messages.stream_arn
+}
+
+output "message_deliveries_table_name" {
+  description = "The name of the DynamoDB table for per-user message deliveries"
+  value       = aws_dynamodb_table.message_deliveries.name
+}
+
+output "message_deliveries_table_arn" {
+  description = "The ARN of the DynamoDB table for per-user message deliveries"
+  value       = aws_dynamodb_table.message_deliveries.arn
+}
+
+output "inbox_table_name" {
+  description = "The name of the DynamoDB table for per-user inbox summaries"
+  value       = aws_dynamodb_table.inbox.name
+}
+
+output "inbox_table_arn" {
+  description = "The ARN of the DynamoDB table for per-user inbox summaries"
+  value       = aws_dynamodb_table.inbox.arn
+}
+
+output "search_index_table_name" {
+  description = "The name of the DynamoDB table for the message search index"
+  value       = aws_dynamodb_table.search_index.name
+}
+
+output "search_index_table_arn" {
+  description = "The ARN of the DynamoDB table for the message search index"
+  value       = aws_dynamodb_table.search_index.arn
+}
+
+output "connections_table_name" {
+  description = "The name of the DynamoDB table for WebSocket connections"
+  value       = aws_dynamodb_table.connections.name
+}
+
+output "connections_table_arn" {
+  description = "The ARN of the DynamoDB table for WebSocket connections"
+  value       = aws_dynamodb_table.connections.arn
+}
+
+output "message_archive_bucket_name" {
+  description = "The name of the S3 bucket for archived conversation segments"
+  value       = aws_s3_bucket.message_archive.bucket
+}
+
+output "message_archive_bucket_arn" {
+  description = "The ARN of the S3 bucket for archived conversation segments"
+  value       = aws_s3_bucket.message_archive.arn
+}
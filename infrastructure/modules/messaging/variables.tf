@@ -0,0 +1,9 @@
+variable "project_name" {
+  type        = string
+  description = "A unique name for the project (e.g., 'chatapp')."
+}
+
+variable "environment_name" {
+  type        = string
+  description = "The name of the environment (e.g., 'dev', 'uat', 'prod')."
+}
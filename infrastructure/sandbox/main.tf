@@ -21,6 +21,9 @@ module "identity" {
 
   project_name     = var.project_name
   environment_name = var.environment_name # This is the dynamic part
+
+  # Creates the user profile once a signup is confirmed
+  post_confirmation_lambda_arn = module.api.post_confirmation_lambda_arn
 }
 
 module "media_storage" {
@@ -31,6 +34,13 @@ module "media_storage" {
   allowed_cors_origins = var.media_allowed_cors_origins
 }
 
+module "messaging" {
+  source = "../modules/messaging"
+
+  project_name     = var.project_name
+  environment_name = var.environment_name
+}
+
 module "api" {
   source = "../modules/api"
 
@@ -44,9 +54,34 @@ module "api" {
   cognito_user_pool_arn   = module.identity.user_pool_arn
   user_profile_table_name = module.identity.user_profile_table_name
   user_profile_table_arn  = module.identity.user_profile_table_arn
+  rate_limit_table_name   = module.identity.rate_limit_table_name
+  rate_limit_table_arn    = module.identity.rate_limit_table_arn
+  idempotency_table_name  = module.identity.idempotency_table_name
+  idempotency_table_arn   = module.identity.idempotency_table_arn
+
+  media_bucket_name          = module.media_storage.media_bucket_name
+  media_bucket_arn           = module.media_storage.media_bucket_arn
+  media_metadata_table_name  = module.media_storage.media_metadata_table_name
+  media_metadata_table_arn   = module.media_storage.media_metadata_table_arn
+  upload_sessions_table_name = module.media_storage.upload_sessions_table_name
+  upload_sessions_table_arn  = module.media_storage.upload_sessions_table_arn
+  cdn_domain_name            = module.media_storage.cdn_domain_name
+  cdn_key_pair_id            = module.media_storage.cdn_key_pair_id
 
-  media_bucket_name         = module.media_storage.media_bucket_name
-  media_bucket_arn          = module.media_storage.media_bucket_arn
-  media_metadata_table_name = module.media_storage.media_metadata_table_name
-  media_metadata_table_arn  = module.media_storage.media_metadata_table_arn
+  # --- Connections from Messaging Module ---
+  conversations_table_name      = module.messaging.conversations_table_name
+  conversations_table_arn       = module.messaging.conversations_table_arn
+  messages_table_name           = module.messaging.messages_table_name
+  messages_table_arn            = module.messaging.messages_table_arn
+  messages_table_stream_arn     = module.messaging.messages_table_stream_arn
+  message_deliveries_table_name = module.messaging.message_deliveries_table_name
+  message_deliveries_table_arn  = module.messaging.message_deliveries_table_arn
+  inbox_table_name              = module.messaging.inbox_table_name
+  inbox_table_arn               = module.messaging.inbox_table_arn
+  search_index_table_name       = module.messaging.search_index_table_name
+  search_index_table_arn        = module.messaging.search_index_table_arn
+  connections_table_name        = module.messaging.connections_table_name
+  connections_table_arn         = module.messaging.connections_table_arn
+  message_archive_bucket_name   = module.messaging.message_archive_bucket_name
+  message_archive_bucket_arn    = module.messaging.message_archive_bucket_arn
 }
\ No newline at end of file
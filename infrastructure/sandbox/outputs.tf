@@ -2,3 +2,8 @@ output "api_invoke_url" {
   description = "The invoke URL for the deployed sandbox API Gateway."
   value       = module.api.api_invoke_url
 }
+
+output "websocket_url" {
+  description = "The WebSocket URL for real-time delivery in the sandbox environment."
+  value       = module.api.websocket_url
+}